@@ -0,0 +1,153 @@
+"""
+Binary-quantized two-stage index versus IndexFlatIP
+
+Builds the same store with `vector_index="flat"` and `vector_index="binary"`
+(each in a fresh subprocess), then reports recall@k against exact search,
+query latency and resident memory after loading the index from disk.
+
+Vectors are synthetic but embedding-like: unit-norm points scattered
+around topic centroids, so near neighbours exist and recall is meaningful.
+
+Usage:
+    python benchmarks/binary_quantization.py
+    python benchmarks/binary_quantization.py --size 1000000 --rerank 10 20 50
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from run import percentile  # noqa: E402
+
+
+def synthetic_vectors(n: int, dimension: int, seed: int, topics: int = 1024, subtopics: int = 16) -> np.ndarray:
+    """Topic + subtopic + noise mixture; the centroid RNG is fixed so every call shares topics"""
+    centroids = np.random.default_rng(0)
+    topic_vecs = centroids.standard_normal((topics, dimension)).astype('float32')
+    sub_vecs = 0.6 * centroids.standard_normal((topics * subtopics, dimension)).astype('float32')
+    
+    rng = np.random.default_rng(seed)
+    sub = rng.integers(0, topics * subtopics, n)
+    vectors = topic_vecs[sub // subtopics] + sub_vecs[sub] + 1.2 * rng.standard_normal((n, dimension)).astype('float32')
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def resident_mb() -> float:
+    """
+    Anonymous resident memory (Linux), falling back to peak RSS elsewhere
+    
+    Memory-mapped segment pages are page cache the kernel can drop, so they
+    are not counted against the index.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def build(path: str, size: int, dimension: int, seed: int):
+    from openmemory.backends.vector_backend import VectorBackend
+    
+    store = VectorBackend(path, dimension=dimension, max_segments=1024)
+    chunk = 50000
+    for start in range(0, size, chunk):
+        vectors = synthetic_vectors(min(chunk, size - start), dimension, seed + start)
+        store.add_vectors(vectors, [
+            {"id": f"v{i}", "content": "", "user_id": None, "category": "general"}
+            for i in range(start, start + len(vectors))
+        ])
+
+
+def measure(path: str, index_type: str, rerank: int, queries: np.ndarray, k: int) -> Dict:
+    """Load the store, search every query and report latency, results and RSS"""
+    from openmemory.backends.vector_backend import VectorBackend
+    
+    before = resident_mb()
+    start = time.perf_counter()
+    store = VectorBackend(path, dimension=queries.shape[1], index_type=index_type, rerank_factor=rerank)
+    load_seconds = time.perf_counter() - start
+    loaded = resident_mb()
+    
+    samples, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        hits = store.search_embedding(q, limit=k, threshold=-1.0)
+        samples.append(time.perf_counter() - start)
+        results.append([h["id"] for h in hits])
+    
+    return {
+        "index": index_type,
+        "rerank_factor": rerank if index_type == "binary" else None,
+        "load_seconds": load_seconds,
+        "index_rss_mb": loaded - before,
+        "rss_after_queries_mb": resident_mb() - before,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "results": results,
+    }
+
+
+def _worker(queue, *args):
+    queue.put(measure(*args))
+
+
+def isolated(*args) -> Dict:
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_worker, args=(queue,) + args)
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Binary-quantized index recall and memory")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--rerank", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+    
+    path = tempfile.mkdtemp(prefix="ocmem-bq-")
+    build(path, args.size, args.dimension, args.seed)
+    queries = synthetic_vectors(args.queries, args.dimension, args.seed - 1)
+    
+    flat = isolated(path, "flat", 0, queries, args.k)
+    runs = [flat] + [isolated(path, "binary", r, queries, args.k) for r in args.rerank]
+    
+    print(f"{'index':>8} {'rerank':>6} {'recall@' + str(args.k):>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'index MB':>9} {'after q MB':>10}")
+    for run in runs:
+        hits = sum(len(set(got) & set(truth)) for got, truth in zip(run["results"], flat["results"]))
+        run["recall"] = hits / sum(len(truth) for truth in flat["results"])
+        print(f"{run['index']:>8} {run['rerank_factor'] or '-':>6} {run['recall']:>9.3f} {run['p50_ms']:>8.2f} "
+              f"{run['p95_ms']:>8.2f} {run['index_rss_mb']:>9.1f} {run['rss_after_queries_mb']:>10.1f}")
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump([{k: v for k, v in run.items() if k != "results"} for run in runs], f, indent=2)
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Store size and cold-load time with and without compression
+
+Fills a store the way it was written before compression (plain SQLite
+rows, content copied into the vector metadata), measures it, then runs
+`openmemory compress` and measures again. Size is the SQLite file plus
+the vectors directory; cold load is a fresh process opening the stores
+and answering its first search.
+
+Usage:
+    python benchmarks/compression.py --rows 50000
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generator import SyntheticData  # noqa: E402
+
+from openmemory.backends.registry import create_long_term_backend, create_vector_store  # noqa: E402
+from openmemory.cli import build_parser  # noqa: E402
+from openmemory.core.config import MemoryConfig  # noqa: E402
+from openmemory.core.memory import OpenClawMemory  # noqa: E402
+
+
+def store_size(config: MemoryConfig):
+    vectors = 0
+    for dirpath, _, files in os.walk(config.vector_path):
+        vectors += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files)
+    return os.path.getsize(config.long_term_path), vectors
+
+
+def cold_load(config: MemoryConfig, report):
+    began = time.perf_counter()
+    mem = OpenClawMemory(user_id="user-0", config=config)
+    opened = time.perf_counter()
+    results = mem.search("project deadline", threshold=0.0)
+    done = time.perf_counter()
+    report.put(((opened - began) * 1000, (done - began) * 1000, bool(results) and all(r["content"] for r in results)))
+
+
+def measure(config: MemoryConfig):
+    report = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=cold_load, args=(config, report))
+    proc.start()
+    result = report.get()
+    proc.join()
+    return store_size(config) + result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--sentences", type=int, default=3, help="generated sentences per memory")
+    args = parser.parse_args()
+
+    base = tempfile.mkdtemp(prefix="ocmem-compress-")
+    config = MemoryConfig(
+        base_path=base, encoder_backend="hash", compaction_interval=0.0, vector_store_content=True
+    )
+    long_term, vectors = create_long_term_backend(config), create_vector_store(config)
+    data = SyntheticData(7)
+    memories = list(data.memories(args.rows))
+    for m in memories:
+        m.content = " ".join([m.content] + [data.text() for _ in range(args.sentences - 1)])
+        m.metadata = {"source": "conversation", "extractor": "bench", "confidence": round(m.importance, 2)}
+    for offset in range(0, args.rows, 5000):
+        long_term.add_many(memories[offset:offset + 5000])
+        vectors.add_many(memories[offset:offset + 5000])
+    # Compact both files so the sizes count live pages only
+    long_term.vacuum()
+
+    rows = [("plain", measure(config))]
+    compress = build_parser().parse_args([
+        "--base-path", base, "--encoder", "hash", "-q", "compress"
+    ])
+    began = time.perf_counter()
+    compress.func(compress)
+    elapsed = time.perf_counter() - began
+    config.compress_text, config.vector_store_content = True, False
+    create_long_term_backend(config).vacuum()
+    rows.append(("compressed", measure(config)))
+
+    print(f"{args.rows:,} rows, compress took {elapsed:.2f}s")
+    print(f"{'store':<11} {'sqlite bytes':>13} {'vector bytes':>13} {'open ms':>8} {'first search ms':>16} {'content':>8}")
+    for name, (sqlite, vectors, opened, first, resolved) in rows:
+        print(f"{name:<11} {sqlite:>13,} {vectors:>13,} {opened:>8.1f} {first:>16.1f} "
+              f"{'ok' if resolved else 'MISSING':>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
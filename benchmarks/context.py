@@ -0,0 +1,95 @@
+"""
+Recency-only versus query-aware get_context
+
+Fills one user's store with synthetic memories, plants "needle" facts in
+its oldest rows and asks get_context() about each needle in a later
+session. Reports how often the needle makes it into the context, latency,
+and how often each retrieval stage ran, for plain get_context() and for
+get_context(query=...) under each latency budget.
+
+Usage:
+    python benchmarks/context.py --rows 20000 --budgets 0 20 5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generator import SyntheticData  # noqa: E402
+from run import percentile  # noqa: E402
+
+from openmemory.backends.registry import create_long_term_backend, create_vector_store  # noqa: E402
+from openmemory.core.config import MemoryConfig  # noqa: E402
+from openmemory.core.memory import OpenClawMemory  # noqa: E402
+
+NEEDLE = "Project {code} ships from the {city} warehouse on pallets numbered {code}"
+
+
+def fill(config: MemoryConfig, rows: int, needles: int):
+    long_term, vectors = create_long_term_backend(config), create_vector_store(config)
+    data = SyntheticData(21)
+    memories = list(data.memories(rows, users=1))
+    planted = []
+    for i in range(needles):
+        # Oldest rows, so recency alone never reaches them
+        m = memories[i * 7]
+        code, city = f"zx{i:03d}q", data.rng.choice(["Riga", "Quito", "Hobart", "Tromso"])
+        m.content, m.category = NEEDLE.format(code=code, city=city), "fact"
+        planted.append((m.id, f"Which warehouse ships project {code}?"))
+    for offset in range(0, rows, 5000):
+        long_term.add_many(memories[offset:offset + 5000])
+        vectors.add_many(memories[offset:offset + 5000])
+    return planted
+
+
+def run(mem: OpenClawMemory, planted, query: bool, budget_ms):
+    found, latencies, stages = 0, [], Counter()
+    for memory_id, question in planted:
+        needle = mem.long_term.get(memory_id).content
+        began = time.perf_counter()
+        context, report = mem.get_context(
+            session_id="session-new", max_tokens=300, query=question if query else None,
+            latency_budget_ms=budget_ms, return_report=True
+        )
+        latencies.append((time.perf_counter() - began) * 1000)
+        found += needle in context
+        stages.update(f"{stage}:{outcome}" for stage, outcome in report["stages"].items())
+    return found / len(planted), latencies, stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--needles", type=int, default=100)
+    parser.add_argument("--budgets", type=float, nargs="+", default=[0, 20, 5], help="ms; 0 means unbounded")
+    args = parser.parse_args()
+
+    config = MemoryConfig(base_path=tempfile.mkdtemp(prefix="ocmem-context-"), encoder_backend="hash",
+                          compaction_interval=0.0)
+    planted = fill(config, args.rows, args.needles)
+    mem = OpenClawMemory(user_id="user-0", config=config)
+    mem.add("warm up", session_id="warm-up", merge_similar=False)
+    mem.get_context(query="warm up")
+
+    modes = [("recency", False, None)] + [
+        (f"query {b:g}ms" if b else "query", True, b or None) for b in args.budgets
+    ]
+    print(f"{args.rows:,} rows, {len(planted)} needles")
+    print(f"{'get_context':<13} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8}  stages")
+    for name, query, budget in modes:
+        recall, latencies, stages = run(mem, planted, query, budget)
+        summary = ", ".join(f"{k} {v}" for k, v in sorted(stages.items()))
+        print(f"{name:<13} {recall:>7.0%} {percentile(latencies, 50):>8.2f} {percentile(latencies, 99):>8.2f}  "
+              f"{summary}")
+    mem.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
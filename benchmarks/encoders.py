@@ -0,0 +1,206 @@
+"""
+CPU encoder throughput and latency
+
+Compares the current encoder (SentenceTransformer when installed, else
+the hash fallback) with the ONNX Runtime encoder in fp32 and with int8
+dynamically quantized weights, across thread counts. Reports model load
+time, batch throughput, single-query latency, padding saved by length
+bucketing and how closely int8 embeddings track fp32 ones.
+
+--model takes a directory with model.onnx and tokenizer.json, e.g. from
+`optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 DIR`.
+Without it a small random transformer-shaped model is generated locally
+(--make-test-model), which is enough to compare runtimes and settings but
+not embedding quality.
+
+Usage:
+    python benchmarks/encoders.py --model ~/models/minilm-onnx --threads 1 4
+    python benchmarks/encoders.py --make-test-model /tmp/ocmem-test-model
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generator import SyntheticData  # noqa: E402
+from run import percentile  # noqa: E402
+
+from openmemory.backends.encoders import EncoderSpec, get_encoder, length_buckets  # noqa: E402
+
+
+def make_test_model(path: str, hidden: int = 384, layers: int = 4, seed: int = 0) -> str:
+    """
+    Write a random transformer-shaped ONNX model and a word-level tokenizer
+
+    Embedding lookup, then `layers` residual feed-forward blocks (hidden ->
+    4 * hidden -> hidden), producing last_hidden_state like an exported
+    encoder. Needs the onnx and tokenizers packages.
+    """
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+    from tokenizers import Tokenizer, models, normalizers, pre_tokenizers, processors
+
+    os.makedirs(path, exist_ok=True)
+    data = SyntheticData(seed)
+    words = sorted({w for _ in range(2000) for w in data.text().lower().replace("(", " ").replace(")", " ").split()})
+    vocab = {token: i for i, token in enumerate(["[PAD]", "[UNK]", "[CLS]", "[SEP]"] + words)}
+
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.normalizer = normalizers.Lowercase()
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[("[CLS]", vocab["[CLS]"]), ("[SEP]", vocab["[SEP]"])]
+    )
+    tokenizer.save(os.path.join(path, "tokenizer.json"))
+
+    rng = np.random.default_rng(seed)
+    init = [numpy_helper.from_array(rng.standard_normal((len(vocab), hidden)).astype('float32'), "embeddings")]
+    nodes = [
+        helper.make_node("Gather", ["embeddings", "input_ids"], ["h0"]),
+        helper.make_node("Cast", ["attention_mask"], ["mask_f"], to=TensorProto.FLOAT),
+        helper.make_node("Unsqueeze", ["mask_f", "axis_last"], ["mask_3d"]),
+        helper.make_node("Mul", ["h0", "mask_3d"], ["x0"]),
+    ]
+    init.append(numpy_helper.from_array(np.array([-1], dtype='int64'), "axis_last"))
+    for layer in range(layers):
+        scale = 1 / np.sqrt(hidden)
+        for name, shape in ((f"w1_{layer}", (hidden, 4 * hidden)), (f"w2_{layer}", (4 * hidden, hidden))):
+            init.append(numpy_helper.from_array((rng.standard_normal(shape) * scale).astype('float32'), name))
+        init.append(numpy_helper.from_array(np.zeros(4 * hidden, dtype='float32'), f"b1_{layer}"))
+        init.append(numpy_helper.from_array(np.zeros(hidden, dtype='float32'), f"b2_{layer}"))
+        x, out = f"x{layer}", f"x{layer + 1}"
+        nodes += [
+            helper.make_node("MatMul", [x, f"w1_{layer}"], [f"m1_{layer}"]),
+            helper.make_node("Add", [f"m1_{layer}", f"b1_{layer}"], [f"a1_{layer}"]),
+            helper.make_node("Relu", [f"a1_{layer}"], [f"r_{layer}"]),
+            helper.make_node("MatMul", [f"r_{layer}", f"w2_{layer}"], [f"m2_{layer}"]),
+            helper.make_node("Add", [f"m2_{layer}", f"b2_{layer}"], [f"a2_{layer}"]),
+            helper.make_node("Add", [x, f"a2_{layer}"], [out]),
+        ]
+    nodes.append(helper.make_node("Identity", [f"x{layers}"], ["last_hidden_state"]))
+
+    graph = helper.make_graph(
+        nodes,
+        "ocmem-test-encoder",
+        [
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "tokens"]),
+            helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "tokens"]),
+        ],
+        [helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "tokens", hidden])],
+        init,
+    )
+    # IR 8 loads on every onnxruntime release that supports opset 17
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)], ir_version=8)
+    onnx.save(model, os.path.join(path, "model.onnx"))
+    return path
+
+
+def texts(n: int, seed: int = 7) -> List[str]:
+    """Memory-like texts of mixed length: mostly one sentence, some paragraphs"""
+    data = SyntheticData(seed)
+    out = []
+    for _ in range(n):
+        sentences = data.rng.choice([1, 1, 1, 2, 3, 8])
+        out.append(". ".join(data.text() for _ in range(sentences)))
+    return out
+
+
+def measure(spec: EncoderSpec, corpus: List[str], queries: List[str]) -> Dict:
+    start = time.perf_counter()
+    encoder = get_encoder(spec)
+    encoder.load()
+    load_s = time.perf_counter() - start
+
+    encoder.encode(corpus[:spec.batch_size])  # warm-up
+    start = time.perf_counter()
+    vectors = encoder.encode(corpus)
+    batch_s = time.perf_counter() - start
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        encoder.encode([query])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "name": encoder.name,
+        "load_s": load_s,
+        "texts_per_s": len(corpus) / batch_s,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "vectors": vectors,
+    }
+
+
+def padding_report(model_dir: str, corpus: List[str], batch_size: int) -> str:
+    from tokenizers import Tokenizer
+
+    tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+    lengths = [len(e.ids) for e in tokenizer.encode_batch(corpus)]
+    real = sum(lengths)
+    arrival = sum(max(lengths[i:i + batch_size]) * len(lengths[i:i + batch_size])
+                  for i in range(0, len(lengths), batch_size))
+    bucketed = sum(max(lengths[i] for i in b) * len(b) for b in length_buckets(lengths, batch_size))
+    return (f"padded tokens per real token: {arrival / real:.2f} in arrival order, "
+            f"{bucketed / real:.2f} length-bucketed (batch {batch_size})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=None, help="ONNX model directory (model.onnx + tokenizer.json)")
+    parser.add_argument("--make-test-model", default=None, metavar="DIR",
+                        help="generate a small random model in DIR (default when --model is not given)")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    model_dir = args.model
+    if model_dir is None:
+        model_dir = make_test_model(args.make_test_model or tempfile.mkdtemp(prefix="ocmem-test-model-"),
+                                    hidden=args.dimension)
+        print(f"generated test model in {model_dir}")
+
+    corpus = texts(args.texts)
+    queries = [q.split(". ")[0] for q in texts(args.queries, seed=11)]
+    print(padding_report(model_dir, corpus, args.batch_size))
+
+    specs = [EncoderSpec(backend="auto", dimension=args.dimension, batch_size=args.batch_size)]
+    for threads in args.threads:
+        for quantize in (False, True):
+            specs.append(EncoderSpec(backend="onnx", model=model_dir, dimension=args.dimension,
+                                     threads=threads, quantize=quantize, batch_size=args.batch_size))
+
+    print(f"\n{'encoder':<44} {'threads':>7} {'load s':>7} {'texts/s':>9} {'p50 ms':>7} {'p95 ms':>7}")
+    fp32 = {}
+    for spec in specs:
+        result = measure(spec, corpus, queries)
+        threads = spec.threads or "-"
+        print(f"{result['name']:<44} {threads!s:>7} {result['load_s']:>7.2f} {result['texts_per_s']:>9,.0f} "
+              f"{result['p50_ms']:>7.2f} {result['p95_ms']:>7.2f}")
+        if spec.backend == "onnx" and not spec.quantize:
+            fp32[spec.threads] = result["vectors"]
+        elif spec.backend == "onnx":
+            agreement = (fp32[spec.threads] * result["vectors"]).sum(axis=1)
+            print(f"{'':<44} int8 vs fp32 cosine: mean {agreement.mean():.4f}, min {agreement.min():.4f}")
+
+    model_file = os.path.join(model_dir, "model.onnx")
+    int8_file = os.path.join(model_dir, "model.int8.onnx")
+    if os.path.exists(int8_file):
+        print(f"\nmodel size: {os.path.getsize(model_file) / 2**20:.1f} MB fp32, "
+              f"{os.path.getsize(int8_file) / 2**20:.1f} MB int8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
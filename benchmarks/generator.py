@@ -0,0 +1,89 @@
+"""Deterministic synthetic memories and conversations for benchmarks"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+from openmemory.core.memory import Memory
+
+NAMES = ["Alice", "Bob", "Carol", "Dmitri", "Eun-ji", "Farah", "Gustavo", "Hana"]
+PLACES = ["Berlin", "San Francisco", "Lagos", "Osaka", "Lima", "Toronto", "Pune", "Oslo"]
+FOODS = ["peanuts", "shellfish", "gluten", "dairy", "sushi", "ramen", "tacos", "curry"]
+TOOLS = ["Python", "Rust", "Go", "TypeScript", "vim", "emacs", "Docker", "Kubernetes"]
+TIMES = ["early morning", "late evening", "lunchtime", "weekends", "Friday afternoons"]
+
+TEMPLATES = {
+    "preference": [
+        "I prefer {tool} over {tool2} for side projects",
+        "I like to work in the {time}",
+        "I really enjoy {food} when travelling to {place}",
+        "Please keep answers short and skip the pleasantries",
+    ],
+    "fact": [
+        "I'm allergic to {food}",
+        "I live in {place} with my partner {name}",
+        "My manager is {name} and we meet on {time}",
+        "I work as a backend engineer using {tool}",
+    ],
+    "task": [
+        "Remind me to call {name} about the {place} trip",
+        "I need to migrate the {tool} service before {time}",
+        "Book a table for {food} with {name} next week",
+    ],
+    "general": [
+        "We talked about the conference in {place}",
+        "{name} recommended a new {tool} plugin",
+        "The {place} office moves to a new building soon",
+    ],
+}
+CATEGORY_WEIGHTS = [("preference", 0.3), ("fact", 0.3), ("task", 0.2), ("general", 0.2)]
+
+
+class SyntheticData:
+    """Seeded generator, so every run and every commit sees the same data"""
+    
+    def __init__(self, seed: int = 42):
+        self.rng = random.Random(seed)
+    
+    def _fill(self, template: str) -> str:
+        rng = self.rng
+        tool, tool2 = rng.sample(TOOLS, 2)
+        return template.format(
+            name=rng.choice(NAMES), place=rng.choice(PLACES), food=rng.choice(FOODS),
+            tool=tool, tool2=tool2, time=rng.choice(TIMES)
+        ) + f" (#{rng.randrange(10 ** 6)})"
+    
+    def _category(self) -> str:
+        names, weights = zip(*CATEGORY_WEIGHTS)
+        return self.rng.choices(names, weights)[0]
+    
+    def text(self, category: str = None) -> str:
+        return self._fill(self.rng.choice(TEMPLATES[category or self._category()]))
+    
+    def memories(self, n: int, users: int = 10, sessions: int = 50) -> Iterator[Memory]:
+        """Yield `n` memories spread over `users` users and `sessions` sessions"""
+        start = datetime(2026, 1, 1)
+        for i in range(n):
+            category = self._category()
+            stamp = (start + timedelta(seconds=i * 37)).isoformat()
+            yield Memory(
+                id=f"bench-{i:08d}",
+                content=self.text(category),
+                user_id=f"user-{i % users}",
+                agent_id="bench-agent",
+                session_id=f"session-{self.rng.randrange(sessions)}",
+                category=category,
+                importance=round(self.rng.random(), 3),
+                created_at=stamp,
+                updated_at=stamp,
+            )
+    
+    def queries(self, n: int) -> List[str]:
+        return [self.text() for _ in range(n)]
+    
+    def conversation(self, turns: int = 6) -> List[Dict[str, str]]:
+        messages = []
+        for _ in range(turns):
+            messages.append({"role": "user", "content": self.text()})
+            messages.append({"role": "assistant", "content": "Noted, I'll keep that in mind."})
+        return messages
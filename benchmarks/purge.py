@@ -0,0 +1,184 @@
+"""
+Large-tenant purge versus live writes and searches
+
+Fills a SQLite store (and a vector index, unless --no-vectors) with one
+large tenant and a few small ones, then purges the large tenant while a
+writer process keeps adding memories for the others and a searcher process
+keeps searching their vectors. Compares a single-transaction purge
+(--chunk-size 0) with chunked deletion and reports the writer's and the
+searcher's latency during the purge, purge duration, the time to reclaim
+the deleted vectors afterwards, and the file size before, after the purge
+and after incremental reclamation.
+
+Usage:
+    python benchmarks/purge.py --rows 200000
+    python benchmarks/purge.py --rows 200000 --chunk-size 0 1000 5000 --no-vectors
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from run import percentile  # noqa: E402
+
+from openmemory.backends.encoders import EncoderSpec, get_encoder  # noqa: E402
+from openmemory.backends.sqlite_backend import SQLiteBackend  # noqa: E402
+from openmemory.backends.vector_backend import VectorBackend  # noqa: E402
+from openmemory.core.memory import Memory  # noqa: E402
+
+SMALL_ROWS = 2000
+
+
+def file_size(path: str) -> int:
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def open_vectors(path: str) -> VectorBackend:
+    return VectorBackend(path, encoder=get_encoder(EncoderSpec(backend="hash")))
+
+
+def writer(path: str, start, stop, report):
+    """Add one memory at a time for small tenants, timing every write"""
+    backend = SQLiteBackend(path)
+    latencies = []
+    start.wait()
+    i = 0
+    while not stop.is_set():
+        memory = Memory(id=None, content=f"live write {i}", user_id=f"small-{i % 4}")
+        began = time.perf_counter()
+        backend.add(memory)
+        latencies.append((time.perf_counter() - began) * 1000)
+        i += 1
+    report.put(latencies)
+
+
+def searcher(vector_path: str, start, stop, report):
+    """Search small tenants' vectors back to back, timing every search"""
+    vectors = open_vectors(vector_path)
+    vectors.search("warm up", user_id="small-0", threshold=0.0)
+    latencies = []
+    start.wait()
+    i = 0
+    while not stop.is_set():
+        began = time.perf_counter()
+        vectors.search(f"small tenant note {i}", user_id=f"small-{i % 4}", limit=10, threshold=0.0)
+        latencies.append((time.perf_counter() - began) * 1000)
+        i += 1
+    report.put(latencies)
+
+
+def run(rows: int, chunk_size: int, base: str, with_vectors: bool) -> Dict:
+    path = os.path.join(base, f"purge-{chunk_size}.db")
+    backend = SQLiteBackend(path)
+    vectors: Optional[VectorBackend] = None
+    if with_vectors:
+        vector_path = os.path.join(base, f"vectors-{chunk_size}")
+        vectors = open_vectors(vector_path)
+    small = [Memory(id=None, content=f"small tenant note {i}", user_id=f"small-{i % 4}") for i in range(SMALL_ROWS)]
+    backend.add_many(small)
+    if vectors:
+        vectors.add_many(small)
+    for offset in range(0, rows, 10000):
+        batch = [
+            Memory(id=None, content=f"tenant memory {offset + i} " + "lorem ipsum " * 20, user_id="large")
+            for i in range(min(10000, rows - offset))
+        ]
+        backend.add_many(batch)
+        if vectors:
+            vectors.add_many(batch)
+    if vectors:
+        vectors.compact()
+    size_full = file_size(path)
+
+    start, stop = multiprocessing.Event(), multiprocessing.Event()
+    reports = {"write": multiprocessing.Queue()}
+    workers = [multiprocessing.Process(target=writer, args=(path, start, stop, reports["write"]))]
+    if vectors:
+        reports["search"] = multiprocessing.Queue()
+        workers.append(multiprocessing.Process(target=searcher, args=(vector_path, start, stop, reports["search"])))
+    for proc in workers:
+        proc.start()
+    start.set()
+    time.sleep(1.0)  # warm-up
+
+    began = time.perf_counter()
+    # chunk_size 0: the whole tenant in one transaction, as before chunking
+    deleted = backend.delete_by_filters(
+        {"user_id": "large"},
+        chunk_size=chunk_size or rows + 1,
+        on_chunk=vectors.delete_many if vectors else None
+    )
+    purge_s = time.perf_counter() - began
+
+    time.sleep(0.2)
+    stop.set()
+    latencies: Dict[str, List[float]] = {name: queue.get() for name, queue in reports.items()}
+    for proc in workers:
+        proc.join()
+
+    reclaim_s = 0.0
+    if vectors:
+        began = time.perf_counter()
+        vectors.reclaim_deleted()
+        reclaim_s = time.perf_counter() - began
+
+    size_purged = file_size(path)
+    reclaimed = 0
+    while True:
+        pages = backend.reclaim(1000)
+        reclaimed += pages
+        if not pages:
+            break
+    backend.count_by_user()  # let the WAL checkpoint back into the file
+    result = {
+        "chunk_size": chunk_size,
+        "deleted": deleted,
+        "purge_s": purge_s,
+        "reclaim_s": reclaim_s,
+        "size_full_mb": size_full / 2**20,
+        "size_purged_mb": size_purged / 2**20,
+        "size_reclaimed_mb": os.path.getsize(path) / 2**20,
+        "reclaimed_pages": reclaimed,
+    }
+    for name, values in latencies.items():
+        result[name] = {
+            "count": len(values),
+            "p50_ms": percentile(values, 50),
+            "p99_ms": percentile(values, 99),
+            "max_ms": max(values),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="memories of the purged tenant")
+    parser.add_argument("--chunk-size", type=int, nargs="+", default=[0, 500],
+                        help="rows per delete transaction; 0 deletes in one transaction")
+    parser.add_argument("--no-vectors", action="store_true", help="purge the SQLite store only")
+    args = parser.parse_args()
+
+    base = tempfile.mkdtemp(prefix="ocmem-purge-")
+    ops = {"write": "writes"} if args.no_vectors else {"write": "writes", "search": "searches"}
+    print(f"{'chunk':>7} {'deleted':>9} {'purge s':>8} {'reclaim s':>9}"
+          + "".join(f" {label:>8} {'p50 ms':>7} {'p99 ms':>8} {'max ms':>8}" for label in ops.values())
+          + f" {'MB full':>8} {'purged':>7} {'reclaimed':>9}")
+    for chunk_size in args.chunk_size:
+        r = run(args.rows, chunk_size, base, with_vectors=not args.no_vectors)
+        label = "all" if not chunk_size else str(chunk_size)
+        print(f"{label:>7} {r['deleted']:>9,} {r['purge_s']:>8.2f} {r['reclaim_s']:>9.2f}"
+              + "".join(f" {r[op]['count']:>8,} {r[op]['p50_ms']:>7.2f} {r[op]['p99_ms']:>8.2f} "
+                        f"{r[op]['max_ms']:>8.1f}" for op in ops)
+              + f" {r['size_full_mb']:>8.1f} {r['size_purged_mb']:>7.1f} {r['size_reclaimed_mb']:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
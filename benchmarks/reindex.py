@@ -0,0 +1,100 @@
+"""
+Reindex while the old index keeps serving
+
+Fills a store, then runs `openmemory reindex` into a new dimension while a
+reader process keeps searching the live index with the old encoder.
+Reports reindex throughput per worker count, the reader's latency during
+the build, and what the reader sees after the swap (it must refuse the new
+index rather than search it with the wrong encoder).
+
+Usage:
+    python benchmarks/reindex.py --rows 50000 --workers 1 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generator import SyntheticData  # noqa: E402
+from run import percentile  # noqa: E402
+
+from openmemory.backends.registry import create_long_term_backend, create_vector_store  # noqa: E402
+from openmemory.backends.vector_backend import IndexMismatchError  # noqa: E402
+from openmemory.cli import build_parser  # noqa: E402
+from openmemory.core.config import MemoryConfig  # noqa: E402
+from openmemory.core.memory import Memory, OpenClawMemory  # noqa: E402
+
+
+def reader(config: MemoryConfig, stop, report):
+    """Search the live index until it is swapped for one this encoder cannot read"""
+    mem = OpenClawMemory(user_id="user", config=config)
+    latencies, refused = [], False
+    while not stop.is_set():
+        began = time.perf_counter()
+        try:
+            mem.search("project deadline", threshold=0.0)
+        except IndexMismatchError:
+            refused = True
+            break
+        latencies.append((time.perf_counter() - began) * 1000)
+    report.put((latencies, refused))
+
+
+def run(rows: int, workers: int, old_dimension: int, dimension: int, base: str, fill: bool):
+    config = MemoryConfig(
+        base_path=base, encoder_backend="hash", embedding_dimension=old_dimension, compaction_interval=0.0
+    )
+    if fill:
+        long_term, vectors = create_long_term_backend(config), create_vector_store(config)
+        data = SyntheticData(5)
+        for offset in range(0, rows, 5000):
+            batch = [Memory(id=None, content=data.text(), user_id="user") for _ in range(min(5000, rows - offset))]
+            long_term.add_many(batch)
+            vectors.add_many(batch)
+
+    stop, report = multiprocessing.Event(), multiprocessing.Queue()
+    proc = multiprocessing.Process(target=reader, args=(config, stop, report))
+    proc.start()
+    time.sleep(1.0)  # reader warm-up
+
+    args = build_parser().parse_args([
+        "--base-path", base, "--encoder", "hash", "--dimension", str(dimension), "-q",
+        "reindex", "--workers", str(workers)
+    ])
+    began = time.perf_counter()
+    args.func(args)
+    elapsed = time.perf_counter() - began
+
+    time.sleep(0.5)
+    stop.set()
+    latencies, refused = report.get()
+    proc.join()
+    return elapsed, latencies, refused
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2])
+    args = parser.parse_args()
+
+    base = tempfile.mkdtemp(prefix="ocmem-reindex-")
+    print(f"{'workers':>7} {'seconds':>8} {'rows/s':>9} {'searches':>9} {'p50 ms':>7} {'p99 ms':>7} {'after swap':>11}")
+    for i, workers in enumerate(args.workers):
+        # Alternate dimensions so every run is a real model change for the reader
+        old, new = (384, 256) if i % 2 == 0 else (256, 384)
+        elapsed, latencies, refused = run(args.rows, workers, old, new, base, fill=i == 0)
+        print(f"{workers:>7} {elapsed:>8.2f} {args.rows / elapsed:>9,.0f} {len(latencies):>9,} "
+              f"{percentile(latencies, 50):>7.2f} {percentile(latencies, 99):>7.2f} "
+              f"{'refused' if refused else 'SEARCHED':>11}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
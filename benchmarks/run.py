@@ -0,0 +1,242 @@
+"""
+Benchmark suite for OpenMemory hot paths
+
+Each (store size, index) combination runs in a fresh subprocess on a fresh
+store, so peak RSS is per run. The store is bulk-loaded to the target size,
+then a fixed sample of operations is timed one by one.
+
+Usage:
+    python benchmarks/run.py                                  # 1k and 10k, FAISS and numpy
+    python benchmarks/run.py --sizes 1000 10000 100000 1000000 --index faiss
+    python benchmarks/run.py --output new.json --compare baseline.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generator import SyntheticData  # noqa: E402
+
+OPERATIONS = [
+    "add",
+    "add_merge_similar",
+    "search_semantic",
+    "search_keyword",
+    "get_context",
+    "extract_from_conversation",
+    "vector_index_load",
+]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency percentiles in milliseconds plus throughput in ops/s"""
+    total = sum(samples)
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "ops_per_sec": len(samples) / total if total > 0 else float("inf"),
+    }
+
+
+def timed(fn: Callable, args_list: List) -> List[float]:
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def bulk_load(mem, data: SyntheticData, size: int, users: int):
+    """Fill the store to `size` memories through the bulk APIs"""
+    chunk = max(10000, size // 16)
+    batch = []
+    for memory in data.memories(size, users=users):
+        batch.append(memory)
+        if len(batch) >= chunk:
+            mem.long_term.add_many(batch)
+            mem.vector_store.add_many(batch)
+            batch = []
+    if batch:
+        mem.long_term.add_many(batch)
+        mem.vector_store.add_many(batch)
+
+
+def run_case(size: int, index: str, samples: int, users: int, seed: int) -> Dict:
+    """Benchmark one store size with one index implementation (runs in a subprocess)"""
+    from openmemory.backends import vector_backend
+    from openmemory.backends.vector_backend import VectorBackend
+    from openmemory.core.config import MemoryConfig
+    from openmemory.core.memory import OpenClawMemory
+    
+    if index == "numpy":
+        vector_backend.FAISS_AVAILABLE = False
+    elif not vector_backend.FAISS_AVAILABLE:
+        return {"skipped": "faiss is not installed"}
+    
+    data = SyntheticData(seed)
+    config = MemoryConfig(base_path=tempfile.mkdtemp(prefix="ocmem-bench-"))
+    mem = OpenClawMemory(user_id="user-0", agent_id="bench-agent", config=config)
+    
+    start = time.perf_counter()
+    bulk_load(mem, data, size, users)
+    load_seconds = time.perf_counter() - start
+    
+    queries = [(q,) for q in data.queries(samples)]
+    results = {
+        "add": timed(lambda text: mem.add(text, merge_similar=False), [(data.text(),) for _ in range(samples)]),
+        "add_merge_similar": timed(lambda text: mem.add(text, merge_similar=True),
+                                   [(data.text(),) for _ in range(samples)]),
+        "search_semantic": timed(lambda q: mem.search(q, semantic=True), queries),
+        "search_keyword": timed(lambda q: mem.search(q.split()[2], semantic=False), queries),
+        "get_context": timed(lambda s: mem.get_context(session_id=s), [(f"session-{i % 50}",) for i in range(samples)]),
+        "extract_from_conversation": timed(
+            mem.extract_from_conversation, [(data.conversation(),) for _ in range(max(1, samples // 10))]
+        ),
+        "vector_index_load": timed(
+            lambda: VectorBackend(config.vector_path, dimension=config.embedding_dimension),
+            [()] * max(1, min(samples // 20, 5))
+        ),
+    }
+    
+    return {
+        "size": size,
+        "index": index,
+        "bulk_load_seconds": load_seconds,
+        "peak_rss_mb": peak_rss_mb(),
+        "operations": {op: summarize(results[op]) for op in OPERATIONS},
+    }
+
+
+def _case_worker(queue, *args):
+    try:
+        queue.put(run_case(*args))
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_isolated(*args) -> Dict:
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_case_worker, args=(queue,) + args)
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    
+    versions = {}
+    for module in ("numpy", "faiss", "sentence_transformers"):
+        try:
+            versions[module] = getattr(__import__(module), "__version__", "unknown")
+        except ImportError:
+            versions[module] = None
+    
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.10) -> List[str]:
+    """Report p50 changes between two result files; returns regression lines"""
+    def index_runs(report):
+        return {(r["size"], r["index"]): r for r in report["runs"] if "operations" in r}
+    
+    regressions = []
+    old_runs = index_runs(baseline)
+    for key, run in sorted(index_runs(current).items()):
+        if key not in old_runs:
+            continue
+        for op, stats in run["operations"].items():
+            old = old_runs[key]["operations"].get(op)
+            if not old or not old["p50_ms"]:
+                continue
+            ratio = stats["p50_ms"] / old["p50_ms"]
+            line = f"{key[1]:>6} {key[0]:>8} {op:<26} p50 {old['p50_ms']:9.3f} -> {stats['p50_ms']:9.3f} ms ({ratio:5.2f}x)"
+            print(line)
+            if ratio > 1 + tolerance:
+                regressions.append(line)
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="OpenMemory hot-path benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--index", nargs="+", choices=["faiss", "numpy"], default=["faiss", "numpy"])
+    parser.add_argument("--samples", type=int, default=200, help="timed operations per measurement")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="write JSON results here (default: stdout)")
+    parser.add_argument("--compare", default=None, help="baseline JSON to diff p50 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="p50 slowdown flagged as regression")
+    args = parser.parse_args(argv)
+    
+    report = {"environment": environment(), "runs": []}
+    for size in args.sizes:
+        for index in args.index:
+            print(f"running size={size} index={index} ...", file=sys.stderr)
+            result = run_isolated(size, index, args.samples, args.users, args.seed)
+            result.setdefault("size", size)
+            result.setdefault("index", index)
+            report["runs"].append(result)
+    
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.tolerance:.0%}", file=sys.stderr)
+            return 1
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
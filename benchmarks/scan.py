@@ -0,0 +1,98 @@
+"""
+Keyset scans versus OFFSET paging and full materialization
+
+Fills a SQLite store with one user's memories, then walks them three ways
+in separate processes: get_by_user() (one list), LIMIT/OFFSET pages, and
+iter_memories() keyset pages. Reports wall time, the cost of the last page
+relative to the first, and peak RSS growth of each walk.
+
+Usage:
+    python benchmarks/scan.py --rows 500000
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from openmemory.backends.sqlite_backend import SQLiteBackend  # noqa: E402
+from openmemory.core.memory import Memory  # noqa: E402
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def walk(mode: str, path: str, batch_size: int, report):
+    backend = SQLiteBackend(path)
+    base_rss = peak_rss_mb()
+    page_times = []
+    count = 0
+    start = time.perf_counter()
+
+    if mode == "materialize":
+        count = len(backend.get_by_user("user"))
+    elif mode == "offset":
+        conn = sqlite3.connect(path)
+        offset = 0
+        while True:
+            began = time.perf_counter()
+            rows = conn.execute(
+                "SELECT * FROM memories WHERE user_id = ? ORDER BY created_at LIMIT ? OFFSET ?",
+                ("user", batch_size, offset)
+            ).fetchall()
+            page_times.append(time.perf_counter() - began)
+            if not rows:
+                break
+            count += len(backend._decode(rows, backend._row_to_memory))
+            offset += batch_size
+    else:
+        batches = backend.iter_memories("user", batch_size=batch_size).batches()
+        while True:
+            began = time.perf_counter()
+            batch = next(batches, None)
+            page_times.append(time.perf_counter() - began)
+            if batch is None:
+                break
+            count += len(batch)
+
+    elapsed = time.perf_counter() - start
+    ratio = page_times[-2] / page_times[0] if len(page_times) > 2 else 1.0
+    report.put((mode, count, elapsed, ratio, peak_rss_mb() - base_rss))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="ocmem-scan-"), "memories.db")
+    backend = SQLiteBackend(path)
+    for offset in range(0, args.rows, 10000):
+        backend.add_many([
+            Memory(id=None, content=f"memory {offset + i} " + "lorem ipsum " * 20, user_id="user",
+                   created_at=f"2026-01-01T00:00:00.{offset + i:07d}")
+            for i in range(min(10000, args.rows - offset))
+        ])
+
+    print(f"{'walk':<12} {'rows':>9} {'seconds':>8} {'last/first page':>16} {'RSS growth MB':>14}")
+    for mode in ("materialize", "offset", "keyset"):
+        report = multiprocessing.Queue()
+        proc = multiprocessing.Process(target=walk, args=(mode, path, args.batch_size, report))
+        proc.start()
+        mode, count, elapsed, ratio, rss = report.get()
+        proc.join()
+        print(f"{mode:<12} {count:>9,} {elapsed:>8.2f} {ratio:>15.1f}x {rss:>14.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
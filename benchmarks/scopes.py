@@ -0,0 +1,91 @@
+"""
+Scoped versus unscoped search on a store shared by many agents
+
+Spreads memories over users and agents, mostly private, some shared with
+the user's other agents and a few global. Compares an agent's default
+scoped search (its private, its user's shared and the global partitions)
+with a user-wide unscoped search and a private-only one: vectors scored
+per query (the `vectors.scanned` counter) and latency.
+
+Usage:
+    python benchmarks/scopes.py --rows 50000 --users 20 --agents 10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generator import SyntheticData  # noqa: E402
+from run import percentile  # noqa: E402
+
+from openmemory.backends.registry import create_long_term_backend, create_vector_store  # noqa: E402
+from openmemory.core.config import MemoryConfig  # noqa: E402
+from openmemory.core.memory import OpenClawMemory  # noqa: E402
+from openmemory.core.metrics import metrics  # noqa: E402
+
+
+def fill(config: MemoryConfig, rows: int, users: int, agents: int, seed: int):
+    long_term, vectors = create_long_term_backend(config), create_vector_store(config)
+    data = SyntheticData(seed)
+    memories = list(data.memories(rows, users=users))
+    for m in memories:
+        m.agent_id = f"agent-{data.rng.randrange(agents)}"
+        roll = data.rng.random()
+        m.visibility = "global" if roll < 0.02 else "shared" if roll < 0.25 else "private"
+    for offset in range(0, rows, 5000):
+        long_term.add_many(memories[offset:offset + 5000])
+        vectors.add_many(memories[offset:offset + 5000])
+
+
+def run(mem: OpenClawMemory, queries, scopes):
+    latencies = []
+    metrics.reset()
+    for query in queries:
+        began = time.perf_counter()
+        mem.search(query, limit=10, threshold=0.0, scopes=scopes)
+        latencies.append((time.perf_counter() - began) * 1000)
+    scanned = metrics.snapshot()["counters"].get("vectors.scanned", 0)
+    return scanned / len(queries), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--agents", type=int, default=10, help="agents per user")
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+
+    config = MemoryConfig(
+        base_path=tempfile.mkdtemp(prefix="ocmem-scopes-"), encoder_backend="hash",
+        compaction_interval=0.0, metrics_enabled=True
+    )
+    fill(config, args.rows, args.users, args.agents, seed=11)
+
+    data = SyntheticData(12)
+    queries = [data.text() for _ in range(args.queries)]
+    base = OpenClawMemory(config=config)
+    modes = [
+        ("user-wide", base.for_user("user-0"), None),
+        ("agent", base.for_user("user-0", "agent-0"), None),
+        ("private", base.for_user("user-0", "agent-0"), ["private"]),
+    ]
+    for _, mem, scopes in modes:
+        mem.search("warm up", threshold=0.0, scopes=scopes)
+
+    print(f"{args.rows:,} rows, {args.users} users x {args.agents} agents")
+    print(f"{'search':<10} {'scanned/query':>14} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, mem, scopes in modes:
+        scanned, latencies = run(mem, queries, scopes)
+        print(f"{name:<10} {scanned:>14,.0f} {percentile(latencies, 50):>8.2f} {percentile(latencies, 99):>8.2f}")
+    base.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
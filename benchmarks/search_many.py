@@ -0,0 +1,75 @@
+"""
+Batched multi-query search versus looping search()
+
+Loads a synthetic store, then answers the same batches of sub-queries with
+`OpenClawMemory.search_many` and with one `search` call per query, checks
+both return the same results, and reports the speedup.
+
+Usage:
+    python benchmarks/search_many.py
+    python benchmarks/search_many.py --size 100000 --batch 4 8 32
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generator import SyntheticData  # noqa: E402
+from run import bulk_load, percentile  # noqa: E402
+
+from openmemory.core.config import MemoryConfig  # noqa: E402
+from openmemory.core.memory import OpenClawMemory  # noqa: E402
+
+
+def measure(fn, batches: List[List[str]]) -> List[float]:
+    samples = []
+    for batch in batches:
+        start = time.perf_counter()
+        fn(batch)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="search_many vs looping search")
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--batch", type=int, nargs="+", default=[4, 8, 16, 64])
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    data = SyntheticData(args.seed)
+    config = MemoryConfig(base_path=tempfile.mkdtemp(prefix="ocmem-bench-"))
+    mem = OpenClawMemory(user_id="user-0", agent_id="bench-agent", config=config)
+    bulk_load(mem, data, args.size, args.users)
+
+    print(f"{'batch':>5} {'loop p50 ms':>12} {'batch p50 ms':>13} {'speedup':>8}")
+    for size in args.batch:
+        # Half the queries are near-duplicates of stored text (semantic hits),
+        # half are single words (keyword fallback)
+        batches = [
+            [q if i % 2 else q.split()[2] for i, q in enumerate(data.queries(size))]
+            for _ in range(args.rounds)
+        ]
+
+        looped = [[mem.search(q) for q in batch] for batch in batches[:3]]
+        batched = [mem.search_many(batch) for batch in batches[:3]]
+        assert [[[r["id"] for r in rows] for rows in b] for b in looped] == \
+               [[[r["id"] for r in rows] for rows in b] for b in batched], "search_many disagrees with search"
+
+        loop_p50 = percentile(measure(lambda b: [mem.search(q) for q in b], batches), 50) * 1000
+        batch_p50 = percentile(measure(mem.search_many, batches), 50) * 1000
+        print(f"{size:>5} {loop_p50:>12.3f} {batch_p50:>13.3f} {loop_p50 / batch_p50:>7.2f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+End-to-end load test for the local memory server
+
+Starts a MemoryServer on a Unix socket and N client processes that each
+seed some memories and then run a mix of searches, adds and get_context
+calls through MemoryClient. Reports throughput, latency percentiles, the
+server's batching counters and peak RSS of the server and of a client.
+With --mode direct every process opens the store itself instead, for
+comparison.
+
+Usage:
+    python benchmarks/server_load.py --clients 16 --seconds 10
+    python benchmarks/server_load.py --clients 16 --seconds 10 --mode direct
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openmemory.core.config import MemoryConfig  # noqa: E402
+from openmemory.core.memory import OpenClawMemory  # noqa: E402
+from openmemory.server import MemoryClient, MemoryServer  # noqa: E402
+
+TOPICS = ["coffee", "travel", "python", "music", "hiking", "budget", "kids", "garden", "movies", "cooking"]
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def serve(address: str, base_path: str, ready, stop, report):
+    server = MemoryServer(address, MemoryConfig(base_path=base_path))
+    server.start()
+    ready.set()
+    stop.wait()
+    report.put(("server", server.stats(), peak_rss_mb()))
+    server.stop()
+
+
+def client(mode: str, address: str, base_path: str, client_id: int, args, report):
+    user_id = f"user-{client_id % args.users}"
+    if mode == "server":
+        mem = MemoryClient(address, user_id=user_id)
+    else:
+        mem = OpenClawMemory(user_id=user_id, config=MemoryConfig(base_path=base_path))
+    rng = random.Random(client_id)
+
+    for i in range(args.seed):
+        mem.add(f"client {client_id} likes {TOPICS[i % len(TOPICS)]} number {i}", merge_similar=False)
+
+    latencies = {"search": [], "add": [], "get_context": []}
+    deadline = time.perf_counter() + args.seconds
+    while time.perf_counter() < deadline:
+        roll = rng.random()
+        start = time.perf_counter()
+        if roll < args.write_ratio:
+            op = "add"
+            mem.add(f"client {client_id} noted {rng.choice(TOPICS)} at {start:.6f}", merge_similar=False)
+        elif roll < args.write_ratio + 0.05:
+            op = "get_context"
+            mem.get_context(session_id=None)
+        else:
+            op = "search"
+            mem.search(f"what about {rng.choice(TOPICS)}", limit=5, threshold=0.0)
+        latencies[op].append(time.perf_counter() - start)
+
+    report.put(("client", latencies, peak_rss_mb()))
+
+
+def percentile(values, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--users", type=int, default=4, help="clients share these users round-robin")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=50, help="memories each client adds before measuring")
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--mode", choices=["server", "direct"], default="server")
+    parser.add_argument("--base-path", default=None, help="defaults to a fresh temp dir")
+    args = parser.parse_args()
+
+    base_path = args.base_path or tempfile.mkdtemp(prefix="ocmem-server-")
+    address = os.path.join(base_path, "server.sock")
+    report = multiprocessing.Queue()
+
+    server = None
+    stop = multiprocessing.Event()
+    if args.mode == "server":
+        ready = multiprocessing.Event()
+        server = multiprocessing.Process(target=serve, args=(address, base_path, ready, stop, report))
+        server.start()
+        if not ready.wait(60):
+            raise SystemExit("server did not start")
+
+    start = time.perf_counter()
+    clients = [
+        multiprocessing.Process(
+            target=client,
+            args=(args.mode, address, base_path, i, args, report)
+        )
+        for i in range(args.clients)
+    ]
+    for p in clients:
+        p.start()
+    results = [report.get() for _ in clients]
+    for p in clients:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    server_stats = server_rss = None
+    if server:
+        stop.set()
+        _, server_stats, server_rss = report.get()
+        server.join()
+
+    latencies = {op: [v for _, lat, _ in results for v in lat[op]] for op in ("search", "add", "get_context")}
+    total = sum(len(v) for v in latencies.values())
+    client_rss = max(rss for _, _, rss in results)
+
+    print(f"mode:             {args.mode} ({args.clients} clients, {args.write_ratio:.0%} writes)")
+    print(f"store:            {base_path}")
+    print(f"throughput:       {total / args.seconds:,.0f} ops/s ({elapsed:.1f}s wall incl. seeding)")
+    for op, values in latencies.items():
+        print(f"{op + ':':<18}{len(values):>8,} ops  p50 {percentile(values, 50):6.2f} ms  "
+              f"p95 {percentile(values, 95):6.2f} ms  p99 {percentile(values, 99):6.2f} ms")
+    print(f"peak RSS:         client {client_rss:.0f} MB" + (f", server {server_rss:.0f} MB" if server_rss else ""))
+    print(f"total RSS:        {client_rss * args.clients + (server_rss or 0):.0f} MB (approx.)")
+    if server_stats:
+        print(f"server batches:   {server_stats['batches']:,} for {server_stats['requests']:,} requests "
+              f"(mean {server_stats['mean_batch']:.2f}, largest {server_stats['largest_batch']}, "
+              f"{server_stats['batched_searches']:,} searches batched)")
+
+    failed = [p.exitcode for p in clients if p.exitcode != 0]
+    print("OK" if not failed else f"FAILED: client exit codes {failed}")
+    return 0 if not failed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
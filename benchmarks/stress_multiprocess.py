@@ -0,0 +1,90 @@
+"""
+Multi-process stress test for a shared memory store
+
+Spawns N worker processes that all open the same long_term.db and vectors/
+directory, interleaving writes and searches, then checks that no vector or
+row was lost and that every process saw other processes' writes.
+
+Usage:
+    python benchmarks/stress_multiprocess.py --processes 8 --writes 50
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openmemory.core.config import MemoryConfig  # noqa: E402
+from openmemory.core.memory import OpenClawMemory  # noqa: E402
+
+
+def worker(base_path: str, worker_id: int, writes: int, results):
+    config = MemoryConfig(base_path=base_path)
+    mem = OpenClawMemory(user_id=f"user-{worker_id}", config=config)
+
+    foreign_hits = 0
+    for i in range(writes):
+        mem.add(f"worker {worker_id} note {i} topic{i % 7}", merge_similar=False)
+
+        # Unscoped search so other workers' vectors are visible too; hits
+        # carry no content (vector_store_content is off), so look it up by ID
+        hits = mem.vector_store.search(f"note topic{i % 7}", limit=20, threshold=0.0)
+        found = [m for m in mem.long_term.get_many([h["id"] for h in hits]) if m]
+        foreign_hits += sum(1 for m in found if not m.content.startswith(f"worker {worker_id} "))
+
+    results.put((worker_id, foreign_hits, mem.vector_store.generation))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=50)
+    parser.add_argument("--base-path", default=None, help="defaults to a fresh temp dir")
+    args = parser.parse_args()
+
+    base_path = args.base_path or tempfile.mkdtemp(prefix="ocmem-stress-")
+    results = multiprocessing.Queue()
+
+    start = time.perf_counter()
+    procs = [
+        multiprocessing.Process(target=worker, args=(base_path, i, args.writes, results))
+        for i in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    failed = [p.exitcode for p in procs if p.exitcode != 0]
+    reports = [results.get() for _ in range(args.processes - len(failed))]
+
+    expected = args.processes * args.writes
+    mem = OpenClawMemory(config=MemoryConfig(base_path=base_path))
+    vector_ids = {meta["id"] for meta in mem.vector_store.metadata.values()}
+    row_ids = {m.id for p in range(args.processes)
+               for m in mem.long_term.get_recent(user_id=f"user-{p}", limit=expected)}
+
+    print(f"store:            {base_path}")
+    print(f"elapsed:          {elapsed:.2f}s ({expected / elapsed:.0f} writes/s)")
+    print(f"rows:             {len(row_ids)}/{expected}")
+    print(f"vectors:          {mem.vector_store.index.ntotal}/{expected}")
+    print(f"generation:       {mem.vector_store.generation}")
+    print(f"foreign hits:     {[r[1] for r in sorted(reports)]}")
+
+    ok = (
+        not failed
+        and len(row_ids) == expected
+        and mem.vector_store.index.ntotal == expected
+        and row_ids == vector_ids
+    )
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
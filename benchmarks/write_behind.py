@@ -0,0 +1,77 @@
+"""
+Synchronous versus write-behind add()
+
+Times add() as the caller sees it and end-to-end ingestion throughput
+(until everything is committed), with and without `write_behind`, then
+checks that a search right after an add finds it (read-your-writes).
+
+Usage:
+    python benchmarks/write_behind.py --adds 2000
+    python benchmarks/write_behind.py --adds 2000 --flush-interval 0.01 0.1
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generator import SyntheticData  # noqa: E402
+from run import percentile  # noqa: E402
+
+from openmemory.core.config import MemoryConfig  # noqa: E402
+from openmemory.core.memory import OpenClawMemory  # noqa: E402
+
+
+def run(adds: int, write_behind: bool, flush_interval: float, merge_similar: bool):
+    config = MemoryConfig(
+        base_path=tempfile.mkdtemp(prefix="ocmem-wb-"),
+        write_behind=write_behind,
+        write_flush_interval=flush_interval
+    )
+    mem = OpenClawMemory(user_id="user", config=config)
+    data = SyntheticData(3)
+    texts = [data.text() for _ in range(adds)]
+    mem.search("warm up the encoder")
+
+    latencies = []
+    start = time.perf_counter()
+    for text in texts:
+        began = time.perf_counter()
+        mem.add(text, merge_similar=merge_similar)
+        latencies.append((time.perf_counter() - began) * 1000)
+    mem.flush()
+    elapsed = time.perf_counter() - start
+
+    probe = mem.add("probe memory about zebra migration", merge_similar=False)
+    began = time.perf_counter()
+    visible = any(r["id"] == probe.id for r in mem.search("zebra migration", threshold=0.0, limit=5))
+    ryw_ms = (time.perf_counter() - began) * 1000
+
+    stats = mem.writer.stats() if mem.writer else None
+    mem.close()
+    return latencies, elapsed, visible, ryw_ms, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--adds", type=int, default=1000)
+    parser.add_argument("--flush-interval", type=float, nargs="+", default=[0.05])
+    parser.add_argument("--no-merge", action="store_true", help="add with merge_similar=False")
+    args = parser.parse_args()
+
+    modes = [("sync", False, 0.0)] + [(f"wb {f * 1000:.0f}ms", True, f) for f in args.flush_interval]
+    print(f"{'mode':<10} {'p50 ms':>8} {'p99 ms':>8} {'adds/s':>9} {'mean group':>11} {'RYW':>4} {'search ms':>10}")
+    for name, write_behind, interval in modes:
+        latencies, elapsed, visible, ryw_ms, stats = run(args.adds, write_behind, interval, not args.no_merge)
+        group = f"{stats['mean_batch']:.1f}" if stats else "1"
+        print(f"{name:<10} {percentile(latencies, 50):>8.3f} {percentile(latencies, 99):>8.3f} "
+              f"{args.adds / elapsed:>9,.0f} {group:>11} {'yes' if visible else 'NO':>4} {ryw_ms:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
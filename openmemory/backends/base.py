@@ -0,0 +1,384 @@
+"""Backend protocols for OC-Mem storage"""
+
+import base64
+import binascii
+import heapq
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional, Protocol, Tuple, runtime_checkable
+
+from ..core.memory import (  # noqa: F401 (scope helpers are re-exported for the backends)
+    DEFAULT_VISIBILITY, SCOPE_FIELDS, VISIBILITIES, Memory, merge_ranked, partition_key, scope_partition
+)
+from ..extractors.entities import memory_entities, normalize_entities
+
+# Filters every backend understands: equality on these fields, a created_at
+# range, an explicit ID set, "entities" (any of the listed entity keys, see
+# extractors/entities.py) and "metadata.<key>" equality on metadata fields
+FILTER_FIELDS = ("user_id", "agent_id", "session_id", "category", "visibility")
+RANGE_FILTERS = {"created_after": ">=", "created_before": "<"}
+
+
+def check_filters(filters: Optional[Dict], allow_metadata: bool = True):
+    """Raise ValueError on filter keys no backend supports"""
+    for key in filters or {}:
+        if key in FILTER_FIELDS or key in RANGE_FILTERS or key == "ids":
+            continue
+        # Metadata and entity filters need the long-term store
+        if allow_metadata and key == "entities":
+            continue
+        if allow_metadata and key.startswith("metadata.") and len(key) > len("metadata."):
+            continue
+        raise ValueError(f"Cannot filter on {key!r}")
+
+
+def matches_filters(memory: Memory, filters: Optional[Dict]) -> bool:
+    """Evaluate `filters` against a Memory in Python (backends without query pushdown)"""
+    for key, value in (filters or {}).items():
+        if key in FILTER_FIELDS:
+            if getattr(memory, key) != value:
+                return False
+        elif key == "created_after":
+            if not memory.created_at or memory.created_at < value:
+                return False
+        elif key == "created_before":
+            if not memory.created_at or memory.created_at >= value:
+                return False
+        elif key == "ids":
+            if memory.id not in value:
+                return False
+        elif key == "entities":
+            if not set(normalize_entities(value)) & set(memory_entities(memory.content, memory.metadata)):
+                return False
+        elif key.startswith("metadata."):
+            if (memory.metadata or {}).get(key[len("metadata."):]) != value:
+                return False
+        else:
+            raise ValueError(f"Cannot filter on {key!r}")
+    return True
+
+
+@runtime_checkable
+class LongTermBackend(Protocol):
+    """
+    Persistent memory store
+    
+    Implemented by SQLiteBackend, RedisBackend, ShardedSQLiteBackend and
+    InMemoryBackend. Bulk methods are part of the contract so callers can
+    batch round-trips instead of looping over single-item calls. A None
+    user_id in reads means every user; `filters` takes the keys
+    check_filters() accepts.
+    delete_by_filters() deletes in chunks of at most `chunk_size` and passes
+    each chunk's IDs to `on_chunk`, so callers can drop them from the vector
+    store as the purge progresses.
+    """
+    
+    def add(self, memory: Memory) -> None: ...
+    
+    def add_many(self, memories: List[Memory]) -> None: ...
+    
+    def get(self, memory_id: str) -> Optional[Memory]: ...
+    
+    def get_many(self, memory_ids: List[str]) -> List[Optional[Memory]]: ...
+    
+    def update(self, memory: Memory) -> None: ...
+    
+    def delete(self, memory_id: str) -> int: ...
+    
+    def delete_many(self, memory_ids: List[str]) -> int: ...
+    
+    def delete_by_filters(
+        self,
+        filters: Dict,
+        chunk_size: int = None,
+        on_chunk: Callable[[List[str]], None] = None
+    ) -> int: ...
+    
+    def search(
+        self,
+        query: str,
+        user_id: str = None,
+        category: str = None,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[Dict]: ...
+    
+    def search_many(
+        self,
+        queries: List[str],
+        user_id: str = None,
+        category: str = None,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[List[Dict]]: ...
+    
+    def filter_ids(self, filters: Dict, limit: int = None) -> List[str]: ...
+    
+    def get_recent(
+        self,
+        user_id: Optional[str],
+        session_id: str = None,
+        limit: int = 20,
+        filters: Dict = None
+    ) -> List[Memory]: ...
+    
+    def get_by_category(
+        self,
+        user_id: Optional[str],
+        category: str,
+        min_importance: float = 0.0,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[Memory]: ...
+    
+    def get_by_entity(
+        self,
+        entities: List[str],
+        user_id: str = None,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[Memory]: ...
+
+
+def rank_by_entities(memories: List[Memory], entities: List[str], limit: int) -> List[Memory]:
+    """Memories mentioning any of `entities`, most matches first, then importance and recency"""
+    keys = set(normalize_entities(entities))
+    scored = []
+    for memory in memories:
+        hits = len(keys.intersection(memory_entities(memory.content, memory.metadata)))
+        if hits:
+            scored.append((hits, memory.importance, memory.updated_at, memory))
+    scored.sort(key=lambda item: item[:3], reverse=True)
+    return [item[3] for item in scored[:limit]]
+
+
+@runtime_checkable
+class SupportsCompaction(Protocol):
+    """Extra long-term methods MemoryCompactor relies on"""
+    
+    def archive(self, memory_ids: List[str]) -> int: ...
+    
+    def scan_importance(self, after_rowid: int = 0, limit: int = 500) -> List[Tuple]: ...
+    
+    def set_importance(self, updates: List[Tuple[str, float, str]]) -> None: ...
+    
+    def count_by_user(self, min_count: int = 0) -> Dict[str, int]: ...
+    
+    def get_lowest_importance(self, user_id: Optional[str], limit: int = 10) -> List[Memory]: ...
+
+
+# Orders iter_memories() accepts, "-" prefixed for descending. Pages continue
+# after the (value, tiebreak) key of the previous page's last row, so every
+# page is an index range read however deep into the scan it is
+SCAN_ORDERS = ("created_at", "updated_at", "importance")
+
+
+def scan_order(order: str) -> Tuple[str, bool]:
+    """(field, descending) for an iter_memories() order, e.g. ("updated_at", True) for -updated_at"""
+    field = order[1:] if order.startswith("-") else order
+    if field not in SCAN_ORDERS:
+        raise ValueError(f"Cannot order a scan by {order!r}; use one of {SCAN_ORDERS}, - for descending")
+    return field, order.startswith("-")
+
+
+def encode_cursor(state: Dict) -> str:
+    raw = json.dumps(state, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict:
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid scan cursor") from None
+    if not isinstance(state, dict) or not {"user_id", "filters", "order", "after"} <= state.keys():
+        raise ValueError("Invalid scan cursor")
+    return state
+
+
+def scan_params(user_id: Optional[str], filters: Optional[Dict], order: str, cursor: Optional[str]) -> Tuple[Dict, Any]:
+    """
+    Validated (params, start position) for iter_memories()
+    
+    A cursor carries the parameters of the scan it came from; arguments
+    passed along with it must agree with them.
+    """
+    # JSON round trip so tuples compare equal to the lists a cursor holds
+    params = json.loads(json.dumps({"user_id": user_id, "filters": dict(filters or {}), "order": order}))
+    if cursor is None:
+        scan_order(order)
+        check_filters(params["filters"])
+        return params, None
+    
+    state = decode_cursor(cursor)
+    defaults = {"user_id": None, "filters": {}, "order": "created_at"}
+    for key, value in params.items():
+        if value != defaults[key] and value != state[key]:
+            raise ValueError(f"Cursor belongs to a scan with {key}={state[key]!r}, not {value!r}")
+    return {key: state[key] for key in params}, state["after"]
+
+
+class MemoryScan:
+    """
+    Keyset-paginated iterator over memories
+    
+    Iterating yields Memory objects and batches() yields lists of up to
+    `batch_size`; either way only one page is held in memory. `fetch(after,
+    limit)` returns up to `limit` (position, memory) pairs following
+    position `after` (None for the start). `cursor` is a token for the
+    position after the last memory handed out, which iter_memories(cursor=)
+    resumes from in this or any other process.
+    """
+    
+    def __init__(
+        self,
+        fetch: Callable[[Any, int], List[Tuple[Any, Memory]]],
+        params: Dict,
+        batch_size: int = 500,
+        after: Any = None
+    ):
+        self._fetch = fetch
+        self.params = params
+        self.batch_size = batch_size
+        self.position = after
+    
+    def entries(self) -> Iterator[Tuple[Any, Memory]]:
+        """(position, memory) pairs from the current position on, without moving it"""
+        after = self.position
+        while True:
+            page = self._fetch(after, self.batch_size)
+            yield from page
+            if len(page) < self.batch_size:
+                return
+            after = page[-1][0]
+    
+    def __iter__(self) -> Iterator[Memory]:
+        for position, memory in self.entries():
+            self.position = position
+            yield memory
+    
+    def batches(self) -> Iterator[List[Memory]]:
+        batch = []
+        for position, memory in self.entries():
+            batch.append(memory)
+            if len(batch) == self.batch_size:
+                self.position = position
+                yield batch
+                batch = []
+        if batch:
+            self.position = position
+            yield batch
+    
+    @property
+    def cursor(self) -> str:
+        return encode_cursor(dict(self.params, after=self.position))
+
+
+class MergedScan(MemoryScan):
+    """
+    Scans of several stores (shards) merged into one order
+    
+    The position is the last position handed out per store, so resuming
+    restarts every store exactly where the merged stream left it.
+    """
+    
+    def __init__(self, scans: Dict[str, MemoryScan], params: Dict, batch_size: int = 500):
+        super().__init__(None, params, batch_size, {name: scan.position for name, scan in scans.items()})
+        self.scans = scans
+    
+    def entries(self) -> Iterator[Tuple[Any, Memory]]:
+        _, descending = scan_order(self.params["order"])
+        
+        def keyed(name: str, scan: MemoryScan):
+            for position, memory in scan.entries():
+                yield (position[0], name, position[1]), name, position, memory
+        
+        after = dict(self.position or {})
+        merged = heapq.merge(*(keyed(n, s) for n, s in self.scans.items()), key=lambda e: e[0], reverse=descending)
+        for _, name, position, memory in merged:
+            after = dict(after, **{name: position})
+            yield after, memory
+
+
+@runtime_checkable
+class SupportsScan(Protocol):
+    """
+    Streaming reads for exports and maintenance jobs
+    
+    iter_memories() walks the memories of `user_id` (every user when None)
+    that match `filters`, in `order` (see SCAN_ORDERS), one `batch_size`
+    page at a time. Implemented by SQLiteBackend, ShardedSQLiteBackend and
+    InMemoryBackend.
+    """
+    
+    def iter_memories(
+        self,
+        user_id: str = None,
+        filters: Dict = None,
+        order: str = "created_at",
+        batch_size: int = 500,
+        cursor: str = None
+    ) -> MemoryScan: ...
+
+
+@runtime_checkable
+class VectorStore(Protocol):
+    """
+    Semantic index over memory content
+    
+    Implemented by VectorBackend, ShardedVectorBackend and InMemoryVectorStore.
+    Search results are dicts with at least id, content, score and category;
+    content is None when the store keeps no copy of it (VectorBackend
+    without store_content), so resolve it by ID from the long-term store.
+    `filters` takes the FILTER_FIELDS, RANGE_FILTERS and "ids" keys (not
+    metadata or entity keys; resolve those to IDs through the long-term
+    store first). warm() does a first search's cold work (encoder load,
+    partition load) ahead of time and returns the partition size.
+    """
+    
+    def add(self, memory: Memory) -> None: ...
+    
+    def add_many(self, memories: List[Memory]) -> None: ...
+    
+    def search(
+        self,
+        query: str,
+        user_id: str = None,
+        limit: int = 5,
+        threshold: float = 0.7,
+        filters: Dict = None
+    ) -> List[Dict]: ...
+    
+    def search_many(
+        self,
+        queries: List[str],
+        user_id: str = None,
+        limit: int = 5,
+        threshold: float = 0.7,
+        filters: Dict = None
+    ) -> List[List[Dict]]: ...
+    
+    def delete_many(self, memory_ids: List[str]) -> int: ...
+    
+    def warm(self, user_id: str = None) -> int: ...
+
+
+@runtime_checkable
+class SupportsPartitionedSearch(Protocol):
+    """
+    Vector search over several disjoint partitions at once
+    
+    search_partitions() returns, per query, the top `limit` hits across
+    the (user_id, filters) partitions (the scopes of a read, see
+    scope_partition), embedding each query once and scoring the union of
+    the partitions in one pass. Implemented by VectorBackend,
+    ShardedVectorBackend and InMemoryVectorStore; for other stores the
+    caller runs one search_many() per partition and merges the lists.
+    """
+    
+    def search_partitions(
+        self,
+        queries: List[str],
+        partitions: List[Tuple[Optional[str], Dict]],
+        limit: int = 5,
+        threshold: float = 0.7
+    ) -> List[List[Dict]]: ...
@@ -0,0 +1,112 @@
+"""
+Compression of stored text (memory content and metadata JSON)
+
+Memories are mostly a sentence or two, too short for a compressor to find
+repeats within one value. Deflate with a preset dictionary fixes that: the
+dictionary holds the words and phrases the store's texts share, trained
+from a sample of them (train_dictionary), and every value is compressed
+as if it followed the dictionary.
+
+A compressed value is a BLOB: one format byte, the 2-byte ID of its
+dictionary (0 for none) and a raw deflate stream. Values that would not
+shrink are kept as they are, so TEXT values (including every row written
+before compression was enabled) read back unchanged and both kinds mix
+freely. Dictionaries are never changed once written; retraining adds a
+new one, and older values keep pointing at theirs.
+"""
+
+import struct
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, Optional, Union
+
+FORMAT_DEFLATE = 1
+DICT_SIZE = 32 * 1024  # deflate's window: bytes further back cannot be referenced
+MIN_SIZE = 24  # shorter texts are stored as they are
+
+_HEADER = struct.Struct(">BH")
+
+
+class UnknownDictionaryError(KeyError):
+    """A value was compressed with a dictionary this codec has not loaded"""
+
+
+def train_dictionary(samples: Iterable[str], size: int = DICT_SIZE, max_words: int = 4) -> bytes:
+    """
+    Build a preset dictionary from sample texts
+    
+    Counts word n-grams (up to `max_words` words) and keeps those with the
+    largest estimated saving, count * length, until `size` bytes. The most
+    valuable phrases go last: deflate encodes nearer matches in fewer bits.
+    """
+    counts: Counter = Counter()
+    for text in samples:
+        words = text.split()
+        for n in range(1, max_words + 1):
+            for i in range(len(words) - n + 1):
+                counts[" ".join(words[i:i + n])] += 1
+    
+    chosen = []
+    total = 0
+    for phrase, count in sorted(counts.items(), key=lambda kv: kv[1] * len(kv[0]), reverse=True):
+        if count < 2:
+            break
+        piece = phrase.encode("utf-8") + b" "
+        if total + len(piece) > size:
+            continue
+        chosen.append(piece)
+        total += len(piece)
+    return b"".join(reversed(chosen))
+
+
+class TextCodec:
+    """
+    Compresses strings to BLOBs and back
+    
+    `dictionaries` maps dictionary ID to its bytes; new values use the
+    highest ID (or no dictionary when there is none). decompress() raises
+    UnknownDictionaryError for IDs it lacks, so a caller sharing the store
+    with other processes can load the new dictionary and retry.
+    """
+    
+    def __init__(self, dictionaries: Dict[int, bytes] = None, level: int = 6, min_size: int = MIN_SIZE):
+        self.dictionaries: Dict[int, bytes] = {}
+        self.level = level
+        self.min_size = min_size
+        self.current = 0
+        self._primed = zlib.compressobj(level, zlib.DEFLATED, -15)
+        for dict_id, data in (dictionaries or {}).items():
+            self.add_dictionary(dict_id, data)
+    
+    def add_dictionary(self, dict_id: int, data: bytes):
+        self.dictionaries[dict_id] = data
+        if dict_id >= self.current:
+            self.current = dict_id
+            # Loading a 32 KB dictionary costs more than compressing a short
+            # text, so load it once and copy the primed state per value
+            if data:
+                self._primed = zlib.compressobj(self.level, zlib.DEFLATED, -15, zdict=data)
+            else:
+                self._primed = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+    
+    def compress(self, text: Optional[str]) -> Union[str, bytes, None]:
+        """`text` as a compressed BLOB, or unchanged if that would not be smaller"""
+        if text is None or len(text) < self.min_size:
+            return text
+        raw = text.encode("utf-8")
+        c = self._primed.copy()
+        packed = _HEADER.pack(FORMAT_DEFLATE, self.current) + c.compress(raw) + c.flush()
+        return packed if len(packed) < len(raw) else text
+    
+    def decompress(self, value: Union[str, bytes, None]) -> Optional[str]:
+        """Inverse of compress(); text values pass through"""
+        if not isinstance(value, bytes):
+            return value
+        fmt, dict_id = _HEADER.unpack_from(value)
+        if fmt != FORMAT_DEFLATE:
+            raise ValueError(f"Unknown compression format {fmt}")
+        if dict_id and dict_id not in self.dictionaries:
+            raise UnknownDictionaryError(dict_id)
+        zdict = self.dictionaries.get(dict_id)
+        d = zlib.decompressobj(-15, zdict=zdict) if zdict else zlib.decompressobj(-15)
+        return (d.decompress(value[_HEADER.size:]) + d.flush()).decode("utf-8")
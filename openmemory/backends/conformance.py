@@ -0,0 +1,348 @@
+"""
+Conformance and benchmark suite for storage backends
+
+Every long-term backend and vector store must pass these checks, whether
+built in or registered through entry points. Run against all registered
+backends (or just the named ones):
+
+    python -m openmemory.backends.conformance
+    python -m openmemory.backends.conformance --long-term sqlite memory --vector faiss
+"""
+
+import argparse
+import json
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from ..core.config import MemoryConfig
+from ..core.memory import Memory
+from .base import LongTermBackend, SupportsPartitionedSearch, SupportsScan, VectorStore
+from .registry import (
+    LONG_TERM_GROUP,
+    VECTOR_GROUP,
+    available_backends,
+    create_long_term_backend,
+    create_vector_store,
+)
+
+
+class ConformanceError(AssertionError):
+    """A backend broke the storage contract"""
+
+
+def _expect(condition: bool, message: str):
+    if not condition:
+        raise ConformanceError(message)
+
+
+def _memories(user_id: str, n: int, **overrides) -> List[Memory]:
+    base = datetime(2026, 1, 1)
+    memories = []
+    for i in range(n):
+        stamp = (base + timedelta(minutes=i)).isoformat()
+        fields = dict(
+            id=f"{user_id}-{i}",
+            content=f"note {i} about topic{i % 3}",
+            user_id=user_id,
+            session_id="s1" if i % 2 else None,
+            category="fact" if i % 3 == 0 else "general",
+            importance=round(i / n, 3),
+            created_at=stamp,
+            updated_at=stamp,
+            metadata={"i": i},
+        )
+        fields.update(overrides)
+        memories.append(Memory(**fields))
+    return memories
+
+
+def check_long_term_backend(backend):
+    """Raise ConformanceError if `backend` does not behave like SQLiteBackend"""
+    _expect(isinstance(backend, LongTermBackend), "does not implement the LongTermBackend protocol")
+    
+    user = f"conf-{uuid.uuid4().hex[:8]}"
+    memories = _memories(user, 12)
+    
+    backend.add(memories[0])
+    got = backend.get(memories[0].id)
+    _expect(got is not None and got.to_dict() == memories[0].to_dict(), "get() does not round-trip add()")
+    _expect(backend.get(f"{user}-missing") is None, "get() of a missing ID must return None")
+    
+    backend.add_many(memories[1:])
+    ids = [m.id for m in memories] + [f"{user}-missing"]
+    got = backend.get_many(ids)
+    _expect(len(got) == len(ids), "get_many() must return one entry per requested ID")
+    _expect([m.id if m else None for m in got] == [m.id for m in memories] + [None],
+            "get_many() must preserve order and return None for missing IDs")
+    
+    recent = backend.get_recent(user, limit=5)
+    _expect([m.id for m in recent] == [m.id for m in reversed(memories)][:5],
+            "get_recent() must order by updated_at descending")
+    session = backend.get_recent(user, session_id="s1", limit=100)
+    _expect(len(session) == 12, "get_recent(session_id) must include session and session-less memories")
+    
+    facts = backend.get_by_category(user, "fact", min_importance=0.2, limit=10)
+    expected = sorted((m for m in memories if m.category == "fact" and m.importance >= 0.2),
+                      key=lambda m: m.importance, reverse=True)
+    _expect([m.id for m in facts] == [m.id for m in expected],
+            "get_by_category() must filter by importance and order by importance descending")
+    
+    hits = backend.search("TOPIC1", user_id=user, limit=100)
+    _expect({h["id"] for h in hits} == {m.id for m in memories if m.content.endswith("topic1")},
+            "search() must be a case-insensitive substring match scoped to user_id")
+    _expect(len(backend.search("topic", user_id=user, limit=3)) == 3, "search() must honour limit")
+    _expect(all(h["category"] == "fact" for h in backend.search("note", user_id=user, category="fact")),
+            "search() must honour category")
+    
+    queries = ["topic0", "TOPIC2", "no such text"]
+    batched = backend.search_many(queries, user_id=user, limit=3)
+    _expect(len(batched) == len(queries), "search_many() must return one result list per query")
+    for query, results in zip(queries, batched):
+        single = backend.search(query, user_id=user, limit=3)
+        _expect([r["id"] for r in results] == [r["id"] for r in single],
+                "search_many() must agree with search()")
+    
+    hits = backend.search("note", user_id=user, limit=100, filters={
+        "session_id": "s1", "created_after": memories[4].created_at, "metadata.i": 7
+    })
+    _expect([h["id"] for h in hits] == [memories[7].id], "search() must honour filters")
+    _expect(set(backend.filter_ids({"user_id": user, "category": "fact"})) ==
+            {m.id for m in memories if m.category == "fact"}, "filter_ids() must return matching IDs")
+    _expect(backend.filter_ids({"user_id": user, "created_before": memories[0].created_at}) == [],
+            "filter_ids() must honour created_before")
+    
+    topic1 = sorted((m for m in memories if m.content.endswith("topic1")), key=lambda m: m.importance, reverse=True)
+    _expect([m.id for m in backend.get_by_entity(["Topic1"], user_id=user, limit=10)] == [m.id for m in topic1],
+            "get_by_entity() must return memories mentioning the entity, by importance")
+    _expect(backend.get_by_entity(["topic1"], user_id=f"{user}-other") == [], "get_by_entity() must be scoped to user_id")
+    _expect({h["id"] for h in backend.search("note", user_id=user, limit=100, filters={"entities": ["topic2"]})} ==
+            {m.id for m in memories if m.content.endswith("topic2")}, "search() must honour the entities filter")
+    
+    _check_scopes(backend, f"{user}-scoped")
+    
+    if isinstance(backend, SupportsScan):
+        _check_scan(backend, user, memories)
+    
+    changed = backend.get(memories[1].id)
+    changed.content = "changed content"
+    changed.importance = 0.99
+    changed.updated_at = datetime(2027, 1, 1).isoformat()
+    changed.metadata = {"changed": True}
+    backend.update(changed)
+    got = backend.get(changed.id)
+    _expect(got.content == "changed content" and got.importance == 0.99 and got.metadata == {"changed": True},
+            "update() must persist content, importance and metadata")
+    _expect(backend.get_recent(user, limit=1)[0].id == changed.id, "update() must refresh updated_at")
+    _expect(changed.id not in {m.id for m in backend.get_by_entity(["topic1"], user_id=user, limit=100)},
+            "update() must re-index entities")
+    
+    _expect(backend.delete(memories[0].id) == 1, "delete() must return 1 for an existing ID")
+    _expect(backend.delete(memories[0].id) == 0, "delete() must return 0 for a missing ID")
+    _expect(backend.delete_many([memories[1].id, memories[2].id, f"{user}-missing"]) == 2,
+            "delete_many() must return the number of deleted memories")
+    remaining_facts = sum(1 for m in memories[3:] if m.category == "fact")
+    _expect(backend.delete_by_filters({"user_id": user, "category": "fact"}) == remaining_facts,
+            "delete_by_filters() must return the number of deleted memories")
+    remaining = {m.id for m in backend.get_recent(user, limit=100)}
+    chunks = []
+    _expect(backend.delete_by_filters({"user_id": user}, chunk_size=2, on_chunk=chunks.append) == len(remaining),
+            "delete_by_filters() must return the number of deleted memories")
+    _expect(backend.get_recent(user, limit=100) == [], "delete_by_filters() must remove matching memories")
+    _expect(all(len(c) <= 2 for c in chunks) and {i for c in chunks for i in c} == remaining,
+            "delete_by_filters() must report every deleted ID to on_chunk in chunks of at most chunk_size")
+
+
+def _check_scopes(backend, user: str):
+    scoped = _memories(user, 6, agent_id="agent-1")
+    for m in scoped[::2]:
+        m.visibility = "private"
+    scoped[5].visibility = "global"
+    backend.add_many(scoped)
+    
+    _expect(backend.get(scoped[0].id).visibility == "private", "get() must round-trip visibility")
+    private = backend.get_recent(user, limit=10, filters={"visibility": "private", "agent_id": "agent-1"})
+    _expect([m.id for m in private] == [m.id for m in reversed(scoped[::2])], "get_recent() must honour filters")
+    everybody = backend.get_recent(None, limit=1000, filters={"visibility": "global"})
+    _expect(scoped[5].id in {m.id for m in everybody}, "get_recent() with no user_id must read every user")
+    shared_facts = backend.get_by_category(user, "fact", min_importance=0.0, filters={"visibility": "shared"})
+    _expect([m.id for m in shared_facts] == [scoped[3].id], "get_by_category() must honour filters")
+    mentions = backend.get_by_entity(["topic2"], user_id=None, limit=1000, filters={"visibility": "global"})
+    _expect(scoped[5].id in {m.id for m in mentions} and all(m.visibility == "global" for m in mentions),
+            "get_by_entity() must honour filters and read every user when user_id is None")
+    
+    _expect(backend.delete_by_filters({"user_id": user}) == len(scoped), "delete_by_filters() must remove every scope")
+
+
+def _check_scan(backend, user: str, memories: List[Memory]):
+    scan = backend.iter_memories(user, batch_size=5)
+    _expect([m.id for m in scan] == [m.id for m in memories], "iter_memories() must walk a user in created_at order")
+    _expect([len(b) for b in backend.iter_memories(user, batch_size=5).batches()] == [5, 5, 2],
+            "iter_memories().batches() must yield batch_size lists")
+    by_importance = sorted(memories, key=lambda m: m.importance, reverse=True)
+    _expect([m.id for m in backend.iter_memories(user, order="-importance", batch_size=4)] ==
+            [m.id for m in by_importance], "iter_memories() must honour a descending order")
+    facts = [m.id for m in backend.iter_memories(user, filters={"category": "fact"}, batch_size=2)]
+    _expect(facts == [m.id for m in memories if m.category == "fact"], "iter_memories() must honour filters")
+    
+    scan = backend.iter_memories(user, order="updated_at", batch_size=3)
+    first = [m.id for _, m in zip(range(7), scan)]
+    rest = [m.id for m in backend.iter_memories(cursor=scan.cursor, batch_size=3)]
+    _expect(first + rest == [m.id for m in memories], "iter_memories(cursor=) must resume after the last memory")
+    try:
+        backend.iter_memories(f"{user}-other", cursor=scan.cursor)
+    except ValueError:
+        pass
+    else:
+        raise ConformanceError("iter_memories() must reject a cursor from a different scan")
+
+
+def check_vector_store(store):
+    """Raise ConformanceError if `store` does not behave like VectorBackend"""
+    _expect(isinstance(store, VectorStore), "does not implement the VectorStore protocol")
+    
+    user, other = f"conf-{uuid.uuid4().hex[:8]}", f"conf-{uuid.uuid4().hex[:8]}"
+    memories = [
+        Memory(id=f"{user}-{i}", content=text, user_id=user, category="fact" if i == 2 else "general")
+        for i, text in enumerate([
+            "allergic to peanuts and tree nuts",
+            "works as a software engineer in berlin",
+            "prefers tea over coffee in the morning",
+        ])
+    ]
+    foreign = Memory(id=f"{other}-0", content="allergic to peanuts and tree nuts", user_id=other)
+    
+    store.add(memories[0])
+    store.add_many(memories[1:] + [foreign])
+    
+    hits = store.search("allergic to peanuts and tree nuts", user_id=user, limit=3, threshold=0.5)
+    _expect(bool(hits) and hits[0]["id"] == memories[0].id, "search() must rank an exact match first")
+    _expect(abs(hits[0]["score"] - 1.0) < 1e-3, "search() scores must be cosine similarities")
+    _expect(all(h["id"].startswith(user) for h in hits), "search() must honour user_id")
+    _expect({"id", "content", "score", "category"} <= set(hits[0]), "search() results miss required keys")
+    _expect(store.search("allergic to peanuts", user_id=user, threshold=1.01) == [],
+            "search() must honour threshold")
+    
+    hits = store.search("allergic to peanuts and tree nuts", limit=5, threshold=0.0, filters={"ids": [foreign.id]})
+    _expect([h["id"] for h in hits] == [foreign.id], "search() must honour the ids filter")
+    hits = store.search("allergic to peanuts and tree nuts", user_id=user, limit=5, threshold=0.0,
+                        filters={"category": "fact"})
+    _expect([h["id"] for h in hits] == [memories[2].id], "search() must honour the category filter")
+    _expect(store.search("allergic to peanuts", user_id=user, threshold=0.0, filters={"visibility": "private"}) == [],
+            "search() must honour the visibility filter")
+    
+    queries = [m.content for m in memories]
+    batched = store.search_many(queries, user_id=user, limit=2, threshold=0.0)
+    _expect(len(batched) == len(queries), "search_many() must return one result list per query")
+    for query, results in zip(queries, batched):
+        single = store.search(query, user_id=user, limit=2, threshold=0.0)
+        _expect([r["id"] for r in results] == [r["id"] for r in single],
+                "search_many() must agree with search()")
+    
+    if isinstance(store, SupportsPartitionedSearch):
+        partitions = [
+            (user, {"visibility": "shared", "category": "fact"}), (user, {"category": "general"}), (other, None)
+        ]
+        merged = store.search_partitions(queries, partitions, limit=2, threshold=0.0)
+        _expect(len(merged) == len(queries), "search_partitions() must return one list per query")
+        for query, results in zip(queries, merged):
+            hits = [h for u, f in partitions for h in store.search(query, user_id=u, limit=2, threshold=0.0, filters=f)]
+            expected = sorted(hits, key=lambda h: h["score"], reverse=True)[:2]
+            _expect([round(r["score"], 4) for r in results] == [round(h["score"], 4) for h in expected] and
+                    {r["id"] for r in results} <= {h["id"] for h in hits},
+                    "search_partitions() must return the best hits of the partitions' searches")
+    
+    _expect(store.delete_many([m.id for m in memories] + [foreign.id]) == 4,
+            "delete_many() must return the number of removed vectors")
+    _expect(store.search("allergic to peanuts and tree nuts", user_id=user, threshold=0.0) == [],
+            "delete_many() must remove vectors from search results")
+
+
+def _rate(fn: Callable, count: int) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    return count / elapsed if elapsed > 0 else float("inf")
+
+
+def benchmark_long_term_backend(backend, n: int = 1000) -> Dict[str, float]:
+    """Throughput (operations per second) of the core long-term operations"""
+    user = f"bench-{uuid.uuid4().hex[:8]}"
+    single, bulk = _memories(user, n), _memories(user + "-bulk", n)
+    ids = [m.id for m in single]
+    
+    report = {
+        "add": _rate(lambda: [backend.add(m) for m in single], n),
+        "add_many": _rate(lambda: backend.add_many(bulk), n),
+        "get": _rate(lambda: [backend.get(i) for i in ids], n),
+        "get_many": _rate(lambda: backend.get_many(ids), n),
+        "search": _rate(lambda: [backend.search(f"topic{i % 3}", user_id=user) for i in range(100)], 100),
+        "search_many": _rate(lambda: backend.search_many([f"topic{i % 3}" for i in range(100)], user_id=user), 100),
+        "get_recent": _rate(lambda: [backend.get_recent(user) for _ in range(100)], 100),
+        "delete_many": _rate(lambda: backend.delete_many(ids), n),
+    }
+    backend.delete_by_filters({"user_id": user + "-bulk"})
+    return report
+
+
+def benchmark_vector_store(store, n: int = 1000) -> Dict[str, float]:
+    """Throughput (operations per second) of the core vector operations"""
+    user = f"bench-{uuid.uuid4().hex[:8]}"
+    memories = _memories(user, n)
+    queries = [f"note {i} about topic{i % 3}" for i in range(100)]
+    
+    report = {
+        "add_many": _rate(lambda: store.add_many(memories), n),
+        "search": _rate(lambda: [store.search(q, user_id=user) for q in queries], len(queries)),
+        "search_many": _rate(lambda: store.search_many(queries, user_id=user), len(queries)),
+        "delete_many": _rate(lambda: store.delete_many([m.id for m in memories]), n),
+    }
+    return report
+
+
+def run(long_term: List[str] = None, vector: List[str] = None, n: int = 1000) -> Dict:
+    """Check and benchmark backends by registry name, each in a fresh temp store"""
+    report = {}
+    suites = [
+        (LONG_TERM_GROUP, long_term, "long_term_backend", create_long_term_backend,
+         check_long_term_backend, benchmark_long_term_backend),
+        (VECTOR_GROUP, vector, "vector_backend", create_vector_store,
+         check_vector_store, benchmark_vector_store),
+    ]
+    
+    for group, names, field, create, check, benchmark in suites:
+        for name in names if names is not None else available_backends(group):
+            config = MemoryConfig(base_path=tempfile.mkdtemp(prefix="ocmem-conformance-"), **{field: name})
+            entry = report.setdefault(group, {})[name] = {}
+            try:
+                backend = create(config)
+                check(backend)
+                entry["conformance"] = "pass"
+                entry["ops_per_sec"] = benchmark(backend, n)
+            except Exception as e:
+                entry["conformance"] = f"fail: {type(e).__name__}: {e}"
+    
+    return report
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backend conformance and benchmark suite")
+    parser.add_argument("--long-term", nargs="*", help="long-term backends to check (default: all)")
+    parser.add_argument("--vector", nargs="*", help="vector stores to check (default: all)")
+    parser.add_argument("-n", type=int, default=1000, help="memories per benchmark")
+    args = parser.parse_args(argv)
+    
+    report = run(args.long_term, args.vector, args.n)
+    print(json.dumps(report, indent=2))
+    
+    failed = [
+        name for group in report.values() for name, entry in group.items()
+        if entry["conformance"] != "pass"
+    ]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
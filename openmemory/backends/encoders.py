@@ -0,0 +1,327 @@
+"""
+Text encoders for the vector stores
+
+An encoder turns texts into L2-normalized float32 rows. Which one a store
+uses is chosen by `MemoryConfig.encoder_backend` and `embedding_model`:
+
+- "sentence-transformers": the PyTorch SentenceTransformer model
+- "onnx": an exported ONNX model run on ONNX Runtime, optionally with int8
+  dynamically quantized weights (`encoder_quantize`); `embedding_model`
+  is a directory holding model.onnx and tokenizer.json, or the .onnx file
+- "hash": word-hash vectors, no model (tests, offline use)
+- "auto": sentence-transformers when installed, else hash
+
+Encoders are loaded once per process per EncoderSpec and shared by every
+store, so shards and worker processes do not each load a copy. Third-party
+encoders register through the "openmemory.encoders" entry point group
+(see registry.py).
+"""
+
+import hashlib
+import importlib.util
+import logging
+import os
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from ..core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+@dataclass(frozen=True)
+class EncoderSpec:
+    """Everything that identifies a loaded encoder (picklable, so worker processes can load their own)"""
+    backend: str = "auto"
+    model: str = DEFAULT_MODEL
+    dimension: int = 384
+    threads: Optional[int] = None
+    quantize: bool = False
+    batch_size: int = 32
+    max_length: int = 256
+    
+    @classmethod
+    def from_config(cls, config) -> "EncoderSpec":
+        return cls(
+            backend=config.encoder_backend,
+            model=config.embedding_model,
+            dimension=config.embedding_dimension,
+            threads=config.encoder_threads,
+            quantize=config.encoder_quantize,
+            batch_size=config.encoder_batch_size,
+            max_length=config.encoder_max_length
+        )
+
+
+class Encoder:
+    """
+    Base class: subclasses implement _encode() for one call's texts
+    
+    Models are loaded by _load() on the first encode(), so opening a store
+    (or a CLI command that never embeds) does not pay for the import and
+    model load. Missing dependencies are reported by the constructor.
+    """
+    
+    name = "encoder"
+    version = ""  # changes whenever the same texts would embed differently
+    
+    def __init__(self, spec: EncoderSpec):
+        self.spec = spec
+        self.dimension = spec.dimension
+        self._loaded = False
+        self._checked = False
+        self._lock = threading.Lock()
+    
+    def load(self):
+        """Load the model now instead of on the first encode()"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    with metrics.span("encoder.load", encoder=self.name):
+                        self._load()
+                    self._loaded = True
+    
+    def _load(self):
+        pass
+    
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed `texts`, one normalized float32 row per text"""
+        if not texts:
+            return np.zeros((0, self.dimension), dtype='float32')
+        
+        self.load()
+        with metrics.span("encode", encoder=self.name, texts=len(texts)):
+            vectors = np.asarray(self._encode(list(texts)), dtype='float32').reshape(len(texts), -1)
+        
+        if not self._checked:
+            if vectors.shape[1] != self.dimension:
+                raise ValueError(
+                    f"Encoder {self.name} produces {vectors.shape[1]}-d vectors "
+                    f"but embedding_dimension is {self.dimension}"
+                )
+            self._checked = True
+        return vectors
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+def _require(module: str, what: str, extra: str):
+    if importlib.util.find_spec(module) is None:
+        raise ImportError(f"The {what} needs {module}: pip install openmemory[{extra}]")
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+def length_buckets(lengths: List[int], batch_size: int) -> Iterator[np.ndarray]:
+    """
+    Split positions into batches of similar length
+    
+    Sorting by length before batching means each batch is padded only to
+    its own longest text instead of the longest text of the whole call.
+    """
+    order = np.argsort(np.asarray(lengths), kind="stable")
+    for start in range(0, len(order), batch_size):
+        yield order[start:start + batch_size]
+
+
+def simple_embedding(text: str, dimension: int) -> np.ndarray:
+    """Simple fallback embedding using word hashes"""
+    words = text.lower().split()
+    embedding = np.zeros(dimension, dtype='float32')
+    
+    for word in words:
+        # Stable hash so every process maps words to the same buckets
+        hash_val = zlib.crc32(word.encode('utf-8')) % dimension
+        embedding[hash_val] += 1.0
+    
+    # Normalize
+    norm = np.linalg.norm(embedding)
+    if norm > 0:
+        embedding = embedding / norm
+    
+    return embedding
+
+
+class HashEncoder(Encoder):
+    """Bag of hashed words; no model, deterministic across processes"""
+    
+    name = "hash"
+    version = "crc32-1"
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return np.stack([simple_embedding(t, self.dimension) for t in texts])
+
+
+class SentenceTransformerEncoder(Encoder):
+    """PyTorch SentenceTransformer on CPU (or whatever device it picks)"""
+    
+    def __init__(self, spec: EncoderSpec):
+        super().__init__(spec)
+        _require("sentence_transformers", "sentence-transformers encoder", "embeddings")
+        self.model = None
+        self.name = f"sentence-transformers:{spec.model}"
+    
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+        
+        if self.spec.threads:
+            import torch
+            torch.set_num_threads(self.spec.threads)
+        self.model = SentenceTransformer(self.spec.model)
+        self.model.max_seq_length = min(self.model.max_seq_length or self.spec.max_length, self.spec.max_length)
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        # encode() already sorts by length before batching
+        return self.model.encode(texts, batch_size=self.spec.batch_size, normalize_embeddings=True)
+
+
+def onnx_model_paths(model: str):
+    """(model.onnx path, tokenizer.json path) for a model directory or .onnx file"""
+    if model.endswith(".onnx"):
+        return model, os.path.join(os.path.dirname(model), "tokenizer.json")
+    return os.path.join(model, "model.onnx"), os.path.join(model, "tokenizer.json")
+
+
+def quantize_model(model_file: str) -> str:
+    """
+    int8 dynamic quantization of an ONNX model's weights, cached next to it
+    
+    Weights of MatMul/Gemm nodes are stored as int8 and activations are
+    quantized on the fly, which roughly quarters the model size and speeds
+    up CPU inference. The quantized file is rebuilt when the source changes.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    
+    target = model_file[:-len(".onnx")] + ".int8.onnx"
+    if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(model_file):
+        tmp = f"{target}.{os.getpid()}.tmp"
+        quantize_dynamic(model_file, tmp, weight_type=QuantType.QInt8)
+        os.replace(tmp, target)
+    return target
+
+
+class OnnxEncoder(Encoder):
+    """
+    Exported transformer on ONNX Runtime with mean pooling
+    
+    Expects a model exported with input_ids/attention_mask (and optionally
+    token_type_ids) inputs, e.g. `optimum-cli export onnx --model
+    sentence-transformers/all-MiniLM-L6-v2 DIR`, plus the tokenizer.json
+    of the same model. Batches are length-bucketed and padded per batch.
+    """
+    
+    def __init__(self, spec: EncoderSpec):
+        super().__init__(spec)
+        _require("onnxruntime", "onnx encoder", "onnx")
+        _require("tokenizers", "onnx encoder", "onnx")
+        self.model_file, self.tokenizer_file = onnx_model_paths(os.path.expanduser(spec.model))
+        if not os.path.exists(self.model_file):
+            raise FileNotFoundError(f"No ONNX model at {self.model_file}")
+        self.session = self.tokenizer = None
+        self.name = f"onnx:{os.path.basename(self.model_file)}" + (":int8" if spec.quantize else "")
+        self._version = None
+    
+    @property
+    def version(self) -> str:
+        """Content hash of the source model, so a re-exported model with the same file name is told apart"""
+        if self._version is None:
+            digest = hashlib.sha256()
+            with open(self.model_file, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            self._version = digest.hexdigest()[:16]
+        return self._version
+    
+    def _load(self):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        
+        model_file = quantize_model(self.model_file) if self.spec.quantize else self.model_file
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.spec.threads:
+            options.intra_op_num_threads = self.spec.threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.inputs = {i.name for i in self.session.get_inputs()}
+        
+        self.tokenizer = Tokenizer.from_file(self.tokenizer_file)
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(self.spec.max_length)
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        out = None
+        
+        for batch in length_buckets([len(e.ids) for e in encodings], self.spec.batch_size):
+            width = max(len(encodings[i].ids) for i in batch)
+            ids = np.zeros((len(batch), width), dtype='int64')
+            mask = np.zeros((len(batch), width), dtype='int64')
+            types = np.zeros((len(batch), width), dtype='int64')
+            for row, i in enumerate(batch):
+                n = len(encodings[i].ids)
+                ids[row, :n] = encodings[i].ids
+                mask[row, :n] = 1
+                types[row, :n] = encodings[i].type_ids
+            
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self.inputs:
+                feeds["token_type_ids"] = types
+            hidden = self.session.run(None, feeds)[0]
+            
+            if hidden.ndim == 3:
+                # Mean over real tokens (the model has no pooling head)
+                weights = mask[:, :, None].astype('float32')
+                hidden = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+            if out is None:
+                out = np.empty((len(texts), hidden.shape[1]), dtype='float32')
+            out[batch] = normalize_rows(hidden)
+        
+        return out
+
+
+def auto_encoder(spec: EncoderSpec) -> Encoder:
+    """SentenceTransformer when installed, else hash embeddings"""
+    try:
+        return SentenceTransformerEncoder(spec)
+    except ImportError:
+        logger.info("sentence-transformers is not installed; using hash embeddings")
+        return HashEncoder(spec)
+
+
+_LOADED: Dict[EncoderSpec, Encoder] = {}
+_LOCK = threading.Lock()
+
+
+def get_encoder(spec: EncoderSpec = None) -> Encoder:
+    """The process-wide encoder for `spec` (its model loads on the first encode)"""
+    spec = spec or EncoderSpec()
+    encoder = _LOADED.get(spec)
+    if encoder is None:
+        from .registry import create_encoder
+        
+        with _LOCK:
+            encoder = _LOADED.get(spec)
+            if encoder is None:
+                encoder = _LOADED[spec] = create_encoder(spec)
+    return encoder
+
+
+def embed_texts(texts: List[str], spec: EncoderSpec = None) -> np.ndarray:
+    """
+    Embed texts with the shared encoder for `spec` (one row per text)
+    
+    A module-level function so worker processes (bulk import, reindex) can
+    embed without opening a store. The model is loaded once per process.
+    """
+    return get_encoder(spec).encode(texts)
@@ -0,0 +1,301 @@
+"""In-process backends with no persistence, for tests and ephemeral agents"""
+
+import threading
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.memory import Memory
+from .base import MemoryScan, check_filters, matches_filters, rank_by_entities, scan_order, scan_params
+
+
+class InMemoryBackend:
+    """Dict-backed long-term store with SQLiteBackend semantics"""
+    
+    FILTERABLE = ("id", "user_id", "agent_id", "session_id", "category", "visibility")
+    
+    def __init__(self):
+        self._rows: Dict[str, Memory] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _copy(memory: Optional[Memory]) -> Optional[Memory]:
+        return Memory.from_dict(memory.to_dict()) if memory else None
+    
+    def add(self, memory: Memory):
+        with self._lock:
+            self._rows[memory.id] = self._copy(memory)
+    
+    def add_many(self, memories: List[Memory]):
+        with self._lock:
+            for memory in memories:
+                self._rows[memory.id] = self._copy(memory)
+    
+    def get(self, memory_id: str) -> Optional[Memory]:
+        return self._copy(self._rows.get(memory_id))
+    
+    def get_many(self, memory_ids: List[str]) -> List[Optional[Memory]]:
+        return [self._copy(self._rows.get(memory_id)) for memory_id in memory_ids]
+    
+    def update(self, memory: Memory):
+        with self._lock:
+            stored = self._rows.get(memory.id)
+            if stored:
+                stored.content = memory.content
+                stored.importance = memory.importance
+                stored.updated_at = memory.updated_at
+                stored.metadata = dict(memory.metadata)
+    
+    def delete(self, memory_id: str) -> int:
+        return self.delete_many([memory_id])
+    
+    def delete_many(self, memory_ids: List[str]) -> int:
+        with self._lock:
+            return sum(1 for memory_id in memory_ids if self._rows.pop(memory_id, None))
+    
+    def delete_by_filters(
+        self,
+        filters: Dict,
+        chunk_size: int = None,
+        on_chunk: Callable[[List[str]], None] = None
+    ) -> int:
+        for key in filters:
+            if key not in self.FILTERABLE:
+                raise ValueError(f"Cannot filter on {key!r}")
+        matches = [
+            m.id for m in list(self._rows.values())
+            if all(getattr(m, k) == v for k, v in filters.items())
+        ]
+        deleted = 0
+        chunk_size = chunk_size or len(matches) or 1
+        for start in range(0, len(matches), chunk_size):
+            chunk = matches[start:start + chunk_size]
+            deleted += self.delete_many(chunk)
+            if on_chunk:
+                on_chunk(chunk)
+        return deleted
+    
+    def iter_memories(
+        self,
+        user_id: str = None,
+        filters: Dict = None,
+        order: str = "created_at",
+        batch_size: int = 500,
+        cursor: str = None
+    ) -> MemoryScan:
+        """Same paging as SQLiteBackend, with the ID as the tiebreak"""
+        params, after = scan_params(user_id, filters, order, cursor)
+        field, descending = scan_order(params["order"])
+        scope = dict(params["filters"])
+        if params["user_id"] is not None:
+            scope["user_id"] = params["user_id"]
+        
+        def fetch(after, limit: int):
+            keyed = sorted(
+                ((getattr(m, field), m.id), m) for m in list(self._rows.values()) if matches_filters(m, scope)
+            )
+            if descending:
+                keyed.reverse()
+            if after is not None:
+                after = tuple(after)
+                keyed = [(k, m) for k, m in keyed if (k < after if descending else k > after)]
+            return [(list(k), self._copy(m)) for k, m in keyed[:limit]]
+        
+        return MemoryScan(fetch, params, batch_size, after)
+    
+    def _select(self, predicate, key, limit: int) -> List[Memory]:
+        rows = sorted((m for m in list(self._rows.values()) if predicate(m)), key=key, reverse=True)
+        return [self._copy(m) for m in rows[:limit]]
+    
+    def search(
+        self,
+        query: str,
+        user_id: str = None,
+        category: str = None,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[Dict]:
+        check_filters(filters)
+        needle = query.lower()
+        return [m.to_dict() for m in self._select(
+            lambda m: needle in m.content.lower()
+            and (not user_id or m.user_id == user_id)
+            and (not category or m.category == category)
+            and matches_filters(m, filters),
+            lambda m: (m.importance, m.updated_at),
+            limit
+        )]
+    
+    def search_many(
+        self,
+        queries: List[str],
+        user_id: str = None,
+        category: str = None,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[List[Dict]]:
+        return [self.search(query, user_id=user_id, category=category, limit=limit, filters=filters) for query in queries]
+    
+    def filter_ids(self, filters: Dict, limit: int = None) -> List[str]:
+        check_filters(filters)
+        rows = self._select(lambda m: matches_filters(m, filters), lambda m: (m.importance, m.updated_at), limit)
+        return [m.id for m in rows]
+    
+    def get_recent(
+        self,
+        user_id: Optional[str],
+        session_id: str = None,
+        limit: int = 20,
+        filters: Dict = None
+    ) -> List[Memory]:
+        check_filters(filters)
+        return self._select(
+            lambda m: (not user_id or m.user_id == user_id)
+            and (not session_id or m.session_id in (session_id, None))
+            and matches_filters(m, filters),
+            lambda m: m.updated_at,
+            limit
+        )
+    
+    def get_by_category(
+        self,
+        user_id: Optional[str],
+        category: str,
+        min_importance: float = 0.0,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[Memory]:
+        check_filters(filters)
+        return self._select(
+            lambda m: (not user_id or m.user_id == user_id) and m.category == category
+            and m.importance >= min_importance and matches_filters(m, filters),
+            lambda m: (m.importance, m.updated_at),
+            limit
+        )
+    
+    def get_by_entity(
+        self,
+        entities: List[str],
+        user_id: str = None,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[Memory]:
+        check_filters(filters)
+        rows = [
+            m for m in list(self._rows.values())
+            if (not user_id or m.user_id == user_id) and matches_filters(m, filters)
+        ]
+        return [self._copy(m) for m in rank_by_entities(rows, entities, limit)]
+
+
+class InMemoryVectorStore:
+    """Brute-force numpy vector store with the VectorBackend interface"""
+    
+    def __init__(self, dimension: int = 384, embed=None):
+        self.dimension = dimension
+        self._embed = embed
+        self._vectors = np.zeros((0, dimension), dtype='float32')
+        self._metas: List[Dict] = []
+        self._lock = threading.Lock()
+    
+    def _get_embeddings(self, texts: List[str]) -> np.ndarray:
+        if self._embed:
+            return np.asarray(self._embed(texts), dtype='float32').reshape(len(texts), self.dimension)
+        
+        # Same stable word-hash scheme as VectorBackend's fallback embedding
+        out = np.zeros((len(texts), self.dimension), dtype='float32')
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                out[row, zlib.crc32(word.encode('utf-8')) % self.dimension] += 1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms > 0, norms, 1)
+    
+    def add(self, memory):
+        self.add_many([memory])
+    
+    def add_many(self, memories: List):
+        if not memories:
+            return
+        vectors = self._get_embeddings([m.content for m in memories])
+        with self._lock:
+            self._vectors = np.vstack([self._vectors, vectors])
+            self._metas.extend({
+                "id": m.id,
+                "content": m.content,
+                "user_id": m.user_id,
+                "agent_id": m.agent_id,
+                "session_id": m.session_id,
+                "category": m.category,
+                "created_at": m.created_at,
+                "visibility": m.visibility
+            } for m in memories)
+    
+    def search(
+        self,
+        query: str,
+        user_id: str = None,
+        limit: int = 5,
+        threshold: float = 0.7,
+        filters: Dict = None
+    ) -> List[Dict]:
+        return self.search_many([query], user_id, limit, threshold, filters)[0]
+    
+    def search_many(
+        self,
+        queries: List[str],
+        user_id: str = None,
+        limit: int = 5,
+        threshold: float = 0.7,
+        filters: Dict = None
+    ) -> List[List[Dict]]:
+        return self._search_matrix(self._get_embeddings(queries), [(user_id, filters)], limit, threshold)
+    
+    def search_partitions(
+        self,
+        queries: List[str],
+        partitions: List[Tuple[Optional[str], Dict]],
+        limit: int = 5,
+        threshold: float = 0.7
+    ) -> List[List[Dict]]:
+        return self._search_matrix(self._get_embeddings(queries), partitions, limit, threshold)
+    
+    def _search_matrix(self, queries_matrix, partitions, limit, threshold) -> List[List[Dict]]:
+        """Top hits among the vectors in any of the (user_id, filters) partitions"""
+        terms = []
+        for user_id, filters in partitions:
+            check_filters(filters, allow_metadata=False)
+            terms.append(dict(filters or {}, **({"user_id": user_id} if user_id else {})))
+        with self._lock:
+            vectors, metas = self._vectors, list(self._metas)
+        
+        if all(terms):
+            keep = [
+                i for i, meta in enumerate(metas)
+                if any(matches_filters(Memory(**meta), partition) for partition in terms)
+            ]
+            vectors, metas = vectors[keep], [metas[i] for i in keep]
+        
+        scores = queries_matrix @ vectors.T
+        results = []
+        for row in scores:
+            order = np.argsort(-row)[:limit]
+            results.append([
+                dict(metas[i], score=float(row[i]))
+                for i in order if row[i] >= threshold
+            ])
+        return results
+    
+    def warm(self, user_id: Optional[str] = None) -> int:
+        self._get_embeddings(["warm-up"])
+        with self._lock:
+            return sum(1 for meta in self._metas if not user_id or meta["user_id"] == user_id)
+    
+    def delete_many(self, memory_ids: List[str]) -> int:
+        targets = set(memory_ids)
+        with self._lock:
+            keep = [i for i, meta in enumerate(self._metas) if meta["id"] not in targets]
+            removed = len(self._metas) - len(keep)
+            self._vectors = self._vectors[keep]
+            self._metas = [self._metas[i] for i in keep]
+        return removed
@@ -0,0 +1,544 @@
+"""Redis backend for short-term memory and hot-read caching"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+
+from ..core.memory import Memory
+from ..core.metrics import metrics
+from .base import check_filters, matches_filters, rank_by_entities
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# Connection pools are shared per URL so every backend in a process reuses sockets
+_POOLS: Dict[str, "redis.ConnectionPool"] = {}
+_POOLS_LOCK = threading.Lock()
+
+_NO_SESSION = "~"
+
+
+def get_client(url: str, max_connections: int = 32):
+    """Get a Redis client backed by the process-wide pool for `url`"""
+    if not REDIS_AVAILABLE:
+        raise ImportError("Redis support requires the redis package: pip install openmemory[redis]")
+    
+    with _POOLS_LOCK:
+        if url not in _POOLS:
+            _POOLS[url] = redis.ConnectionPool.from_url(url, max_connections=max_connections)
+        return redis.Redis(connection_pool=_POOLS[url])
+
+
+def _timestamp(iso: str) -> float:
+    return datetime.fromisoformat(iso).timestamp()
+
+
+def _dump(memory: Memory) -> str:
+    return json.dumps(memory.to_dict())
+
+
+def _load(raw) -> Optional[Memory]:
+    return Memory.from_dict(json.loads(raw)) if raw else None
+
+
+class RedisBackend:
+    """
+    Redis backend with the same interface as SQLiteBackend
+    
+    Each memory is a JSON string under `<prefix>:mem:<id>`. Sorted sets index
+    memories by recency per user and per session, and by importance per
+    (user, category), so the SQLiteBackend read queries become one range
+    read plus one MGET. Multi-key writes go through a single pipeline. With
+    `ttl` set, memories and their indexes expire (short-term memory).
+    
+    Sorted-set members cannot expire on their own, so with `ttl` every index
+    has a companion set under `<prefix>:exp:` scoring its members by expiry
+    time. Reads prune members whose memories have expired before ranging
+    over an index, so a limit is filled from live memories only.
+    """
+    
+    FILTERABLE = ("user_id", "agent_id", "session_id", "category", "visibility")
+    
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        ttl: int = None,
+        prefix: str = "ocmem",
+        client=None,
+        max_connections: int = 32
+    ):
+        self.ttl = ttl
+        self.prefix = prefix
+        self.client = client or get_client(url, max_connections=max_connections)
+    
+    # Key layout
+    
+    def _mem_key(self, memory_id: str) -> str:
+        return f"{self.prefix}:mem:{memory_id}"
+    
+    def _ids_key(self) -> str:
+        return f"{self.prefix}:ids"
+    
+    def _recent_key(self, user_id: Optional[str]) -> str:
+        return f"{self.prefix}:recent:{user_id}"
+    
+    def _session_key(self, user_id: Optional[str], session_id: Optional[str]) -> str:
+        return f"{self.prefix}:session:{user_id}:{session_id or _NO_SESSION}"
+    
+    def _category_key(self, user_id: Optional[str], category: str) -> str:
+        return f"{self.prefix}:cat:{user_id}:{category}"
+    
+    def _expiry_key(self, key: str) -> str:
+        return f"{self.prefix}:exp:{key[len(self.prefix) + 1:]}"
+    
+    def _index_keys(self, memory: Memory) -> List[str]:
+        return [
+            self._ids_key(),
+            self._recent_key(memory.user_id),
+            self._session_key(memory.user_id, memory.session_id),
+            self._category_key(memory.user_id, memory.category),
+        ]
+    
+    # Writes
+    
+    def _write(self, pipe, memory: Memory):
+        updated = _timestamp(memory.updated_at)
+        pipe.set(self._mem_key(memory.id), _dump(memory), ex=self.ttl)
+        pipe.zadd(self._ids_key(), {memory.id: updated})
+        pipe.zadd(self._recent_key(memory.user_id), {memory.id: updated})
+        pipe.zadd(self._session_key(memory.user_id, memory.session_id), {memory.id: updated})
+        pipe.zadd(self._category_key(memory.user_id, memory.category), {memory.id: memory.importance})
+        if self.ttl:
+            # A key untouched for `ttl` only holds expired members, so whole indexes expire too
+            expires = time.time() + self.ttl
+            for key in self._index_keys(memory):
+                pipe.zadd(self._expiry_key(key), {memory.id: expires})
+                pipe.expire(key, self.ttl)
+                pipe.expire(self._expiry_key(key), self.ttl)
+    
+    def add(self, memory: Memory):
+        """Add a memory"""
+        self.add_many([memory])
+    
+    def add_many(self, memories: List[Memory]):
+        """Add memories in one pipeline round-trip"""
+        pipe = self.client.pipeline(transaction=False)
+        for memory in memories:
+            self._write(pipe, memory)
+        pipe.execute()
+    
+    def update(self, memory: Memory):
+        """Update a memory (no-op if it does not exist, like SQLiteBackend)"""
+        if self.client.exists(self._mem_key(memory.id)):
+            self.add(memory)
+    
+    def delete(self, memory_id: str) -> int:
+        """Delete memory by ID"""
+        return self.delete_many([memory_id])
+    
+    def delete_many(self, memory_ids: List[str]) -> int:
+        """Delete memories and their index entries in one pipeline"""
+        memories = [m for m in self.get_many(memory_ids) if m]
+        if not memories:
+            return 0
+        
+        pipe = self.client.pipeline(transaction=False)
+        for memory in memories:
+            pipe.delete(self._mem_key(memory.id))
+            for key in self._index_keys(memory):
+                pipe.zrem(key, memory.id)
+                if self.ttl:
+                    pipe.zrem(self._expiry_key(key), memory.id)
+        pipe.execute()
+        
+        return len(memories)
+    
+    def delete_by_filters(
+        self,
+        filters: Dict,
+        chunk_size: int = None,
+        on_chunk: Callable[[List[str]], None] = None
+    ) -> int:
+        """Delete memories matching filters, one pipeline per chunk of `chunk_size`"""
+        for key in filters:
+            if key not in self.FILTERABLE:
+                raise ValueError(f"Cannot filter on {key!r}")
+        
+        matches = [
+            m.id for m in self._scan(filters.get("user_id"))
+            if all(getattr(m, k) == v for k, v in filters.items())
+        ]
+        deleted = 0
+        chunk_size = chunk_size or len(matches) or 1
+        for start in range(0, len(matches), chunk_size):
+            chunk = matches[start:start + chunk_size]
+            deleted += self.delete_many(chunk)
+            if on_chunk:
+                on_chunk(chunk)
+        return deleted
+    
+    def _prune(self, *keys: str):
+        """Remove members whose memories have expired from the indexes at `keys`"""
+        if not self.ttl:
+            return
+        now = time.time()
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.zcount(self._expiry_key(key), "-inf", now)
+        stale = [key for key, count in zip(keys, pipe.execute()) if count]
+        if not stale:
+            return
+        
+        def prune(pipe):
+            # Runs under WATCH on the expiry sets: a concurrent rewrite re-scores
+            # its member and aborts this, so a live memory is never dropped
+            expired = {key: pipe.zrangebyscore(self._expiry_key(key), "-inf", now) for key in stale}
+            pipe.multi()
+            for key, ids in expired.items():
+                if ids:
+                    pipe.zrem(key, *ids)
+                    pipe.zremrangebyscore(self._expiry_key(key), "-inf", now)
+        
+        self.client.transaction(prune, *[self._expiry_key(key) for key in stale])
+    
+    # Reads
+    
+    def get(self, memory_id: str) -> Optional[Memory]:
+        """Get memory by ID"""
+        return _load(self.client.get(self._mem_key(memory_id)))
+    
+    def get_many(self, memory_ids: List[str]) -> List[Optional[Memory]]:
+        """Get memories by ID with a single MGET, None for missing IDs"""
+        if not memory_ids:
+            return []
+        return [_load(raw) for raw in self.client.mget([self._mem_key(i) for i in memory_ids])]
+    
+    def _members(self, key: str, start: int = 0, stop: int = -1) -> List[str]:
+        return [m.decode() if isinstance(m, bytes) else m for m in self.client.zrevrange(key, start, stop)]
+    
+    def _scan(self, user_id: str = None) -> List[Memory]:
+        key = self._recent_key(user_id) if user_id else self._ids_key()
+        self._prune(key)
+        return [m for m in self.get_many(self._members(key)) if m]
+    
+    def search(
+        self,
+        query: str,
+        user_id: str = None,
+        category: str = None,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[Dict]:
+        """Search memories by keyword"""
+        check_filters(filters)
+        needle = query.lower()
+        matches = [
+            m for m in self._scan(user_id)
+            if needle in m.content.lower() and (not category or m.category == category)
+            and matches_filters(m, filters)
+        ]
+        matches.sort(key=lambda m: (m.importance, m.updated_at), reverse=True)
+        return [m.to_dict() for m in matches[:limit]]
+    
+    def search_many(
+        self,
+        queries: List[str],
+        user_id: str = None,
+        category: str = None,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[List[Dict]]:
+        """Keyword search for several queries over a single scan"""
+        check_filters(filters)
+        candidates = [
+            m for m in self._scan(user_id)
+            if (not category or m.category == category) and matches_filters(m, filters)
+        ]
+        candidates.sort(key=lambda m: (m.importance, m.updated_at), reverse=True)
+        
+        results = []
+        for query in queries:
+            needle = query.lower()
+            results.append([m.to_dict() for m in candidates if needle in m.content.lower()][:limit])
+        return results
+    
+    def filter_ids(self, filters: Dict, limit: int = None) -> List[str]:
+        """IDs of memories matching `filters`, most important first"""
+        check_filters(filters)
+        matches = [m for m in self._scan(filters.get("user_id")) if matches_filters(m, filters)]
+        matches.sort(key=lambda m: (m.importance, m.updated_at), reverse=True)
+        return [m.id for m in matches[:limit]]
+    
+    def get_recent(
+        self,
+        user_id: Optional[str],
+        session_id: str = None,
+        limit: int = 20,
+        filters: Dict = None
+    ) -> List[Memory]:
+        """Get recent memories"""
+        if filters or not user_id:
+            # No sorted set covers these; scan newest first (as search() does)
+            check_filters(filters)
+            return [
+                m for m in self._scan(user_id)
+                if (not session_id or m.session_id in (session_id, None)) and matches_filters(m, filters)
+            ][:limit]
+        if not session_id:
+            self._prune(self._recent_key(user_id))
+            return [m for m in self.get_many(self._members(self._recent_key(user_id), 0, limit - 1)) if m]
+        
+        # Same semantics as SQLiteBackend: this session plus session-less memories
+        self._prune(self._session_key(user_id, session_id), self._session_key(user_id, None))
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrevrange(self._session_key(user_id, session_id), 0, limit - 1)
+        pipe.zrevrange(self._session_key(user_id, None), 0, limit - 1)
+        ids = [m.decode() if isinstance(m, bytes) else m for batch in pipe.execute() for m in batch]
+        
+        memories = [m for m in self.get_many(ids) if m]
+        memories.sort(key=lambda m: m.updated_at, reverse=True)
+        return memories[:limit]
+    
+    def get_by_category(
+        self,
+        user_id: Optional[str],
+        category: str,
+        min_importance: float = 0.0,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[Memory]:
+        """Get memories by category"""
+        if filters or not user_id:
+            check_filters(filters)
+            matches = [
+                m for m in self._scan(user_id)
+                if m.category == category and m.importance >= min_importance and matches_filters(m, filters)
+            ]
+            matches.sort(key=lambda m: (m.importance, m.updated_at), reverse=True)
+            return matches[:limit]
+        self._prune(self._category_key(user_id, category))
+        ids = self.client.zrevrangebyscore(
+            self._category_key(user_id, category), "+inf", min_importance, start=0, num=limit
+        )
+        memories = [m for m in self.get_many([i.decode() if isinstance(i, bytes) else i for i in ids]) if m]
+        memories.sort(key=lambda m: (m.importance, m.updated_at), reverse=True)
+        return memories
+    
+    def get_by_entity(
+        self,
+        entities: List[str],
+        user_id: str = None,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[Memory]:
+        """Memories mentioning any of `entities`, ranked in Python over the user's memories"""
+        check_filters(filters)
+        memories = [m for m in self._scan(user_id) if matches_filters(m, filters)]
+        return rank_by_entities(memories, entities, limit)
+
+
+class CachedBackend:
+    """
+    Read-through Redis cache in front of a long-term backend
+    
+    `get`, `get_recent` and `get_by_category` are served from Redis when
+    possible, so hot reads from any process skip SQLite. Query results are
+    cached as ID lists in one hash per user; every write through this
+    wrapper refreshes the cached memory and drops that user's hash.
+    Everything else is delegated to the wrapped backend.
+    """
+    
+    def __init__(self, backend, client, ttl: int = 3600, prefix: str = "ocmem:cache"):
+        self.backend = backend
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+    
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+    
+    def _mem_key(self, memory_id: str) -> str:
+        return f"{self.prefix}:mem:{memory_id}"
+    
+    def _query_key(self, user_id: Optional[str]) -> str:
+        return f"{self.prefix}:q:{user_id}"
+    
+    def _store(self, pipe, memories: List[Memory]):
+        for memory in memories:
+            pipe.set(self._mem_key(memory.id), _dump(memory), ex=self.ttl)
+    
+    def _cached_query(self, user_id: Optional[str], field: str, load) -> List[Memory]:
+        raw_ids = self.client.hget(self._query_key(user_id), field)
+        if raw_ids is not None:
+            ids = json.loads(raw_ids)
+            raws = self.client.mget([self._mem_key(i) for i in ids]) if ids else []
+            if all(raws):
+                self.hits += 1
+                metrics.incr("cache.hits")
+                return [_load(raw) for raw in raws]
+        
+        self.misses += 1
+        metrics.incr("cache.misses")
+        memories = load()
+        
+        pipe = self.client.pipeline(transaction=False)
+        self._store(pipe, memories)
+        pipe.hset(self._query_key(user_id), field, json.dumps([m.id for m in memories]))
+        pipe.expire(self._query_key(user_id), self.ttl)
+        pipe.execute()
+        
+        return memories
+    
+    def _invalidate(self, memories: List[Memory]):
+        self._invalidate_ids([m.id for m in memories], {m.user_id for m in memories})
+    
+    def _invalidate_ids(self, memory_ids: List[str], user_ids: Set[Optional[str]]):
+        pipe = self.client.pipeline(transaction=False)
+        for memory_id in memory_ids:
+            pipe.delete(self._mem_key(memory_id))
+        for user_id in user_ids:
+            pipe.delete(self._query_key(user_id))
+        pipe.execute()
+    
+    def _owners(self, memory_ids: List[str]) -> Set[Optional[str]]:
+        """
+        Users whose cached queries a write to `memory_ids` can change
+        
+        Read before the write, which may remove the rows. Memories that are
+        not cached themselves can still enter a cached ranking (a raised
+        importance), so their users come from the backend.
+        """
+        if not memory_ids:
+            return set()
+        raws = self.client.mget([self._mem_key(i) for i in memory_ids])
+        users = {_load(raw).user_id for raw in raws if raw}
+        missing = [memory_id for memory_id, raw in zip(memory_ids, raws) if not raw]
+        if missing:
+            users.update(m.user_id for m in self.backend.get_many(missing) if m)
+        return users
+    
+    def get(self, memory_id: str) -> Optional[Memory]:
+        raw = self.client.get(self._mem_key(memory_id))
+        if raw:
+            self.hits += 1
+            metrics.incr("cache.hits")
+            return _load(raw)
+        
+        self.misses += 1
+        metrics.incr("cache.misses")
+        memory = self.backend.get(memory_id)
+        if memory:
+            self.client.set(self._mem_key(memory.id), _dump(memory), ex=self.ttl)
+        return memory
+    
+    def get_many(self, memory_ids: List[str]) -> List[Optional[Memory]]:
+        if not memory_ids:
+            return []
+        
+        memories = [_load(raw) for raw in self.client.mget([self._mem_key(i) for i in memory_ids])]
+        missing = [memory_id for memory_id, m in zip(memory_ids, memories) if m is None]
+        self.hits += len(memory_ids) - len(missing)
+        metrics.incr("cache.hits", len(memory_ids) - len(missing))
+        self.misses += len(missing)
+        metrics.incr("cache.misses", len(missing))
+        
+        if missing:
+            loaded = {m.id: m for m in self.backend.get_many(missing) if m}
+            pipe = self.client.pipeline(transaction=False)
+            self._store(pipe, list(loaded.values()))
+            pipe.execute()
+            memories = [m or loaded.get(memory_id) for memory_id, m in zip(memory_ids, memories)]
+        
+        return memories
+    
+    def get_recent(
+        self,
+        user_id: Optional[str],
+        session_id: str = None,
+        limit: int = 20,
+        filters: Dict = None
+    ) -> List[Memory]:
+        if filters or not user_id:
+            # Scoped and cross-user reads are not invalidated per user, so not cached
+            return self.backend.get_recent(user_id, session_id=session_id, limit=limit, filters=filters)
+        return self._cached_query(
+            user_id, f"recent:{session_id}:{limit}",
+            lambda: self.backend.get_recent(user_id, session_id=session_id, limit=limit)
+        )
+    
+    def get_by_category(
+        self,
+        user_id: Optional[str],
+        category: str,
+        min_importance: float = 0.0,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[Memory]:
+        if filters or not user_id:
+            return self.backend.get_by_category(
+                user_id, category, min_importance=min_importance, limit=limit, filters=filters
+            )
+        return self._cached_query(
+            user_id, f"cat:{category}:{min_importance}:{limit}",
+            lambda: self.backend.get_by_category(user_id, category, min_importance=min_importance, limit=limit)
+        )
+    
+    def add(self, memory: Memory):
+        self.backend.add(memory)
+        self._invalidate([memory])
+    
+    def add_many(self, memories: List[Memory]):
+        self.backend.add_many(memories)
+        self._invalidate(memories)
+    
+    def update(self, memory: Memory):
+        self.backend.update(memory)
+        self._invalidate([memory])
+    
+    def delete(self, memory_id: str) -> int:
+        memory = self.get(memory_id)
+        deleted = self.backend.delete(memory_id)
+        if memory:
+            self._invalidate([memory])
+        return deleted
+    
+    def delete_many(self, memory_ids: List[str]) -> int:
+        users = self._owners(memory_ids)
+        deleted = self.backend.delete_many(memory_ids)
+        self._invalidate_ids(memory_ids, users)
+        return deleted
+    
+    def archive(self, memory_ids: List[str]) -> int:
+        users = self._owners(memory_ids)
+        archived = self.backend.archive(memory_ids)
+        self._invalidate_ids(memory_ids, users)
+        return archived
+    
+    def set_importance(self, updates):
+        memory_ids = [memory_id for memory_id, _, _ in updates]
+        users = self._owners(memory_ids)
+        self.backend.set_importance(updates)
+        self._invalidate_ids(memory_ids, users)
+    
+    def delete_by_filters(
+        self,
+        filters: Dict,
+        chunk_size: int = None,
+        on_chunk: Callable[[List[str]], None] = None
+    ) -> int:
+        deleted = self.backend.delete_by_filters(filters, chunk_size=chunk_size, on_chunk=on_chunk)
+        self.clear()
+        return deleted
+    
+    def clear(self):
+        """Drop every cached entry under this prefix"""
+        keys = list(self.client.scan_iter(match=f"{self.prefix}:*", count=1000))
+        for start in range(0, len(keys), 1000):
+            self.client.delete(*keys[start:start + 1000])
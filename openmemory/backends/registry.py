@@ -0,0 +1,196 @@
+"""
+Backend registry
+
+Backends are factories taking a MemoryConfig and returning a store. Built-in
+backends are registered below; third-party packages can add their own
+through entry points:
+
+    setup(
+        ...
+        entry_points={
+            "openmemory.long_term_backends": ["lmdb = mypkg.lmdb:create"],
+            "openmemory.vector_stores": ["mmap = mypkg.mmap_store:create"],
+            "openmemory.encoders": ["openvino = mypkg.ov:OpenVinoEncoder"],
+        },
+    )
+
+and select them with MemoryConfig(long_term_backend="lmdb", vector_backend="mmap",
+encoder_backend="openvino"). Encoder factories take an EncoderSpec instead of
+the config (see encoders.py).
+"""
+
+from typing import Callable, Dict
+
+from ..core.config import MemoryConfig
+
+LONG_TERM_GROUP = "openmemory.long_term_backends"
+VECTOR_GROUP = "openmemory.vector_stores"
+ENCODER_GROUP = "openmemory.encoders"
+
+_REGISTRY: Dict[str, Dict[str, Callable]] = {LONG_TERM_GROUP: {}, VECTOR_GROUP: {}, ENCODER_GROUP: {}}
+_ENTRY_POINTS_LOADED = set()
+
+
+def register_long_term_backend(name: str, factory: Callable[[MemoryConfig], object]):
+    """Register a long-term backend factory under `name`"""
+    _REGISTRY[LONG_TERM_GROUP][name] = factory
+
+
+def register_vector_store(name: str, factory: Callable[[MemoryConfig], object]):
+    """Register a vector store factory under `name`"""
+    _REGISTRY[VECTOR_GROUP][name] = factory
+
+
+def register_encoder(name: str, factory: Callable):
+    """Register an encoder factory (EncoderSpec -> Encoder) under `name`"""
+    _REGISTRY[ENCODER_GROUP][name] = factory
+
+
+def _entry_points(group: str):
+    from importlib.metadata import entry_points
+    
+    eps = entry_points()
+    if hasattr(eps, "select"):
+        return eps.select(group=group)
+    return eps.get(group, [])  # Python < 3.10
+
+
+def _load_entry_points(group: str):
+    if group in _ENTRY_POINTS_LOADED:
+        return
+    _ENTRY_POINTS_LOADED.add(group)
+    
+    for ep in _entry_points(group):
+        # Explicit registrations win over installed plugins with the same name
+        _REGISTRY[group].setdefault(ep.name, ep.load())
+
+
+def _lookup(group: str, name: str) -> Callable:
+    if name not in _REGISTRY[group]:
+        _load_entry_points(group)
+    try:
+        return _REGISTRY[group][name]
+    except KeyError:
+        available = ", ".join(sorted(available_backends(group))) or "none"
+        raise ValueError(f"Unknown backend {name!r} for {group} (available: {available})") from None
+
+
+def available_backends(group: str = LONG_TERM_GROUP):
+    """List registered backend names for a group"""
+    _load_entry_points(group)
+    return list(_REGISTRY[group])
+
+
+def create_long_term_backend(config: MemoryConfig):
+    """Build the long-term backend selected by `config.long_term_backend`"""
+    return _lookup(LONG_TERM_GROUP, config.long_term_backend)(config)
+
+
+def create_vector_store(config: MemoryConfig):
+    """Build the vector store selected by `config.vector_backend`"""
+    return _lookup(VECTOR_GROUP, config.vector_backend)(config)
+
+
+def create_encoder(spec):
+    """Build the encoder selected by `spec.backend` (use encoders.get_encoder to share one per process)"""
+    return _lookup(ENCODER_GROUP, spec.backend)(spec)
+
+
+# Built-in backends
+
+def _shard_router(config: MemoryConfig):
+    from .sharded_backend import ShardRouter
+    return ShardRouter(config.shard_path, num_shards=config.num_shards)
+
+
+def _sqlite(config: MemoryConfig):
+    if config.num_shards > 1:
+        from .sharded_backend import ShardedSQLiteBackend
+        return ShardedSQLiteBackend(
+            _shard_router(config),
+            indexed_metadata_keys=config.indexed_metadata_keys,
+            compress=config.compress_text
+        )
+    
+    from .sqlite_backend import SQLiteBackend
+    return SQLiteBackend(
+        config.long_term_path,
+        indexed_metadata_keys=config.indexed_metadata_keys,
+        compress=config.compress_text
+    )
+
+
+def _redis(config: MemoryConfig):
+    from .redis_backend import RedisBackend, get_client
+    client = get_client(config.redis_url or "redis://localhost:6379/0", config.redis_max_connections)
+    return RedisBackend(prefix=f"{config.redis_prefix}:lt", client=client)
+
+
+def _memory(config: MemoryConfig):
+    from .memory_backend import InMemoryBackend
+    return InMemoryBackend()
+
+
+def _faiss(config: MemoryConfig):
+    from .encoders import EncoderSpec, get_encoder
+    encoder = get_encoder(EncoderSpec.from_config(config))
+    
+    if config.num_shards > 1:
+        from .sharded_backend import ShardedVectorBackend
+        return ShardedVectorBackend(
+            _shard_router(config),
+            dimension=config.embedding_dimension,
+            index_type=config.vector_index,
+            rerank_factor=config.binary_rerank_factor,
+            encoder=encoder,
+            store_content=config.vector_store_content
+        )
+    
+    from .vector_backend import VectorBackend
+    return VectorBackend(
+        config.vector_path,
+        dimension=config.embedding_dimension,
+        index_type=config.vector_index,
+        rerank_factor=config.binary_rerank_factor,
+        encoder=encoder,
+        store_content=config.vector_store_content
+    )
+
+
+def _memory_vectors(config: MemoryConfig):
+    from .memory_backend import InMemoryVectorStore
+    return InMemoryVectorStore(dimension=config.embedding_dimension)
+
+
+register_long_term_backend("sqlite", _sqlite)
+register_long_term_backend("redis", _redis)
+register_long_term_backend("memory", _memory)
+register_vector_store("faiss", _faiss)
+register_vector_store("memory", _memory_vectors)
+
+
+
+def _auto_encoder(spec):
+    from .encoders import auto_encoder
+    return auto_encoder(spec)
+
+
+def _sentence_transformers(spec):
+    from .encoders import SentenceTransformerEncoder
+    return SentenceTransformerEncoder(spec)
+
+
+def _onnx(spec):
+    from .encoders import OnnxEncoder
+    return OnnxEncoder(spec)
+
+
+def _hash_encoder(spec):
+    from .encoders import HashEncoder
+    return HashEncoder(spec)
+
+
+register_encoder("auto", _auto_encoder)
+register_encoder("sentence-transformers", _sentence_transformers)
+register_encoder("onnx", _onnx)
+register_encoder("hash", _hash_encoder)
@@ -0,0 +1,572 @@
+"""Sharded long-term and vector stores routed by user_id"""
+
+import bisect
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from ..core.locking import FileLock, atomic_write_json
+from ..core.memory import Memory
+from ..core.metrics import metrics
+from .base import MemoryScan, MergedScan, merge_ranked, rank_by_entities, scan_params
+from .encoders import Encoder, EncoderSpec, get_encoder
+from .sqlite_backend import SQLiteBackend
+from .vector_backend import VectorBackend
+
+# Bit offset packing the shard number into compaction scan cursors
+_CURSOR_SHIFT = 40
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes"""
+    
+    def __init__(self, nodes: List[str], vnodes: int = 64):
+        self.nodes = list(nodes)
+        self._ring = sorted(
+            (self._hash(f"{node}#{i}"), node)
+            for node in self.nodes
+            for i in range(vnodes)
+        )
+        self._keys = [h for h, _ in self._ring]
+    
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+    
+    def node_for(self, key: Optional[str]) -> str:
+        pos = bisect.bisect(self._keys, self._hash(key or "")) % len(self._ring)
+        return self._ring[pos][1]
+
+
+class ShardRouter:
+    """
+    Shard layout shared by the sharded backends
+    
+    The list of shards lives in `shards.json` under `shard_path` so every
+    process routes the same way. Routing re-reads the file when it changes
+    on disk, which is how other processes pick up an online split.
+    """
+    
+    def __init__(self, shard_path: str, num_shards: int = 4, vnodes: int = 64):
+        self.shard_path = shard_path
+        self.vnodes = vnodes
+        os.makedirs(shard_path, exist_ok=True)
+        
+        self._manifest_file = os.path.join(shard_path, "shards.json")
+        self._lock = FileLock(os.path.join(shard_path, ".lock"))
+        self._stat = None
+        self._listeners = []
+        
+        with self._lock:
+            if not os.path.exists(self._manifest_file):
+                names = [f"shard-{i:03d}" for i in range(num_shards)]
+                atomic_write_json(self._manifest_file, {"shards": names})
+        
+        self.ring = None
+        self.refresh()
+        self.executor = ThreadPoolExecutor(max_workers=max(len(self.ring.nodes), 2))
+    
+    @property
+    def shards(self) -> List[str]:
+        return self.ring.nodes
+    
+    def shard_dir(self, name: str) -> str:
+        return os.path.join(self.shard_path, name)
+    
+    def on_change(self, callback):
+        """Register a callback run when the shard list grows"""
+        self._listeners.append(callback)
+    
+    def refresh(self):
+        st = os.stat(self._manifest_file)
+        key = (st.st_ino, st.st_mtime_ns)
+        if key == self._stat:
+            return
+        self._stat = key
+        
+        with open(self._manifest_file, "r") as f:
+            names = json.load(f)["shards"]
+        self.ring = HashRing(names, self.vnodes)
+        for callback in self._listeners:
+            callback(names)
+    
+    def route(self, user_id: Optional[str]) -> str:
+        self.refresh()
+        return self.ring.node_for(user_id)
+    
+    def holding(self):
+        """Shared hold on the shard list: deletes take it so they wait out an online split"""
+        return self._lock.shared()
+    
+    def publish(self, names: List[str]):
+        """Atomically replace the shard list (caller holds the lock)"""
+        atomic_write_json(self._manifest_file, {"shards": names})
+        self.refresh()
+    
+    def scatter(self, fn, names: List[str] = None) -> List:
+        """Run `fn(shard_name)` on every shard in parallel"""
+        self.refresh()
+        return list(self.executor.map(fn, self.shards if names is None else names))
+
+
+class ShardedSQLiteBackend:
+    """
+    SQLiteBackend interface over N SQLite files
+    
+    Per-user operations go to the shard that owns `user_id`, so writers of
+    different users never share a database lock. Operations that do not name
+    a user (lookups by ID, admin deletes, unscoped search) scatter to every
+    shard in parallel and gather the results.
+    """
+    
+    def __init__(self, router: ShardRouter, indexed_metadata_keys: Sequence[str] = (), compress: bool = False):
+        self.router = router
+        self.indexed_metadata_keys = tuple(indexed_metadata_keys)
+        self.compress = compress
+        self.shards: Dict[str, SQLiteBackend] = {}
+        self._mutex = threading.Lock()
+        router.on_change(self._open_shards)
+        self._open_shards(router.shards)
+    
+    def _open_shards(self, names: List[str]):
+        with self._mutex:
+            for name in names:
+                if name not in self.shards:
+                    os.makedirs(self.router.shard_dir(name), exist_ok=True)
+                    path = os.path.join(self.router.shard_dir(name), "long_term.db")
+                    self.shards[name] = SQLiteBackend(
+                        path, indexed_metadata_keys=self.indexed_metadata_keys, compress=self.compress
+                    )
+    
+    def shard_for(self, user_id: Optional[str]) -> SQLiteBackend:
+        return self.shards[self.router.route(user_id)]
+    
+    def _scatter(self, fn) -> List:
+        return self.router.scatter(lambda name: fn(self.shards[name]))
+    
+    def add(self, memory: Memory):
+        self.shard_for(memory.user_id).add(memory)
+    
+    def add_many(self, memories: List[Memory]):
+        groups: Dict[str, List[Memory]] = {}
+        for m in memories:
+            groups.setdefault(self.router.route(m.user_id), []).append(m)
+        self.router.scatter(lambda name: self.shards[name].add_many(groups[name]), list(groups))
+    
+    def get(self, memory_id: str) -> Optional[Memory]:
+        found = [m for m in self._scatter(lambda s: s.get(memory_id)) if m]
+        return max(found, key=lambda m: m.updated_at) if found else None
+    
+    def get_many(self, memory_ids: List[str]) -> List[Optional[Memory]]:
+        found: Dict[str, Memory] = {}
+        for memories in self._scatter(lambda s: s.get_many(memory_ids)):
+            for m in memories:
+                if m and (m.id not in found or m.updated_at > found[m.id].updated_at):
+                    found[m.id] = m
+        return [found.get(memory_id) for memory_id in memory_ids]
+    
+    def update(self, memory: Memory):
+        self.shard_for(memory.user_id).update(memory)
+    
+    # Deletes hold the router (see split_shard), so none lands on a shard mid-move
+    
+    def delete(self, memory_id: str) -> int:
+        with self.router.holding():
+            return sum(self._scatter(lambda s: s.delete(memory_id)))
+    
+    def delete_many(self, memory_ids: List[str]) -> int:
+        with self.router.holding():
+            return sum(self._scatter(lambda s: s.delete_many(memory_ids)))
+    
+    def delete_by_filters(
+        self,
+        filters: Dict,
+        chunk_size: int = None,
+        on_chunk: Callable[[List[str]], None] = None
+    ) -> int:
+        with self.router.holding():
+            if "user_id" in filters:
+                return self.shard_for(filters["user_id"]).delete_by_filters(filters, chunk_size, on_chunk)
+            return sum(self._scatter(lambda s: s.delete_by_filters(filters, chunk_size, on_chunk)))
+    
+    def reclaim(self, max_pages: int = 1000) -> int:
+        return sum(self._scatter(lambda s: s.reclaim(max_pages)))
+    
+    def vacuum(self) -> Dict:
+        results = self._scatter(lambda s: s.vacuum())
+        return {key: sum(r[key] for r in results) for key in results[0]}
+    
+    def train_dictionary(self, samples: int = None) -> Dict[str, int]:
+        """Train a compression dictionary per shard (each on its own rows)"""
+        names = list(self.shards)
+        return dict(zip(names, self.router.scatter(lambda name: self.shards[name].train_dictionary(samples), names)))
+    
+    def recompress(self, batch_size: int = 500, on_batch: Callable[[int], None] = None) -> Dict:
+        results = self._scatter(lambda s: s.recompress(batch_size, on_batch))
+        return {key: sum(r[key] for r in results) for key in results[0]}
+    
+    def archive(self, memory_ids: List[str]) -> int:
+        with self.router.holding():
+            return sum(self._scatter(lambda s: s.archive(memory_ids)))
+    
+    def search(
+        self,
+        query: str,
+        user_id: str = None,
+        category: str = None,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[Dict]:
+        if user_id:
+            return self.shard_for(user_id).search(query, user_id=user_id, category=category, limit=limit, filters=filters)
+        
+        gathered = [
+            r for rows in self._scatter(lambda s: s.search(query, category=category, limit=limit, filters=filters))
+            for r in rows
+        ]
+        gathered.sort(key=lambda r: (r["importance"], r["updated_at"]), reverse=True)
+        return gathered[:limit]
+    
+    def search_many(
+        self,
+        queries: List[str],
+        user_id: str = None,
+        category: str = None,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[List[Dict]]:
+        if user_id:
+            return self.shard_for(user_id).search_many(
+                queries, user_id=user_id, category=category, limit=limit, filters=filters
+            )
+        
+        per_shard = self._scatter(lambda s: s.search_many(queries, category=category, limit=limit, filters=filters))
+        merged = []
+        for i in range(len(queries)):
+            rows = [r for shard_rows in per_shard for r in shard_rows[i]]
+            rows.sort(key=lambda r: (r["importance"], r["updated_at"]), reverse=True)
+            merged.append(rows[:limit])
+        return merged
+    
+    def filter_ids(self, filters: Dict, limit: int = None) -> List[str]:
+        if filters.get("user_id"):
+            return self.shard_for(filters["user_id"]).filter_ids(filters, limit=limit)
+        # Unscoped: concatenated per shard, so only each shard's slice is ordered
+        ids = [i for shard_ids in self._scatter(lambda s: s.filter_ids(filters, limit=limit)) for i in shard_ids]
+        return ids[:limit]
+    
+    def get_recent(
+        self,
+        user_id: Optional[str],
+        session_id: str = None,
+        limit: int = 20,
+        filters: Dict = None
+    ) -> List[Memory]:
+        if user_id:
+            return self.shard_for(user_id).get_recent(user_id, session_id=session_id, limit=limit, filters=filters)
+        
+        per_shard = self._scatter(lambda s: s.get_recent(None, session_id=session_id, limit=limit, filters=filters))
+        return merge_ranked(per_shard, limit, key=lambda m: m.updated_at)
+    
+    def get_by_category(
+        self,
+        user_id: Optional[str],
+        category: str,
+        min_importance: float = 0.0,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[Memory]:
+        if user_id:
+            return self.shard_for(user_id).get_by_category(
+                user_id, category, min_importance=min_importance, limit=limit, filters=filters
+            )
+        
+        per_shard = self._scatter(lambda s: s.get_by_category(
+            None, category, min_importance=min_importance, limit=limit, filters=filters
+        ))
+        return merge_ranked(per_shard, limit, key=lambda m: (m.importance, m.updated_at))
+    
+    def get_by_entity(
+        self,
+        entities: List[str],
+        user_id: str = None,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[Memory]:
+        if user_id:
+            return self.shard_for(user_id).get_by_entity(entities, user_id=user_id, limit=limit, filters=filters)
+        
+        per_shard = self._scatter(lambda s: s.get_by_entity(entities, limit=limit, filters=filters))
+        return rank_by_entities([m for rows in per_shard for m in rows], entities, limit)
+    
+    def get_by_user(self, user_id: Optional[str], updated_since: str = None) -> List[Memory]:
+        return self.shard_for(user_id).get_by_user(user_id, updated_since=updated_since)
+    
+    def iter_memories(
+        self,
+        user_id: str = None,
+        filters: Dict = None,
+        order: str = "created_at",
+        batch_size: int = 500,
+        cursor: str = None
+    ) -> MemoryScan:
+        """A user's scan runs on their shard; an all-users scan merges every shard's"""
+        params, after = scan_params(user_id, filters, order, cursor)
+        if params["user_id"] is not None:
+            return self.shard_for(params["user_id"]).iter_memories(batch_size=batch_size, cursor=cursor, **params)
+        
+        scans = {}
+        for name in self.router.shards:
+            scan = self.shards[name].iter_memories(batch_size=batch_size, **params)
+            scan.position = (after or {}).get(name)
+            scans[name] = scan
+        return MergedScan(scans, params, batch_size)
+    
+    def list_users(self) -> List[Optional[str]]:
+        return sorted({u for users in self._scatter(lambda s: s.list_users()) for u in users}, key=str)
+    
+    # Compaction support: cursors pack (shard number, rowid) into one int
+    
+    def scan_importance(self, after_rowid: int = 0, limit: int = 500):
+        names = self.router.shards
+        shard_no, rowid = after_rowid >> _CURSOR_SHIFT, after_rowid & ((1 << _CURSOR_SHIFT) - 1)
+        
+        batch = []
+        while shard_no < len(names) and len(batch) < limit:
+            rows = self.shards[names[shard_no]].scan_importance(after_rowid=rowid, limit=limit - len(batch))
+            base = shard_no << _CURSOR_SHIFT
+            batch.extend((base + r[0],) + tuple(r[1:]) for r in rows)
+            shard_no, rowid = shard_no + 1, 0
+        
+        return batch
+    
+    def set_importance(self, updates):
+        self._scatter(lambda s: s.set_importance(updates))
+    
+    def count_by_user(self, min_count: int = 0) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for shard_counts in self._scatter(lambda s: s.count_by_user(min_count)):
+            counts.update(shard_counts)
+        return counts
+    
+    def get_lowest_importance(self, user_id: Optional[str], limit: int = 10) -> List[Memory]:
+        return self.shard_for(user_id).get_lowest_importance(user_id, limit=limit)
+
+
+class ShardedVectorBackend:
+    """VectorBackend interface over one vector segment directory per shard"""
+    
+    def __init__(
+        self,
+        router: ShardRouter,
+        dimension: int = 384,
+        index_type: str = "flat",
+        rerank_factor: int = 20,
+        encoder: Encoder = None,
+        store_content: bool = True
+    ):
+        self.router = router
+        self.dimension = dimension
+        self.encoder = encoder or get_encoder(EncoderSpec(dimension=dimension))
+        self.index_type = index_type
+        self.rerank_factor = rerank_factor
+        self.store_content = store_content
+        self.shards: Dict[str, VectorBackend] = {}
+        self._mutex = threading.Lock()
+        router.on_change(self._open_shards)
+        self._open_shards(router.shards)
+    
+    def _open_shards(self, names: List[str]):
+        with self._mutex:
+            for name in names:
+                if name not in self.shards:
+                    path = os.path.join(self.router.shard_dir(name), "vectors")
+                    self.shards[name] = VectorBackend(
+                        path,
+                        dimension=self.dimension,
+                        index_type=self.index_type,
+                        rerank_factor=self.rerank_factor,
+                        encoder=self.encoder,
+                        store_content=self.store_content
+                    )
+    
+    @metrics.timed("embed")
+    def _get_embedding(self, text: str):
+        # One model for all shards
+        return self.encoder.encode([text])[0]
+    
+    def shard_for(self, user_id: Optional[str]) -> VectorBackend:
+        return self.shards[self.router.route(user_id)]
+    
+    @metrics.timed("embed")
+    def _get_embeddings(self, texts: List[str]):
+        return self.encoder.encode(texts)
+    
+    def add(self, memory):
+        self.shard_for(memory.user_id).add_embedding(memory, self._get_embedding(memory.content))
+    
+    def add_many(self, memories: List):
+        if memories:
+            self.add_embeddings(memories, self._get_embeddings([m.content for m in memories]))
+    
+    def add_embeddings(self, memories: List, embeddings):
+        groups: Dict[str, List[int]] = {}
+        for i, m in enumerate(memories):
+            groups.setdefault(self.router.route(m.user_id), []).append(i)
+        self.router.scatter(
+            lambda name: self.shards[name].add_embeddings(
+                [memories[i] for i in groups[name]], embeddings[groups[name]]
+            ),
+            list(groups)
+        )
+    
+    def delete_many(self, memory_ids: List[str]) -> int:
+        with self.router.holding():
+            return sum(self.router.scatter(lambda name: self.shards[name].delete_many(memory_ids)))
+    
+    def strip_content(self) -> int:
+        return sum(self.router.scatter(lambda name: self.shards[name].strip_content()))
+    
+    def compact(self):
+        self.router.scatter(lambda name: self.shards[name].compact())
+    
+    def reclaim_deleted(self, min_fraction: float = 0.0) -> int:
+        return sum(self.router.scatter(lambda name: self.shards[name].reclaim_deleted(min_fraction)))
+    
+    def warm(self, user_id: Optional[str] = None) -> int:
+        if user_id:
+            return self.shard_for(user_id).warm(user_id)
+        return sum(self.router.scatter(lambda name: self.shards[name].warm()))
+    
+    def search(
+        self,
+        query: str,
+        user_id: str = None,
+        limit: int = 5,
+        threshold: float = 0.7,
+        filters: Dict = None
+    ) -> List[Dict]:
+        embedding = self._get_embedding(query)
+        if user_id:
+            return self.shard_for(user_id).search_embedding(embedding, user_id, limit, threshold, filters)
+        
+        gathered = [
+            r for rows in self.router.scatter(
+                lambda name: self.shards[name].search_embedding(embedding, None, limit, threshold, filters)
+            )
+            for r in rows
+        ]
+        gathered.sort(key=lambda r: r["score"], reverse=True)
+        return gathered[:limit]
+    
+    def search_many(
+        self,
+        queries: List[str],
+        user_id: str = None,
+        limit: int = 5,
+        threshold: float = 0.7,
+        filters: Dict = None
+    ) -> List[List[Dict]]:
+        return self._search_embeddings(self._get_embeddings(queries), [(user_id, filters)], limit, threshold)
+    
+    def search_partitions(
+        self,
+        queries: List[str],
+        partitions: List[Tuple[Optional[str], Dict]],
+        limit: int = 5,
+        threshold: float = 0.7
+    ) -> List[List[Dict]]:
+        return self._search_embeddings(self._get_embeddings(queries), partitions, limit, threshold)
+    
+    def _search_embeddings(self, embeddings, partitions, limit, threshold) -> List[List[Dict]]:
+        # Partitions of one user live on its shard; the rest span every shard
+        users = {user_id for user_id, _ in partitions}
+        if len(users) == 1 and None not in users:
+            return self.shard_for(users.pop()).search_partition_embeddings(embeddings, partitions, limit, threshold)
+        
+        per_shard = self.router.scatter(
+            lambda name: self.shards[name].search_partition_embeddings(embeddings, partitions, limit, threshold)
+        )
+        return [
+            merge_ranked([shard_rows[i] for shard_rows in per_shard], limit, key=lambda r: r["score"])
+            for i in range(len(embeddings))
+        ]
+
+
+def split_shard(
+    long_term: ShardedSQLiteBackend,
+    vector_store: ShardedVectorBackend = None
+) -> str:
+    """
+    Add a shard and move the users it now owns, while serving traffic
+    
+    Each moving user is copied to the new shard, the new shard list is
+    published (so new writes route there), rows written during the copy are
+    copied again, and finally the user is removed from the old shard.
+    Deletes through the sharded backends wait for the split to finish (they
+    take `router.holding()`), so a row deleted mid-copy cannot come back on
+    the new shard.
+    
+    Returns:
+        Name of the new shard
+    """
+    router = long_term.router
+    
+    with router._lock:
+        router.refresh()
+        old_names = router.shards
+        new_name = f"shard-{len(old_names):03d}"
+        new_ring = HashRing(old_names + [new_name], router.vnodes)
+        
+        long_term._open_shards(old_names + [new_name])
+        if vector_store:
+            vector_store._open_shards(old_names + [new_name])
+        
+        moves = [
+            (user_id, old)
+            for old in old_names
+            for user_id in long_term.shards[old].list_users()
+            if new_ring.node_for(user_id) == new_name
+        ]
+        
+        copied_at = datetime.now().isoformat()
+        for user_id, old in moves:
+            _move_user(long_term, vector_store, user_id, old, new_name)
+        
+        router.publish(old_names + [new_name])
+        
+        # Catch up with writes that landed on the old shard during the copy
+        moved_ids: Dict[str, List[str]] = {}
+        for user_id, old in moves:
+            _move_user(long_term, vector_store, user_id, old, new_name, since=copied_at)
+            moved_ids.setdefault(old, []).extend(
+                m.id for m in long_term.shards[old].iter_memories(filters={"user_id": user_id}, batch_size=1000)
+            )
+        
+        for old, ids in moved_ids.items():
+            long_term.shards[old].delete_many(ids)
+            if vector_store:
+                vector_store.shards[old].delete_many(ids)
+    
+    return new_name
+
+
+def _move_user(long_term, vector_store, user_id, source, target, since: str = None):
+    if since is None:
+        # Full copy: stream the user in batches rather than loading them whole
+        batches = long_term.shards[source].iter_memories(filters={"user_id": user_id}, batch_size=1000).batches()
+    else:
+        batches = [long_term.shards[source].get_by_user(user_id, updated_since=since)]
+    
+    for memories in batches:
+        long_term.shards[target].add_many(memories)
+        
+        if vector_store and memories:
+            ids = [m.id for m in memories]
+            vector_store.shards[target].delete_many(ids)
+            vectors, metas = vector_store.shards[source].get_vectors(ids)
+            vector_store.shards[target].add_vectors(vectors, metas)
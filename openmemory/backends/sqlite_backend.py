@@ -1,25 +1,93 @@
 """SQLite backend for long-term memory"""
 
 import json
+import re
 import sqlite3
-from typing import List, Dict, Optional
+import time
+from typing import Callable, List, Dict, Optional, Sequence, Tuple
 from datetime import datetime
 
-from ..core.memory import Memory
+from ..core.memory import DEFAULT_VISIBILITY, Memory
+from ..core.metrics import metrics
+from ..extractors.entities import memory_entities, normalize_entities
+from .base import FILTER_FIELDS, RANGE_FILTERS, MemoryScan, check_filters, scan_order, scan_params
+from .compression import TextCodec, UnknownDictionaryError, train_dictionary
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Columns read into a Memory, in _row_to_memory order. Named rather than *,
+# since columns added by migrations land in a different order per file.
+_COLUMNS = (
+    "id, content, user_id, agent_id, session_id, category, importance, created_at, updated_at, metadata, visibility"
+)
+
+# Columns a vector and its metadata are built from: updating one is logged
+# by start_change_log(), so reindex re-embeds the memory
+_LOGGED_COLUMNS = "content, user_id, agent_id, session_id, category, created_at, visibility"
 
 
 class SQLiteBackend:
-    """SQLite backend for persistent memory storage"""
+    """
+    SQLite backend for persistent memory storage
+    
+    With `compress`, content and metadata are stored deflated against a
+    dictionary trained from the store's own rows (see compression.py).
+    The first dictionary is trained once TRAIN_MIN_ROWS memories exist;
+    train_dictionary() and recompress() retrain and rewrite older rows.
+    Reads decode either form, whatever `compress` is set to. Metadata
+    stays plain JSON when metadata keys are indexed (generated columns
+    need SQLite's own JSON functions to read it).
+    """
+    
+    MAX_BATCH_QUERIES = 150
+    DELETE_CHUNK_SIZE = 500
+    ID_CHUNK_SIZE = 500  # IDs per IN (...) list, under SQLite's 999 bound-parameter limit
+    DELETE_CHUNK_PAUSE = 0.005  # seconds between delete chunks, so other writers get the lock
+    TRAIN_MIN_ROWS = 1000  # rows before the first compression dictionary is trained
+    TRAIN_SAMPLES = 5000  # most recent rows a dictionary is trained on
     
-    def __init__(self, db_path: str):
+    def __init__(
+        self,
+        db_path: str,
+        busy_timeout: float = 30.0,
+        indexed_metadata_keys: Sequence[str] = (),
+        compress: bool = False
+    ):
         self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.compress = compress
+        self.codec = TextCodec()
+        self._compressed = compress  # rows may hold BLOBs, so SQL must decode before matching text
+        self._compress_metadata = compress and not indexed_metadata_keys
+        self._rows_seen = 0  # toward TRAIN_MIN_ROWS while no dictionary is trained
+        
+        for key in indexed_metadata_keys:
+            if not _IDENTIFIER.match(key):
+                raise ValueError(f"Cannot index metadata key {key!r}")
+        self.indexed_metadata_keys = tuple(indexed_metadata_keys)
+        
         self._init_db()
     
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection that waits on other processes' write locks instead of failing"""
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout)
+        if self._compressed:
+            conn.create_function("ocm_text", 1, self._text, deterministic=True)
+        return conn
+    
     def _init_db(self):
         """Initialize database schema"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
+        # Freed pages go to a freelist that reclaim() returns to the OS in
+        # bounded steps. Only takes effect on a new file; vacuum() converts
+        # an existing one.
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        
+        # WAL lets readers in other processes proceed while one process writes
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS memories (
                 id TEXT PRIMARY KEY,
@@ -35,27 +103,354 @@ class SQLiteBackend:
             )
         """)
         
+        # Columns added after the initial schema
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(memories)")}
+        if "decayed_at" not in columns:
+            self._add_column(cursor, "decayed_at TEXT")
+        if "visibility" not in columns:
+            self._add_column(cursor, f"visibility TEXT NOT NULL DEFAULT '{DEFAULT_VISIBILITY}'")
+        
+        # json_extract in generated columns cannot read compressed metadata
+        if any(c.startswith("meta_") for c in columns):
+            self._compress_metadata = False
+        
+        # Promote selected metadata keys to indexed generated columns (JSON1)
+        for key in self.indexed_metadata_keys:
+            if f"meta_{key}" not in columns:
+                self._add_column(
+                    cursor, f"meta_{key} GENERATED ALWAYS AS (json_extract(metadata, '$.{key}')) VIRTUAL"
+                )
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_meta_{key} ON memories(user_id, meta_{key})")
+        
+        # Cold storage for compacted memories
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS memories_archive (
+                id TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                user_id TEXT,
+                agent_id TEXT,
+                session_id TEXT,
+                category TEXT,
+                importance REAL,
+                created_at TEXT,
+                updated_at TEXT,
+                metadata TEXT,
+                archived_at TEXT
+            )
+        """)
+        archive_columns = {row[1] for row in cursor.execute("PRAGMA table_info(memories_archive)")}
+        if "visibility" not in archive_columns:
+            self._add_column(cursor, f"visibility TEXT NOT NULL DEFAULT '{DEFAULT_VISIBILITY}'", "memories_archive")
+        
+        # Entity inverted index: one posting per (entity, memory), maintained on
+        # write; the trigger drops postings on every delete path (incl. archive)
+        backfill = not cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memory_entities'"
+        ).fetchone()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS memory_entities (
+                entity TEXT NOT NULL,
+                user_id TEXT,
+                memory_id TEXT NOT NULL
+            )
+        """)
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_entity_memory ON memory_entities(memory_id, entity)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_entity_user ON memory_entities(entity, user_id)")
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS memories_drop_entities AFTER DELETE ON memories
+            BEGIN
+                DELETE FROM memory_entities WHERE memory_id = old.id;
+            END
+        """)
+        
+        # Memories per user, kept by triggers so compaction finds the users over
+        # capacity without counting the table. Rows are written with INSERT or
+        # INSERT OR REPLACE; the BEFORE trigger takes back the row a REPLACE
+        # overwrites, since REPLACE does not fire delete triggers.
+        count_backfill = not cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memory_user_counts'"
+        ).fetchone()
+        cursor.execute("CREATE TABLE IF NOT EXISTS memory_user_counts (user_id TEXT, count INTEGER NOT NULL)")
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_user_counts_user ON memory_user_counts(user_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_counts_count ON memory_user_counts(count)")
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS memories_count_replace BEFORE INSERT ON memories
+            WHEN EXISTS (SELECT 1 FROM memories WHERE id = new.id)
+            BEGIN
+                UPDATE memory_user_counts SET count = count - 1
+                WHERE user_id IS (SELECT user_id FROM memories WHERE id = new.id);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS memories_count_insert AFTER INSERT ON memories
+            BEGIN
+                INSERT INTO memory_user_counts (user_id, count) SELECT new.user_id, 0
+                WHERE NOT EXISTS (SELECT 1 FROM memory_user_counts WHERE user_id IS new.user_id);
+                UPDATE memory_user_counts SET count = count + 1 WHERE user_id IS new.user_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS memories_count_delete AFTER DELETE ON memories
+            BEGIN
+                UPDATE memory_user_counts SET count = count - 1 WHERE user_id IS old.user_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS memories_count_move AFTER UPDATE OF user_id ON memories
+            WHEN old.user_id IS NOT new.user_id
+            BEGIN
+                UPDATE memory_user_counts SET count = count - 1 WHERE user_id IS old.user_id;
+                INSERT INTO memory_user_counts (user_id, count) SELECT new.user_id, 0
+                WHERE NOT EXISTS (SELECT 1 FROM memory_user_counts WHERE user_id IS new.user_id);
+                UPDATE memory_user_counts SET count = count + 1 WHERE user_id IS new.user_id;
+            END
+        """)
+        if count_backfill:
+            # Recount in one transaction, so it is right even if another
+            # process created the table (or wrote through the triggers) first
+            cursor.execute("DELETE FROM memory_user_counts")
+            cursor.execute("""
+                INSERT INTO memory_user_counts (user_id, count)
+                SELECT user_id, COUNT(*) FROM memories GROUP BY user_id
+            """)
+            conn.commit()
+        
+        # Compression dictionaries, referenced by ID from compressed values.
+        # Row 0 (no dictionary) marks a store that has used compression.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS compression_dicts (
+                id INTEGER PRIMARY KEY,
+                dict BLOB NOT NULL,
+                created_at TEXT
+            )
+        """)
+        if self.compress:
+            cursor.execute(
+                "INSERT OR IGNORE INTO compression_dicts (id, dict, created_at) VALUES (0, ?, ?)",
+                (b"", datetime.now().isoformat())
+            )
+        self._load_dictionaries(cursor)
+        
+        if backfill:
+            self._index_entities(cursor, cursor.execute("SELECT id, user_id, content, metadata FROM memories"))
+        
         # Create indexes
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_user ON memories(user_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_agent ON memories(agent_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_category ON memories(category)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_session ON memories(session_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_created ON memories(created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_importance ON memories(user_id, importance)")
+        # Keyset scans (iter_memories) page through these
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_created ON memories(user_id, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_updated ON memories(user_id, updated_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_updated ON memories(updated_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_importance ON memories(importance)")
+        # Scoped reads: an agent's private memories, then a user's shared ones
+        # and everybody's global ones, each newest first
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_user_agent ON memories(user_id, agent_id, visibility, updated_at)"
+        )
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_visibility_user ON memories(visibility, user_id, updated_at)")
+        
+        if self.compress and not self.codec.current:
+            self._rows_seen = cursor.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
         
         conn.commit()
         conn.close()
+        self._maybe_train()
+    
+    def _add_column(self, cursor, definition: str, table: str = "memories"):
+        """Add a column, tolerating another process having just added it"""
+        try:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+        except sqlite3.OperationalError as e:
+            if "duplicate column" not in str(e):
+                raise
+    
+    def _load_dictionaries(self, cursor=None):
+        """Load compression dictionaries this process has not seen yet"""
+        conn = None
+        if cursor is None:
+            conn = self._connect()
+            cursor = conn.cursor()
+        rows = cursor.execute(
+            "SELECT id, dict FROM compression_dicts WHERE id >= ? ORDER BY id", (self.codec.current,)
+        ).fetchall()
+        if conn:
+            conn.close()
+        
+        for dict_id, data in rows:
+            if dict_id not in self.codec.dictionaries:
+                self.codec.add_dictionary(dict_id, data)
+        if rows and not self._compressed:
+            self._compressed = True
+    
+    def _text(self, value):
+        """Stored content or metadata as text (decompressed if it is a BLOB)"""
+        try:
+            return self.codec.decompress(value)
+        except UnknownDictionaryError:
+            # Trained by another process after this one loaded its dictionaries
+            self._load_dictionaries()
+            return self.codec.decompress(value)
+    
+    def _column(self, name: str) -> str:
+        """SQL for the text of `name` (content or metadata) in a WHERE clause"""
+        return f"ocm_text({name})" if self._compressed else name
+    
+    def _pack(self, content: str, metadata: Optional[str]) -> Tuple:
+        """(content, metadata JSON) as stored"""
+        if not self.compress:
+            return content, metadata
+        if self._compress_metadata:
+            metadata = self.codec.compress(metadata)
+        return self.codec.compress(content), metadata
     
+    def _maybe_train(self, added: int = 0):
+        """Train the first dictionary once the store has enough rows to sample"""
+        if not self.compress or self.codec.current:
+            return
+        self._rows_seen += added
+        if self._rows_seen >= self.TRAIN_MIN_ROWS:
+            self.train_dictionary()
+    
+    @metrics.timed("sqlite.train_dictionary")
+    def train_dictionary(self, samples: int = None) -> int:
+        """
+        Train a compression dictionary on the most recent rows
+        
+        New writes use it; existing rows keep theirs until recompress().
+        
+        Returns:
+            The new dictionary's ID
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        rows = cursor.execute(
+            "SELECT content, metadata FROM memories ORDER BY rowid DESC LIMIT ?",
+            (samples or self.TRAIN_SAMPLES,)
+        ).fetchall()
+        texts = [self._text(content) for content, _ in rows]
+        if self._compress_metadata:
+            texts += [self._text(metadata) for _, metadata in rows if metadata]
+        data = train_dictionary(texts)
+        
+        cursor.execute("BEGIN IMMEDIATE")
+        dict_id = cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM compression_dicts").fetchone()[0]
+        cursor.execute(
+            "INSERT INTO compression_dicts (id, dict, created_at) VALUES (?, ?, ?)",
+            (dict_id, data, datetime.now().isoformat())
+        )
+        conn.commit()
+        conn.close()
+        
+        self.codec.add_dictionary(dict_id, data)
+        self._compressed = True
+        return dict_id
+    
+    @metrics.timed("sqlite.recompress")
+    def recompress(self, batch_size: int = 500, on_batch: Callable[[int], None] = None) -> Dict:
+        """
+        Rewrite every row in the current storage form
+        
+        Compresses rows written before compression was enabled or with an
+        older dictionary (or, with `compress` off, stores them plain again).
+        Walks the table in rowid order, one short transaction per
+        `batch_size` rows. Freed pages go back to the OS via reclaim().
+        
+        Returns:
+            {"rows": rows rewritten, "bytes_before", "bytes_after"} for content and metadata
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        stats = {"rows": 0, "bytes_before": 0, "bytes_after": 0}
+        after = 0
+        
+        while True:
+            rows = cursor.execute(
+                "SELECT rowid, content, metadata FROM memories WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (after, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            after = rows[-1][0]
+            
+            updates = []
+            for rowid, content, metadata in rows:
+                packed = self._pack(self._text(content), self._text(metadata))
+                stats["bytes_before"] += _stored_size(content) + _stored_size(metadata)
+                stats["bytes_after"] += _stored_size(packed[0]) + _stored_size(packed[1])
+                if packed != (content, metadata):
+                    updates.append(packed + (rowid,))
+            
+            if updates:
+                cursor.executemany("UPDATE memories SET content = ?, metadata = ? WHERE rowid = ?", updates)
+                conn.commit()
+                stats["rows"] += len(updates)
+            if on_batch:
+                on_batch(len(rows))
+        
+        conn.close()
+        return stats
+    
+    def _index_entities(self, cursor, rows):
+        """
+        (Re)build postings for (id, user_id, content, metadata JSON) rows
+        
+        Old postings of each row are dropped first: INSERT OR REPLACE does not
+        fire the delete trigger.
+        """
+        postings = []
+        ids = []
+        for memory_id, user_id, content, metadata in rows:
+            content = self._text(content)
+            if isinstance(metadata, (str, bytes)):
+                metadata = json.loads(self._text(metadata)) if metadata else {}
+            ids.append((memory_id,))
+            postings.extend((entity, user_id, memory_id) for entity in memory_entities(content, metadata))
+        
+        cursor.executemany("DELETE FROM memory_entities WHERE memory_id = ?", ids)
+        cursor.executemany(
+            "INSERT OR IGNORE INTO memory_entities (entity, user_id, memory_id) VALUES (?, ?, ?)", postings
+        )
+    
+    @metrics.timed("sqlite.index_entities")
+    def index_entities(self, memory_ids: List[str] = None):
+        """Rebuild entity postings for some memories (all when `memory_ids` is None)"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        if memory_ids is None:
+            rows = cursor.execute("SELECT id, user_id, content, metadata FROM memories").fetchall()
+        else:
+            rows = []
+            for start in range(0, len(memory_ids), self.ID_CHUNK_SIZE):
+                chunk = memory_ids[start:start + self.ID_CHUNK_SIZE]
+                rows += cursor.execute(
+                    f"SELECT id, user_id, content, metadata FROM memories WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+        self._index_entities(cursor, rows)
+        
+        conn.commit()
+        conn.close()
+    
+    @metrics.timed("sqlite.add")
     def add(self, memory: Memory):
         """Add a memory"""
-        conn = sqlite3.connect(self.db_path)
+        content, metadata = self._pack(memory.content, json.dumps(memory.metadata))
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
             INSERT OR REPLACE INTO memories 
-            (id, content, user_id, agent_id, session_id, category, importance, created_at, updated_at, metadata)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            (id, content, user_id, agent_id, session_id, category, importance, created_at, updated_at, metadata,
+             visibility)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             memory.id,
-            memory.content,
+            content,
             memory.user_id,
             memory.agent_id,
             memory.session_id,
@@ -63,28 +458,88 @@ class SQLiteBackend:
             memory.importance,
             memory.created_at,
             memory.updated_at,
-            json.dumps(memory.metadata)
+            metadata,
+            memory.visibility
         ))
+        self._index_entities(cursor, [(memory.id, memory.user_id, memory.content, memory.metadata)])
         
         conn.commit()
         conn.close()
+        self._maybe_train(1)
     
+    @metrics.timed("sqlite.add_many")
+    def add_many(self, memories: List[Memory]):
+        """Add memories in a single transaction"""
+        if not memories:
+            return
+        
+        packed = [self._pack(m.content, json.dumps(m.metadata)) for m in memories]
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.executemany("""
+            INSERT OR REPLACE INTO memories 
+            (id, content, user_id, agent_id, session_id, category, importance, created_at, updated_at, metadata,
+             visibility)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(
+            m.id,
+            content,
+            m.user_id,
+            m.agent_id,
+            m.session_id,
+            m.category,
+            m.importance,
+            m.created_at,
+            m.updated_at,
+            metadata,
+            m.visibility
+        ) for m, (content, metadata) in zip(memories, packed)])
+        self._index_entities(cursor, [(m.id, m.user_id, m.content, m.metadata) for m in memories])
+        
+        conn.commit()
+        conn.close()
+        self._maybe_train(len(memories))
+    
+    @metrics.timed("sqlite.get")
     def get(self, memory_id: str) -> Optional[Memory]:
         """Get memory by ID"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT * FROM memories WHERE id = ?", (memory_id,))
+        cursor.execute(f"SELECT {_COLUMNS} FROM memories WHERE id = ?", (memory_id,))
         row = cursor.fetchone()
         conn.close()
         
         if row:
-            return self._row_to_memory(row)
+            return self._decode([row], self._row_to_memory)[0]
         return None
     
+    @metrics.timed("sqlite.get_many")
+    def get_many(self, memory_ids: List[str]) -> List[Optional[Memory]]:
+        """Get memories by ID, one query per ID_CHUNK_SIZE IDs, None for missing IDs"""
+        if not memory_ids:
+            return []
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        ids = list(memory_ids)
+        rows = []
+        for start in range(0, len(ids), self.ID_CHUNK_SIZE):
+            chunk = ids[start:start + self.ID_CHUNK_SIZE]
+            cursor.execute(f"SELECT {_COLUMNS} FROM memories WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            rows += cursor.fetchall()
+        conn.close()
+        
+        found = {m.id: m for m in self._decode(rows, self._row_to_memory)}
+        return [found.get(memory_id) for memory_id in memory_ids]
+    
+    @metrics.timed("sqlite.update")
     def update(self, memory: Memory):
         """Update a memory"""
-        conn = sqlite3.connect(self.db_path)
+        content, metadata = self._pack(memory.content, json.dumps(memory.metadata))
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -92,19 +547,23 @@ class SQLiteBackend:
             SET content = ?, importance = ?, updated_at = ?, metadata = ?
             WHERE id = ?
         """, (
-            memory.content,
+            content,
             memory.importance,
             memory.updated_at,
-            json.dumps(memory.metadata),
+            metadata,
             memory.id
         ))
+        if cursor.rowcount:
+            user_id = cursor.execute("SELECT user_id FROM memories WHERE id = ?", (memory.id,)).fetchone()[0]
+            self._index_entities(cursor, [(memory.id, user_id, memory.content, memory.metadata)])
         
         conn.commit()
         conn.close()
     
+    @metrics.timed("sqlite.delete")
     def delete(self, memory_id: str) -> int:
         """Delete memory by ID"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("DELETE FROM memories WHERE id = ?", (memory_id,))
@@ -115,40 +574,378 @@ class SQLiteBackend:
         
         return deleted
     
-    def delete_by_filters(self, filters: Dict) -> int:
-        """Delete memories matching filters"""
-        conn = sqlite3.connect(self.db_path)
+    @metrics.timed("sqlite.delete_by_filters")
+    def delete_by_filters(
+        self,
+        filters: Dict,
+        chunk_size: int = None,
+        on_chunk: Callable[[List[str]], None] = None
+    ) -> int:
+        """
+        Delete memories matching filters in bounded chunks
+        
+        Each chunk of at most `chunk_size` rows is its own short write
+        transaction, and the lock is released for DELETE_CHUNK_PAUSE between
+        chunks, so purging a large tenant never blocks other writers for
+        long. `on_chunk` gets the IDs of every committed chunk (to drop them
+        from the vector store). Only indexed columns may be filtered on; an
+        empty filter deletes everything.
+        """
+        self._check_delete_filters(filters)
+        conditions, values = self._filter_conditions(filters)
+        where_clause = " AND ".join(conditions) if conditions else "1=1"
+        chunk_size = chunk_size or self.DELETE_CHUNK_SIZE
+        
+        conn = self._connect()
+        conn.isolation_level = None
+        cursor = conn.cursor()
+        deleted = 0
+        
+        try:
+            while True:
+                # IMMEDIATE takes the write lock up front, so the chunk selected
+                # is the chunk deleted
+                cursor.execute("BEGIN IMMEDIATE")
+                rows = cursor.execute(
+                    f"SELECT rowid, id FROM memories WHERE {where_clause} LIMIT ?", values + [chunk_size]
+                ).fetchall()
+                if rows:
+                    cursor.execute(
+                        f"DELETE FROM memories WHERE rowid IN ({','.join('?' * len(rows))})", [r[0] for r in rows]
+                    )
+                cursor.execute("COMMIT")
+                if not rows:
+                    break
+                
+                deleted += len(rows)
+                metrics.incr("sqlite.delete_chunks")
+                if on_chunk:
+                    on_chunk([r[1] for r in rows])
+                if len(rows) < chunk_size:
+                    break
+                time.sleep(self.DELETE_CHUNK_PAUSE)
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.close()
+        
+        return deleted
+    
+    def _check_delete_filters(self, filters: Dict):
+        """Bulk deletes may only filter on indexed columns, so each chunk is an index lookup"""
+        for key in filters:
+            if key in FILTER_FIELDS or key in RANGE_FILTERS or key in ("ids", "entities"):
+                continue
+            if key.startswith("metadata.") and key[len("metadata."):] in self.indexed_metadata_keys:
+                continue
+            raise ValueError(f"Cannot delete by {key!r}: not an indexed filter")
+    
+    @metrics.timed("sqlite.delete_many")
+    def delete_many(self, memory_ids: List[str]) -> int:
+        """Delete memories by ID in a single transaction"""
+        if not memory_ids:
+            return 0
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.executemany("DELETE FROM memories WHERE id = ?", [(i,) for i in memory_ids])
+        deleted = cursor.rowcount
+        
+        conn.commit()
+        conn.close()
+        
+        return deleted
+    
+    @metrics.timed("sqlite.archive")
+    def archive(self, memory_ids: List[str]) -> int:
+        """Move memories into the cold archive table (one transaction, ID_CHUNK_SIZE IDs per statement)"""
+        if not memory_ids:
+            return 0
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        archived_at = datetime.now().isoformat()
+        ids = list(memory_ids)
+        archived = 0
+        for start in range(0, len(ids), self.ID_CHUNK_SIZE):
+            chunk = ids[start:start + self.ID_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(f"""
+                INSERT OR REPLACE INTO memories_archive
+                (id, content, user_id, agent_id, session_id, category, importance, created_at, updated_at, metadata,
+                 visibility, archived_at)
+                SELECT id, content, user_id, agent_id, session_id, category, importance, created_at, updated_at,
+                       metadata, visibility, ?
+                FROM memories WHERE id IN ({placeholders})
+            """, [archived_at] + chunk)
+            cursor.execute(f"DELETE FROM memories WHERE id IN ({placeholders})", chunk)
+            archived += cursor.rowcount
+        
+        conn.commit()
+        conn.close()
+        
+        return archived
+    
+    @metrics.timed("sqlite.reclaim")
+    def reclaim(self, max_pages: int = 1000) -> int:
+        """
+        Return up to `max_pages` free pages to the filesystem
+        
+        A bounded incremental vacuum: one short write transaction that
+        truncates the file by pages freed by earlier deletes. Returns the
+        number of pages reclaimed (0 unless the file uses incremental
+        auto_vacuum, see vacuum()).
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        before = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        if before:
+            # executescript steps the pragma to completion; execute() frees one page
+            conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+        after = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        
+        conn.commit()
+        conn.close()
+        
+        return before - after
+    
+    @metrics.timed("sqlite.vacuum")
+    def vacuum(self) -> Dict:
+        """
+        Rebuild the file, switching it to incremental auto_vacuum
+        
+        Files created before incremental auto_vacuum was the default need
+        this once for reclaim() to work. Takes an exclusive lock for the
+        whole rebuild, so run it off-peak.
+        """
+        conn = self._connect()
+        conn.isolation_level = None
+        cursor = conn.cursor()
+        
+        before = cursor.execute("PRAGMA page_count").fetchone()[0]
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute("VACUUM")
+        after = cursor.execute("PRAGMA page_count").fetchone()[0]
+        page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+        conn.close()
+        
+        return {"pages_before": before, "pages_after": after, "bytes_freed": max(0, before - after) * page_size}
+    
+    def start_change_log(self):
+        """
+        Log the ID of every memory added, deleted or changed from now on
+        
+        A trigger-kept memory_write_log gets one row per write in commit order
+        (writes are serialized), so changes_since() finds every write however
+        old its timestamps are. Importance-only updates (decay) are not logged.
+        Starting again discards an older log; stop_change_log() drops it.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        self._drop_change_log(cursor)
+        cursor.execute("""
+            CREATE TABLE memory_write_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL
+            )
+        """)
+        for name, event, row in (
+            ("insert", "INSERT", "new"),
+            ("update", f"UPDATE OF {_LOGGED_COLUMNS}", "new"),
+            ("delete", "DELETE", "old")
+        ):
+            cursor.execute(f"""
+                CREATE TRIGGER memories_write_log_{name} AFTER {event} ON memories
+                BEGIN
+                    INSERT INTO memory_write_log (id) VALUES ({row}.id);
+                END
+            """)
+        
+        conn.commit()
+        conn.close()
+    
+    @metrics.timed("sqlite.changes_since")
+    def changes_since(self, after: int = 0, limit: int = 1000) -> List[Tuple[int, str]]:
+        """(seq, memory ID) rows of the change log following `after`"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT seq, id FROM memory_write_log WHERE seq > ? ORDER BY seq LIMIT ?", (after, limit))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return rows
+    
+    def stop_change_log(self):
+        """Drop the change log and its triggers"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        self._drop_change_log(cursor)
+        conn.commit()
+        conn.close()
+    
+    def _drop_change_log(self, cursor):
+        for name in ("insert", "update", "delete"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS memories_write_log_{name}")
+        cursor.execute("DROP TABLE IF EXISTS memory_write_log")
+    
+    @metrics.timed("sqlite.scan_importance")
+    def scan_importance(self, after_rowid: int = 0, limit: int = 500) -> List[Tuple]:
+        """
+        Read a batch of (rowid, id, importance, updated_at, decayed_at) rows
+        
+        Rows are returned in rowid order starting after `after_rowid`, so
+        callers can walk the whole table incrementally.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT rowid, id, importance, updated_at, decayed_at FROM memories
+            WHERE rowid > ?
+            ORDER BY rowid
+            LIMIT ?
+        """, (after_rowid, limit))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return rows
+    
+    @metrics.timed("sqlite.set_importance")
+    def set_importance(self, updates: List[Tuple[str, float, str]]):
+        """Bulk update (id, importance, decayed_at) without touching updated_at"""
+        if not updates:
+            return
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.executemany(
+            "UPDATE memories SET importance = ?, decayed_at = ? WHERE id = ?",
+            [(importance, decayed_at, memory_id) for memory_id, importance, decayed_at in updates]
+        )
+        
+        conn.commit()
+        conn.close()
+    
+    @metrics.timed("sqlite.count_by_user")
+    def count_by_user(self, min_count: int = 0) -> Dict[str, int]:
+        """
+        Count memories per user, keeping users with more than `min_count`
+        
+        Reads the trigger-kept memory_user_counts table, so the cost follows
+        the number of users returned rather than the number of memories.
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT user_id, count FROM memory_user_counts WHERE count > ?", (min_count,))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return {user_id: count for user_id, count in rows}
+    
+    @metrics.timed("sqlite.get_lowest_importance")
+    def get_lowest_importance(self, user_id: Optional[str], limit: int = 10) -> List[Memory]:
+        """Get the least important (then oldest) memories of a user"""
+        conn = self._connect()
         cursor = conn.cursor()
         
+        cursor.execute(f"""
+            SELECT {_COLUMNS} FROM memories
+            WHERE user_id IS ?
+            ORDER BY importance ASC, updated_at ASC
+            LIMIT ?
+        """, (user_id, limit))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return self._decode(rows, self._row_to_memory)
+    
+    def _filter_conditions(self, filters: Optional[Dict]) -> Tuple[List[str], List]:
+        """
+        Translate filters into WHERE conditions
+        
+        Metadata keys listed in `indexed_metadata_keys` use their indexed
+        generated column; other metadata keys fall back to json_extract.
+        """
+        check_filters(filters)
         conditions = []
         values = []
         
-        for key, value in filters.items():
-            conditions.append(f"{key} = ?")
+        for key, value in (filters or {}).items():
+            if key in FILTER_FIELDS:
+                conditions.append(f"{key} IS ?")
+            elif key in RANGE_FILTERS:
+                conditions.append(f"created_at {RANGE_FILTERS[key]} ?")
+            elif key == "ids":
+                ids = list(value)
+                conditions.append(f"id IN ({','.join('?' * len(ids))})" if ids else "0")
+                values.extend(ids)
+                continue
+            elif key == "entities":
+                entities = normalize_entities(value)
+                conditions.append(
+                    f"id IN (SELECT memory_id FROM memory_entities WHERE entity IN ({','.join('?' * len(entities))}))"
+                    if entities else "0"
+                )
+                values.extend(entities)
+                continue
+            else:
+                name = key[len("metadata."):]
+                if name in self.indexed_metadata_keys:
+                    conditions.append(f"meta_{name} IS ?")
+                else:
+                    conditions.append(f"json_extract({self._column('metadata')}, ?) IS ?")
+                    values.append(f'$."{name}"')
             values.append(value)
         
+        return conditions, values
+    
+    @metrics.timed("sqlite.filter_ids")
+    def filter_ids(self, filters: Dict, limit: int = None) -> List[str]:
+        """IDs of memories matching `filters`, most important first"""
+        conditions, values = self._filter_conditions(filters)
         where_clause = " AND ".join(conditions) if conditions else "1=1"
         
-        cursor.execute(f"DELETE FROM memories WHERE {where_clause}", values)
-        deleted = cursor.rowcount
+        conn = self._connect()
+        cursor = conn.cursor()
         
-        conn.commit()
+        cursor.execute(f"""
+            SELECT id FROM memories
+            WHERE {where_clause}
+            ORDER BY importance DESC, updated_at DESC
+            LIMIT ?
+        """, values + [-1 if limit is None else limit])
+        
+        rows = cursor.fetchall()
         conn.close()
         
-        return deleted
+        return [row[0] for row in rows]
     
+    @metrics.timed("sqlite.search")
     def search(
         self,
         query: str,
         user_id: str = None,
         category: str = None,
-        limit: int = 10
+        limit: int = 10,
+        filters: Dict = None
     ) -> List[Dict]:
         """Search memories by keyword"""
-        conn = sqlite3.connect(self.db_path)
+        extra_conditions, extra_values = self._filter_conditions(filters)
+        
+        conn = self._connect()
         cursor = conn.cursor()
         
-        conditions = ["content LIKE ?"]
+        conditions = [f"{self._column('content')} LIKE ?"]
         values = [f"%{query}%"]
         
         if user_id:
@@ -159,10 +956,13 @@ class SQLiteBackend:
             conditions.append("category = ?")
             values.append(category)
         
+        conditions += extra_conditions
+        values += extra_values
+        
         where_clause = " AND ".join(conditions)
         
         cursor.execute(f"""
-            SELECT * FROM memories 
+            SELECT {_COLUMNS} FROM memories 
             WHERE {where_clause}
             ORDER BY importance DESC, updated_at DESC
             LIMIT ?
@@ -171,66 +971,257 @@ class SQLiteBackend:
         rows = cursor.fetchall()
         conn.close()
         
-        return [self._row_to_dict(row) for row in rows]
+        return self._decode(rows, self._row_to_dict)
     
+    @metrics.timed("sqlite.search_many")
+    def search_many(
+        self,
+        queries: List[str],
+        user_id: str = None,
+        category: str = None,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[List[Dict]]:
+        """Keyword search for several queries in one statement, one result list per query"""
+        if not queries:
+            return []
+        
+        conditions = [f"{self._column('content')} LIKE ?"]
+        values = []
+        
+        if user_id:
+            conditions.append("user_id = ?")
+            values.append(user_id)
+        
+        if category:
+            conditions.append("category = ?")
+            values.append(category)
+        
+        extra_conditions, extra_values = self._filter_conditions(filters)
+        conditions += extra_conditions
+        values += extra_values
+        
+        # One top-N subquery per query, combined into a single statement
+        select = f"""
+            SELECT * FROM (
+                SELECT ?, {_COLUMNS} FROM memories
+                WHERE {" AND ".join(conditions)}
+                ORDER BY importance DESC, updated_at DESC
+                LIMIT ?
+            )
+        """
+        results = [[] for _ in queries]
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        # Stay under SQLite's compound-select and bound-parameter limits
+        batch = max(1, min(self.MAX_BATCH_QUERIES, 900 // (3 + len(values))))
+        for start in range(0, len(queries), batch):
+            chunk = queries[start:start + batch]
+            params = [
+                v for i, query in enumerate(chunk, start)
+                for v in [i, f"%{query}%"] + values + [limit]
+            ]
+            cursor.execute(" UNION ALL ".join([select] * len(chunk)), params)
+            
+            for row in cursor.fetchall():
+                results[row[0]].append(row[1:])
+        
+        conn.close()
+        
+        return [self._decode(rows, self._row_to_dict) for rows in results]
+    
+    @metrics.timed("sqlite.get_recent")
     def get_recent(
         self,
-        user_id: str,
+        user_id: Optional[str],
         session_id: str = None,
-        limit: int = 20
+        limit: int = 20,
+        filters: Dict = None
     ) -> List[Memory]:
         """Get recent memories"""
-        conn = sqlite3.connect(self.db_path)
+        conditions, values = self._filter_conditions(filters)
+        if user_id:
+            conditions.append("user_id = ?")
+            values.append(user_id)
+        if session_id:
+            conditions.append("(session_id = ? OR session_id IS NULL)")
+            values.append(session_id)
+        where_clause = " AND ".join(conditions) if conditions else "1=1"
+        
+        conn = self._connect()
         cursor = conn.cursor()
         
-        if session_id:
-            cursor.execute("""
-                SELECT * FROM memories 
-                WHERE user_id = ? AND (session_id = ? OR session_id IS NULL)
-                ORDER BY updated_at DESC
-                LIMIT ?
-            """, (user_id, session_id, limit))
+        cursor.execute(f"""
+            SELECT {_COLUMNS} FROM memories 
+            WHERE {where_clause}
+            ORDER BY updated_at DESC
+            LIMIT ?
+        """, values + [limit])
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return self._decode(rows, self._row_to_memory)
+    
+    def iter_memories(
+        self,
+        user_id: str = None,
+        filters: Dict = None,
+        order: str = "created_at",
+        batch_size: int = 500,
+        cursor: str = None
+    ) -> MemoryScan:
+        """
+        Stream memories in `order`, `batch_size` rows per query
+        
+        Pages are keyset reads on (order column, rowid), so page N costs the
+        same as page 1 and memory use does not grow with the store. Resume
+        an interrupted walk with the scan's `cursor`.
+        """
+        params, after = scan_params(user_id, filters, order, cursor)
+        field, descending = scan_order(params["order"])
+        scope = dict(params["filters"])
+        if params["user_id"] is not None:
+            scope["user_id"] = params["user_id"]
+        conditions, values = self._filter_conditions(scope)
+        direction, compare = ("DESC", "<") if descending else ("ASC", ">")
+        
+        def fetch(after, limit: int):
+            where, args = list(conditions), list(values)
+            if after is not None:
+                where.append(f"({field}, rowid) {compare} (?, ?)")
+                args.extend(after)
+            
+            conn = self._connect()
+            with metrics.span("sqlite.scan_page"):
+                rows = conn.execute(f"""
+                    SELECT rowid, {_COLUMNS} FROM memories
+                    WHERE {" AND ".join(where) or "1=1"}
+                    ORDER BY {field} {direction}, rowid {direction}
+                    LIMIT ?
+                """, args + [limit]).fetchall()
+            conn.close()
+            
+            memories = self._decode([row[1:] for row in rows], self._row_to_memory)
+            return [([getattr(m, field), row[0]], m) for row, m in zip(rows, memories)]
+        
+        return MemoryScan(fetch, params, batch_size, after)
+    
+    @metrics.timed("sqlite.get_by_user")
+    def get_by_user(self, user_id: Optional[str], updated_since: str = None) -> List[Memory]:
+        """Get every memory of a user, optionally only those updated after a timestamp"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        if updated_since:
+            cursor.execute(
+                f"SELECT {_COLUMNS} FROM memories WHERE user_id IS ? AND updated_at > ?",
+                (user_id, updated_since)
+            )
         else:
-            cursor.execute("""
-                SELECT * FROM memories 
-                WHERE user_id = ?
-                ORDER BY updated_at DESC
-                LIMIT ?
-            """, (user_id, limit))
+            cursor.execute(f"SELECT {_COLUMNS} FROM memories WHERE user_id IS ?", (user_id,))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return self._decode(rows, self._row_to_memory)
+    
+    @metrics.timed("sqlite.list_users")
+    def list_users(self) -> List[Optional[str]]:
+        """List distinct user IDs"""
+        conn = self._connect()
+        cursor = conn.cursor()
         
+        cursor.execute("SELECT DISTINCT user_id FROM memories")
         rows = cursor.fetchall()
         conn.close()
         
-        return [self._row_to_memory(row) for row in rows]
+        return [row[0] for row in rows]
     
+    @metrics.timed("sqlite.get_by_category")
     def get_by_category(
         self,
-        user_id: str,
+        user_id: Optional[str],
         category: str,
         min_importance: float = 0.0,
-        limit: int = 10
+        limit: int = 10,
+        filters: Dict = None
     ) -> List[Memory]:
         """Get memories by category"""
-        conn = sqlite3.connect(self.db_path)
+        conditions, values = self._filter_conditions(filters)
+        if user_id:
+            conditions.append("user_id = ?")
+            values.append(user_id)
+        
+        conn = self._connect()
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT * FROM memories 
-            WHERE user_id = ? AND category = ? AND importance >= ?
+        cursor.execute(f"""
+            SELECT {_COLUMNS} FROM memories 
+            WHERE {" AND ".join(conditions + ["category = ?", "importance >= ?"])}
             ORDER BY importance DESC, updated_at DESC
             LIMIT ?
-        """, (user_id, category, min_importance, limit))
+        """, values + [category, min_importance, limit])
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return self._decode(rows, self._row_to_memory)
+    
+    @metrics.timed("sqlite.get_by_entity")
+    def get_by_entity(
+        self,
+        entities: List[str],
+        user_id: str = None,
+        limit: int = 10,
+        filters: Dict = None
+    ) -> List[Memory]:
+        """Memories mentioning any of `entities`, most matching entities first"""
+        entities = normalize_entities(entities)
+        if not entities:
+            return []
+        
+        postings = [f"entity IN ({','.join('?' * len(entities))})"]
+        values = list(entities)
+        if user_id:
+            postings.append("user_id = ?")
+            values.append(user_id)
+        conditions, extra_values = self._filter_conditions(filters)
+        where_clause = " AND ".join(conditions) if conditions else "1=1"
+        
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute(f"""
+            SELECT {_COLUMNS} FROM memories m
+            JOIN (
+                SELECT memory_id, COUNT(*) AS hits FROM memory_entities
+                WHERE {" AND ".join(postings)}
+                GROUP BY memory_id
+            ) e ON m.id = e.memory_id
+            WHERE {where_clause}
+            ORDER BY e.hits DESC, m.importance DESC, m.updated_at DESC
+            LIMIT ?
+        """, values + extra_values + [limit])
         
         rows = cursor.fetchall()
         conn.close()
         
-        return [self._row_to_memory(row) for row in rows]
+        return self._decode(rows, self._row_to_memory)
+    
+    def _decode(self, rows: List, convert) -> List:
+        """Convert fetched rows (JSON metadata decode), counted as rows returned"""
+        with metrics.span("sqlite.decode"):
+            metrics.incr("rows.returned", len(rows))
+            return [convert(row) for row in rows]
     
     def _row_to_memory(self, row) -> Memory:
         """Convert DB row to Memory object"""
         return Memory(
             id=row[0],
-            content=row[1],
+            content=self._text(row[1]),
             user_id=row[2],
             agent_id=row[3],
             session_id=row[4],
@@ -238,14 +1229,15 @@ class SQLiteBackend:
             importance=row[6],
             created_at=row[7],
             updated_at=row[8],
-            metadata=json.loads(row[9]) if row[9] else {}
+            metadata=json.loads(self._text(row[9])) if row[9] else {},
+            visibility=row[10]
         )
     
     def _row_to_dict(self, row) -> Dict:
         """Convert DB row to dict"""
         return {
             "id": row[0],
-            "content": row[1],
+            "content": self._text(row[1]),
             "user_id": row[2],
             "agent_id": row[3],
             "session_id": row[4],
@@ -253,5 +1245,12 @@ class SQLiteBackend:
             "importance": row[6],
             "created_at": row[7],
             "updated_at": row[8],
-            "metadata": json.loads(row[9]) if row[9] else {}
+            "metadata": json.loads(self._text(row[9])) if row[9] else {},
+            "visibility": row[10]
         }
+
+
+def _stored_size(value) -> int:
+    if value is None:
+        return 0
+    return len(value) if isinstance(value, bytes) else len(value.encode("utf-8"))
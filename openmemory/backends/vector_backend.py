@@ -1,9 +1,19 @@
 """Vector store backend using FAISS for semantic search"""
 
+import io
 import os
 import json
+import logging
+import threading
 import numpy as np
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
+
+from ..core.locking import FileLock, atomic_write, atomic_write_json
+from .base import DEFAULT_VISIBILITY, FILTER_FIELDS, SCOPE_FIELDS, check_filters, partition_key
+from .encoders import Encoder, EncoderSpec, embed_texts, get_encoder, simple_embedding  # noqa: F401 (re-exported)
+from ..core.metrics import metrics
+
+logger = logging.getLogger(__name__)
 
 # Try to import FAISS, fallback to simple implementation
 try:
@@ -14,107 +24,755 @@ except ImportError:
     print("Warning: FAISS not available. Using simple numpy backend.")
 
 
+class IndexMismatchError(ValueError):
+    """The index on disk was built by a different encoder or dimension than the store's"""
+
+
 class VectorBackend:
-    """Vector store for semantic memory search"""
+    """
+    Vector store for semantic memory search
+    
+    The store is a directory of immutable segments (`seg-<generation>.npy`
+    vectors plus `seg-<generation>.json` metadata) listed in `manifest.json`.
+    Writers append a segment and atomically replace the manifest under an
+    exclusive file lock, bumping its generation. Readers compare the manifest
+    on each call and load only the segments they have not seen yet; a bumped
+    epoch (segment merge) triggers a full reload. This makes one directory
+    safe to share between processes.
+    
+    Deletes do not rewrite anything: delete_many() appends a tombstone
+    file (`del-<generation>.npy`, the deleted positions) to the manifest,
+    which readers pick up like a segment and searches skip. Segment merges,
+    compact() and reclaim_deleted() drop the deleted rows for good, so a
+    large purge costs one rewrite instead of one per chunk.
+    
+    Filters (user_id, category, agent_id, session_id, visibility,
+    created_at range, ID sets) are pushed into the search: in-memory
+    postings per field value select the candidate positions, and only
+    those vectors are scored. Each scope partition (an agent's private
+    memories, a user's shared ones, the global ones; see base.SCOPE_FIELDS)
+    has a posting of its own, so a scoped search reads its partition
+    directly instead of intersecting the user, agent and visibility lists.
+    
+    Texts are embedded by `encoder` (see encoders.py), shared process-wide.
+    The manifest records the encoder name, its version and the dimension;
+    opening (or reloading) an index written by any other encoder raises
+    IndexMismatchError instead of mixing incompatible vectors. Indexes from
+    before the header was recorded are stamped with the current encoder.
+    
+    Without `store_content`, segment metadata leaves out memory content
+    and search results carry `content: None` for the caller to resolve by
+    ID from the long-term store (OpenClawMemory does), instead of every
+    memory's text being stored, and loaded, twice.
+    
+    With `index_type="binary"` the index holds 1-bit codes in memory and
+    memory-maps the float segments, which are only read to re-rank the
+    best Hamming-distance candidates.
+    """
     
-    def __init__(self, vector_path: str, dimension: int = 384):
+    def __init__(
+        self,
+        vector_path: str,
+        dimension: int = 384,
+        max_segments: int = 32,
+        index_type: str = "flat",
+        rerank_factor: int = 20,
+        encoder: Encoder = None,
+        store_content: bool = True
+    ):
+        if index_type not in ("flat", "binary"):
+            raise ValueError(f"Unknown index type {index_type!r}")
+        
         self.vector_path = vector_path
         self.dimension = dimension
+        self.encoder = encoder or get_encoder(EncoderSpec(dimension=dimension))
+        self.max_segments = max_segments
+        self.index_type = index_type
+        self.rerank_factor = rerank_factor
+        self.store_content = store_content
         self.index = None
         self.metadata = {}
         
+        # Filter pushdown: field -> value -> positions, created_at per position, ID -> position
+        self._postings: Dict[str, Dict] = {}
+        self._posting_arrays: Dict = {}
+        self._created: List[str] = []
+        self._created_array = None
+        self._positions: Dict[str, int] = {}
+        self._older: Dict[str, List[int]] = {}  # ID -> earlier live positions of an ID appended again
+        self._alive = np.ones(0, dtype=bool)  # False at tombstoned positions
+        self._deleted = 0
+        
+        self.generation = 0
+        self._epoch = None
+        self._segments = []
+        self._tombstones = []
+        self._manifest_stat = None
+        self._mutex = threading.RLock()
+        
+        os.makedirs(vector_path, exist_ok=True)
+        self._lock = FileLock(os.path.join(vector_path, ".lock"))
+        self._manifest_file = os.path.join(vector_path, "manifest.json")
+        
         self._load_or_create()
     
     def _load_or_create(self):
-        """Load existing index or create new"""
+        """Load existing segments, migrating a legacy single-file index first"""
+        if not os.path.exists(self._manifest_file):
+            with self._lock:
+                if not os.path.exists(self._manifest_file):
+                    self._migrate_legacy()
+        elif "encoder" not in self._read_manifest():
+            with self._lock:
+                manifest = self._read_manifest()
+                if "encoder" not in manifest:
+                    self._check_header(manifest)
+                    atomic_write_json(self._manifest_file, dict(manifest, **self._header()))
+        
+        self.refresh()
+    
+    def _header(self) -> Dict:
+        """What the manifest records about the vectors' encoder"""
+        return {"dimension": self.dimension, "encoder": self.encoder.name, "encoder_version": self.encoder.version}
+    
+    def _check_header(self, manifest: Dict):
+        """Refuse an index built by another encoder (legacy manifests: dimension only)"""
+        ours = self._header()
+        theirs = {key: manifest[key] for key in ours if key in manifest}
+        if any(ours[key] != value for key, value in theirs.items()):
+            built = ", ".join(f"{key}={value!r}" for key, value in theirs.items())
+            raise IndexMismatchError(
+                f"Vector index at {self.vector_path} was built with {built}, but this store uses "
+                f"{self.encoder.name!r} ({self.dimension}-d); rebuild it with `openmemory reindex`"
+            )
+    
+    def _new_index(self):
+        if self.index_type == "binary":
+            return BinaryQuantizedIndex(self.dimension, self.rerank_factor)
+        if FAISS_AVAILABLE:
+            return faiss.IndexFlatIP(self.dimension)  # Inner product for cosine similarity
+        return SimpleNumpyIndex(self.dimension)
+    
+    def _migrate_legacy(self):
+        """Convert index.faiss + metadata.json from older versions into a first segment"""
         index_file = os.path.join(self.vector_path, "index.faiss")
         metadata_file = os.path.join(self.vector_path, "metadata.json")
+        manifest = dict({"generation": 0, "epoch": 0, "segments": []}, **self._header())
         
+        vectors = None
         if os.path.exists(index_file) and FAISS_AVAILABLE:
-            self.index = faiss.read_index(index_file)
+            legacy = faiss.read_index(index_file)
+            vectors = legacy.reconstruct_n(0, legacy.ntotal)
+        elif os.path.exists(index_file + ".npy"):
+            vectors = np.load(index_file + ".npy")
+        
+        if vectors is not None and len(vectors) and os.path.exists(metadata_file):
             with open(metadata_file, 'r') as f:
-                self.metadata = json.load(f)
-        else:
-            # Create new index
-            if FAISS_AVAILABLE:
-                self.index = faiss.IndexFlatIP(self.dimension)  # Inner product for cosine similarity
-            else:
-                self.index = SimpleNumpyIndex(self.dimension)
+                legacy_meta = json.load(f)
+            metas = [legacy_meta.get(str(i), {"id": None}) for i in range(len(vectors))]
+            manifest["generation"] = 1
+            manifest["segments"].append(self._write_segment(1, vectors, metas))
+        
+        atomic_write_json(self._manifest_file, manifest)
+    
+    def _read_manifest(self) -> Dict:
+        with open(self._manifest_file, 'r') as f:
+            return json.load(f)
+    
+    def _manifest_changed(self) -> bool:
+        """Cheap change check: os.replace gives the manifest a new inode"""
+        st = os.stat(self._manifest_file)
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if key == self._manifest_stat:
+            return False
+        self._manifest_stat = key
+        return True
+    
+    def refresh(self) -> bool:
+        """
+        Pick up segments written by other processes
+        
+        Returns:
+            True if anything new was loaded
+        """
+        with self._mutex:
+            if not self._manifest_changed():
+                return False
+            with metrics.span("vector.load"), self._lock.shared():
+                try:
+                    return self._apply_manifest(self._read_manifest())
+                except IndexMismatchError:
+                    self._manifest_stat = None  # keep refusing rather than serve the stale index
+                    raise
+    
+    def _apply_manifest(self, manifest: Dict) -> bool:
+        """Bring the in-memory index up to `manifest` (caller holds a file lock)"""
+        if manifest["epoch"] != self._epoch:
+            self._check_header(manifest)
+            self.index = self._new_index()
             self.metadata = {}
+            self._postings = {}
+            self._posting_arrays = {}
+            self._created = []
+            self._created_array = None
+            self._positions = {}
+            self._older = {}
+            self._alive = np.ones(0, dtype=bool)
+            self._deleted = 0
+            self._segments = []
+            self._tombstones = []
+            self._epoch = manifest["epoch"]
+        
+        new_segments = manifest["segments"][len(self._segments):]
+        for segment in new_segments:
+            vectors, metas = self._read_segment(segment["name"])
+            codes = self._read_codes(segment["name"], vectors) if self.index_type == "binary" else None
+            self._append(vectors, metas, codes)
+            self._segments.append(segment)
+        
+        # Tombstones only name positions of segments listed before them
+        new_tombstones = manifest.get("tombstones", [])[len(self._tombstones):]
+        for tombstone in new_tombstones:
+            self._bury(np.load(self._segment_path(tombstone["name"], "npy")))
+            self._tombstones.append(tombstone)
+        
+        self.generation = manifest["generation"]
+        return bool(new_segments or new_tombstones)
+    
+    def _append(self, vectors: np.ndarray, metas: List[Dict], codes: np.ndarray = None):
+        start = self.index.ntotal
+        if codes is not None:
+            self.index.add(vectors, codes=codes)
+        else:
+            self.index.add(np.ascontiguousarray(vectors, dtype='float32'))
+        for pos, meta in enumerate(metas, start):
+            self.metadata[str(pos)] = meta
+            # Segments from before visibility existed hold shared memories
+            meta.setdefault("visibility", DEFAULT_VISIBILITY)
+            for field in FILTER_FIELDS:
+                self._postings.setdefault(field, {}).setdefault(meta.get(field), []).append(pos)
+            partition = partition_key(meta["visibility"], meta.get("user_id"), meta.get("agent_id"))
+            self._postings.setdefault("partition", {}).setdefault(partition, []).append(pos)
+            self._created.append(meta.get("created_at") or "")
+            if meta["id"] in self._positions:
+                self._older.setdefault(meta["id"], []).append(self._positions[meta["id"]])
+            self._positions[meta["id"]] = pos
+        self._alive = np.concatenate([self._alive, np.ones(len(metas), dtype=bool)])
+        self._posting_arrays = {}
+        self._created_array = None
+    
+    def _bury(self, positions: np.ndarray):
+        """Hide tombstoned positions from lookups and searches"""
+        for pos in positions.tolist():
+            meta = self.metadata.pop(str(pos), None)
+            if meta is None:
+                continue
+            older = self._older.get(meta["id"], [])
+            if pos in older:
+                older.remove(pos)
+            elif self._positions.get(meta["id"]) == pos:
+                if older:
+                    self._positions[meta["id"]] = older.pop()
+                else:
+                    del self._positions[meta["id"]]
+            if not older:
+                self._older.pop(meta["id"], None)
+        self._alive[positions] = False
+        self._deleted = int(len(self._alive) - self._alive.sum())
+    
+    def _segment_path(self, name: str, ext: str) -> str:
+        return os.path.join(self.vector_path, f"{name}.{ext}")
     
+    def _write_segment(self, generation: int, vectors: np.ndarray, metas: List[Dict]) -> Dict:
+        name = f"seg-{generation:08d}"
+        buf = io.BytesIO()
+        np.save(buf, np.asarray(vectors, dtype='float32').reshape(-1, self.dimension))
+        atomic_write(self._segment_path(name, "npy"), buf.getvalue())
+        if self.index_type == "binary":
+            self._write_codes(name, BinaryQuantizedIndex.quantize(np.asarray(vectors).reshape(-1, self.dimension)))
+        atomic_write_json(self._segment_path(name, "json"), metas)
+        return {"name": name, "count": len(metas)}
+    
+    def _read_segment(self, name: str):
+        # Segments are immutable, so the binary index can keep them mapped
+        mmap_mode = 'r' if self.index_type == "binary" else None
+        vectors = np.load(self._segment_path(name, "npy"), mmap_mode=mmap_mode)
+        with open(self._segment_path(name, "json"), 'r') as f:
+            metas = json.load(f)
+        return vectors, metas
+    
+    def _write_codes(self, name: str, codes: np.ndarray):
+        buf = io.BytesIO()
+        np.save(buf, codes)
+        atomic_write(self._segment_path(name, "bits.npy"), buf.getvalue())
+    
+    def _read_codes(self, name: str, vectors: np.ndarray) -> np.ndarray:
+        """
+        1-bit codes of a segment
+        
+        Only binary stores write codes with their segments. Segments written
+        by a flat store (or an older version) are quantized on their first
+        binary load, which saves the codes for the next one.
+        """
+        path = self._segment_path(name, "bits.npy")
+        if os.path.exists(path):
+            return np.load(path)
+        codes = BinaryQuantizedIndex.quantize(vectors)
+        try:
+            self._write_codes(name, codes)
+        except OSError as e:
+            logger.warning("Could not save binary codes of segment %s: %s", name, e)
+        return codes
+    
+    def _all_vectors(self) -> np.ndarray:
+        if self.index.ntotal == 0:
+            return np.zeros((0, self.dimension), dtype='float32')
+        if isinstance(self.index, SimpleNumpyIndex):
+            return np.array(self.index.vectors, dtype='float32')
+        return self.index.reconstruct_n(0, self.index.ntotal)
+    
+    @metrics.timed("vector.warm")
+    def warm(self, user_id: Optional[str] = None) -> int:
+        """
+        Do the cold work of a first search ahead of time
+        
+        Loads the encoder, picks up new segments, builds the user's posting
+        array and, for the binary index, pages the user's float rows in from
+        the mapped segments.
+        
+        Returns:
+            Number of vectors in the user's partition
+        """
+        self._get_embedding("warm-up")
+        self.refresh()
+        with self._mutex:
+            positions = self._posting("user_id", user_id) if user_id else np.arange(self.index.ntotal)
+            if self.index_type == "binary" and len(positions):
+                self.index._floats(positions)
+            return len(positions)
+    
+    @metrics.timed("embed")
     def _get_embedding(self, text: str) -> np.ndarray:
         """Get embedding for text"""
-        # In production, use sentence-transformers or OpenAI embeddings
-        # This is a simplified version
-        try:
-            from sentence_transformers import SentenceTransformer
-            if not hasattr(self, '_model'):
-                self._model = SentenceTransformer('all-MiniLM-L6-v2')
-            embedding = self._model.encode(text)
-            return embedding.astype('float32')
-        except ImportError:
-            # Fallback: simple hash-based embedding
-            return self._simple_embedding(text)
-    
-    def _simple_embedding(self, text: str) -> np.ndarray:
-        """Simple fallback embedding using word hashes"""
-        words = text.lower().split()
-        embedding = np.zeros(self.dimension, dtype='float32')
-        
-        for word in words:
-            # Simple hash-based encoding
-            hash_val = hash(word) % self.dimension
-            embedding[hash_val] += 1.0
-        
-        # Normalize
-        norm = np.linalg.norm(embedding)
-        if norm > 0:
-            embedding = embedding / norm
-        
-        return embedding
+        return self.encoder.encode([text])[0]
+    
+    @metrics.timed("embed")
+    def _get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts in one encoder call"""
+        return self.encoder.encode(texts)
     
     def add(self, memory):
         """Add memory to vector store"""
-        embedding = self._get_embedding(memory.content)
-        embedding = embedding.reshape(1, -1)
-        
-        # Add to index
-        idx = self.index.ntotal if hasattr(self.index, 'ntotal') else len(self.index)
-        self.index.add(embedding)
-        
-        # Store metadata
-        self.metadata[str(idx)] = {
+        self.add_embedding(memory, self._get_embedding(memory.content))
+    
+    def add_many(self, memories: List) -> None:
+        """Embed memories in one batch and publish them as a single segment"""
+        if memories:
+            self.add_embeddings(memories, self._get_embeddings([m.content for m in memories]))
+    
+    def add_embedding(self, memory, embedding: np.ndarray):
+        """Add a memory whose embedding was computed elsewhere"""
+        self.add_embeddings([memory], embedding.reshape(1, -1))
+    
+    def add_embeddings(self, memories: List, embeddings: np.ndarray):
+        """Add memories with precomputed embeddings (one row per memory)"""
+        metas = [{
             "id": memory.id,
-            "content": memory.content,
             "user_id": memory.user_id,
-            "category": memory.category
-        }
+            "agent_id": memory.agent_id,
+            "session_id": memory.session_id,
+            "category": memory.category,
+            "created_at": memory.created_at,
+            "visibility": memory.visibility
+        } for memory in memories]
+        if self.store_content:
+            for meta, memory in zip(metas, memories):
+                meta["content"] = memory.content
+        
+        self._commit(embeddings, metas)
+    
+    def add_vectors(self, vectors: np.ndarray, metas: List[Dict]):
+        """Append raw vectors with their metadata as one segment"""
+        if len(metas):
+            self._commit(vectors, metas)
+    
+    def get_vectors(self, memory_ids: List[str]):
+        """
+        Look up stored vectors by memory ID
+        
+        Returns:
+            (vectors, metadata) for the IDs present in the index
+        """
+        targets = set(memory_ids)
+        self.refresh()
+        
+        with self._mutex:
+            positions = sorted(self._positions[i] for i in targets if i in self._positions)
+            metas = [self.metadata[str(pos)] for pos in positions]
+            if positions:
+                # Only the requested rows, so copying a user out in batches stays linear
+                vectors = self.index.reconstruct_batch(np.array(positions, dtype='int64'))
+            else:
+                vectors = np.zeros((0, self.dimension), dtype='float32')
+        
+        return vectors, metas
+    
+    @metrics.timed("vector.write")
+    def _commit(self, vectors: np.ndarray, metas: List[Dict]):
+        """Append a segment and publish it with a new manifest generation"""
+        with self._mutex, self._lock:
+            manifest = self._read_manifest()
+            self._apply_manifest(manifest)
+            
+            generation = manifest["generation"] + 1
+            manifest["segments"].append(self._write_segment(generation, vectors, metas))
+            manifest["generation"] = generation
+            
+            if len(manifest["segments"]) > self.max_segments:
+                # Load our own segment first so the merge includes it
+                self._apply_manifest(manifest)
+                self._rewrite(manifest)
+            else:
+                atomic_write_json(self._manifest_file, manifest)
+                self._apply_manifest(manifest)
+    
+    def _rewrite(self, manifest: Dict):
+        """
+        Replace every segment with one merged segment and bump the epoch
+        
+        Caller holds the exclusive lock and has applied `manifest`.
+        Tombstoned rows are left out, and the tombstones with them.
+        """
+        vectors = self._all_vectors()
+        keep = np.flatnonzero(self._alive)
+        if self._deleted:
+            vectors = vectors[keep]
+        metas = [self.metadata[str(i)] for i in keep.tolist()]
+        if not self.store_content:
+            metas = [{k: v for k, v in meta.items() if k != "content"} for meta in metas]
+        
+        old_names = [s["name"] for s in manifest["segments"] + manifest.get("tombstones", [])]
+        generation = manifest["generation"] + 1
+        merged = dict(
+            manifest,
+            generation=generation,
+            epoch=manifest["epoch"] + 1,
+            segments=[self._write_segment(generation, vectors, metas)] if len(metas) else [],
+            tombstones=[]
+        )
+        atomic_write_json(self._manifest_file, merged)
+        self._remove_segments(self.vector_path, old_names)
+        self._apply_manifest(merged)
+    
+    @staticmethod
+    def _remove_segments(vector_path: str, names: List[str]):
+        # Readers load segments under a shared lock, so nobody is reading these now
+        for name in names:
+            for ext in ("npy", "bits.npy", "json"):
+                path = os.path.join(vector_path, f"{name}.{ext}")
+                if os.path.exists(path):
+                    os.unlink(path)
+    
+    def compact(self):
+        """Merge every segment into one (bulk loads leave many small segments), dropping deleted rows"""
+        with self._mutex, self._lock:
+            manifest = self._read_manifest()
+            self._apply_manifest(manifest)
+            if len(manifest["segments"]) > 1 or self._deleted:
+                self._rewrite(manifest)
+    
+    def reclaim_deleted(self, min_fraction: float = 0.0) -> int:
+        """
+        Drop tombstoned rows once they make up `min_fraction` of the index
+        
+        Returns:
+            Number of rows dropped (0 when below the threshold)
+        """
+        with self._mutex, self._lock:
+            manifest = self._read_manifest()
+            self._apply_manifest(manifest)
+            deleted = self._deleted
+            if not deleted or deleted < min_fraction * self.index.ntotal:
+                return 0
+            self._rewrite(manifest)
+        return deleted
+    
+    def strip_content(self) -> int:
+        """
+        Drop the content copies that indexes written with `store_content` hold
+        
+        Returns:
+            Number of entries that carried content (0 when keeping them)
+        """
+        with self._mutex, self._lock:
+            manifest = self._read_manifest()
+            self._apply_manifest(manifest)
+            if self.store_content:
+                return 0
+            carrying = sum(1 for meta in self.metadata.values() if "content" in meta)
+            if carrying:
+                self._rewrite(manifest)
+        return carrying
+    
+    def swap_into(self, vector_path: str, prepare: Callable[[Optional[Dict]], None] = None) -> Dict:
+        """
+        Atomically replace the index at `vector_path` with this one
+        
+        Used to publish an index rebuilt next to a live one. Under the
+        target's exclusive lock, `prepare(live_manifest)` runs first (last
+        writes into this store), then this store's segments are moved into
+        `vector_path` and one manifest replace switches the target over
+        with a new epoch and this store's encoder header. Readers keep
+        serving the old index until then and reload on the epoch change,
+        which fails with IndexMismatchError where their encoder differs.
+        This store is left empty.
+        
+        Returns:
+            The target's new manifest
+        """
+        os.makedirs(vector_path, exist_ok=True)
+        manifest_file = os.path.join(vector_path, "manifest.json")
+        
+        with FileLock(os.path.join(vector_path, ".lock")):
+            live = None
+            if os.path.exists(manifest_file):
+                with open(manifest_file, 'r') as f:
+                    live = json.load(f)
+            if prepare:
+                prepare(live)
+            
+            with self._mutex, self._lock:
+                own = self._read_manifest()
+                self._apply_manifest(own)
+                if self._deleted:
+                    self._rewrite(own)
+                    own = self._read_manifest()
+                # Names above the live generation cannot collide with live segments
+                generation = live["generation"] if live else 0
+                segments = []
+                for segment in own["segments"]:
+                    generation += 1
+                    name = f"seg-{generation:08d}"
+                    for ext in ("npy", "bits.npy", "json"):
+                        source = self._segment_path(segment["name"], ext)
+                        if os.path.exists(source):  # flat builds have no codes
+                            os.replace(source, os.path.join(vector_path, f"{name}.{ext}"))
+                    segments.append({"name": name, "count": segment["count"]})
+                
+                swapped = dict(
+                    own, generation=generation, epoch=(live["epoch"] + 1) if live else 0, segments=segments
+                )
+                atomic_write_json(manifest_file, swapped)
+                if live:
+                    files = live["segments"] + live.get("tombstones", [])
+                    self._remove_segments(vector_path, [s["name"] for s in files])
+                
+                emptied = dict(
+                    own, generation=own["generation"] + 1, epoch=own["epoch"] + 1, segments=[], tombstones=[]
+                )
+                atomic_write_json(self._manifest_file, emptied)
+                self._apply_manifest(emptied)
+        
+        return swapped
+    
+    @metrics.timed("vector.delete")
+    def delete_many(self, memory_ids: List[str]) -> int:
+        """Remove memories from the index by memory ID (tombstoned; see the class docstring)"""
+        targets = set(memory_ids)
+        
+        with self._mutex, self._lock:
+            manifest = self._read_manifest()
+            self._apply_manifest(manifest)
+            
+            # Every live copy of each ID, without walking the metadata
+            removed = []
+            for memory_id in targets:
+                if memory_id in self._positions:
+                    removed.append(self._positions[memory_id])
+                    removed.extend(self._older.get(memory_id, ()))
+            if not removed:
+                return 0
+            removed.sort()
+            
+            generation = manifest["generation"] + 1
+            name = f"del-{generation:08d}"
+            buf = io.BytesIO()
+            np.save(buf, np.asarray(removed, dtype='int64'))
+            atomic_write(self._segment_path(name, "npy"), buf.getvalue())
+            manifest["tombstones"] = manifest.get("tombstones", []) + [{"name": name, "count": len(removed)}]
+            manifest["generation"] = generation
+            atomic_write_json(self._manifest_file, manifest)
+            self._apply_manifest(manifest)
         
-        self._save()
+        return len(removed)
     
     def search(
         self,
         query: str,
         user_id: str = None,
         limit: int = 5,
-        threshold: float = 0.7
+        threshold: float = 0.7,
+        filters: Dict = None
     ) -> List[Dict]:
         """Search for similar memories"""
-        query_embedding = self._get_embedding(query)
-        query_embedding = query_embedding.reshape(1, -1)
+        return self.search_embedding(self._get_embedding(query), user_id, limit, threshold, filters)
+    
+    def search_many(
+        self,
+        queries: List[str],
+        user_id: str = None,
+        limit: int = 5,
+        threshold: float = 0.7,
+        filters: Dict = None
+    ) -> List[List[Dict]]:
+        """Search several queries with one batched encode and one matrix search"""
+        return self.search_embeddings(self._get_embeddings(queries), user_id, limit, threshold, filters)
+    
+    def search_partitions(
+        self,
+        queries: List[str],
+        partitions: List[Tuple[Optional[str], Dict]],
+        limit: int = 5,
+        threshold: float = 0.7
+    ) -> List[List[List[Dict]]]:
+        """Top hits across disjoint (user_id, filters) partitions, scored in one pass over their union"""
+        return self.search_partition_embeddings(self._get_embeddings(queries), partitions, limit, threshold)
+    
+    def search_embedding(
+        self,
+        query_embedding: np.ndarray,
+        user_id: str = None,
+        limit: int = 5,
+        threshold: float = 0.7,
+        filters: Dict = None
+    ) -> List[Dict]:
+        """Search with a precomputed query embedding"""
+        return self.search_embeddings(query_embedding.reshape(1, -1), user_id, limit, threshold, filters)[0]
+    
+    def _posting(self, field: str, value) -> np.ndarray:
+        key = (field, value)
+        if key not in self._posting_arrays:
+            positions = self._postings.get(field, {}).get(value, [])
+            self._posting_arrays[key] = np.asarray(positions, dtype='int64')
+        return self._posting_arrays[key]
+    
+    def _candidates(self, user_id: Optional[str], filters: Optional[Dict]) -> Optional[np.ndarray]:
+        """
+        Sorted positions passing `user_id` and `filters` (caller holds the mutex)
+        
+        Returns:
+            None when nothing is filtered, so the whole index is searched
+        """
+        check_filters(filters, allow_metadata=False)
+        terms = dict(filters or {})
+        if user_id:
+            terms["user_id"] = user_id
+        if not terms:
+            return np.flatnonzero(self._alive) if self._deleted else None
+        
+        # A scope's partition stands in for the fields it is keyed by
+        fields = [field for field in FILTER_FIELDS if field in terms]
+        selectors = []
+        scope_fields = SCOPE_FIELDS.get(terms.get("visibility"))
+        if scope_fields is not None and all(field in terms for field in scope_fields):
+            key = partition_key(terms["visibility"], terms.get("user_id"), terms.get("agent_id"))
+            selectors.append(self._posting("partition", key))
+            fields = [field for field in fields if field not in scope_fields and field != "visibility"]
+        
+        # Intersect the smallest selectors first
+        selectors += [self._posting(field, terms[field]) for field in fields]
+        if "ids" in terms:
+            selectors.append(np.asarray(
+                sorted({self._positions[i] for i in terms["ids"] if i in self._positions}), dtype='int64'
+            ))
+        
+        selected = None
+        for positions in sorted(selectors, key=len):
+            selected = positions if selected is None else np.intersect1d(selected, positions, assume_unique=True)
+            if not len(selected):
+                return selected
+        if self._deleted:
+            selected = np.flatnonzero(self._alive) if selected is None else selected[self._alive[selected]]
+        
+        if "created_after" in terms or "created_before" in terms:
+            if self._created_array is None:
+                self._created_array = np.asarray(self._created, dtype=str)
+            created = self._created_array if selected is None else self._created_array[selected]
+            mask = created != ""
+            if "created_after" in terms:
+                mask &= created >= terms["created_after"]
+            if "created_before" in terms:
+                mask &= created < terms["created_before"]
+            selected = np.flatnonzero(mask) if selected is None else selected[mask]
+        
+        return selected
+    
+    def _search_subset(self, queries: np.ndarray, k: int, candidates: np.ndarray):
+        """Score only the candidate positions"""
+        if isinstance(self.index, (SimpleNumpyIndex, BinaryQuantizedIndex)):
+            return self.index.search(queries, k, subset=candidates)
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(candidates))
+        return self.index.search(queries, k, params=params)
+    
+    def search_embeddings(
+        self,
+        query_embeddings: np.ndarray,
+        user_id: str = None,
+        limit: int = 5,
+        threshold: float = 0.7,
+        filters: Dict = None
+    ) -> List[List[Dict]]:
+        """Search with a matrix of precomputed query embeddings (one row per query)"""
+        return self.search_partition_embeddings(query_embeddings, [(user_id, filters)], limit, threshold)
+    
+    def search_partition_embeddings(
+        self,
+        query_embeddings: np.ndarray,
+        partitions: List[Tuple[Optional[str], Dict]],
+        limit: int = 5,
+        threshold: float = 0.7
+    ) -> List[List[Dict]]:
+        """search_partitions() with precomputed query embeddings"""
+        if len(query_embeddings) == 0:
+            return []
+        
+        self.refresh()
+        queries = np.ascontiguousarray(query_embeddings, dtype='float32')
+        # Whole-index results are re-checked against the one partition's user
+        user_id = partitions[0][0] if len(partitions) == 1 else None
         
         # Search index
-        if FAISS_AVAILABLE:
-            scores, indices = self.index.search(query_embedding, limit * 2)  # Get extra for filtering
-        else:
-            scores, indices = self.index.search(query_embedding, limit * 2)
+        with metrics.span("vector.search"), self._mutex:
+            selected = [self._candidates(u, f) for u, f in partitions]
+            if any(positions is None for positions in selected):
+                candidates = None
+            elif len(selected) == 1:
+                candidates = selected[0]
+            else:
+                # Partitions are disjoint: one subset search over their union
+                candidates = np.unique(np.concatenate(selected))
+            if candidates is None:
+                scores, indices = self.index.search(queries, limit * 2)  # Get extra for filtering
+                metrics.incr("vectors.scanned", self.index.ntotal * len(queries))
+            elif len(candidates):
+                scores, indices = self._search_subset(queries, min(limit, len(candidates)), candidates)
+                metrics.incr("vectors.scanned", len(candidates) * len(queries))
+            else:
+                return [[] for _ in queries]
+            metadata = self.metadata
         
+        return [
+            self._collect(row_scores, row_indices, metadata, user_id, limit, threshold)
+            for row_scores, row_indices in zip(scores, indices)
+        ]
+    
+    def _collect(self, scores, indices, metadata, user_id, limit, threshold) -> List[Dict]:
         results = []
-        for score, idx in zip(scores[0], indices[0]):
+        for score, idx in zip(scores, indices):
             if idx == -1 or score < threshold:
                 continue
             
-            meta = self.metadata.get(str(idx))
+            meta = metadata.get(str(idx))
             if not meta:
                 continue
             
@@ -124,7 +782,7 @@ class VectorBackend:
             
             results.append({
                 "id": meta["id"],
-                "content": meta["content"],
+                "content": meta.get("content"),
                 "score": float(score),
                 "category": meta.get("category", "general")
             })
@@ -133,19 +791,99 @@ class VectorBackend:
                 break
         
         return results
+
+
+class BinaryQuantizedIndex:
+    """
+    Two-stage index: Hamming scan over sign bits, exact float re-rank
     
-    def _save(self):
-        """Save index and metadata"""
-        index_file = os.path.join(self.vector_path, "index.faiss")
-        metadata_file = os.path.join(self.vector_path, "metadata.json")
+    Each vector is kept in memory as dimension / 8 bytes (48 for 384-d).
+    The float vectors stay in the (memory-mapped) segment arrays passed to
+    add(); only the `k * rerank_factor` closest codes are read back and
+    scored exactly, so the search returns inner-product scores like
+    IndexFlatIP.
+    """
+    
+    def __init__(self, dimension: int, rerank_factor: int = 20):
+        self.dimension = dimension
+        self.rerank_factor = rerank_factor
+        self.codes = np.zeros((0, (dimension + 7) // 8), dtype='uint8')
+        self._chunks = []
+        self._starts = []
+    
+    @staticmethod
+    def quantize(vectors: np.ndarray) -> np.ndarray:
+        return np.packbits(np.asarray(vectors) > 0, axis=1)
+    
+    def add(self, vectors: np.ndarray, codes: np.ndarray = None):
+        if not len(vectors):
+            return
+        self._starts.append(self.ntotal)
+        self._chunks.append(vectors)
+        self.codes = np.vstack([self.codes, self.quantize(vectors) if codes is None else codes])
+    
+    def _floats(self, positions: np.ndarray) -> np.ndarray:
+        """Gather float vectors for `positions` from the segment arrays"""
+        out = np.empty((len(positions), self.dimension), dtype='float32')
+        owners = np.searchsorted(self._starts, positions, side='right') - 1
+        for chunk in np.unique(owners):
+            rows = owners == chunk
+            out[rows] = self._chunks[chunk][positions[rows] - self._starts[chunk]]
+        return out
+    
+    def reconstruct_n(self, start: int, n: int) -> np.ndarray:
+        return self._floats(np.arange(start, start + n))
+    
+    def reconstruct_batch(self, positions: np.ndarray) -> np.ndarray:
+        return self._floats(np.asarray(positions))
+    
+    def search(self, query: np.ndarray, k: int, subset: np.ndarray = None):
+        positions = np.arange(self.ntotal) if subset is None else np.asarray(subset)
+        if not len(positions):
+            return np.zeros((len(query), k), dtype='float32'), np.full((len(query), k), -1)
         
-        if FAISS_AVAILABLE and hasattr(self.index, 'faiss'):
-            faiss.write_index(self.index, index_file)
-        else:
-            self.index.save(index_file)
+        codes = _as_words(self.codes if subset is None else self.codes[positions])
+        shortlist = min(len(positions), max(k * self.rerank_factor, k))
         
-        with open(metadata_file, 'w') as f:
-            json.dump(self.metadata, f)
+        scores = np.zeros((len(query), k), dtype='float32')
+        indices = np.full((len(query), k), -1)
+        for row, (q, q_code) in enumerate(zip(query, _as_words(self.quantize(query)))):
+            # Coarse: Hamming distance to every code, keep the closest
+            distances = _popcount(np.bitwise_xor(codes, q_code)).sum(axis=1, dtype='int32')
+            if shortlist < len(positions):
+                candidates = np.argpartition(distances, shortlist - 1)[:shortlist]
+            else:
+                candidates = np.arange(len(positions))
+            
+            # Fine: exact inner product on the shortlist only
+            candidate_positions = positions[candidates]
+            exact = self._floats(candidate_positions) @ q
+            top = np.argsort(-exact)[:k]
+            scores[row, :len(top)] = exact[top]
+            indices[row, :len(top)] = candidate_positions[top]
+        
+        return scores, indices
+    
+    @property
+    def ntotal(self):
+        return len(self.codes)
+
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype='uint8')
+
+
+def _as_words(codes: np.ndarray) -> np.ndarray:
+    """View packed codes as 64-bit words when popcount can use them (half the work)"""
+    if hasattr(np, "bitwise_count") and codes.shape[1] % 8 == 0:
+        return np.ascontiguousarray(codes).view('<u8')
+    return codes
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """Per-element set-bit counts"""
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(values)
+    return _POPCOUNT[values]
 
 
 class SimpleNumpyIndex:
@@ -156,30 +894,36 @@ class SimpleNumpyIndex:
         self.vectors = []
     
     def add(self, vectors: np.ndarray):
-        self.vectors.append(vectors[0])
+        self.vectors.extend(vectors)
+    
+    def reconstruct_batch(self, positions: np.ndarray) -> np.ndarray:
+        return np.array([self.vectors[i] for i in positions], dtype='float32').reshape(-1, self.dimension)
     
-    def search(self, query: np.ndarray, k: int):
-        if not self.vectors:
-            return np.array([[]]), np.array([[-1] * k])
+    def search(self, query: np.ndarray, k: int, subset: np.ndarray = None):
+        if not self.vectors or (subset is not None and not len(subset)):
+            return np.zeros((len(query), k), dtype='float32'), np.full((len(query), k), -1)
         
-        # Calculate cosine similarities
-        vectors = np.array(self.vectors)
-        similarities = np.dot(vectors, query[0])
+        # Calculate cosine similarities, one row per query
+        if subset is None:
+            vectors = np.array(self.vectors)
+        else:
+            vectors = np.stack([self.vectors[i] for i in subset])
+        similarities = np.dot(query, vectors.T)
         
         # Get top k
-        top_k = min(k, len(similarities))
-        indices = np.argsort(similarities)[-top_k:][::-1]
-        scores = similarities[indices]
+        top_k = min(k, similarities.shape[1])
+        indices = np.argsort(-similarities, axis=1)[:, :top_k]
+        scores = np.take_along_axis(similarities, indices, axis=1)
+        if subset is not None:
+            indices = subset[indices]
         
         # Pad if needed
-        if len(indices) < k:
-            indices = np.concatenate([indices, [-1] * (k - len(indices))])
-            scores = np.concatenate([scores, [0] * (k - len(scores))])
+        if top_k < k:
+            pad = k - top_k
+            indices = np.hstack([indices, np.full((len(query), pad), -1)])
+            scores = np.hstack([scores, np.zeros((len(query), pad), dtype=scores.dtype)])
         
-        return scores.reshape(1, -1), indices.reshape(1, -1)
-    
-    def save(self, path: str):
-        np.save(path, np.array(self.vectors))
+        return scores, indices
     
     @property
     def ntotal(self):
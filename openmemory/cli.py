@@ -0,0 +1,904 @@
+"""
+Command-line interface for OpenMemory
+
+    openmemory export memories.jsonl.gz
+    openmemory import memories.jsonl --workers 4 --checkpoint import.ckpt
+    openmemory migrate ~/.openclaw/MEMORY.md --user alice
+    openmemory stats
+    openmemory reindex --workers 4
+    openmemory --encoder onnx --model ~/models/minilm-onnx reindex --workers 4
+    openmemory purge --user alice
+    openmemory compress
+    openmemory vacuum
+    openmemory snapshot /backups/ocmem
+    openmemory restore /backups/ocmem
+    openmemory serve /tmp/ocmem.sock
+
+Export and import stream records in batches, so memory use stays flat no
+matter how large the store is. Each imported batch is one long-term
+transaction plus one vector segment; with --workers > 1 the embeddings of
+the next batches are computed in a process pool while the current one is
+written. A checkpoint file records the input position after every
+committed batch, so an interrupted import resumes where it stopped.
+
+Files ending in .gz are gzip-compressed JSONL; files ending in .parquet
+need pyarrow (`pip install openmemory[parquet]`).
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .backends.encoders import EncoderSpec, embed_texts, get_encoder
+from .core.config import MemoryConfig
+from .core.locking import atomic_write_json
+from .core.memory import Memory
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+MEMORY_FIELDS = [f.name for f in fields(Memory)]
+CATEGORIES = ("preference", "fact", "task", "context", "skill", "goal")
+
+
+class Progress:
+    """Periodic record count and throughput on stderr"""
+    
+    def __init__(self, label: str, interval: float = 2.0, quiet: bool = False):
+        self.label = label
+        self.interval = interval
+        self.quiet = quiet
+        self.count = 0
+        self.start = time.monotonic()
+        self._last = self.start
+    
+    def update(self, n: int):
+        self.count += n
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._last = now
+            self._report(now)
+    
+    def done(self):
+        self._report(time.monotonic())
+    
+    def _report(self, now: float):
+        if self.quiet:
+            return
+        elapsed = now - self.start
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        print(f"{self.label}: {self.count:,} records in {elapsed:.1f}s ({rate:,.0f}/s)", file=sys.stderr)
+
+
+# Reading and writing record files
+
+def _format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    return "parquet" if path.endswith(".parquet") else "jsonl"
+
+
+def _require_parquet():
+    if not PARQUET_AVAILABLE:
+        raise SystemExit("Parquet support needs pyarrow: pip install openmemory[parquet]")
+
+
+def read_jsonl(path: str, offset: int = 0) -> Iterator[Tuple[Dict, int]]:
+    """Yield (record, byte offset after the record), starting at byte `offset`"""
+    if path == "-":
+        f = sys.stdin.buffer
+    elif path.endswith(".gz"):
+        f = gzip.open(path, "rb")
+    else:
+        f = open(path, "rb")
+    
+    with f:
+        if offset:
+            f.seek(offset)
+        for line in f:
+            offset += len(line)
+            if line.strip():
+                yield json.loads(line), offset
+
+
+def read_parquet(path: str, offset: int = 0, batch_size: int = 1000) -> Iterator[Tuple[Dict, int]]:
+    """Yield (record, row number after the record), skipping the first `offset` rows"""
+    _require_parquet()
+    row = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        if row + batch.num_rows <= offset:
+            row += batch.num_rows
+            continue
+        for record in batch.to_pylist():
+            row += 1
+            if row > offset:
+                yield record, row
+
+
+def write_jsonl(path: str, batches: Iterator[List[Dict]], progress: Progress):
+    if path == "-":
+        f = sys.stdout
+    elif path.endswith(".gz"):
+        f = gzip.open(path, "wt", encoding="utf-8")
+    else:
+        f = open(path, "w", encoding="utf-8")
+    
+    try:
+        for records in batches:
+            f.write("".join(json.dumps(r) + "\n" for r in records))
+            progress.update(len(records))
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+
+def write_parquet(path: str, batches: Iterator[List[Dict]], progress: Progress):
+    """One row group per batch; metadata is stored as a JSON string column"""
+    _require_parquet()
+    schema = pa.schema([
+        ("id", pa.string()),
+        ("content", pa.string()),
+        ("user_id", pa.string()),
+        ("agent_id", pa.string()),
+        ("session_id", pa.string()),
+        ("category", pa.string()),
+        ("importance", pa.float64()),
+        ("created_at", pa.string()),
+        ("updated_at", pa.string()),
+        ("metadata", pa.string()),
+        ("visibility", pa.string()),
+    ])
+    
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for records in batches:
+            rows = [dict(r, metadata=json.dumps(r["metadata"])) for r in records]
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            progress.update(len(records))
+
+
+def to_memory(record: Dict, user_id: str = None) -> Memory:
+    """Build a Memory from an exported record; missing optional fields get defaults"""
+    data = {k: record[k] for k in MEMORY_FIELDS if record.get(k) is not None}
+    if not data.get("content"):
+        raise ValueError(f"Record {record.get('id')!r} has no content")
+    if isinstance(data.get("metadata"), str):
+        data["metadata"] = json.loads(data["metadata"])
+    if user_id and "user_id" not in data:
+        data["user_id"] = user_id
+    data.setdefault("id", None)
+    return Memory(**data)
+
+
+def _batched(records: Iterator[Tuple[Dict, int]], batch_size: int, user_id: str = None):
+    """Group (record, position) pairs into (memories, position of the last record) batches"""
+    batch, position = [], None
+    for record, position in records:
+        try:
+            batch.append(to_memory(record, user_id))
+        except (TypeError, ValueError) as e:
+            raise SystemExit(f"Bad record before input position {position}: {e}")
+        if len(batch) >= batch_size:
+            yield batch, position
+            batch = []
+    if batch:
+        yield batch, position
+
+
+# Streaming over the store
+
+def iter_memories(long_term, batch_size: int = 1000, user_id: str = None) -> Iterator[List[Memory]]:
+    """
+    Walk a long-term store in creation order, one batch of memories at a time
+    
+    Keyset-paginated (see SupportsScan), so only one batch is held in memory
+    and a user's export reads only that user's rows.
+    """
+    if not hasattr(long_term, "iter_memories"):
+        raise SystemExit(f"{type(long_term).__name__} does not support streaming scans")
+    return long_term.iter_memories(user_id=user_id, batch_size=batch_size).batches()
+
+
+def load_batches(
+    batches: Iterator[Tuple[List[Memory], object]],
+    long_term,
+    vector_store,
+    encoder: EncoderSpec,
+    workers: int = 1,
+    on_commit: Callable[[object, int], None] = None,
+    progress: Progress = None,
+    skip_indexed: bool = False
+) -> int:
+    """
+    Write (memories, position) batches to the stores
+    
+    Each batch is one long-term transaction and one vector segment. With
+    `workers` > 1 embeddings are computed in a process pool, at most
+    2 * workers batches ahead of the writer. `on_commit(position, total)`
+    runs once a batch is in both stores. `skip_indexed` drops memories of
+    the first batch whose vectors already exist (resuming after a crash
+    between the vector write and the checkpoint).
+    
+    Returns:
+        Number of memories written
+    """
+    embed = vector_store is not None and hasattr(vector_store, "add_embeddings")
+    pool = None
+    if embed and workers > 1:
+        pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    
+    total = 0
+    
+    def write(memories: List[Memory], embeddings, position):
+        nonlocal total, skip_indexed
+        written = len(memories)
+        if long_term is not None:
+            long_term.add_many(memories)
+        
+        if skip_indexed and hasattr(vector_store, "get_vectors"):
+            _, metas = vector_store.get_vectors([m.id for m in memories])
+            indexed = {meta["id"] for meta in metas}
+            keep = [i for i, m in enumerate(memories) if m.id not in indexed]
+            memories = [memories[i] for i in keep]
+            embeddings = embeddings[keep] if embeddings is not None else None
+        skip_indexed = False
+        
+        if embed and memories:
+            vector_store.add_embeddings(memories, embeddings)
+        elif vector_store is not None:
+            vector_store.add_many(memories)
+        
+        total += written
+        if progress:
+            progress.update(written)
+        if on_commit:
+            on_commit(position, total)
+    
+    pending = deque()
+    try:
+        for memories, position in batches:
+            if pool is None:
+                write(memories, embed_texts([m.content for m in memories], encoder) if embed else None, position)
+                continue
+            
+            pending.append((memories, pool.submit(embed_texts, [m.content for m in memories], encoder), position))
+            if len(pending) >= 2 * workers:
+                memories, future, position = pending.popleft()
+                write(memories, future.result(), position)
+        
+        while pending:
+            memories, future, position = pending.popleft()
+            write(memories, future.result(), position)
+    finally:
+        if pool:
+            pool.shutdown()
+    
+    return total
+
+
+# MEMORY.md migration
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_ITEM = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+(?:\[[ xX]\]\s+)?(.*)$")
+
+
+def _category_for(heading: Optional[str]) -> str:
+    title = (heading or "").lower()
+    for category in CATEGORIES:
+        if category in title:
+            return category
+    return "general"
+
+
+def parse_memory_md(text: str, user_id: str = None, source: str = "MEMORY.md") -> Iterator[Tuple[Dict, int]]:
+    """
+    Turn a MEMORY.md file into (record, line number) pairs
+    
+    Every list item (continuation lines included) and every plain paragraph
+    becomes one memory. The nearest heading picks the category when it names
+    one (a "## Preferences" section holds preferences) and is kept in
+    metadata. IDs hash source, user and content, so re-running a migration
+    overwrites instead of duplicating. Fenced code blocks are skipped.
+    """
+    heading = None
+    lines: List[str] = []
+    start = 0
+    in_fence = False
+    
+    def flush(end: int):
+        content = " ".join(lines).strip()
+        lines.clear()
+        if not content:
+            return None
+        digest = hashlib.sha256(f"{source}:{user_id}:{content}".encode()).hexdigest()[:16]
+        return {
+            "id": digest,
+            "content": content,
+            "user_id": user_id,
+            "category": _category_for(heading),
+            "metadata": {"source": source, "section": heading, "line": start},
+        }, end
+    
+    for number, line in enumerate(text.splitlines(), 1):
+        if line.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+            continue
+        if in_fence:
+            continue
+        
+        heading_match = _HEADING.match(line)
+        item_match = _ITEM.match(line)
+        if heading_match or item_match or not line.strip():
+            record = flush(number - 1)
+            if record:
+                yield record
+        
+        if heading_match:
+            heading = heading_match.group(2) or None
+        elif item_match:
+            lines.append(item_match.group(1))
+            start = number
+        elif line.strip():
+            if not lines:
+                start = number
+            lines.append(line.strip())
+    
+    record = flush(number if text else 0)
+    if record:
+        yield record
+
+
+# Commands
+
+def _config(args) -> MemoryConfig:
+    kwargs = {"compaction_interval": 0.0}
+    if args.base_path:
+        kwargs["base_path"] = args.base_path
+    if args.shards:
+        kwargs["num_shards"] = args.shards
+    if args.vector_index:
+        kwargs["vector_index"] = args.vector_index
+    if getattr(args, "no_vectors", False):
+        kwargs["use_vector"] = False
+    if args.encoder:
+        kwargs["encoder_backend"] = args.encoder
+    if args.model:
+        kwargs["embedding_model"] = args.model
+    if args.dimension:
+        kwargs["embedding_dimension"] = args.dimension
+    if args.quantize:
+        kwargs["encoder_quantize"] = True
+    return MemoryConfig(**kwargs)
+
+
+def _stores(config: MemoryConfig):
+    from .backends.registry import create_long_term_backend, create_vector_store
+    
+    long_term = create_long_term_backend(config)
+    vector_store = create_vector_store(config) if config.use_vector else None
+    return long_term, vector_store
+
+
+def cmd_export(args) -> int:
+    from .backends.registry import create_long_term_backend
+    
+    long_term = create_long_term_backend(_config(args))
+    batches = ([m.to_dict() for m in batch] for batch in iter_memories(long_term, args.batch_size, args.user))
+    
+    progress = Progress("export", quiet=args.quiet)
+    if _format(args.output, args.format) == "parquet":
+        write_parquet(args.output, batches, progress)
+    else:
+        write_jsonl(args.output, batches, progress)
+    progress.done()
+    return 0
+
+
+def _read_checkpoint(path: Optional[str], source: str) -> Dict:
+    if not path or not os.path.exists(path):
+        return {"source": source, "position": 0, "imported": 0}
+    
+    with open(path, "r") as f:
+        checkpoint = json.load(f)
+    if checkpoint["source"] != source:
+        raise SystemExit(f"Checkpoint {path} belongs to {checkpoint['source']}, not {source}")
+    return checkpoint
+
+
+def _run_import(args, records_from: Callable[[int], Iterator[Tuple[Dict, int]]], source: str, user_id: str = None) -> int:
+    """Shared by import and migrate: checkpointed, batched, optionally parallel load"""
+    if args.checkpoint and source == "-":
+        raise SystemExit("Cannot checkpoint an import from stdin")
+    
+    checkpoint = _read_checkpoint(args.checkpoint, source)
+    if checkpoint.get("complete"):
+        print(f"{source} was already imported ({checkpoint['imported']:,} records)", file=sys.stderr)
+        return 0
+    resuming = checkpoint["position"] > 0
+    if resuming:
+        print(f"Resuming {source} at position {checkpoint['position']}", file=sys.stderr)
+    
+    config = _config(args)
+    long_term, vector_store = _stores(config)
+    imported = checkpoint["imported"]
+    
+    def on_commit(position, total: int):
+        if args.checkpoint:
+            checkpoint.update(position=position, imported=imported + total, updated_at=datetime.now().isoformat())
+            atomic_write_json(args.checkpoint, checkpoint)
+    
+    progress = Progress("import", quiet=args.quiet)
+    total = load_batches(
+        _batched(records_from(checkpoint["position"]), args.batch_size, user_id),
+        long_term,
+        vector_store,
+        EncoderSpec.from_config(config),
+        workers=args.workers,
+        on_commit=on_commit,
+        progress=progress,
+        skip_indexed=resuming
+    )
+    progress.done()
+    
+    if args.checkpoint:
+        checkpoint.update(imported=imported + total, complete=True, updated_at=datetime.now().isoformat())
+        atomic_write_json(args.checkpoint, checkpoint)
+    return 0
+
+
+def cmd_import(args) -> int:
+    source = args.input if args.input == "-" else os.path.abspath(args.input)
+    if _format(args.input, args.format) == "parquet":
+        _require_parquet()
+        records_from = lambda offset: read_parquet(args.input, offset, args.batch_size)  # noqa: E731
+    else:
+        records_from = lambda offset: read_jsonl(args.input, offset)  # noqa: E731
+    return _run_import(args, records_from, source, user_id=args.user)
+
+
+def cmd_migrate(args) -> int:
+    source = os.path.abspath(os.path.expanduser(args.input))
+    with open(source, "r", encoding="utf-8") as f:
+        text = f.read()
+    
+    def records_from(offset: int):
+        return ((r, line) for r, line in parse_memory_md(text, args.user, os.path.basename(source)) if line > offset)
+    
+    return _run_import(args, records_from, source)
+
+
+def _vector_stats(vector_store) -> Dict:
+    shards = getattr(vector_store, "shards", None)
+    stores = list(shards.values()) if shards else [vector_store]
+    stores = [s for s in stores if hasattr(s, "index")]
+    if not stores:
+        return {}
+    return {
+        "vectors": sum(s.index.ntotal for s in stores),
+        "segments": sum(len(s._segments) for s in stores),
+        "index_type": stores[0].index_type,
+        "dimension": stores[0].dimension,
+        "encoder": stores[0].encoder.name,
+    }
+
+
+def _disk_usage(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def cmd_stats(args) -> int:
+    config = _config(args)
+    long_term, vector_store = _stores(config)
+    
+    if not hasattr(long_term, "count_by_user"):
+        raise SystemExit(f"{type(long_term).__name__} does not report per-user counts")
+    counts = long_term.count_by_user()
+    top = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)[:args.top]
+    
+    stats = {
+        "base_path": config.base_path,
+        "memories": sum(counts.values()),
+        "users": len(counts),
+        "top_users": [{"user_id": user_id, "memories": n} for user_id, n in top],
+        "disk_bytes": _disk_usage(config.base_path),
+    }
+    if vector_store is not None:
+        stats.update(_vector_stats(vector_store))
+    
+    if args.json:
+        print(json.dumps(stats, indent=2))
+        return 0
+    
+    for key, value in stats.items():
+        if key != "top_users":
+            print(f"{key:>12}: {value:,}" if isinstance(value, int) else f"{key:>12}: {value}")
+    for entry in stats["top_users"]:
+        print(f"{'':>12}  {entry['user_id']!s:<24} {entry['memories']:,}")
+    return 0
+
+
+def _catch_up(scan, store, spec: EncoderSpec) -> int:
+    """Embed the memories added or updated since `scan` stopped, replacing their old vectors"""
+    total = 0
+    for batch in scan.batches():
+        store.delete_many([m.id for m in batch])
+        store.add_embeddings(batch, embed_texts([m.content for m in batch], spec))
+        total += len(batch)
+    return total
+
+
+def _replay(long_term, store, spec: EncoderSpec, after: int, batch_size: int) -> Tuple[int, int]:
+    """
+    Apply the change log past `after` to `store`: re-embed memories that
+    still exist, drop the vectors of deleted ones
+    
+    Returns:
+        (memories re-embedded, last sequence number applied)
+    """
+    total = 0
+    while True:
+        rows = long_term.changes_since(after, batch_size)
+        if not rows:
+            return total, after
+        after = rows[-1][0]
+        ids = list(dict.fromkeys(memory_id for _, memory_id in rows))
+        memories = [m for m in long_term.get_many(ids) if m]
+        store.delete_many(ids)
+        if memories:
+            store.add_embeddings(memories, embed_texts([m.content for m in memories], spec))
+        total += len(memories)
+
+
+def _drop_deleted(long_term, store, batch_size: int) -> int:
+    """Remove vectors whose memories were deleted from the long-term store"""
+    store.refresh()
+    ids = [meta["id"] for meta in store.metadata.values()]
+    gone = []
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        gone.extend(i for i, memory in zip(chunk, long_term.get_many(chunk)) if memory is None)
+    return store.delete_many(gone) if gone else 0
+
+
+def reindex_store(long_term, vector_path: str, config: MemoryConfig, args) -> int:
+    """
+    Rebuild one vector directory from its long-term store with the configured encoder
+    
+    Memories are streamed out of the long-term store and embedded by
+    `--workers` processes into a new index next to the old one, which keeps
+    serving meanwhile. Stores with a change log (SQLite) log every write from
+    before the scan starts; replaying the log re-embeds memories written
+    during the build and drops deleted ones, whatever their timestamps (an
+    import keeps its records' own). Other stores resume the scan in
+    updated_at order, which misses writes stamped before the point it had
+    reached. One manifest replace swaps the new index in
+    (VectorBackend.swap_into). The last catch-up runs under the live index's
+    lock, so no write committed before the swap is missed; processes still
+    running with another encoder refuse the new index and must be restarted
+    with the new config.
+    """
+    from .backends.vector_backend import VectorBackend
+    
+    if not hasattr(long_term, "iter_memories"):
+        raise SystemExit(f"{type(long_term).__name__} does not support streaming scans")
+    
+    spec = EncoderSpec.from_config(config)
+    build_path = vector_path + ".reindex"
+    shutil.rmtree(build_path, ignore_errors=True)
+    store = VectorBackend(
+        build_path,
+        dimension=config.embedding_dimension,
+        max_segments=1 << 20,  # merged once at the end instead of after every batch
+        index_type=config.vector_index,
+        rerank_factor=config.binary_rerank_factor,
+        encoder=get_encoder(spec)
+    )
+    
+    logged = hasattr(long_term, "start_change_log")
+    if logged:
+        long_term.start_change_log()
+    try:
+        progress = Progress(f"reindex {vector_path}", quiet=args.quiet)
+        scan = long_term.iter_memories(order="updated_at", batch_size=args.batch_size)
+        total = load_batches(
+            ((batch, None) for batch in scan.batches()),
+            None,
+            store,
+            spec,
+            workers=args.workers,
+            progress=progress
+        )
+        
+        # Catch up outside the lock first, so the locked pass has little left to do
+        if logged:
+            caught_up, seq = _replay(long_term, store, spec, 0, args.batch_size)
+            total += caught_up
+        else:
+            total += _catch_up(scan, store, spec)
+            live_deletes = _deletes(vector_path)
+            _drop_deleted(long_term, store, args.batch_size)
+        store.compact()
+        
+        def prepare(live: Optional[Dict]):
+            nonlocal total
+            if logged:
+                total += _replay(long_term, store, spec, seq, args.batch_size)[0]
+                return
+            total += _catch_up(scan, store, spec)
+            # Deletes add tombstones (and merges bump the epoch), so an unchanged mark means none since the check
+            if live and _deletes(vector_path, live) != live_deletes:
+                _drop_deleted(long_term, store, args.batch_size)
+        
+        store.swap_into(vector_path, prepare)
+    finally:
+        if logged:
+            long_term.stop_change_log()
+    shutil.rmtree(build_path, ignore_errors=True)
+    progress.done()
+    return total
+
+
+def _deletes(vector_path: str, manifest: Dict = None) -> Optional[Tuple[int, int]]:
+    """(epoch, tombstones) of a live index: changes whenever vectors were deleted"""
+    if manifest is None:
+        manifest_file = os.path.join(vector_path, "manifest.json")
+        if not os.path.exists(manifest_file):
+            return None
+        with open(manifest_file, "r") as f:
+            manifest = json.load(f)
+    return manifest["epoch"], len(manifest.get("tombstones", []))
+
+
+def cmd_reindex(args) -> int:
+    from .backends.registry import create_long_term_backend
+    
+    config = _config(args)
+    if config.vector_backend != "faiss":
+        raise SystemExit(f"reindex supports the faiss vector store, not {config.vector_backend!r}")
+    long_term = create_long_term_backend(config)
+    
+    if config.num_shards > 1:
+        for name in long_term.router.shards:
+            path = os.path.join(long_term.router.shard_dir(name), "vectors")
+            reindex_store(long_term.shards[name], path, config, args)
+    else:
+        reindex_store(long_term, config.vector_path, config, args)
+    return 0
+
+
+def cmd_purge(args) -> int:
+    config = _config(args)
+    long_term, vector_store = _stores(config)
+    
+    filters = {key: value for key, value in (
+        ("user_id", args.user), ("agent_id", args.agent), ("session_id", args.session), ("category", args.category)
+    ) if value is not None}
+    if not filters:
+        raise SystemExit("purge needs at least one of --user, --agent, --session, --category")
+    
+    progress = Progress("purge", quiet=args.quiet)
+    
+    def on_chunk(ids: List[str]):
+        if vector_store is not None:
+            vector_store.delete_many(ids)
+        progress.update(len(ids))
+    
+    long_term.delete_by_filters(filters, chunk_size=args.chunk_size, on_chunk=on_chunk)
+    progress.done()
+    
+    reclaim = getattr(long_term, "reclaim", None)
+    if reclaim:
+        # Leave the freed pages to background reclamation unless asked
+        pages = reclaim(args.reclaim_pages) if args.reclaim_pages else 0
+        if not args.quiet and pages:
+            print(f"purge: reclaimed {pages:,} pages", file=sys.stderr)
+    return 0
+
+
+def cmd_compress(args) -> int:
+    config = _config(args)
+    config.compress_text = not args.off
+    long_term, vector_store = _stores(config)
+    if not hasattr(long_term, "recompress"):
+        raise SystemExit(f"{type(long_term).__name__} does not support compression")
+    
+    if config.compress_text:
+        long_term.train_dictionary()
+    progress = Progress("compress", quiet=args.quiet)
+    result = long_term.recompress(args.batch_size, on_batch=progress.update)
+    progress.done()
+    
+    stripped = vector_store.strip_content() if hasattr(vector_store, "strip_content") else 0
+    pages = long_term.reclaim(args.reclaim_pages) if args.reclaim_pages else 0
+    if not args.quiet:
+        print(f"compress: {result['rows']:,} rows rewritten, text {result['bytes_before']:,} -> "
+              f"{result['bytes_after']:,} bytes, {stripped:,} vector entries without content, "
+              f"{pages:,} pages reclaimed", file=sys.stderr)
+    return 0
+
+
+def cmd_vacuum(args) -> int:
+    from .backends.registry import create_long_term_backend
+    
+    long_term = create_long_term_backend(_config(args))
+    if not hasattr(long_term, "vacuum"):
+        raise SystemExit(f"{type(long_term).__name__} does not support vacuum")
+    result = long_term.vacuum()
+    if not args.quiet:
+        print(f"vacuum: {result['pages_before']:,} -> {result['pages_after']:,} pages "
+              f"({result['bytes_freed']:,} bytes freed)", file=sys.stderr)
+    return 0
+
+
+def cmd_snapshot(args) -> int:
+    from .core.snapshot import Snapshotter
+    
+    snapshotter = Snapshotter(_config(args))
+    if args.list:
+        for snapshot in snapshotter.list(args.dest):
+            kind = "full" if all(p["full"] for p in snapshot["parts"].values()) else "incremental"
+            print(f"{snapshot['id']}  {kind:<11}  {snapshot['finished_at']}")
+        return 0
+    
+    start = time.monotonic()
+    snapshot = snapshotter.create(args.dest, incremental=not args.full)
+    for part, info in snapshot["parts"].items():
+        rows = "full copy" if info["full"] else \
+            f"{info['changed']:,} changed, {info['archived']:,} archived, {info['deleted']:,} deleted"
+        vectors = info.get("vectors")
+        segments = f", {len(vectors['segments'])} vector segments (lock {vectors['lock_ms']:.1f} ms)" if vectors else ""
+        if not args.quiet:
+            print(f"{part}: {rows}{segments}", file=sys.stderr)
+    print(snapshot["id"])
+    if not args.quiet:
+        print(f"snapshot took {time.monotonic() - start:.1f}s", file=sys.stderr)
+    return 0
+
+
+def cmd_restore(args) -> int:
+    from .core.snapshot import Snapshotter
+    
+    snapshot = Snapshotter(_config(args)).restore(args.dest, args.id)
+    if not args.quiet:
+        print(f"Restored snapshot {snapshot['id']}", file=sys.stderr)
+    return 0
+
+
+def cmd_serve(args) -> int:
+    from .server import MemoryServer
+    
+    config = _config(args)
+    config.compaction_interval = args.compaction_interval
+    server = MemoryServer(
+        args.address, config,
+        max_batch=args.max_batch, batch_window_ms=args.batch_window_ms, slow_workers=args.slow_workers
+    )
+    if not args.quiet:
+        print(f"Serving {config.base_path} on {args.address}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    if not args.quiet:
+        print(f"Stopped after {server.stats()['requests']:,} requests", file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="openmemory", description="OpenMemory command-line tools")
+    parser.add_argument("--base-path", default=None, help="store directory (default ~/.openclaw/ocmem)")
+    parser.add_argument("--shards", type=int, default=None, help="number of shards the store was created with")
+    parser.add_argument("--vector-index", choices=["flat", "binary"], default=None)
+    parser.add_argument("--encoder", default=None, help="auto, sentence-transformers, onnx, hash or a registered one")
+    parser.add_argument("--model", default=None, help="embedding model name, or ONNX model dir/file")
+    parser.add_argument("--dimension", type=int, default=None, help="embedding dimension of --model")
+    parser.add_argument("--quantize", action="store_true", help="onnx: int8 dynamic quantization")
+    parser.add_argument("-q", "--quiet", action="store_true", help="no progress output")
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    p = sub.add_parser("export", help="stream every memory to JSONL or Parquet")
+    p.add_argument("output", help="output file (.jsonl, .jsonl.gz, .parquet or - for stdout)")
+    p.add_argument("--format", choices=["jsonl", "parquet"], default=None)
+    p.add_argument("--user", default=None, help="only this user's memories")
+    p.add_argument("--batch-size", type=int, default=1000)
+    p.set_defaults(func=cmd_export)
+    
+    for name, func, help_text in (
+        ("import", cmd_import, "load memories from JSONL or Parquet"),
+        ("migrate", cmd_migrate, "import the entries of a MEMORY.md file"),
+    ):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("input", help="input file" + (" (- for stdin)" if name == "import" else ""))
+        if name == "import":
+            p.add_argument("--format", choices=["jsonl", "parquet"], default=None)
+        p.add_argument("--user", default=None, help="user ID for records without one")
+        p.add_argument("--batch-size", type=int, default=1000, help="memories per transaction")
+        p.add_argument("--workers", type=int, default=1, help="embedding processes")
+        p.add_argument("--checkpoint", default=None, help="progress file for resuming")
+        p.add_argument("--no-vectors", action="store_true", help="skip the vector index")
+        p.set_defaults(func=func)
+    
+    p = sub.add_parser("stats", help="memory, user and index counts")
+    p.add_argument("--top", type=int, default=10, help="users to list")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_stats)
+    
+    p = sub.add_parser("reindex", help="re-embed every memory into a new index and swap it in")
+    p.add_argument("--batch-size", type=int, default=1000)
+    p.add_argument("--workers", type=int, default=1, help="embedding processes")
+    p.set_defaults(func=cmd_reindex)
+    
+    p = sub.add_parser("purge", help="delete matching memories in chunks, vectors included")
+    p.add_argument("--user", default=None)
+    p.add_argument("--agent", default=None)
+    p.add_argument("--session", default=None)
+    p.add_argument("--category", default=None)
+    p.add_argument("--chunk-size", type=int, default=500, help="rows per transaction")
+    p.add_argument("--reclaim-pages", type=int, default=0, help="free pages to return to the OS afterwards")
+    p.set_defaults(func=cmd_purge)
+    
+    p = sub.add_parser("compress", help="train a dictionary and rewrite every row compressed with it")
+    p.add_argument("--off", action="store_true", help="store every row uncompressed again")
+    p.add_argument("--batch-size", type=int, default=500, help="rows per transaction")
+    p.add_argument("--reclaim-pages", type=int, default=0, help="free pages to return to the OS afterwards")
+    p.set_defaults(func=cmd_compress)
+    
+    p = sub.add_parser("vacuum", help="rebuild the database file and enable incremental space reclamation")
+    p.set_defaults(func=cmd_vacuum)
+    
+    p = sub.add_parser("snapshot", help="online snapshot, incremental after the first")
+    p.add_argument("dest", help="snapshot directory")
+    p.add_argument("--full", action="store_true", help="full snapshot even if one exists")
+    p.add_argument("--list", action="store_true", help="list snapshots in dest")
+    p.set_defaults(func=cmd_snapshot)
+    
+    p = sub.add_parser("restore", help="restore the store from a snapshot (stop writers first)")
+    p.add_argument("dest", help="snapshot directory")
+    p.add_argument("--id", default=None, help="snapshot to restore (default latest)")
+    p.set_defaults(func=cmd_restore)
+    
+    p = sub.add_parser("serve", help="share one model and index between local agent processes")
+    p.add_argument("address", help="Unix socket path, or host:port for TCP")
+    p.add_argument("--max-batch", type=int, default=64, help="requests executed per dispatcher batch")
+    p.add_argument("--batch-window-ms", type=float, default=0.0, help="wait this long to fill a batch")
+    p.add_argument("--slow-workers", type=int, default=2, help="threads for deletes, snapshots, compaction and scans")
+    p.add_argument("--compaction-interval", type=float, default=0.0, help="seconds between compaction ticks")
+    p.set_defaults(func=cmd_serve)
+    
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        print("Interrupted" + (f"; resume with --checkpoint {args.checkpoint}" if getattr(args, "checkpoint", None) else ""),
+              file=sys.stderr)
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
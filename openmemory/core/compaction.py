@@ -0,0 +1,222 @@
+"""Importance decay and capacity-bounded forgetting for OC-Mem"""
+
+import json
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from .config import MemoryConfig
+from .memory import Memory
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CompactionStats:
+    """Work done by a single compaction tick"""
+    decayed: int = 0
+    evicted: int = 0
+    summarized: int = 0
+    reclaimed: int = 0  # free pages returned to the filesystem
+    vectors_reclaimed: int = 0  # deleted rows dropped from the vector index
+
+
+def decay_importance(importance: float, since: str, now: datetime, half_life_days: float) -> float:
+    """
+    Exponentially decay an importance score
+    
+    Args:
+        importance: Current importance (0-1)
+        since: ISO timestamp the current score was computed at
+        now: Reference time
+        half_life_days: Days after which importance halves
+    
+    Returns:
+        Decayed importance
+    """
+    elapsed = (now - datetime.fromisoformat(since)).total_seconds() / 86400
+    if elapsed <= 0:
+        return importance
+    return importance * 0.5 ** (elapsed / half_life_days)
+
+
+def default_summarizer(memories: List[Memory]) -> str:
+    """Collapse a cluster of memories into one line of text"""
+    text = "; ".join(m.content for m in memories)
+    if len(text) > 500:
+        text = text[:497] + "..."
+    return f"Summary of {len(memories)} older memories: {text}"
+
+
+class MemoryCompactor:
+    """
+    Incremental compaction of the long-term store
+    
+    Each tick does a bounded amount of work (`compaction_batch_size` rows):
+    it decays importance for the next slice of the table, then evicts the
+    lowest-scoring memories of users above `max_memories_per_user`, archiving
+    them to a cold table or JSONL file and removing them from the vector index.
+    Finally it returns up to `reclaim_pages` pages freed by deletes to the
+    filesystem (SQLite stores) and, once `vector_reclaim_fraction` of the
+    vector index is deleted rows, rewrites the index without them.
+    """
+    
+    def __init__(
+        self,
+        long_term,
+        vector_store=None,
+        config: MemoryConfig = None,
+        summarizer: Callable[[List[Memory]], str] = None,
+        on_change: Callable[[], None] = None
+    ):
+        self.long_term = long_term
+        self.vector_store = vector_store
+        self.config = config or MemoryConfig()
+        self.summarizer = summarizer or default_summarizer
+        self.on_change = on_change
+        
+        self._decay_cursor = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    @metrics.timed("compact")
+    def run_once(self, now: datetime = None) -> CompactionStats:
+        """Run one bounded compaction tick"""
+        now = now or datetime.now()
+        budget = self.config.compaction_batch_size
+        
+        with self._lock:
+            stats = CompactionStats()
+            if self.config.decay_half_life_days:
+                stats.decayed = self._decay_step(now, budget)
+            if self.config.max_memories_per_user:
+                evicted, summarized = self._evict_step(budget)
+                stats.evicted = evicted
+                stats.summarized = summarized
+            reclaim = getattr(self.long_term, "reclaim", None)
+            if self.config.reclaim_pages and reclaim:
+                stats.reclaimed = reclaim(self.config.reclaim_pages)
+            reclaim_vectors = getattr(self.vector_store, "reclaim_deleted", None)
+            if self.config.vector_reclaim_fraction and reclaim_vectors:
+                stats.vectors_reclaimed = reclaim_vectors(self.config.vector_reclaim_fraction)
+        
+        if self.on_change and (stats.decayed or stats.evicted):
+            self.on_change()
+        return stats
+    
+    def _decay_step(self, now: datetime, budget: int) -> int:
+        """Decay importance for the next `budget` rows, wrapping around at the end"""
+        rows = self.long_term.scan_importance(after_rowid=self._decay_cursor, limit=budget)
+        if not rows:
+            self._decay_cursor = 0
+            return 0
+        
+        stamp = now.isoformat()
+        updates = []
+        for rowid, memory_id, importance, updated_at, decayed_at in rows:
+            since = max(filter(None, [updated_at, decayed_at]), default=None)
+            if since is None:
+                continue
+            decayed = decay_importance(importance, since, now, self.config.decay_half_life_days)
+            if importance - decayed > 1e-6:
+                updates.append((memory_id, decayed, stamp))
+        
+        self.long_term.set_importance(updates)
+        self._decay_cursor = rows[-1][0] if len(rows) == budget else 0
+        
+        return len(updates)
+    
+    def _evict_step(self, budget: int):
+        """Evict the lowest-scoring memories of users over capacity"""
+        capacity = self.config.max_memories_per_user
+        evicted = summarized = 0
+        
+        for user_id, count in self.long_term.count_by_user(min_count=capacity).items():
+            if budget <= 0:
+                break
+            
+            # A summary takes a slot of its own, so fetch one extra row for it
+            # and keep that row only if a summary (2+ victims) will be written
+            excess = count - capacity
+            limit = excess + 1 if self.config.summarize_evicted else excess
+            victims = self.long_term.get_lowest_importance(user_id, limit=min(limit, budget))
+            summarize = self.config.summarize_evicted and len(victims) > 1
+            if not summarize:
+                victims = victims[:excess]
+            if not victims:
+                continue
+            
+            self._evict(victims)
+            evicted += len(victims)
+            budget -= len(victims)
+            
+            if summarize:
+                self._summarize(user_id, victims)
+                summarized += 1
+        
+        return evicted, summarized
+    
+    def _evict(self, memories: List[Memory]):
+        """Archive or drop memories and keep the vector index in sync"""
+        ids = [m.id for m in memories]
+        mode = self.config.compaction_mode
+        
+        if mode == "archive":
+            self.long_term.archive(ids)
+        elif mode == "file":
+            archived_at = datetime.now().isoformat()
+            with open(self.config.archive_path, "a") as f:
+                for m in memories:
+                    f.write(json.dumps(dict(m.to_dict(), archived_at=archived_at)) + "\n")
+            self.long_term.delete_many(ids)
+        elif mode == "delete":
+            self.long_term.delete_many(ids)
+        else:
+            raise ValueError(f"Unknown compaction mode: {mode}")
+        
+        if self.vector_store:
+            self.vector_store.delete_many(ids)
+    
+    def _summarize(self, user_id: Optional[str], memories: List[Memory]):
+        """Replace an evicted low-importance cluster with a single summary memory"""
+        category = Counter(m.category for m in memories).most_common(1)[0][0]
+        summary = Memory(
+            id=None,
+            content=self.summarizer(memories),
+            user_id=user_id,
+            category=category,
+            importance=max(m.importance for m in memories),
+            metadata={"summary_of": [m.id for m in memories]}
+        )
+        
+        self.long_term.add(summary)
+        if self.vector_store:
+            self.vector_store.add(summary)
+    
+    def start(self):
+        """Run compaction ticks in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ocmem-compactor", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = None):
+        """Stop the background thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def _run(self):
+        while not self._stop.wait(self.config.compaction_interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Memory compaction tick failed")
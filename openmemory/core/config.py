@@ -2,7 +2,7 @@
 
 import os
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
 
 
 @dataclass
@@ -17,22 +17,79 @@ class MemoryConfig:
     use_long_term: bool = True
     use_vector: bool = True
     
+    # Backend selection (see backends/registry.py; plugins register via entry points)
+    long_term_backend: str = "sqlite"
+    vector_backend: str = "faiss"
+    
     # Short-term (session) config
     short_term_ttl: int = 86400  # 24 hours
+    redis_url: Optional[str] = None  # e.g. redis://localhost:6379/0, enables Redis
+    redis_prefix: str = "ocmem"
+    redis_max_connections: int = 32
+    cache_long_term: bool = False  # Redis read-through cache in front of long-term reads
+    cache_ttl: int = 3600
     
     # Long-term config
     long_term_path: Optional[str] = None
+    indexed_metadata_keys: Tuple[str, ...] = ()  # metadata keys promoted to indexed SQLite columns
+    compress_text: bool = False  # deflate content and metadata with a dictionary trained on the store
+    
+    # Sharding config (num_shards > 1 routes users across several stores)
+    num_shards: int = 1
+    shard_path: Optional[str] = None
     
     # Vector store config
     vector_path: Optional[str] = None
-    embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"  # model name, or ONNX model dir/file
     embedding_dimension: int = 384
+    encoder_backend: str = "auto"  # auto, sentence-transformers, onnx or hash
+    encoder_threads: Optional[int] = None  # intra-op CPU threads, None lets the runtime decide
+    encoder_quantize: bool = False  # onnx: int8 dynamic quantization of the weights
+    encoder_batch_size: int = 32  # texts per forward pass (length-bucketed)
+    encoder_max_length: int = 256  # tokens; longer texts are truncated
+    vector_index: str = "flat"  # flat, or binary: 1-bit Hamming scan + float re-rank from disk
+    binary_rerank_factor: int = 20  # binary index re-ranks limit * factor candidates
+    vector_store_content: bool = False  # copy content into vector metadata; otherwise resolved by ID
+    
+    # Search result cache (per process; 0 disables)
+    search_cache_size: int = 0
+    search_cache_ttl: float = 300.0  # seconds; bounds staleness from other processes' writes
+    
+    # Session prefetch (prefetch_session)
+    prefetch_ttl: float = 300.0  # seconds a prefetched session is kept for its first read
+    
+    # Query-aware get_context (see core/context.py)
+    context_candidates: int = 20  # memories the vector and keyword stages each contribute
+    context_min_similarity: float = 0.3  # vector hits below this are not candidates
+    context_latency_budget_ms: Optional[float] = None  # None waits for every stage
     
     # Extraction config
     auto_extract: bool = True
     auto_categorize: bool = True
     min_importance_threshold: float = 0.3
     
+    # Compaction config
+    decay_half_life_days: Optional[float] = None  # None disables importance decay
+    max_memories_per_user: Optional[int] = None  # None means unbounded
+    compaction_mode: str = "archive"  # archive (cold table), file (JSONL) or delete
+    archive_path: Optional[str] = None
+    summarize_evicted: bool = False
+    compaction_batch_size: int = 500  # max rows touched per tick
+    compaction_interval: float = 0.0  # seconds between background ticks, 0 disables
+    reclaim_pages: int = 1000  # free SQLite pages returned to the OS per tick, 0 disables
+    delete_chunk_size: int = 500  # rows per transaction in filter deletes
+    vector_reclaim_fraction: float = 0.2  # ticks rewrite the vector index once this share is deleted, 0 disables
+    
+    # Write-behind ingestion (see core/write_behind.py)
+    write_behind: bool = False  # add() returns once queued; a writer thread group-commits
+    write_flush_interval: float = 0.05  # seconds the writer waits for a group to fill
+    write_batch_size: int = 256  # max adds per group commit
+    write_max_pending: int = 10000  # add() blocks while this many writes are outstanding
+    
+    # Metrics config (see core/metrics.py)
+    metrics_enabled: bool = False
+    slow_op_threshold_ms: Optional[float] = None  # log operations slower than this
+    
     def __post_init__(self):
         """Resolve paths"""
         self.base_path = os.path.expanduser(self.base_path)
@@ -43,6 +100,12 @@ class MemoryConfig:
         if self.vector_path is None:
             self.vector_path = os.path.join(self.base_path, "vectors")
         
+        if self.shard_path is None:
+            self.shard_path = os.path.join(self.base_path, "shards")
+        
+        if self.archive_path is None:
+            self.archive_path = os.path.join(self.base_path, "archive.jsonl")
+        
         # Ensure directories exist
         os.makedirs(self.base_path, exist_ok=True)
         os.makedirs(self.vector_path, exist_ok=True)
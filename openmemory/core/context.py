@@ -0,0 +1,164 @@
+"""Query-aware context retrieval: concurrent ranked stages under a latency budget"""
+
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .memory import Memory
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Weight of each signal in a candidate's combined score; stage scores and
+# importance are all in [0, 1]
+WEIGHTS = {"vector": 0.45, "keyword": 0.3, "recent": 0.15, "importance": 0.1}
+
+# Cheap stages that always run to completion, so a tight budget still
+# leaves the context something to show
+FLOOR = ("recent",)
+
+# A stage returns its candidates, each with the stage's score in [0, 1]
+Stage = Callable[[], List[Tuple[Memory, float]]]
+
+
+class ContextRetriever:
+    """
+    Runs get_context()'s retrieval stages side by side within a time budget
+    
+    retrieve() submits every stage (vector similarity, keyword overlap,
+    recency) to a small thread pool and waits for them until the deadline.
+    A stage whose recent latency (a moving average) would use up the budget
+    is not started at all. One still running at the deadline is abandoned:
+    its average is raised to at least the time it was given, and the stage
+    is skipped until the abandoned run finishes in the background (so stale
+    runs never hold more than one worker per stage). Every skip lowers the
+    average a little, so a stage that got faster (a warmed encoder, a
+    smaller partition) is tried again. Floor stages (recency) are exempt:
+    they always run and are always waited for, so only the ranked stages
+    can be cut by the budget.
+    Candidates from the stages that ran are ranked by the weighted sum of
+    their stage scores and importance.
+    
+    The report maps each stage to "ran", "skipped" (predicted to miss the
+    budget), "timed_out" or "failed"; outcomes are also counted in metrics
+    as context.<stage>.<outcome>.
+    """
+    
+    def __init__(self, workers: int = 3, smoothing: float = 0.2):
+        self.smoothing = smoothing
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocmem-context")
+        self._latency: Dict[str, float] = {}  # stage -> moving average, seconds
+        self._abandoned: Set[str] = set()  # stages with a timed-out run still going
+        self._lock = threading.Lock()
+    
+    def expected_ms(self, stage: str) -> float:
+        """Moving-average latency of a stage; 0 until it has run once"""
+        with self._lock:
+            return self._latency.get(stage, 0.0) * 1000
+    
+    def retrieve(self, stages: Dict[str, Stage], budget_ms: Optional[float] = None) -> Tuple[List[Memory], Dict]:
+        """
+        Run `stages` concurrently and rank what they found
+        
+        Args:
+            stages: Stage name (a WEIGHTS key) -> function returning scored candidates
+            budget_ms: Time allowed the stages not in FLOOR; None waits for every stage
+        
+        Returns:
+            (memories best first, report)
+        """
+        began = time.perf_counter()
+        outcomes = {}
+        futures = {}
+        for name, stage in stages.items():
+            if budget_ms is not None and name not in FLOOR and self._should_skip(name, budget_ms):
+                outcomes[name] = "skipped"
+                continue
+            futures[name] = self._executor.submit(self._timed, name, stage)
+        
+        timeout = None if budget_ms is None else max(0.0, budget_ms / 1000 - (time.perf_counter() - began))
+        wait([f for name, f in futures.items() if name not in FLOOR], timeout=timeout)
+        wait([f for name, f in futures.items() if name in FLOOR])
+        
+        results = {}
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                outcomes[name] = "timed_out"
+                with self._lock:
+                    self._latency[name] = max(self._latency.get(name, 0.0), time.perf_counter() - began)
+                    self._abandoned.add(name)
+            elif future.exception() is not None:
+                logger.warning("Context stage %s failed: %s", name, future.exception())
+                outcomes[name] = "failed"
+            else:
+                results[name] = future.result()
+                outcomes[name] = "ran"
+        for name, outcome in outcomes.items():
+            metrics.incr(f"context.{name}.{outcome}")
+        
+        ranked = combine(results)
+        report = {
+            "stages": {name: outcomes[name] for name in stages},
+            "candidates": len(ranked),
+            "budget_ms": budget_ms,
+            "elapsed_ms": (time.perf_counter() - began) * 1000,
+        }
+        return ranked, report
+    
+    def _should_skip(self, name: str, budget_ms: float) -> bool:
+        with self._lock:
+            expected = self._latency.get(name, 0.0) * 1000
+            if name not in self._abandoned and expected < budget_ms:
+                return False
+            if name in self._latency:
+                self._latency[name] *= 1 - self.smoothing
+            return True
+    
+    def _timed(self, name: str, stage: Stage) -> List[Tuple[Memory, float]]:
+        began = time.perf_counter()
+        try:
+            return stage()
+        finally:
+            elapsed = time.perf_counter() - began
+            with self._lock:
+                self._abandoned.discard(name)
+                previous = self._latency.get(name)
+                self._latency[name] = elapsed if previous is None else previous + self.smoothing * (elapsed - previous)
+    
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+def keyword_scores(keys: Set[str], candidates: List[Tuple[Memory, Iterable[str]]]) -> List[Tuple[Memory, float]]:
+    """
+    Score candidates by the query keys they mention, each key weighted by its rarity
+    
+    A key most candidates share ("project") says little; one only a few
+    mention (a name, a code) says a lot. Rarity is an inverse document
+    frequency over the candidates themselves, which needs no corpus
+    statistics; a memory mentioning every key scores 1.
+    """
+    mentions = [(memory, keys.intersection(memory_keys)) for memory, memory_keys in candidates]
+    frequency = {key: sum(1 for _, found in mentions if key in found) for key in keys}
+    weight = {key: math.log(1 + len(mentions) / (count or 1)) for key, count in frequency.items()}
+    total = sum(weight.values())
+    return [(memory, sum(weight[key] for key in found) / total) for memory, found in mentions if found]
+
+
+def combine(results: Dict[str, List[Tuple[Memory, float]]]) -> List[Memory]:
+    """Candidates of every stage, by combined score (then recency)"""
+    memories: Dict[str, Memory] = {}
+    scores: Dict[str, float] = {}
+    for stage, hits in results.items():
+        for memory, score in hits:
+            memories.setdefault(memory.id, memory)
+            scores[memory.id] = scores.get(memory.id, 0.0) + WEIGHTS[stage] * score
+    return sorted(
+        memories.values(),
+        key=lambda m: (scores[m.id] + WEIGHTS["importance"] * m.importance, m.updated_at),
+        reverse=True
+    )
@@ -0,0 +1,108 @@
+"""Cross-process file locking and atomic file replacement"""
+
+import json
+import os
+import tempfile
+import threading
+
+from .metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    Advisory lock on a lock file, shared between processes
+    
+    Exclusive locks serialize writers; shared locks let readers load a
+    consistent set of files while no writer is replacing them. On Windows
+    every lock is exclusive. The lock is re-entrant within one thread.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+    
+    def acquire(self, shared: bool = False):
+        depth = getattr(self._local, "depth", 0)
+        if depth:
+            self._local.depth = depth + 1
+            return
+        
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        except BaseException:
+            os.close(fd)
+            raise
+        
+        self._local.fd = fd
+        self._local.depth = 1
+    
+    def release(self):
+        self._local.depth -= 1
+        if self._local.depth:
+            return
+        
+        fd = self._local.fd
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+    
+    def shared(self):
+        """Context manager holding a shared (reader) lock"""
+        return _Held(self, shared=True)
+    
+    def __enter__(self):
+        self.acquire()
+        return self
+    
+    def __exit__(self, *exc):
+        self.release()
+
+
+class _Held:
+    def __init__(self, lock: FileLock, shared: bool):
+        self.lock = lock
+        self.shared = shared
+    
+    def __enter__(self):
+        self.lock.acquire(shared=self.shared)
+        return self.lock
+    
+    def __exit__(self, *exc):
+        self.lock.release()
+
+
+def atomic_write(path: str, data: bytes):
+    """Write a file so readers see either the old or the new content, never a torn one"""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        metrics.incr("bytes.persisted", len(data))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def atomic_write_json(path: str, obj):
+    """Atomically write `obj` as JSON"""
+    atomic_write(path, json.dumps(obj).encode("utf-8"))
@@ -0,0 +1,354 @@
+"""
+Metrics and tracing for OC-Mem operations
+
+A process-wide `metrics` registry records span timings (operations such as
+`search` and the stages inside them such as `embed`, `vector.search` and
+`sqlite.get`) and counters (cache hits, merges, vectors scanned, rows
+returned, bytes persisted). It is disabled by default; while disabled every
+hook is a single attribute check.
+
+    from openmemory.core.metrics import metrics, InMemorySpanExporter
+
+    metrics.configure(enabled=True, slow_threshold_ms=50)
+    exporter = metrics.add_exporter(InMemorySpanExporter())
+    ...
+    metrics.snapshot()        # timers, counters and recent slow operations
+    metrics.to_prometheus()   # Prometheus text exposition format
+    exporter.spans            # OpenTelemetry-style span dicts
+"""
+
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import trace as otel_trace
+    OTEL_AVAILABLE = True
+except ImportError:
+    OTEL_AVAILABLE = False
+
+_UNSET = object()
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _NullSpan:
+    """Shared no-op span handed out while metrics are disabled"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def set_attribute(self, key: str, value):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _TimerStats:
+    """Aggregated durations of one span name"""
+    
+    __slots__ = ("count", "total", "max", "buckets")
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+    
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+
+class Span:
+    """
+    A timed operation or stage
+    
+    Spans opened while another span is active on the same thread become its
+    children and share its trace. When the root span ends, the whole trace
+    is handed to the registered exporters.
+    """
+    
+    def __init__(self, registry: "Metrics", name: str, attributes: Dict):
+        self.registry = registry
+        self.name = name
+        self.attributes = attributes
+        self.parent = None
+        self.trace = None
+        self.span_id = None
+        self.start_ns = 0
+        self.end_ns = 0
+        self._start = 0.0
+        self.duration = 0.0
+    
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+    
+    def __enter__(self):
+        stack = self.registry._stack()
+        self.parent = stack[-1] if stack else None
+        self.trace = self.parent.trace if self.parent else {"id": os.urandom(16).hex(), "spans": []}
+        self.trace["spans"].append(self)
+        self.span_id = os.urandom(8).hex()
+        stack.append(self)
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._start
+        self.end_ns = self.start_ns + int(self.duration * 1e9)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        
+        stack = self.registry._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        self.registry._finish(self)
+        return False
+    
+    def to_dict(self) -> Dict:
+        """OpenTelemetry-style representation"""
+        return {
+            "name": self.name,
+            "trace_id": self.trace["id"],
+            "span_id": self.span_id,
+            "parent_span_id": self.parent.span_id if self.parent else None,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "attributes": dict(self.attributes),
+            "status": "ERROR" if "error" in self.attributes else "OK",
+        }
+
+
+class Metrics:
+    """Registry of span timers, counters, exporters and the slow-operation log"""
+    
+    def __init__(self):
+        self.enabled = False
+        self.slow_threshold_ms: Optional[float] = None
+        self.slow_ops = deque(maxlen=100)
+        self._timers: Dict[str, _TimerStats] = {}
+        self._counters: Dict[str, float] = {}
+        self._exporters: List = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def configure(self, enabled: bool = None, slow_threshold_ms: Optional[float] = _UNSET, slow_log_size: int = None):
+        """
+        Change settings; arguments left out keep their current value
+        
+        Args:
+            enabled: Turn recording on or off
+            slow_threshold_ms: Log root operations slower than this (None disables)
+            slow_log_size: Number of slow operations kept for snapshot()
+        """
+        if enabled is not None:
+            self.enabled = enabled
+        if slow_threshold_ms is not _UNSET:
+            self.slow_threshold_ms = slow_threshold_ms
+        if slow_log_size is not None:
+            self.slow_ops = deque(self.slow_ops, maxlen=slow_log_size)
+    
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+    
+    def span(self, name: str, **attributes):
+        """Context manager timing `name`; a shared no-op while disabled"""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, attributes)
+    
+    def timed(self, name: str) -> Callable:
+        """Decorator timing every call of a function as span `name`"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with Span(self, name, {}):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+    
+    def incr(self, name: str, value: float = 1):
+        """Add `value` to counter `name`"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+    
+    def add_exporter(self, exporter):
+        """Register an object with an `export(spans)` method; returns it"""
+        with self._lock:
+            self._exporters.append(exporter)
+        return exporter
+    
+    def remove_exporter(self, exporter):
+        with self._lock:
+            if exporter in self._exporters:
+                self._exporters.remove(exporter)
+    
+    def _finish(self, span: Span):
+        with self._lock:
+            stats = self._timers.get(span.name)
+            if stats is None:
+                stats = self._timers[span.name] = _TimerStats()
+            stats.observe(span.duration)
+            exporters = list(self._exporters)
+        
+        if span.parent is not None:
+            return
+        
+        if self.slow_threshold_ms is not None and span.duration * 1000 >= self.slow_threshold_ms:
+            self._log_slow(span)
+        
+        if exporters:
+            spans = [s.to_dict() for s in span.trace["spans"]]
+            for exporter in exporters:
+                try:
+                    exporter.export(spans)
+                except Exception as e:
+                    logger.warning("Span exporter %r failed: %s", exporter, e)
+    
+    def _log_slow(self, span: Span):
+        stages = {}
+        for child in span.trace["spans"][1:]:
+            stages[child.name] = stages.get(child.name, 0.0) + child.duration * 1000
+        
+        entry = {
+            "name": span.name,
+            "duration_ms": span.duration * 1000,
+            "start_time_unix_nano": span.start_ns,
+            "attributes": dict(span.attributes),
+            "stages_ms": stages,
+        }
+        self.slow_ops.append(entry)
+        logger.warning(
+            "Slow %s: %.1f ms (%s)", span.name, entry["duration_ms"],
+            ", ".join(f"{name} {ms:.1f} ms" for name, ms in sorted(stages.items(), key=lambda s: -s[1]))
+        )
+    
+    def reset(self):
+        """Drop all recorded timers, counters and slow operations"""
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+            self.slow_ops.clear()
+    
+    def snapshot(self) -> Dict:
+        """Point-in-time copy of everything recorded so far"""
+        with self._lock:
+            timers = {
+                name: {
+                    "count": s.count,
+                    "total_ms": s.total * 1000,
+                    "mean_ms": s.total * 1000 / s.count if s.count else 0.0,
+                    "max_ms": s.max * 1000,
+                }
+                for name, s in self._timers.items()
+            }
+            counters = dict(self._counters)
+            slow_ops = list(self.slow_ops)
+        
+        return {"timers": timers, "counters": counters, "slow_ops": slow_ops}
+    
+    def to_prometheus(self, prefix: str = "ocmem") -> str:
+        """Render timers as a histogram and counters in Prometheus text format"""
+        with self._lock:
+            timers = [(name, s.count, s.total, list(s.buckets)) for name, s in sorted(self._timers.items())]
+            counters = sorted(self._counters.items())
+        
+        lines = []
+        if timers:
+            metric = f"{prefix}_span_duration_seconds"
+            lines.append(f"# HELP {metric} Duration of memory operations and their stages")
+            lines.append(f"# TYPE {metric} histogram")
+            for name, count, total, buckets in timers:
+                label = f'span="{_escape(name)}"'
+                cumulative = 0
+                for bound, n in zip(BUCKETS, buckets):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {count}')
+                lines.append(f"{metric}_sum{{{label}}} {total}")
+                lines.append(f"{metric}_count{{{label}}} {count}")
+        
+        for name, value in counters:
+            metric = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class InMemorySpanExporter:
+    """Keeps the most recent finished spans, e.g. for tests or a debug endpoint"""
+    
+    def __init__(self, max_spans: int = 10000):
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+    
+    def export(self, spans: List[Dict]):
+        with self._lock:
+            self._spans.extend(spans)
+    
+    @property
+    def spans(self) -> List[Dict]:
+        with self._lock:
+            return list(self._spans)
+    
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+class OpenTelemetryExporter:
+    """Replays finished traces into an OpenTelemetry tracer (needs opentelemetry-api)"""
+    
+    def __init__(self, tracer=None):
+        if not OTEL_AVAILABLE:
+            raise ImportError("OpenTelemetry not installed. Run: pip install opentelemetry-api opentelemetry-sdk")
+        self.tracer = tracer or otel_trace.get_tracer("openmemory")
+    
+    def export(self, spans: List[Dict]):
+        # Spans arrive parents first; end them children first
+        live = {}
+        for span in spans:
+            parent = live.get(span["parent_span_id"])
+            live[span["span_id"]] = self.tracer.start_span(
+                span["name"],
+                context=otel_trace.set_span_in_context(parent) if parent else None,
+                start_time=span["start_time_unix_nano"],
+                attributes={k: v for k, v in span["attributes"].items() if v is not None},
+            )
+        for span in reversed(spans):
+            live[span["span_id"]].end(end_time=span["end_time_unix_nano"])
+
+
+# Process-wide registry used by OpenClawMemory and the backends
+metrics = Metrics()
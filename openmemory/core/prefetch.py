@@ -0,0 +1,155 @@
+"""Session-start prefetch: warm the stores and cache first-turn context rows"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SessionKey = Tuple[Optional[str], Optional[str], Optional[str]]  # user, session, agent
+
+
+class SessionPrefetcher:
+    """
+    Background loader for the rows a session's first turn will read
+    
+    prefetch() runs `loader(user_id, session_id, agent_id)` on a small
+    thread pool and keeps its result (a dict of memory lists) for `ttl`
+    seconds. The first get() for the session and agent takes it; a get()
+    that finds the prefetch still running waits for it rather than issuing
+    the same queries again. Later reads go to the (now warm) stores.
+    
+    Entries are dropped on every write for their user (invalidate()), and a
+    prefetch that was running while such a write happened is discarded, so
+    a served entry is never older than the last write through this process.
+    The hit rate counts prefetched sessions whose first read was served
+    from the prefetch.
+    """
+    
+    def __init__(
+        self,
+        loader: Callable[[Optional[str], Optional[str], Optional[str]], Dict],
+        ttl: float = 600.0,
+        workers: int = 2
+    ):
+        self.loader = loader
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocmem-prefetch")
+        self._entries: Dict[SessionKey, Tuple[float, Dict]] = {}
+        self._pending: Dict[SessionKey, Future] = {}
+        self._requested: Dict[SessionKey, float] = {}  # key -> when its first read stops counting
+        self._generations: Dict[Optional[str], int] = {}
+        self._lock = threading.Lock()
+        
+        self.requests = 0
+        self.hits = 0
+        self.waits = 0
+        self.misses = 0
+        self.failures = 0
+        self.invalidations = 0
+    
+    def prefetch(self, user_id: Optional[str], session_id: Optional[str], agent_id: Optional[str] = None) -> Future:
+        """Start loading a session in the background; returns the in-flight future"""
+        key = (user_id, session_id, agent_id)
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            for stale in [k for k, deadline in self._requested.items() if deadline < now and k not in self._pending]:
+                del self._requested[stale]
+            self._requested[key] = now + self.ttl
+            pending = self._pending.get(key)
+            if pending is not None:
+                return pending
+            generation = self._generations.get(user_id, 0)
+            future = self._executor.submit(self._load, key, generation)
+            self._pending[key] = future
+        return future
+    
+    def _load(self, key: SessionKey, generation: int) -> Optional[Dict]:
+        try:
+            with metrics.span("prefetch", user_id=key[0], session_id=key[1], agent_id=key[2]):
+                rows = self.loader(*key)
+        except Exception:
+            logger.exception("Session prefetch failed for %s", key)
+            with self._lock:
+                self.failures += 1
+                self._pending.pop(key, None)
+            return None
+        
+        with self._lock:
+            self._pending.pop(key, None)
+            # A write landed while loading; the rows may be stale
+            if generation != self._generations.get(key[0], 0):
+                return None
+            self._entries[key] = (time.monotonic() + self.ttl, rows)
+        return rows
+    
+    def get(self, user_id: Optional[str], session_id: Optional[str], agent_id: Optional[str] = None) -> Optional[Dict]:
+        """Take the prefetched rows for a session; None if it was not prefetched or they went stale"""
+        key = (user_id, session_id, agent_id)
+        with self._lock:
+            if self._requested.pop(key, None) is None:
+                return None
+            entry = self._entries.pop(key, None)
+            if entry is not None and entry[0] < time.monotonic():
+                entry = None
+            pending = self._pending.get(key) if entry is None else None
+        
+        if entry is not None:
+            self._count("hits")
+            return entry[1]
+        if pending is not None:
+            rows = pending.result()
+            with self._lock:
+                self._entries.pop(key, None)
+            if rows is not None:
+                self._count("waits")
+                return rows
+        
+        self._count("misses")
+        return None
+    
+    def _count(self, outcome: str):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+        metrics.incr(f"prefetch.{outcome}")
+    
+    def invalidate(self, user_id: Optional[str]):
+        """Drop a user's prefetched sessions (and all-users ones, of user None) after a write"""
+        with self._lock:
+            for stale in {user_id, None}:
+                self._generations[stale] = self._generations.get(stale, 0) + 1
+            for key in [k for k in self._entries if k[0] in (user_id, None)]:
+                del self._entries[key]
+            self.invalidations += 1
+    
+    def clear(self):
+        """Drop every prefetched session (e.g. after compaction or bulk deletes)"""
+        with self._lock:
+            for user_id in {k[0] for k in self._entries} | {k[0] for k in self._pending}:
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._entries.clear()
+            self.invalidations += 1
+    
+    def close(self):
+        self._executor.shutdown(wait=True)
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.waits + self.misses
+            return {
+                "entries": len(self._entries),
+                "pending": len(self._pending),
+                "requests": self.requests,
+                "hits": self.hits,
+                "waits": self.waits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.waits) / lookups if lookups else 0.0,
+                "failures": self.failures,
+                "invalidations": self.invalidations,
+            }
+
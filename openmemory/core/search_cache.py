@@ -0,0 +1,130 @@
+"""Per-user search result cache with generation-based invalidation"""
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import metrics
+
+
+def normalize_query(query: str) -> str:
+    """Case and whitespace do not change semantic results (the encoders lowercase and split on whitespace)"""
+    return " ".join(query.lower().split())
+
+
+class SearchCache:
+    """
+    LRU cache of search results, bounded by entry count and TTL
+    
+    Every key includes the user's generation counter. Writes bump the
+    counter through invalidate(), so results cached before the write can
+    never be served again; their entries are dropped right away to free
+    room. Searches of user None read every user, so every write bumps its
+    counter too. The cache is per process: writes from other processes are
+    only picked up when entries expire, so keep `ttl` short for shared
+    stores.
+    
+    Semantic queries are keyed case- and whitespace-normalized; `exact`
+    keys (keyword searches, whose LIKE patterns match the query as typed)
+    keep the query verbatim.
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple, Tuple[float, List]]" = OrderedDict()
+        self._by_user: Dict[Optional[str], set] = {}
+        self._generations: Dict[Optional[str], int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    def key(self, user_id: Optional[str], query: str, exact: bool = False, **params) -> Tuple:
+        """Cache key for one search; `params` are the remaining search arguments"""
+        frozen = json.dumps(params, sort_keys=True, default=sorted)
+        query = (True, query) if exact else (False, normalize_query(query))
+        return (user_id, self._epoch, self._generations.get(user_id, 0), query, frozen)
+    
+    def get(self, key: Tuple) -> Optional[List[Dict]]:
+        """Cached results for `key`, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            
+            if entry is None:
+                self.misses += 1
+                metrics.incr("search_cache.misses")
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            metrics.incr("search_cache.hits")
+            results = entry[1]
+        
+        return copy.deepcopy(results)
+    
+    def put(self, key: Tuple, results: List[Dict]):
+        user_id, epoch, generation = key[:3]
+        with self._lock:
+            # A write landed while this search ran; its results may be stale
+            if epoch != self._epoch or generation != self._generations.get(user_id, 0):
+                return
+            
+            self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(results))
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(user_id, set()).add(key)
+            
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def _drop(self, key: Tuple):
+        self._entries.pop(key, None)
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+    
+    def invalidate(self, user_id: Optional[str]):
+        """Bump the user's generation (and the all-users one) after a write"""
+        with self._lock:
+            for stale in {user_id, None}:
+                self._generations[stale] = self._generations.get(stale, 0) + 1
+                for key in self._by_user.pop(stale, ()):
+                    self._entries.pop(key, None)
+            self.invalidations += 1
+    
+    def clear(self):
+        """Invalidate every user (e.g. after compaction or bulk deletes)"""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._by_user.clear()
+            self.invalidations += 1
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,186 @@
+"""Write-behind ingestion: add() enqueues, one writer thread group-commits"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from .memory import Memory
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PendingWrite = Tuple[Memory, bool]  # (memory, merge_similar)
+
+# Counted alongside the writer's user: a global memory is visible to every user
+_GLOBAL = object()
+
+
+class WriteBehindQueue:
+    """
+    Bounded queue of pending adds, committed in groups by a background thread
+    
+    submit() returns as soon as the write is queued. The writer waits up to
+    `flush_interval` for more writes, then hands up to `batch_size` of them
+    to `commit` at once, so one SQLite transaction and one vector append
+    carry many adds. With `max_pending` writes outstanding, submit() blocks
+    until the writer catches up (backpressure).
+    
+    Readers call wait_for_user() first: it returns at once when neither the
+    user nor anybody's global memories have writes outstanding, and
+    otherwise flushes and waits. That gives every handle of the process
+    read-your-writes, including global memories another user's handle just
+    added. close() (also run at interpreter exit) flushes everything before
+    stopping the writer.
+    """
+    
+    def __init__(
+        self,
+        commit: Callable[[List[PendingWrite]], None],
+        flush_interval: float = 0.05,
+        batch_size: int = 256,
+        max_pending: int = 10000
+    ):
+        self.commit = commit
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        
+        self._queue: Deque[PendingWrite] = deque()
+        self._users: Counter = Counter()  # queued or committing writes per user, and global ones
+        self._submitted = 0
+        self._committed = 0
+        self._flush_requested = False
+        self._closed = False
+        self._cond = threading.Condition()
+        
+        self.batches = 0
+        self.largest_batch = 0
+        self.blocked = 0
+        self.failures = 0
+        
+        self._thread = threading.Thread(target=self._run, name="ocmem-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+    
+    def submit(self, memory: Memory, merge_similar: bool = True):
+        """Queue an add; blocks while `max_pending` writes are outstanding"""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Write-behind queue is closed")
+            if self._submitted - self._committed >= self.max_pending:
+                self.blocked += 1
+                metrics.incr("write_behind.blocked")
+                self._flush_requested = True
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: self._submitted - self._committed < self.max_pending)
+            
+            self._queue.append((memory, merge_similar))
+            for key in self._keys(memory):
+                self._users[key] += 1
+            self._submitted += 1
+            self._cond.notify_all()
+    
+    def flush(self, timeout: float = None) -> bool:
+        """Commit everything submitted so far; False if `timeout` ran out first"""
+        with self._cond:
+            target = self._submitted
+            if self._committed >= target:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._committed >= target, timeout)
+    
+    @staticmethod
+    def _keys(memory: Memory) -> Tuple:
+        """Whose reads a queued write must be committed before"""
+        return (memory.user_id, _GLOBAL) if memory.visibility == "global" else (memory.user_id,)
+    
+    def wait_for_user(self, user_id: Optional[str], timeout: float = None) -> bool:
+        """Return once none of the user's or any global writes are outstanding (flushing them if needed)"""
+        def settled():
+            return not self._users.get(user_id) and not self._users.get(_GLOBAL)
+        
+        if settled():
+            return True
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(settled, timeout)
+    
+    def pending(self) -> int:
+        return self._submitted - self._committed
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                
+                # Let the group grow unless it is full or someone is waiting on it
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._queue) < self.batch_size and not (self._flush_requested or self._closed):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                if not self._queue:
+                    self._flush_requested = False
+            
+            self._commit(batch)
+            
+            with self._cond:
+                self._committed += len(batch)
+                for memory, _ in batch:
+                    for key in self._keys(memory):
+                        self._users[key] -= 1
+                        if not self._users[key]:
+                            del self._users[key]
+                self.batches += 1
+                self.largest_batch = max(self.largest_batch, len(batch))
+                self._cond.notify_all()
+    
+    def _commit(self, batch: List[PendingWrite]):
+        try:
+            with metrics.span("write_behind.commit", writes=len(batch)):
+                self.commit(batch)
+            return
+        except Exception:
+            logger.exception("Group commit of %d writes failed; retrying them one at a time", len(batch))
+        
+        # Keep one bad write from taking the rest of its group with it
+        for write in batch:
+            try:
+                self.commit([write])
+            except Exception:
+                logger.exception("Dropping write of memory %s", write[0].id)
+                self.failures += 1
+                metrics.incr("write_behind.failures")
+    
+    def close(self, timeout: float = None):
+        """Flush outstanding writes and stop the writer"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+    
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "pending": self._submitted - self._committed,
+                "submitted": self._submitted,
+                "committed": self._committed,
+                "batches": self.batches,
+                "mean_batch": self._committed / self.batches if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+                "blocked": self.blocked,
+                "failures": self.failures,
+            }
@@ -0,0 +1,92 @@
+"""Lightweight entity and keyphrase extraction for the entity index"""
+
+import re
+from typing import Iterable, List
+
+# Common English words that never make useful lookup keys
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each else ever few for from
+further get got had has have having he her here hers herself him himself his how i if in into is
+it its itself just like likes love loves me more most my myself need no nor not now of off on once
+only or other our ours ourselves out over own prefer prefers really same she should so some still
+such than that the their theirs them themselves then there these they this those through to too
+under until up use used uses user very want wants was we were what when where which while who whom
+why will with would you your yours yourself yourselves
+""".split())
+
+_TOKEN = re.compile(r"[A-Za-z0-9][A-Za-z0-9'&.-]*[A-Za-z0-9]|[A-Za-z0-9]")
+_PHRASE = re.compile(r"\b[A-Z][\w'&-]*(?:\s+(?:of|de|la|von|van|the)?\s*[A-Z][\w'&-]*)+")
+_QUOTED = re.compile(r"\"([^\"]{2,60})\"")
+
+MAX_ENTITIES = 32
+
+
+def normalize_entity(name: str) -> str:
+    """
+    Canonical form of an entity name, used both when indexing and when looking up
+    
+    Lowercases, drops possessives and surrounding punctuation, and strips a
+    plural "s" from single words ("Peanuts" and "peanut" are the same key).
+    """
+    words = [w.strip(".,;:!?()[]{}'\"") for w in name.lower().split()]
+    words = [w[:-2] if w.endswith("'s") else w for w in words if w]
+    if len(words) == 1:
+        word = words[0]
+        if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+            word = word[:-1]
+        return word
+    return " ".join(words)
+
+
+def extract_entities(text: str, limit: int = MAX_ENTITIES) -> List[str]:
+    """
+    Entity keys for a piece of text, in order of appearance
+    
+    Multi-word proper names ("San Francisco") and quoted phrases are kept
+    whole; every other word that is not a stopword becomes a keyword key.
+    """
+    keys = []
+    seen = set()
+    
+    def add(candidate: str):
+        key = normalize_entity(candidate)
+        if len(key) >= 3 and key not in STOPWORDS and not key.isdigit() and key not in seen:
+            seen.add(key)
+            keys.append(key)
+    
+    for match in _QUOTED.finditer(text):
+        add(match.group(1))
+    for match in _PHRASE.finditer(text):
+        words = match.group(0).split()
+        while words and words[0].lower() in STOPWORDS:
+            words = words[1:]
+        if len(words) > 1:
+            add(" ".join(words))
+    for match in _TOKEN.finditer(text):
+        add(match.group(0))
+    
+    return keys[:limit]
+
+
+def memory_entities(content: str, metadata: dict = None) -> List[str]:
+    """Keys to index for a memory: extractor-supplied `metadata["entities"]` first, then the content's"""
+    keys = []
+    for name in (metadata or {}).get("entities") or ():
+        key = normalize_entity(str(name))
+        if key and key not in keys:
+            keys.append(key)
+    for key in extract_entities(content):
+        if key not in keys:
+            keys.append(key)
+    return keys[:MAX_ENTITIES]
+
+
+def normalize_entities(names: Iterable[str]) -> List[str]:
+    """Normalize lookup names, dropping empties and duplicates"""
+    keys = []
+    for name in names:
+        key = normalize_entity(name)
+        if key and key not in keys:
+            keys.append(key)
+    return keys
@@ -17,21 +17,23 @@ For each memory, provide:
 - category: One of [preference, fact, task, general]
 - importance: Score 0.0-1.0 (how important is this to remember)
 - confidence: Score 0.0-1.0 (how certain are you about this)
+- entities: The people, places, products and topics it mentions
 
 Conversation:
 {conversation}
 
 Respond in JSON format:
-{
+{{
   "memories": [
-    {
+    {{
       "content": "...",
       "category": "preference|fact|task|general",
       "importance": 0.8,
-      "confidence": 0.9
-    }
+      "confidence": 0.9,
+      "entities": ["..."]
+    }}
   ]
-}"""
+}}"""
 
 
 class LLMMemoryExtractor:
@@ -1,12 +1,60 @@
 """Core memory interface for OC-Mem"""
 
+import copy
+import heapq
+import itertools
 import json
 import hashlib
+from concurrent.futures import Future
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import Callable, List, Dict, Optional, Any, Set, Tuple
 from dataclasses import dataclass, asdict
 
 from .config import MemoryConfig
+from .metrics import metrics
+
+# Who can read a memory: only the agent that wrote it (private), every agent
+# of its user (shared) or every user and agent (global). Memories written
+# before visibility existed are shared.
+VISIBILITIES = ("private", "shared", "global")
+DEFAULT_VISIBILITY = "shared"
+
+# Fields each visibility partitions memories by: a private memory belongs to
+# one (user, agent), a shared one to a user, a global one to everybody
+SCOPE_FIELDS = {"private": ("user_id", "agent_id"), "shared": ("user_id",), "global": ()}
+
+
+def scope_partition(scope: str, user_id: Optional[str], agent_id: Optional[str]) -> Tuple[Optional[str], Dict]:
+    """
+    (user_id, filters) selecting what `scope` lets `agent_id` of `user_id` read
+    
+    Scopes are the visibilities: the agent's private memories, the user's
+    shared ones and everybody's global ones. A None user_id means every
+    user, as everywhere else in the stores.
+    """
+    if scope not in VISIBILITIES:
+        raise ValueError(f"Unknown scope {scope!r}; use one of {VISIBILITIES}")
+    filters = {"visibility": scope}
+    if scope == "private":
+        filters["agent_id"] = agent_id
+    return (None if scope == "global" else user_id), filters
+
+
+def partition_key(visibility: Optional[str], user_id: Optional[str], agent_id: Optional[str]) -> Tuple:
+    """Key of the scope partition a memory with these fields falls in"""
+    visibility = visibility or DEFAULT_VISIBILITY
+    values = {"user_id": user_id, "agent_id": agent_id}
+    return (visibility,) + tuple(values[field] for field in SCOPE_FIELDS[visibility])
+
+
+def merge_ranked(ranked: List[List], limit: int, key: Callable) -> List:
+    """
+    Best `limit` rows of several lists, each already sorted best-first by `key`
+    
+    A heap merge, so only the heads of the lists are compared; the lists
+    are disjoint partitions (scopes, shards) of one result.
+    """
+    return list(itertools.islice(heapq.merge(*ranked, key=key, reverse=True), limit))
 
 
 @dataclass
@@ -22,8 +70,13 @@ class Memory:
     created_at: str = None
     updated_at: str = None
     metadata: Dict[str, Any] = None
+    visibility: str = DEFAULT_VISIBILITY
     
     def __post_init__(self):
+        if self.visibility is None:
+            self.visibility = DEFAULT_VISIBILITY
+        elif self.visibility not in VISIBILITIES:
+            raise ValueError(f"Unknown visibility {self.visibility!r}; use one of {VISIBILITIES}")
         if self.created_at is None:
             self.created_at = datetime.now().isoformat()
         if self.updated_at is None:
@@ -46,6 +99,11 @@ class Memory:
         return cls(**data)
 
 
+def _keyword_rank(row: Dict) -> Tuple:
+    """Order of long-term search results, for merging per-partition lists"""
+    return row.get("importance", 0.5), row.get("updated_at", "")
+
+
 class OpenClawMemory:
     """Main memory interface for OpenClaw"""
     
@@ -54,17 +112,75 @@ class OpenClawMemory:
         self.agent_id = agent_id
         self.config = config or MemoryConfig()
         
+        # Process-wide metrics registry (see core/metrics.py)
+        self.metrics = metrics
+        if self.config.metrics_enabled:
+            metrics.configure(enabled=True, slow_threshold_ms=self.config.slow_op_threshold_ms)
+        
         # Initialize backends
         self._init_backends()
     
     def _init_backends(self):
         """Initialize storage backends"""
-        from ..backends.sqlite_backend import SQLiteBackend
-        from ..backends.vector_backend import VectorBackend
+        from ..backends.registry import create_long_term_backend, create_vector_store
+        from .compaction import MemoryCompactor
+        
+        self.long_term = create_long_term_backend(self.config)
+        self.vector_store = create_vector_store(self.config) if self.config.use_vector else None
+        
+        self.short_term = None
+        if self.config.redis_url:
+            from ..backends.redis_backend import RedisBackend, CachedBackend, get_client
+            
+            client = get_client(self.config.redis_url, max_connections=self.config.redis_max_connections)
+            if self.config.use_short_term:
+                self.short_term = RedisBackend(
+                    ttl=self.config.short_term_ttl,
+                    prefix=self.config.redis_prefix,
+                    client=client
+                )
+            if self.config.cache_long_term:
+                self.long_term = CachedBackend(
+                    self.long_term,
+                    client,
+                    ttl=self.config.cache_ttl,
+                    prefix=f"{self.config.redis_prefix}:cache"
+                )
+        
+        self.search_cache = None
+        if self.config.search_cache_size > 0:
+            from .search_cache import SearchCache
+            self.search_cache = SearchCache(self.config.search_cache_size, self.config.search_cache_ttl)
+        
+        # Created by the first prefetch_session()
+        self.prefetcher = None
         
-        self.long_term = SQLiteBackend(self.config.long_term_path)
-        self.vector_store = VectorBackend(self.config.vector_path) if self.config.use_vector else None
+        # Thread pool for query-aware get_context() (threads start on first use)
+        from .context import ContextRetriever
+        self.retriever = ContextRetriever()
+        
+        # With write_behind, add() only enqueues and this thread group-commits
+        self.writer = None
+        if self.config.write_behind:
+            from .write_behind import WriteBehindQueue
+            self.writer = WriteBehindQueue(
+                self._commit_writes,
+                flush_interval=self.config.write_flush_interval,
+                batch_size=self.config.write_batch_size,
+                max_pending=self.config.write_max_pending
+            )
+        
+        # Decay and eviction change rankings, so they flush the caches
+        self.compactor = MemoryCompactor(
+            self.long_term,
+            self.vector_store,
+            self.config,
+            on_change=self._clear_caches
+        )
+        if self.config.compaction_interval > 0:
+            self.compactor.start()
     
+    @metrics.timed("add")
     def add(
         self,
         content: str,
@@ -72,7 +188,9 @@ class OpenClawMemory:
         importance: float = 0.5,
         session_id: str = None,
         metadata: Dict = None,
-        merge_similar: bool = True
+        merge_similar: bool = True,
+        short_term: bool = False,
+        visibility: str = DEFAULT_VISIBILITY
     ) -> Memory:
         """
         Add a new memory
@@ -84,10 +202,16 @@ class OpenClawMemory:
             session_id: Optional session ID
             metadata: Additional metadata
             merge_similar: Whether to merge with similar existing memories
+            short_term: Keep only in the short-term store (expires after short_term_ttl)
+            visibility: private (this agent only), shared (every agent of
+                this user) or global (everybody)
         
         Returns:
-            Memory object
+            Memory object (under write_behind, queued: its ID is final unless
+            the writer merges it into a similar memory)
         """
+        if visibility == "private" and not self.agent_id:
+            raise ValueError("Private memories need a handle with an agent_id")
         memory = Memory(
             id=None,
             content=content,
@@ -96,12 +220,22 @@ class OpenClawMemory:
             session_id=session_id,
             category=category,
             importance=importance,
-            metadata=metadata or {}
+            metadata=metadata or {},
+            visibility=visibility
         )
         
+        if short_term and self.short_term:
+            self.short_term.add(memory)
+            return memory
+        
+        if self.writer:
+            # Merging, storage and cache invalidation happen in the group commit
+            self.writer.submit(memory, merge_similar)
+            return memory
+        
         # Check for similar memories if merge enabled
         if merge_similar:
-            similar = self._find_similar(content, threshold=0.85)
+            similar = self._find_similar(content, threshold=0.85, visibility=memory.visibility)
             if similar:
                 # Update existing memory
                 existing = similar[0]
@@ -109,6 +243,8 @@ class OpenClawMemory:
                 existing.importance = max(existing.importance, importance)
                 existing.updated_at = datetime.now().isoformat()
                 self.long_term.update(existing)
+                self._invalidate(existing.user_id, existing.visibility)
+                metrics.incr("merges")
                 return existing
         
         # Store in long-term memory
@@ -118,15 +254,20 @@ class OpenClawMemory:
         if self.vector_store:
             self.vector_store.add(memory)
         
+        self._invalidate(memory.user_id, memory.visibility)
         return memory
     
+    @metrics.timed("search")
     def search(
         self,
         query: str,
         category: str = None,
         limit: int = 5,
         semantic: bool = True,
-        threshold: float = 0.7
+        threshold: float = 0.7,
+        filters: Dict = None,
+        entities: List[str] = None,
+        scopes: List[str] = None
     ) -> List[Dict]:
         """
         Search memories
@@ -137,76 +278,197 @@ class OpenClawMemory:
             limit: Max results
             semantic: Use semantic search (requires vector store)
             threshold: Minimum similarity score
+            filters: Extra filters: agent_id, session_id, created_after,
+                created_before, ids or "metadata.<key>" equality
+            entities: Only return memories that mention one of these entities
+            scopes: Visibilities to read: "private" (this agent's own),
+                "shared" (this user's), "global". Defaults to all three for
+                a handle with an agent_id, else every memory of the user
         
         Returns:
             List of matching memories with scores
         """
+        self._await_writes()
+        if entities:
+            filters = dict(filters or {}, entities=list(entities))
+        scopes = self._scopes(scopes)
+        
+        cache_key = None
+        if self.search_cache:
+            cache_key = self._cache_key(query, category, limit, semantic, threshold, filters, scopes)
+            cached = self.search_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        partitions = self._partitions(scopes, filters)
         results = []
         
         # Semantic search if enabled
-        if semantic and self.vector_store:
-            vector_results = self.vector_store.search(
-                query, 
-                user_id=self.user_id,
-                limit=limit,
-                threshold=threshold
-            )
-            results.extend(vector_results)
+        if semantic and self.vector_store and partitions:
+            results.extend(self._vector_search([query], category, limit, threshold, partitions)[0])
         
         # Keyword search fallback
-        if not results:
-            keyword_results = self.long_term.search(
-                query,
-                user_id=self.user_id,
-                category=category,
-                limit=limit
-            )
-            results.extend(keyword_results)
+        fell_back = not results
+        if fell_back:
+            results.extend(self._keyword_search(query, category, limit, partitions))
+        
+        # The entity index already narrowed the candidates; fall back to them by importance
+        if not results and entities:
+            results.extend(self._keyword_search("", category, limit, partitions))
         
         # Sort by importance and recency
         results.sort(key=lambda x: (x.get("importance", 0.5), x.get("created_at", "")), reverse=True)
         
+        # Fallback results depend on the query as typed, which a semantic (normalized) key does not capture
+        if cache_key and not (fell_back and semantic and self.vector_store):
+            self.search_cache.put(cache_key, results[:limit])
+        
         return results[:limit]
     
+    @metrics.timed("search_many")
+    def search_many(
+        self,
+        queries: List[str],
+        category: str = None,
+        limit: int = 5,
+        semantic: bool = True,
+        threshold: float = 0.7,
+        filters: Dict = None,
+        scopes: List[str] = None
+    ) -> List[List[Dict]]:
+        """
+        Search several queries at once
+        
+        Returns what calling search() for each query would, but embeds all
+        queries in one batch, runs one matrix search over the vector index
+        and does the keyword fallbacks in one long-term store round-trip.
+        
+        Args:
+            queries: Search queries
+            category: Filter by category
+            limit: Max results per query
+            semantic: Use semantic search (requires vector store)
+            threshold: Minimum similarity score
+            filters: Extra filters, as for search()
+            scopes: Visibilities to read, as for search()
+        
+        Returns:
+            One list of matching memories per query, in query order
+        """
+        self._await_writes()
+        scopes = self._scopes(scopes)
+        if not self.search_cache:
+            return self._search_many(queries, category, limit, semantic, threshold, filters, scopes)[0]
+        
+        keys = [self._cache_key(q, category, limit, semantic, threshold, filters, scopes) for q in queries]
+        results = [self.search_cache.get(key) for key in keys]
+        
+        pending = [i for i, rows in enumerate(results) if rows is None]
+        if pending:
+            computed, fell_back = self._search_many(
+                [queries[i] for i in pending], category, limit, semantic, threshold, filters, scopes
+            )
+            normalized = semantic and self.vector_store
+            for n, (i, rows) in enumerate(zip(pending, computed)):
+                if not (normalized and n in fell_back):
+                    self.search_cache.put(keys[i], rows)
+                results[i] = rows
+        
+        return results
+    
+    def _search_many(
+        self,
+        queries: List[str],
+        category: Optional[str],
+        limit: int,
+        semantic: bool,
+        threshold: float,
+        filters: Optional[Dict],
+        scopes: Optional[Tuple[str, ...]]
+    ) -> Tuple[List[List[Dict]], Set[int]]:
+        """Results per query, and the positions of the queries answered by the keyword fallback"""
+        partitions = self._partitions(scopes, filters)
+        results = [[] for _ in queries]
+        
+        if semantic and self.vector_store and queries and partitions:
+            results = self._vector_search(queries, category, limit, threshold, partitions)
+        
+        # Keyword fallback for the queries without semantic hits
+        missing = [i for i, rows in enumerate(results) if not rows]
+        if missing and partitions:
+            per_partition = [
+                self.long_term.search_many(
+                    [queries[i] for i in missing],
+                    user_id=user_id,
+                    category=category,
+                    limit=limit,
+                    filters=partition_filters
+                )
+                for user_id, partition_filters in partitions
+            ]
+            for n, i in enumerate(missing):
+                results[i] = merge_ranked([rows[n] for rows in per_partition], limit, key=_keyword_rank)
+        
+        for rows in results:
+            rows.sort(key=lambda x: (x.get("importance", 0.5), x.get("created_at", "")), reverse=True)
+        
+        return [rows[:limit] for rows in results], set(missing)
+    
+    @metrics.timed("get_context")
     def get_context(
         self,
         session_id: str = None,
         max_tokens: int = 2000,
-        categories: List[str] = None
-    ) -> str:
+        categories: List[str] = None,
+        scopes: List[str] = None,
+        query: str = None,
+        latency_budget_ms: float = None,
+        return_report: bool = False
+    ):
         """
         Get relevant context for current session
         
+        Without a query: the session's recent memories and the user's top
+        preferences, by importance. With one, vector, keyword (entity
+        overlap) and recency retrieval run concurrently, and memories are
+        ranked by their combined score (see core/context.py).
+        
         Args:
             session_id: Current session ID
             max_tokens: Maximum context tokens
             categories: Specific categories to include
+            scopes: Visibilities to read, as for search()
+            query: The current user message, to rank memories by relevance to it
+            latency_budget_ms: Time allowed for query retrieval (default
+                context_latency_budget_ms); stages that would overrun it are
+                skipped or abandoned
+            return_report: Also return a report of which stages ran
         
         Returns:
-            Formatted context string
+            Formatted context string, or (context, report) with return_report
         """
-        # Get recent session memories
-        memories = self.long_term.get_recent(
-            user_id=self.user_id,
-            session_id=session_id,
-            limit=20
-        )
+        self._await_writes()
         
-        # Get high-importance user preferences
-        preferences = self.long_term.get_by_category(
-            user_id=self.user_id,
-            category="preference",
-            min_importance=0.7,
-            limit=10
-        )
-        
-        # Combine and deduplicate
-        all_memories = {m.id: m for m in preferences + memories}
-        sorted_memories = sorted(
-            all_memories.values(),
-            key=lambda m: (m.importance, m.updated_at),
-            reverse=True
-        )
+        if query:
+            if latency_budget_ms is None:
+                latency_budget_ms = self.config.context_latency_budget_ms
+            sorted_memories, report = self.retriever.retrieve(
+                self._context_stages(query, session_id, scopes),
+                budget_ms=latency_budget_ms
+            )
+            if categories:
+                sorted_memories = [m for m in sorted_memories if m.category in categories]
+        else:
+            memories, preferences = self._context_rows(session_id, scopes)
+            
+            # Combine and deduplicate
+            all_memories = {m.id: m for m in preferences + memories}
+            sorted_memories = sorted(
+                all_memories.values(),
+                key=lambda m: (m.importance, m.updated_at),
+                reverse=True
+            )
+            report = {"stages": {"recent": "ran"}, "candidates": len(sorted_memories)}
         
         # Format as context string
         context_parts = []
@@ -223,8 +485,134 @@ class OpenClawMemory:
             context_parts.append(mem_str)
             current_tokens += mem_tokens
         
-        return "\n".join(context_parts) if context_parts else ""
+        context = "\n".join(context_parts) if context_parts else ""
+        return (context, report) if return_report else context
+    
+    def _context_rows(
+        self,
+        session_id: Optional[str],
+        scopes: Optional[List[str]]
+    ) -> Tuple[List[Memory], List[Memory]]:
+        """Recent session memories (newest first) and high-importance preferences, warm if prefetched"""
+        # Prefetches read the default scopes
+        rows = None
+        if self.prefetcher and scopes is None:
+            rows = self.prefetcher.get(self.user_id, session_id, self.agent_id)
+        if rows is None:
+            rows = self._session_rows(self.user_id, session_id, self.agent_id, self._scopes(scopes))
+        memories = list(rows["recent"])
+        
+        # Session scratch memories from the short-term store
+        if self.short_term:
+            memories += self.short_term.get_recent(
+                user_id=self.user_id,
+                session_id=session_id,
+                limit=20
+            )
+        return memories, rows["preferences"]
+    
+    def _context_stages(self, query: str, session_id: Optional[str], scopes: Optional[List[str]]) -> Dict:
+        """Retrieval stages for a query-aware get_context(), each scoring its candidates in [0, 1]"""
+        from ..extractors.entities import extract_entities, memory_entities
+        from .context import keyword_scores
+        
+        partitions = self._partitions(self._scopes(scopes), None)
+        limit = self.config.context_candidates
+        keys = set(extract_entities(query))
+        
+        def recent():
+            memories, preferences = self._context_rows(session_id, scopes)
+            # Newest first, so the score falls off with position
+            scored = [(m, 1.0 - i / len(memories)) for i, m in enumerate(memories)]
+            return scored + [(m, 0.0) for m in preferences]
+        
+        def keyword():
+            # The entity index ranks memories by how many of the query's keys they share
+            memories = [
+                m for u, f in partitions
+                for m in self.long_term.get_by_entity(list(keys), user_id=u, limit=limit, filters=f)
+            ]
+            return keyword_scores(keys, [(m, memory_entities(m.content, m.metadata)) for m in memories])
+        
+        def vector():
+            hits = self._vector_hits([query], None, limit, self.config.context_min_similarity, partitions)[0]
+            found = {m.id: m for m in self.long_term.get_many([h["id"] for h in hits]) if m}
+            return [(found[h["id"]], min(1.0, h["score"])) for h in hits if h["id"] in found]
+        
+        stages = {"recent": recent}
+        if keys and partitions:
+            stages["keyword"] = keyword
+        if self.vector_store and partitions:
+            stages["vector"] = vector
+        return stages
+    
+    def prefetch_session(self, user_id: str = None, session_id: str = None, agent_id: str = None) -> Future:
+        """
+        Warm everything a session's first turn reads, in the background
+        
+        Loads the encoder and the user's vector partition, and fetches the
+        rows get_context() reads: the recent session rows and the top
+        preferences. The next get_context() for the session is served from
+        them; see `prefetcher.stats()` for the hit rate.
+        
+        Args:
+            user_id: User to warm (defaults to this instance's user)
+            session_id: Session that is about to start
+            agent_id: Agent whose scopes to fetch (defaults to this instance's agent)
+        
+        Returns:
+            Future that resolves once the prefetch is done
+        """
+        self._ensure_prefetcher()
+        return self.prefetcher.prefetch(user_id or self.user_id, session_id, agent_id or self.agent_id)
+    
+    def _ensure_prefetcher(self):
+        if self.prefetcher is None:
+            from .prefetch import SessionPrefetcher
+            self.prefetcher = SessionPrefetcher(self._prefetch_rows, ttl=self.config.prefetch_ttl)
+    
+    def _session_rows(
+        self,
+        user_id: Optional[str],
+        session_id: Optional[str],
+        agent_id: Optional[str],
+        scopes: Optional[Tuple[str, ...]]
+    ) -> Dict[str, List[Memory]]:
+        """Long-term rows get_context() builds on, merged across the scope partitions"""
+        partitions = self._partitions(scopes, None, user_id, agent_id)
+        return {
+            "recent": merge_ranked(
+                [
+                    self.long_term.get_recent(user_id=u, session_id=session_id, limit=20, filters=f)
+                    for u, f in partitions
+                ],
+                20,
+                key=lambda m: m.updated_at
+            ),
+            "preferences": self._top_in_category(partitions, "preference"),
+        }
     
+    def _top_in_category(self, partitions: List[Tuple[Optional[str], Optional[Dict]]], category: str) -> List[Memory]:
+        return merge_ranked(
+            [
+                self.long_term.get_by_category(user_id=u, category=category, min_importance=0.7, limit=10, filters=f)
+                for u, f in partitions
+            ],
+            10,
+            key=lambda m: (m.importance, m.updated_at)
+        )
+    
+    def _prefetch_rows(
+        self,
+        user_id: Optional[str],
+        session_id: Optional[str],
+        agent_id: Optional[str]
+    ) -> Dict[str, List[Memory]]:
+        if self.vector_store:
+            self.vector_store.warm(user_id)
+        return self._session_rows(user_id, session_id, agent_id, self._scopes(None, agent_id))
+    
+    @metrics.timed("extract_from_conversation")
     def extract_from_conversation(
         self,
         messages: List[Dict[str, str]],
@@ -261,14 +649,52 @@ class OpenClawMemory:
                 content=item["content"],
                 category=item["category"],
                 importance=item.get("importance", 0.5),
-                metadata=item.get("metadata", {})
+                metadata=self._with_entities(item)
             )
             memories.append(mem)
         
         return memories
     
+    @metrics.timed("get_by_entity")
+    def get_by_entity(self, entities: List[str], limit: int = 10) -> List[Memory]:
+        """
+        Memories that mention any of `entities`
+        
+        Served from the entity index, ranked by how many of the entities a
+        memory mentions, then importance and recency.
+        """
+        self._await_writes()
+        return self.long_term.get_by_entity(entities, user_id=self.user_id, limit=limit)
+    
+    def iter_memories(
+        self,
+        filters: Dict = None,
+        order: str = "created_at",
+        batch_size: int = 500,
+        cursor: str = None
+    ):
+        """
+        Stream this user's memories (every user's if user_id is None)
+        
+        Args:
+            filters: Same keys as search()
+            order: created_at, updated_at or importance; prefix - for descending
+            batch_size: Rows read per query; only one batch is held in memory
+            cursor: A previous scan's `cursor`, to resume after its last memory
+        
+        Returns:
+            MemoryScan: iterate for memories, .batches() for lists, .cursor to resume
+        """
+        if not hasattr(self.long_term, "iter_memories"):
+            raise NotImplementedError(f"{type(self.long_term).__name__} does not support streaming scans")
+        self._await_writes()
+        return self.long_term.iter_memories(self.user_id, filters, order, batch_size, cursor)
+    
+    @metrics.timed("update")
     def update(self, memory_id: str, content: str = None, metadata: Dict = None) -> Optional[Memory]:
         """Update an existing memory"""
+        if self.writer:
+            self.writer.flush()
         memory = self.long_term.get(memory_id)
         if not memory:
             return None
@@ -280,27 +706,343 @@ class OpenClawMemory:
         
         memory.updated_at = datetime.now().isoformat()
         self.long_term.update(memory)
+        self._invalidate(memory.user_id, memory.visibility)
         
         return memory
     
+    @metrics.timed("delete")
     def delete(self, memory_id: str = None, filters: Dict = None) -> int:
         """Delete memories by ID or filters"""
+        if self.writer:
+            self.writer.flush()
         if memory_id:
+            if self.search_cache or self.prefetcher:
+                memory = self.long_term.get(memory_id)
+                if memory:
+                    self._invalidate(memory.user_id, memory.visibility)
+                else:
+                    self._invalidate(self.user_id)
+            if self.vector_store:
+                self.vector_store.delete_many([memory_id])
             return self.long_term.delete(memory_id)
         elif filters:
-            return self.long_term.delete_by_filters(filters)
+            # Chunked, so a large purge never holds the write lock for long;
+            # each committed chunk is tombstoned in the vector index as it goes
+            deleted = self.long_term.delete_by_filters(
+                filters,
+                chunk_size=self.config.delete_chunk_size,
+                on_chunk=self.vector_store.delete_many if self.vector_store else None
+            )
+            if "user_id" in filters:
+                self._invalidate(filters["user_id"])
+            else:
+                self._clear_caches()
+            return deleted
         return 0
     
-    def _find_similar(self, content: str, threshold: float = 0.85) -> List[Memory]:
-        """Find similar existing memories"""
+    def compact(self):
+        """
+        Run one bounded compaction tick
+        
+        Decays importance and evicts the lowest-scoring memories of users
+        over `max_memories_per_user` (see MemoryConfig compaction options).
+        
+        Returns:
+            CompactionStats for the tick
+        """
+        return self.compactor.run_once()
+    
+    def snapshot(self, dest: str, incremental: bool = True) -> Dict:
+        """
+        Take an online snapshot of the store while it stays writable
+        
+        Args:
+            dest: Snapshot directory; restore with Snapshotter.restore or `openmemory restore`
+            incremental: Ship only what changed since the latest snapshot in `dest`
+        
+        Returns:
+            Snapshot manifest
+        """
+        from .snapshot import Snapshotter
+        if self.writer:
+            self.writer.flush()
+        return Snapshotter(self.config).create(dest, incremental=incremental)
+    
+    def for_user(self, user_id: str = None, agent_id: str = None) -> "OpenClawMemory":
+        """
+        A handle for another user (and agent) over this instance's stores
+        
+        Shares the backends, caches and background workers, so one process
+        can serve many users with each store opened once. Close only the
+        original instance.
+        """
+        # Created up front so every handle sees the others' invalidations
+        self._ensure_prefetcher()
+        view = copy.copy(self)
+        view.user_id = user_id
+        view.agent_id = agent_id
+        return view
+    
+    def close(self):
+        """Flush queued writes and stop background workers"""
+        if self.writer:
+            self.writer.close()
+        self.compactor.stop()
+        self.retriever.close()
+        if self.prefetcher:
+            self.prefetcher.close()
+    
+    def _cache_key(self, query, category, limit, semantic, threshold, filters, scopes):
+        return self.search_cache.key(
+            self.user_id,
+            query,
+            # Without a vector search, results come from LIKE on the query as typed
+            exact=not (semantic and self.vector_store),
+            agent_id=self.agent_id,
+            scopes=scopes,
+            category=category,
+            limit=limit,
+            semantic=semantic,
+            threshold=threshold,
+            filters=filters or {}
+        )
+    
+    def _scopes(self, scopes: Optional[List[str]], agent_id: Optional[str] = None) -> Optional[Tuple[str, ...]]:
+        """
+        The visibilities a read covers; None reads the user's memories unscoped
+        
+        A handle with an agent defaults to every scope, one without keeps
+        reading all of its user's memories as before visibility existed.
+        """
+        if scopes is None:
+            return VISIBILITIES if (agent_id or self.agent_id) else None
+        unknown = [s for s in scopes if s not in VISIBILITIES]
+        if unknown:
+            raise ValueError(f"Unknown scopes {unknown}; use some of {VISIBILITIES}")
+        return tuple(s for s in VISIBILITIES if s in scopes)
+    
+    def _partitions(
+        self,
+        scopes: Optional[Tuple[str, ...]],
+        filters: Optional[Dict],
+        user_id: Optional[str] = None,
+        agent_id: Optional[str] = None
+    ) -> List[Tuple[Optional[str], Optional[Dict]]]:
+        """
+        (user_id, filters) per scope partition a read covers
+        
+        Each scope maps to one indexed partition (see base.scope_partition).
+        A scope whose fixed fields contradict `filters` cannot match and is
+        left out; so is "private" for a handle without an agent.
+        """
+        user_id = user_id if user_id is not None else self.user_id
+        agent_id = agent_id if agent_id is not None else self.agent_id
+        if scopes is None:
+            return [(user_id, filters)]
+        
+        partitions = []
+        for scope in scopes:
+            if scope == "private" and not agent_id:
+                continue
+            scope_user, scope_filters = scope_partition(scope, user_id, agent_id)
+            if any(k in (filters or {}) and filters[k] != v for k, v in scope_filters.items()):
+                continue
+            partitions.append((scope_user, dict(filters or {}, **scope_filters)))
+        return partitions
+    
+    def _vector_search(
+        self,
+        queries: List[str],
+        category: Optional[str],
+        limit: int,
+        threshold: float,
+        partitions: List[Tuple[Optional[str], Optional[Dict]]]
+    ) -> List[List[Dict]]:
+        """Vector hits per query, top `limit` by score across the partitions"""
+        return self._resolve_content(self._vector_hits(queries, category, limit, threshold, partitions))
+    
+    def _vector_hits(
+        self,
+        queries: List[str],
+        category: Optional[str],
+        limit: int,
+        threshold: float,
+        partitions: List[Tuple[Optional[str], Optional[Dict]]]
+    ) -> List[List[Dict]]:
+        """_vector_search() without the content lookup (hits may lack content)"""
+        searches = [(u, self._vector_filters(category, f, u)) for u, f in partitions]
+        if len(searches) > 1 and hasattr(self.vector_store, "search_partitions"):
+            return self.vector_store.search_partitions(queries, searches, limit=limit, threshold=threshold)
+        
+        per_partition = [
+            self.vector_store.search_many(queries, user_id=u, limit=limit, threshold=threshold, filters=f)
+            for u, f in searches
+        ]
+        return [
+            merge_ranked([rows[i] for rows in per_partition], limit, key=lambda r: r["score"])
+            for i in range(len(queries))
+        ]
+    
+    def _keyword_search(
+        self,
+        query: str,
+        category: Optional[str],
+        limit: int,
+        partitions: List[Tuple[Optional[str], Optional[Dict]]]
+    ) -> List[Dict]:
+        return merge_ranked(
+            [self.long_term.search(query, user_id=u, category=category, limit=limit, filters=f) for u, f in partitions],
+            limit,
+            key=_keyword_rank
+        )
+    
+    @staticmethod
+    def _with_entities(item: Dict) -> Dict:
+        """Metadata for an extracted memory, carrying the extractor's entities for the index"""
+        metadata = dict(item.get("metadata") or {})
+        if item.get("entities"):
+            metadata["entities"] = list(item["entities"])
+        return metadata
+    
+    def flush(self, timeout: float = None) -> bool:
+        """Commit writes queued under write_behind (no-op otherwise); False on timeout"""
+        return self.writer.flush(timeout) if self.writer else True
+    
+    def _await_writes(self):
+        """Read-your-writes under write_behind: wait for this user's and any global queued adds"""
+        if self.writer:
+            self.writer.wait_for_user(self.user_id)
+    
+    def _commit_writes(self, batch: List[Tuple[Memory, bool]]):
+        """
+        Group commit for the write-behind queue (runs on the writer thread)
+        
+        Similarity merges are looked up with one search_many per scope
+        partition; the remaining memories go to each store in one add_many.
+        """
+        merged = set()
+        candidates: Dict[Tuple, List[Memory]] = {}
+        for memory, merge_similar in batch:
+            if merge_similar and self.vector_store:
+                key = partition_key(memory.visibility, memory.user_id, memory.agent_id)
+                candidates.setdefault(key, []).append(memory)
+        
+        for memories in candidates.values():
+            user_id, filters = scope_partition(memories[0].visibility, memories[0].user_id, memories[0].agent_id)
+            hits = self.vector_store.search_many(
+                [m.content for m in memories], user_id=user_id, limit=1, threshold=0.85, filters=filters
+            )
+            found = self.long_term.get_many(list({r[0]["id"] for r in hits if r}))
+            existing = {m.id: m for m in found if m}
+            for memory, results in zip(memories, hits):
+                target = existing.get(results[0]["id"]) if results else None
+                if target is None:
+                    continue
+                target.content = memory.content
+                target.importance = max(target.importance, memory.importance)
+                target.updated_at = datetime.now().isoformat()
+                self.long_term.update(target)
+                merged.add(memory.id)
+                metrics.incr("merges")
+        
+        new = [memory for memory, _ in batch if memory.id not in merged]
+        self.long_term.add_many(new)
+        if self.vector_store:
+            self.vector_store.add_many(new)
+        
+        if any(memory.visibility == "global" for memory, _ in batch):
+            self._clear_caches()
+            return
+        for user_id in {memory.user_id for memory, _ in batch}:
+            self._invalidate(user_id)
+    
+    def _invalidate(self, user_id: Optional[str], visibility: str = DEFAULT_VISIBILITY):
+        """Drop cached search results and prefetched rows of a user after a write"""
+        # Every user's reads may include a global memory
+        if visibility == "global":
+            self._clear_caches()
+            return
+        if self.search_cache:
+            self.search_cache.invalidate(user_id)
+        if self.prefetcher:
+            self.prefetcher.invalidate(user_id)
+    
+    def _clear_caches(self):
+        """Invalidate every user's cached results (compaction, unscoped bulk deletes)"""
+        if self.search_cache:
+            self.search_cache.clear()
+        if self.prefetcher:
+            self.prefetcher.clear()
+    
+    def _resolve_content(self, results: List[List[Dict]]) -> List[List[Dict]]:
+        """
+        Fill in the content of vector hits from the long-term store
+        
+        Vector indexes keep no copy of the content by default; one get_many
+        covers every result list. Hits whose memory is gone are dropped.
+        """
+        missing = list({row["id"] for rows in results for row in rows if row.get("content") is None})
+        if not missing:
+            return [list(rows) for rows in results]
+        
+        found = {m.id: m.content for m in self.long_term.get_many(missing) if m}
+        resolved = []
+        for rows in results:
+            kept = []
+            for row in rows:
+                if row.get("content") is None:
+                    if row["id"] not in found:
+                        continue
+                    row = dict(row, content=found[row["id"]])
+                kept.append(row)
+            resolved.append(kept)
+        return resolved
+    
+    def _vector_filters(self, category: Optional[str], filters: Optional[Dict], user_id: Optional[str]) -> Dict:
+        """
+        Filters to push into the vector search
+        
+        The vector index knows category, agent, session and creation time.
+        Metadata and entity filters are resolved to candidate IDs by the
+        long-term store first (indexed generated columns and the entity
+        postings on SQLite).
+        """
+        def resolved(key: str) -> bool:
+            return key.startswith("metadata.") or key == "entities"
+        
+        vector_filters = {k: v for k, v in (filters or {}).items() if not resolved(k)}
+        if category:
+            vector_filters["category"] = category
+        
+        metadata_filters = {k: v for k, v in (filters or {}).items() if resolved(k)}
+        if metadata_filters:
+            if user_id:
+                metadata_filters["user_id"] = user_id
+            ids = self.long_term.filter_ids(metadata_filters)
+            if "ids" in vector_filters:
+                wanted = set(vector_filters["ids"])
+                ids = [i for i in ids if i in wanted]
+            vector_filters["ids"] = ids
+        
+        return vector_filters
+    
+    def _find_similar(
+        self,
+        content: str,
+        threshold: float = 0.85,
+        visibility: str = DEFAULT_VISIBILITY
+    ) -> List[Memory]:
+        """Find similar existing memories in the partition a new memory of `visibility` would join"""
         if not self.vector_store:
             return []
         
+        user_id, filters = scope_partition(visibility, self.user_id, self.agent_id)
         results = self.vector_store.search(
             content,
-            user_id=self.user_id,
+            user_id=user_id,
             limit=1,
-            threshold=threshold
+            threshold=threshold,
+            filters=filters
         )
         
         similar = []
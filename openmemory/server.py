@@ -0,0 +1,559 @@
+"""
+Local memory server and thin client
+
+One `MemoryServer` process owns the encoder, the vector indexes and the
+SQLite writer; agent processes talk to it through `MemoryClient`, which has
+the OpenClawMemory interface. Dozens of workers on a host then share one
+model and one index in RAM instead of loading their own.
+
+    openmemory serve /tmp/ocmem.sock
+
+    mem = MemoryClient("/tmp/ocmem.sock", user_id="alice")
+    mem.add("Prefers window seats", category="preference")
+    mem.search("seating")
+
+The wire protocol is one JSON object per line over a Unix socket (or TCP
+on localhost): `{"id", "method", "user_id", "agent_id", "args", "kwargs"}`
+answered by `{"id", "result"}` or `{"id", "error": {"type", "message"}}`.
+Memory objects travel as `{"__memory__": {...}}`.
+"""
+
+import inspect
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, is_dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .backends.base import MemoryScan
+from .core.config import MemoryConfig
+from .core.memory import Memory, OpenClawMemory
+from .core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# OpenClawMemory methods a client may call: every public one except for_user and
+# close, which MemoryClient implements on its own connection
+METHODS = frozenset({
+    "add", "search", "search_many", "get_context", "extract_from_conversation", "update",
+    "delete", "get_by_entity", "iter_memories", "prefetch_session", "flush", "compact", "snapshot",
+})
+
+# Methods that can run for seconds (purges, snapshots, compaction, LLM
+# extraction, draining the write queue, reading a scan page); they go to a
+# worker pool so searches queued behind them are not held up
+SLOW_METHODS = frozenset({"extract_from_conversation", "delete", "iter_memories", "flush", "compact", "snapshot"})
+
+_SEARCH = inspect.signature(OpenClawMemory.search)
+
+
+class RemoteError(Exception):
+    """An error raised by the server that has no local equivalent"""
+    
+    def __init__(self, type_name: str, message: str):
+        super().__init__(f"{type_name}: {message}")
+        self.type_name = type_name
+
+
+# Exceptions re-raised with their own type on the client
+_BUILTIN_ERRORS = {e.__name__: e for e in (ValueError, KeyError, TypeError, FileNotFoundError, NotImplementedError)}
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """
+    Socket family and address for "unix:/path", "/path.sock", "tcp://host:port" or "host:port"
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    if address.startswith("tcp://"):
+        address = address[len("tcp://"):]
+    elif "/" in address or ":" not in address:
+        return socket.AF_UNIX, address
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def _encode(value):
+    if isinstance(value, Memory):
+        return {"__memory__": value.to_dict()}
+    if is_dataclass(value):
+        return asdict(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not serializable")
+
+
+def _decode(obj: Dict):
+    if len(obj) == 1 and "__memory__" in obj:
+        return Memory.from_dict(obj["__memory__"])
+    return obj
+
+
+def dumps(message: Dict) -> bytes:
+    return json.dumps(message, default=_encode, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def loads(line: bytes) -> Dict:
+    return json.loads(line, object_hook=_decode)
+
+
+class _Call:
+    """A request waiting for the dispatcher"""
+    
+    __slots__ = ("request", "result", "error", "done")
+    
+    def __init__(self, request: Dict):
+        self.request = request
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+    
+    def finish(self, result=None, error: BaseException = None):
+        self.result = result
+        self.error = error
+        self.done.set()
+    
+    def response(self) -> Dict:
+        if self.error is not None:
+            return {"id": self.request.get("id"), "error": {"type": type(self.error).__name__, "message": str(self.error)}}
+        return {"id": self.request.get("id"), "result": self.result}
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128  # many agent processes connect at once on startup
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class MemoryServer:
+    """
+    Serves one OpenClawMemory to many local clients
+    
+    Connections are read on their own threads, and requests are handed to
+    a single dispatcher thread. Slow methods (SLOW_METHODS) are passed on
+    to a pool of `slow_workers` threads; everything else runs on the
+    dispatcher itself. The dispatcher drains whatever has queued up while
+    it was busy and batches it: searches that differ only in their query
+    text are answered by one search_many() (one encoder call, one matrix
+    search). `batch_window_ms` additionally holds the first request of a
+    batch back to collect more; at 0 a lone request never waits. Requests in
+    one batch are concurrent by construction, since each client connection
+    has at most one request in flight.
+    
+    Unix sockets are created with mode 0600, so only the owning user can
+    connect.
+    """
+    
+    def __init__(
+        self,
+        address: str,
+        config: MemoryConfig = None,
+        max_batch: int = 64,
+        batch_window_ms: float = 0.0,
+        slow_workers: int = 2
+    ):
+        self.address = address
+        self.memory = OpenClawMemory(config=config or MemoryConfig())
+        self.max_batch = max_batch
+        self.batch_window = batch_window_ms / 1000
+        self._workers = ThreadPoolExecutor(max_workers=slow_workers, thread_name_prefix="ocmem-slow")
+        
+        self._views: Dict[Tuple[Optional[str], Optional[str]], OpenClawMemory] = {}
+        self._views_lock = threading.Lock()
+        self._queue: "queue.Queue[_Call]" = queue.Queue()
+        self._stop = threading.Event()
+        self._dispatcher = None
+        self._server = None
+        
+        self.requests = 0
+        self.batches = 0
+        self.batched_searches = 0
+        self.largest_batch = 0
+        self.offloaded = 0
+        self.connections = 0
+    
+    # Dispatch
+    
+    def submit(self, request: Dict) -> _Call:
+        call = _Call(request)
+        self._queue.put(call)
+        return call
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                try:
+                    wait = deadline - time.monotonic()
+                    batch.append(self._queue.get(timeout=wait) if wait > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                self._execute(batch)
+            except Exception as e:  # never leave a client waiting
+                logger.exception("Memory server batch failed")
+                for call in batch:
+                    if not call.done.is_set():
+                        call.finish(error=e)
+    
+    def _execute(self, batch: List[_Call]):
+        self.requests += len(batch)
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        metrics.incr("server.requests", len(batch))
+        
+        searches: Dict[str, List[Tuple[_Call, Dict]]] = {}
+        for call in batch:
+            if call.request.get("method") in SLOW_METHODS:
+                self.offloaded += 1
+                self._workers.submit(self._execute_one, call)
+                continue
+            if call.request.get("method") == "search":
+                params = self._search_params(call.request)
+                if params is not None:
+                    query = params.pop("query")
+                    key = json.dumps([call.request.get("user_id"), call.request.get("agent_id"), params],
+                                     sort_keys=True, default=str)
+                    searches.setdefault(key, []).append((call, dict(params, query=query)))
+                    continue
+            self._execute_one(call)
+        
+        for group in searches.values():
+            if len(group) == 1:
+                self._execute_one(group[0][0])
+                continue
+            
+            call, params = group[0]
+            view = self._view(call.request)
+            # Everything but the query was part of the grouping key, so it is shared
+            options = {name: value for name, value in params.items() if name != "query"}
+            try:
+                with metrics.span("server.search_batch", size=len(group)):
+                    results = view.search_many([p["query"] for _, p in group], **options)
+            except Exception as e:
+                for call, _ in group:
+                    call.finish(error=e)
+                continue
+            
+            self.batched_searches += len(group)
+            metrics.incr("server.batched_searches", len(group))
+            for (call, _), rows in zip(group, results):
+                call.finish(rows)
+    
+    @staticmethod
+    def _search_params(request: Dict) -> Optional[Dict]:
+        """search() arguments with defaults filled in, or None if the call cannot be batched"""
+        try:
+            bound = _SEARCH.bind(None, *request.get("args", ()), **request.get("kwargs", {}))
+        except TypeError:
+            return None
+        bound.apply_defaults()
+        params = dict(bound.arguments)
+        params.pop("self")
+        # Entity searches have a fallback of their own that search_many() does not
+        if params.pop("entities"):
+            return None
+        return params
+    
+    def _execute_one(self, call: _Call):
+        request = call.request
+        method = request.get("method")
+        try:
+            if method == "server.stats":
+                result = self.stats()
+            elif method not in METHODS:
+                raise ValueError(f"Unknown method {method!r}")
+            else:
+                view = self._view(request)
+                result = getattr(view, method)(*request.get("args", ()), **request.get("kwargs", {}))
+                if isinstance(result, Future):
+                    result = None  # prefetch_session keeps running in the background
+                elif isinstance(result, MemoryScan):
+                    result = self._scan_page(result)
+        except Exception as e:
+            call.finish(error=e)
+        else:
+            call.finish(result)
+    
+    @staticmethod
+    def _scan_page(scan: MemoryScan) -> Dict:
+        """One batch of a scan and the cursor after it; the client asks again with that cursor"""
+        memories = next(scan.batches(), [])
+        return {"memories": memories, "cursor": scan.cursor}
+    
+    def _view(self, request: Dict) -> OpenClawMemory:
+        key = (request.get("user_id"), request.get("agent_id"))
+        with self._views_lock:
+            view = self._views.get(key)
+            if view is None:
+                view = self._views[key] = self.memory.for_user(*key)
+            return view
+    
+    # Transport
+    
+    def start(self):
+        """Start the dispatcher and listen in a background thread"""
+        family, address = parse_address(self.address)
+        server_ref = self
+        
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                server_ref.connections += 1
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = loads(line)
+                    except ValueError as e:
+                        response = {"id": None, "error": {"type": "ValueError", "message": f"Bad request: {e}"}}
+                    else:
+                        call = server_ref.submit(request)
+                        call.done.wait()
+                        response = call.response()
+                    try:
+                        payload = dumps(response)
+                    except TypeError as e:
+                        payload = dumps({"id": response["id"], "error": {"type": "TypeError", "message": str(e)}})
+                    self.wfile.write(payload)
+                    self.wfile.flush()
+        
+        if family == socket.AF_UNIX:
+            if os.path.exists(address):
+                os.unlink(address)  # stale socket of a previous run
+            server_class = _UnixServer
+        else:
+            server_class = _TCPServer
+        
+        self._stop.clear()
+        self._dispatcher = threading.Thread(target=self._run, name="ocmem-dispatch", daemon=True)
+        self._dispatcher.start()
+        
+        self._server = server_class(address, Handler)
+        if family == socket.AF_UNIX:
+            os.chmod(address, 0o600)
+        threading.Thread(target=self._server.serve_forever, name="ocmem-server", daemon=True).start()
+        logger.info("Memory server listening on %s", self.address)
+    
+    def serve_forever(self):
+        """Serve until stop() is called from another thread (or KeyboardInterrupt)"""
+        self.start()
+        try:
+            while not self._stop.wait(0.5):
+                pass
+        finally:
+            self.stop()
+    
+    def stop(self):
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            family, address = parse_address(self.address)
+            if family == socket.AF_UNIX and os.path.exists(address):
+                os.unlink(address)
+        if self._dispatcher:
+            self._dispatcher.join()
+            self._dispatcher = None
+        self._workers.shutdown(wait=True)
+        self.memory.close()
+    
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch": self.requests / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "batched_searches": self.batched_searches,
+            "offloaded": self.offloaded,
+            "connections": self.connections,
+            "users": len(self._views),
+            "queued": self._queue.qsize(),
+        }
+
+
+class RemoteScan:
+    """
+    OpenClawMemory.iter_memories() over a MemoryClient
+    
+    Same surface as MemoryScan: iterate for memories, batches() for lists,
+    `cursor` to resume. Each batch is one request carrying the previous
+    batch's cursor, so the server holds no scan state between requests.
+    While iterating memories, `cursor` moves at batch boundaries: resuming
+    after a break mid-batch yields that batch again from its start.
+    """
+    
+    def __init__(self, client: "MemoryClient", params: Dict, cursor: str = None):
+        self._client = client
+        self.params = params
+        self.cursor = cursor
+    
+    def _pages(self):
+        while True:
+            page = self._client._call("iter_memories", cursor=self.cursor, **self.params)
+            if page["memories"]:
+                yield page["memories"], page["cursor"]
+            if len(page["memories"]) < self.params["batch_size"]:
+                return
+            self.cursor = page["cursor"]
+    
+    def __iter__(self):
+        for memories, cursor in self._pages():
+            yield from memories
+            self.cursor = cursor
+    
+    def batches(self):
+        for memories, cursor in self._pages():
+            self.cursor = cursor
+            yield memories
+
+
+class MemoryClient:
+    """
+    OpenClawMemory interface over a MemoryServer connection
+    
+    Methods take the same arguments as their OpenClawMemory counterparts and
+    return the same types. One request is in flight per client; share a
+    client between threads (calls are serialized) or open one per thread
+    for concurrency. A broken connection is reopened on the next call, but
+    the failed call itself is not retried.
+    """
+    
+    def __init__(self, address: str, user_id: str = None, agent_id: str = None, timeout: float = 60.0):
+        self.address = address
+        self.user_id = user_id
+        self.agent_id = agent_id
+        self.timeout = timeout
+        self._conn = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+    
+    def _connect(self):
+        family, address = parse_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(address)
+        self._conn = (sock, sock.makefile("rb"))
+    
+    def _call(self, method: str, *args, **kwargs):
+        request = {"method": method, "user_id": self.user_id, "agent_id": self.agent_id, "args": args, "kwargs": kwargs}
+        with self._lock:
+            if self._conn is None:
+                self._connect()
+            self._next_id += 1
+            request["id"] = self._next_id
+            sock, reader = self._conn
+            try:
+                sock.sendall(dumps(request))
+                line = reader.readline()
+                if not line:
+                    raise ConnectionError(f"Memory server at {self.address} closed the connection")
+            except OSError:
+                self._disconnect()
+                raise
+        
+        response = loads(line)
+        error = response.get("error")
+        if error:
+            raise _BUILTIN_ERRORS.get(error["type"], lambda m: RemoteError(error["type"], m))(error["message"])
+        return response.get("result")
+    
+    def _disconnect(self):
+        if self._conn:
+            sock, reader = self._conn
+            reader.close()
+            sock.close()
+            self._conn = None
+    
+    def close(self):
+        """Close the connection (the server keeps running)"""
+        with self._lock:
+            self._disconnect()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def for_user(self, user_id: str = None, agent_id: str = None) -> "MemoryClient":
+        """A client for another user over a new connection"""
+        return MemoryClient(self.address, user_id, agent_id, self.timeout)
+    
+    def server_stats(self) -> Dict:
+        """Request and batching counters of the server"""
+        return self._call("server.stats")
+    
+    # OpenClawMemory interface
+    
+    def add(self, content: str, **kwargs) -> Memory:
+        return self._call("add", content, **kwargs)
+    
+    def search(self, query: str, **kwargs) -> List[Dict]:
+        return self._call("search", query, **kwargs)
+    
+    def search_many(self, queries: List[str], **kwargs) -> List[List[Dict]]:
+        return self._call("search_many", list(queries), **kwargs)
+    
+    def get_context(self, session_id: str = None, **kwargs) -> str:
+        return self._call("get_context", session_id, **kwargs)
+    
+    def extract_from_conversation(self, messages: List[Dict[str, str]], **kwargs) -> List[Memory]:
+        return self._call("extract_from_conversation", messages, **kwargs)
+    
+    def update(self, memory_id: str, **kwargs) -> Optional[Memory]:
+        return self._call("update", memory_id, **kwargs)
+    
+    def delete(self, memory_id: str = None, filters: Dict = None) -> int:
+        return self._call("delete", memory_id, filters)
+    
+    def get_by_entity(self, entities: List[str], limit: int = 10) -> List[Memory]:
+        return self._call("get_by_entity", list(entities), limit)
+    
+    def iter_memories(
+        self,
+        filters: Dict = None,
+        order: str = "created_at",
+        batch_size: int = 500,
+        cursor: str = None
+    ) -> RemoteScan:
+        """Stream memories from the server one batch per request (see RemoteScan)"""
+        return RemoteScan(self, {"filters": filters, "order": order, "batch_size": batch_size}, cursor)
+    
+    def prefetch_session(self, user_id: str = None, session_id: str = None, agent_id: str = None) -> Future:
+        """Start the prefetch on the server; the returned future is already resolved"""
+        self._call("prefetch_session", user_id, session_id, agent_id)
+        future = Future()
+        future.set_result(None)
+        return future
+    
+    def flush(self, timeout: float = None) -> bool:
+        """Commit the server's queued writes (write_behind); False on timeout"""
+        return self._call("flush", timeout)
+    
+    def compact(self) -> Dict:
+        """Run a compaction tick on the server; returns the CompactionStats fields"""
+        return self._call("compact")
+    
+    def snapshot(self, dest: str, incremental: bool = True) -> Dict:
+        """Snapshot the server's store into `dest` (a path on the server's host)"""
+        return self._call("snapshot", dest, incremental)
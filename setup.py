@@ -33,9 +33,16 @@ setup(
         "embeddings": [
             "sentence-transformers>=2.2.0",
         ],
+        "onnx": [
+            "onnxruntime>=1.14.0",
+            "tokenizers>=0.13.0",
+        ],
         "redis": [
             "redis>=4.0.0",
         ],
+        "parquet": [
+            "pyarrow>=10.0.0",
+        ],
         "dev": [
             "pytest>=7.0.0",
             "pytest-cov>=4.0.0",
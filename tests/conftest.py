@@ -0,0 +1,10 @@
+"""Shared fixtures: every test gets a fresh store under pytest's tmp_path, with hash embeddings"""
+
+import pytest
+
+from openmemory.core.config import MemoryConfig
+
+
+@pytest.fixture
+def config(tmp_path) -> MemoryConfig:
+    return MemoryConfig(base_path=str(tmp_path), encoder_backend="hash")
@@ -0,0 +1,97 @@
+"""Binary index: Hamming shortlist + float re-rank finds what the flat index finds, with the same scores"""
+
+import numpy as np
+import pytest
+
+from openmemory.backends.vector_backend import VectorBackend
+from openmemory.core.memory import Memory
+
+DIMENSION = 384
+LIMIT = 10
+
+
+def _embeddings(n, seed, topics=64, subtopics=16):
+    """Unit vectors around topic and subtopic centroids, as in benchmarks/binary_quantization.py"""
+    centroids = np.random.default_rng(0)
+    topic_vecs = centroids.standard_normal((topics, DIMENSION))
+    sub_vecs = 0.6 * centroids.standard_normal((topics * subtopics, DIMENSION))
+    rng = np.random.default_rng(seed)
+    sub = rng.integers(0, topics * subtopics, n)
+    vectors = topic_vecs[sub // subtopics] + sub_vecs[sub] + 1.2 * rng.standard_normal((n, DIMENSION))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype("float32")
+
+
+@pytest.fixture
+def corpus():
+    """4000 stored embeddings over four users, and 50 queries from the same topics"""
+    vectors = _embeddings(4000, seed=1)
+    memories = [Memory(id=f"m{i}", content=f"memory {i}", user_id=f"u{i % 4}") for i in range(len(vectors))]
+    return memories, vectors, _embeddings(50, seed=2)
+
+
+def _index(path, index_type, memories, vectors):
+    backend = VectorBackend(str(path), DIMENSION, index_type=index_type)
+    for start in range(0, len(memories), 1000):  # several segments
+        backend.add_embeddings(memories[start:start + 1000], vectors[start:start + 1000])
+    return backend
+
+
+def _top(backend, queries, **kwargs):
+    return [
+        {hit["id"]: hit["score"] for hit in hits}
+        for hits in backend.search_embeddings(queries, limit=LIMIT, threshold=-1.0, **kwargs)
+    ]
+
+
+def _recall(expected, found):
+    return np.mean([len(e.keys() & f.keys()) / len(e) for e, f in zip(expected, found)])
+
+
+def test_recall_matches_flat(tmp_path, corpus):
+    memories, vectors, queries = corpus
+    flat = _index(tmp_path / "flat", "flat", memories, vectors)
+    binary = _index(tmp_path / "binary", "binary", memories, vectors)
+
+    expected, found = _top(flat, queries), _top(binary, queries)
+    assert _recall(expected, found) >= 0.95
+    # Re-ranking is exact, so shared hits score the same
+    for e, f in zip(expected, found):
+        for memory_id in e.keys() & f.keys():
+            assert f[memory_id] == pytest.approx(e[memory_id], abs=1e-5)
+
+    # Filtered searches shortlist within the user's positions only
+    found = _top(binary, queries, user_id="u1")
+    assert _recall(_top(flat, queries, user_id="u1"), found) >= 0.95
+    assert all(int(memory_id[1:]) % 4 == 1 for hits in found for memory_id in hits)
+
+    # A reopened index reads its codes from disk and answers the same
+    assert _top(VectorBackend(str(tmp_path / "binary"), DIMENSION, index_type="binary"), queries) == _top(
+        binary, queries
+    )
+
+
+def test_deleted_vectors_never_return(tmp_path, corpus):
+    memories, vectors, queries = corpus
+    binary = _index(tmp_path / "binary", "binary", memories, vectors)
+    first = _top(binary, queries)
+    gone = sorted({memory_id for hits in first for memory_id in hits})
+    binary.delete_many(gone)
+
+    found = _top(binary, queries)
+    assert not any(hits.keys() & set(gone) for hits in found)
+    assert all(len(hits) == LIMIT for hits in found)
+
+
+def test_codes_are_written_only_for_binary_stores(tmp_path, corpus):
+    memories, vectors, queries = corpus
+    path = tmp_path / "vectors"
+    flat = _index(path, "flat", memories[:2000], vectors[:2000])
+    assert not list(path.glob("*.bits.npy"))
+
+    # Switching a store to the binary index quantizes its segments once and keeps the codes
+    binary = VectorBackend(str(path), DIMENSION, index_type="binary")
+    assert len(list(path.glob("*.bits.npy"))) == len(binary._segments)
+    binary.add_embeddings(memories[2000:], vectors[2000:])
+    assert len(list(path.glob("*.bits.npy"))) == len(binary._segments)
+    flat.refresh()
+    assert _recall(_top(flat, queries), _top(binary, queries)) >= 0.95
@@ -0,0 +1,94 @@
+"""CLI export/import: records round-trip between stores, and an interrupted import resumes from its checkpoint"""
+
+import gzip
+import json
+
+import pytest
+
+from openmemory import cli
+from openmemory.backends.registry import create_long_term_backend, create_vector_store
+from openmemory.core.config import MemoryConfig
+from openmemory.core.memory import OpenClawMemory
+
+
+def _run(base_path, *argv):
+    return cli.main(["--base-path", str(base_path), "--encoder", "hash", "-q", *argv])
+
+
+def _records(long_term):
+    return {m.id: m.to_dict() for m in long_term.iter_memories()}
+
+
+@pytest.fixture
+def exported(tmp_path):
+    """A source store with 25 memories over two users, exported to gzipped JSONL"""
+    config = MemoryConfig(base_path=str(tmp_path / "source"), encoder_backend="hash")
+    mem = OpenClawMemory(user_id="alice", config=config)
+    try:
+        for i in range(25):
+            mem.for_user("alice" if i % 2 else "bob").add(
+                f"memory number {i}", category="fact", importance=0.5, metadata={"n": i}, merge_similar=False
+            )
+        expected = _records(mem.long_term)
+    finally:
+        mem.close()
+
+    path = tmp_path / "memories.jsonl.gz"
+    assert _run(config.base_path, "export", str(path), "--batch-size", "7") == 0
+    return path, expected
+
+
+def _stored(base_path):
+    config = MemoryConfig(base_path=str(base_path), encoder_backend="hash")
+    return create_long_term_backend(config), create_vector_store(config)
+
+
+def test_export_import_round_trip(tmp_path, exported):
+    path, expected = exported
+    with gzip.open(path, "rt") as f:
+        assert len(f.readlines()) == 25
+
+    assert _run(tmp_path / "target", "import", str(path), "--batch-size", "10") == 0
+    long_term, vectors = _stored(tmp_path / "target")
+    # Timestamps and metadata survive, not just content
+    assert _records(long_term) == expected
+    assert set(vectors._positions) == set(expected)
+
+    # A user's export reads only that user's rows
+    alice = tmp_path / "alice.jsonl"
+    assert _run(tmp_path / "target", "export", str(alice), "--user", "alice") == 0
+    assert {json.loads(line)["user_id"] for line in alice.read_text().splitlines()} == {"alice"}
+
+
+def test_interrupted_import_resumes(tmp_path, exported, monkeypatch, capsys):
+    path, expected = exported
+    checkpoint = tmp_path / "import.ckpt"
+    write_checkpoint = cli.atomic_write_json
+    calls = []
+
+    def crash_before_second_checkpoint(target, data):
+        # The second batch is in both stores when its checkpoint is lost
+        calls.append(data["position"])
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        write_checkpoint(target, data)
+
+    monkeypatch.setattr(cli, "atomic_write_json", crash_before_second_checkpoint)
+    argv = ["import", str(path), "--batch-size", "10", "--checkpoint", str(checkpoint)]
+    assert _run(tmp_path / "target", *argv) == 130
+    assert json.loads(checkpoint.read_text())["imported"] == 10
+
+    monkeypatch.setattr(cli, "atomic_write_json", write_checkpoint)
+    assert _run(tmp_path / "target", *argv) == 0
+    assert "Resuming" in capsys.readouterr().err
+    state = json.loads(checkpoint.read_text())
+    assert state["complete"] and state["imported"] == 25
+
+    long_term, vectors = _stored(tmp_path / "target")
+    assert _records(long_term) == expected
+    # The replayed batch was not indexed twice
+    assert len(vectors.metadata) == 25 and set(vectors._positions) == set(expected)
+
+    # A finished checkpoint makes a rerun a no-op
+    assert _run(tmp_path / "target", *argv) == 0
+    assert "already imported" in capsys.readouterr().err
@@ -0,0 +1,105 @@
+"""Compaction: importance decay, capacity eviction to each archive mode, summaries and vector sync"""
+
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from openmemory.core.memory import OpenClawMemory
+
+
+def _memory(config, **options):
+    for key, value in options.items():
+        setattr(config, key, value)
+    return OpenClawMemory(user_id="alice", config=config)
+
+
+def _fill(mem, count, user_id="alice"):
+    """`count` memories of `user_id` with importance rising from 0.1"""
+    view = mem.for_user(user_id)
+    return [
+        view.add(f"note number {i} for {user_id}", importance=round(0.1 + 0.05 * i, 2), merge_similar=False)
+        for i in range(count)
+    ]
+
+
+def _archived(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in conn.execute("SELECT id FROM memories_archive")}
+    finally:
+        conn.close()
+
+
+def test_decay_halves_importance_per_half_life(config):
+    mem = _memory(config, decay_half_life_days=10)
+    try:
+        memory = mem.add("Likes long walks", importance=0.8, merge_similar=False)
+        stats = mem.compactor.run_once(now=datetime.now() + timedelta(days=10))
+        assert stats.decayed == 1
+
+        stored = mem.long_term.get(memory.id)
+        assert stored.importance == pytest.approx(0.4, rel=1e-3)
+        # Decay is not an edit
+        assert stored.updated_at == memory.updated_at
+    finally:
+        mem.close()
+
+
+@pytest.mark.parametrize("mode", ["archive", "file", "delete"])
+def test_eviction_keeps_the_most_important(config, mode):
+    mem = _memory(config, max_memories_per_user=3, compaction_mode=mode)
+    try:
+        memories = _fill(mem, 5)
+        others = _fill(mem, 2, user_id="bob")
+        stats = mem.compact()
+        assert (stats.evicted, stats.summarized) == (2, 0)
+
+        evicted = {m.id for m in memories[:2]}
+        kept = {m.id for m in memories[2:] + others}
+        assert {m.id for m in mem.long_term.iter_memories()} == kept
+        # The vector index drops what the store evicted
+        assert set(mem.vector_store._positions) == kept
+
+        if mode == "archive":
+            assert _archived(config.long_term_path) == evicted
+        elif mode == "file":
+            with open(config.archive_path) as f:
+                assert {json.loads(line)["id"] for line in f} == evicted
+        assert mem.long_term.count_by_user() == {"alice": 3, "bob": 2}
+
+        # Users at capacity are left alone
+        assert mem.compact().evicted == 0
+    finally:
+        mem.close()
+
+
+def test_summary_replaces_evicted_memories(config):
+    mem = _memory(config, max_memories_per_user=3, summarize_evicted=True)
+    try:
+        memories = _fill(mem, 5)
+        stats = mem.compact()
+        # One extra row makes room for the summary
+        assert (stats.evicted, stats.summarized) == (3, 1)
+
+        remaining = list(mem.long_term.iter_memories())
+        assert len(remaining) == 3
+        summary, = [m for m in remaining if m.metadata.get("summary_of")]
+        assert summary.metadata["summary_of"] == [m.id for m in memories[:3]]
+        assert summary.importance == memories[2].importance
+        assert set(mem.vector_store._positions) == {m.id for m in remaining}
+    finally:
+        mem.close()
+
+
+def test_no_summary_slot_without_a_summary(config):
+    # A one-row budget evicts a single memory, which is never summarized
+    mem = _memory(config, max_memories_per_user=3, summarize_evicted=True, compaction_batch_size=1)
+    try:
+        _fill(mem, 4)
+        stats = mem.compact()
+        assert (stats.evicted, stats.summarized) == (1, 0)
+        assert mem.long_term.count_by_user() == {"alice": 3}
+    finally:
+        mem.close()
@@ -0,0 +1,85 @@
+"""Run the backend conformance suite (openmemory.backends.conformance) against the built-in backends"""
+
+import sqlite3
+
+import pytest
+
+from openmemory.backends.conformance import check_long_term_backend, check_vector_store
+from openmemory.backends.registry import create_long_term_backend, create_vector_store
+from openmemory.core.config import MemoryConfig
+from openmemory.core.memory import Memory
+
+LONG_TERM = {
+    "sqlite": {"long_term_backend": "sqlite"},
+    "sqlite-compressed": {"long_term_backend": "sqlite", "compress_text": True},
+    "sqlite-sharded": {"long_term_backend": "sqlite", "num_shards": 3},
+    "memory": {"long_term_backend": "memory"},
+}
+
+VECTOR = {
+    "faiss": {"vector_backend": "faiss"},
+    "faiss-content": {"vector_backend": "faiss", "vector_store_content": True},
+    "faiss-binary": {"vector_backend": "faiss", "vector_index": "binary"},
+    "faiss-sharded": {"vector_backend": "faiss", "num_shards": 3},
+    "memory": {"vector_backend": "memory"},
+}
+
+
+@pytest.mark.parametrize("options", LONG_TERM.values(), ids=list(LONG_TERM))
+def test_long_term_backend(tmp_path, options):
+    check_long_term_backend(create_long_term_backend(MemoryConfig(base_path=str(tmp_path), **options)))
+
+
+@pytest.mark.parametrize("options", VECTOR.values(), ids=list(VECTOR))
+def test_vector_store(tmp_path, options):
+    config = MemoryConfig(base_path=str(tmp_path), encoder_backend="hash", **options)
+    check_vector_store(create_vector_store(config))
+
+
+def test_vector_store_after_deletes(tmp_path):
+    # Tombstoned rows must stay invisible through a reclaim and a reload
+    config = MemoryConfig(base_path=str(tmp_path), encoder_backend="hash")
+    store = create_vector_store(config)
+    check_vector_store(store)
+    store.reclaim_deleted()
+    check_vector_store(create_vector_store(config))
+
+
+def test_vector_delete_removes_every_copy_of_an_id(tmp_path):
+    # Imports append vectors for IDs that already have one; a delete must drop them all
+    config = MemoryConfig(base_path=str(tmp_path), encoder_backend="hash")
+    store = create_vector_store(config)
+    store.add_many([Memory(id=f"m{i}", content=f"note {i}") for i in range(5)])
+    store.add_many([Memory(id="m1", content="note 1, imported again"), Memory(id="m3", content="note 3 again")])
+    store.add_many([Memory(id="m1", content="note 1, a third time")])
+
+    assert store.delete_many(["m1", "m4"]) == 4
+    reopened = create_vector_store(config)
+    for backend in (store, reopened):
+        assert sorted(meta["id"] for meta in backend.metadata.values()) == ["m0", "m2", "m3", "m3"]
+        assert set(backend._positions) == {"m0", "m2", "m3"}
+
+    assert store.delete_many(["m3"]) == 2
+    assert sorted(meta["id"] for meta in store.metadata.values()) == ["m0", "m2"]
+
+
+def test_sqlite_id_lists_fit_the_variable_limit(tmp_path, monkeypatch):
+    # Builds of SQLite before 3.32 allow 999 bound parameters per statement
+    from openmemory.backends.sqlite_backend import SQLiteBackend
+    connect = SQLiteBackend._connect
+
+    def limited(self):
+        conn = connect(self)
+        conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+        return conn
+
+    monkeypatch.setattr(SQLiteBackend, "_connect", limited)
+    store = SQLiteBackend(str(tmp_path / "memories.db"))
+    store.add_many([Memory(id=f"m{i}", content=f"note {i}", user_id="u") for i in range(1500)])
+
+    ids = [f"m{i}" for i in range(0, 3000, 2)]
+    found = store.get_many(ids)
+    assert [m.id if m else None for m in found] == [i if int(i[1:]) < 1500 else None for i in ids]
+
+    assert store.archive([f"m{i}" for i in range(1200)]) == 1200
+    assert [m.id for m in store.iter_memories()] == [f"m{i}" for i in range(1200, 1500)]
@@ -0,0 +1,45 @@
+"""Query-aware context: the latency budget cuts the ranked stages, never the recency floor"""
+
+import time
+
+from openmemory.core.config import MemoryConfig
+from openmemory.core.context import ContextRetriever
+from openmemory.core.memory import Memory, OpenClawMemory
+
+
+def _slow(memory: Memory, seconds: float):
+    def stage():
+        time.sleep(seconds)
+        return [(memory, 1.0)]
+    return stage
+
+
+def test_budget_never_skips_recency():
+    retriever = ContextRetriever()
+    recent, found = Memory(id="recent", content="just said"), Memory(id="found", content="old fact")
+    stages = {"recent": _slow(recent, 0.02), "vector": _slow(found, 0.02)}
+    try:
+        retriever.retrieve(stages)  # both stages now have a latency history
+        ranked, report = retriever.retrieve(stages, budget_ms=1)
+        assert report["stages"] == {"recent": "ran", "vector": "skipped"}
+        assert [m.id for m in ranked] == ["recent"]
+
+        # Abandoned at the deadline instead of skipped: recency is still waited for
+        ranked, report = retriever.retrieve({"recent": _slow(recent, 0.02), "keyword": _slow(found, 0.2)}, budget_ms=5)
+        assert report["stages"] == {"recent": "ran", "keyword": "timed_out"}
+        assert [m.id for m in ranked] == ["recent"]
+    finally:
+        retriever.close()
+
+
+def test_tiny_budget_still_returns_recent_memories(tmp_path):
+    mem = OpenClawMemory(user_id="alice", config=MemoryConfig(base_path=str(tmp_path), encoder_backend="hash"))
+    try:
+        mem.add("Alice is allergic to peanuts", session_id="trip", merge_similar=False)
+        context, report = mem.get_context(
+            session_id="trip", query="Where can Alice eat?", latency_budget_ms=0, return_report=True
+        )
+        assert report["stages"]["recent"] == "ran"
+        assert "peanuts" in context
+    finally:
+        mem.close()
@@ -0,0 +1,144 @@
+"""Encoders: hash determinism, the ONNX path on a tiny generated model, and encoder/index mismatch checks"""
+
+import numpy as np
+import pytest
+
+from openmemory.backends.encoders import EncoderSpec, HashEncoder, simple_embedding
+from openmemory.backends.vector_backend import IndexMismatchError, VectorBackend
+from openmemory.core.memory import Memory
+
+WORDS = ["[PAD]", "[UNK]", "alpha", "beta", "gamma", "delta"]
+DIMENSION = 8
+
+
+def test_hash_encoder_is_deterministic():
+    spec = EncoderSpec(backend="hash", dimension=64)
+    texts = ["alpha beta", "Alpha  beta", "gamma"]
+    first, second = HashEncoder(spec).encode(texts), HashEncoder(spec).encode(texts)
+
+    assert first.dtype == np.float32 and first.shape == (3, 64)
+    assert np.array_equal(first, second)
+    # Case and whitespace do not matter; words do
+    assert np.array_equal(first[0], first[1])
+    assert not np.allclose(first[0], first[2])
+    assert np.allclose(np.linalg.norm(first, axis=1), 1.0)
+    # Stable hash: the same buckets as the module-level helper (and every other process)
+    assert np.array_equal(first[2], simple_embedding("gamma", 64))
+
+
+def _write_model(directory, seed: int = 0):
+    """Embedding lookup + projection, with no pooling head; pad rows are non-zero on purpose"""
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(seed)
+    table = rng.normal(size=(len(WORDS), DIMENSION)).astype('float32')
+    projection = rng.normal(size=(DIMENSION, DIMENSION)).astype('float32')
+    graph = helper.make_graph(
+        [
+            helper.make_node("Gather", ["table", "input_ids"], ["embedded"]),
+            helper.make_node("MatMul", ["embedded", "projection"], ["hidden"]),
+        ],
+        "tiny",
+        [
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "tokens"]),
+            helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "tokens"]),
+        ],
+        [helper.make_tensor_value_info("hidden", TensorProto.FLOAT, ["batch", "tokens", DIMENSION])],
+        initializer=[numpy_helper.from_array(table, "table"), numpy_helper.from_array(projection, "projection")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(directory / "model.onnx"))
+    return table @ projection
+
+
+@pytest.fixture
+def tiny_model(tmp_path):
+    pytest.importorskip("onnxruntime")
+    tokenizers = pytest.importorskip("tokenizers")
+
+    vocab = {word: i for i, word in enumerate(WORDS)}
+    tokenizer = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    tokenizer.save(str(tmp_path / "tokenizer.json"))
+    return tmp_path, _write_model(tmp_path)
+
+
+def _onnx(model_dir, **options):
+    from openmemory.backends.encoders import OnnxEncoder
+    return OnnxEncoder(EncoderSpec(backend="onnx", model=str(model_dir), dimension=DIMENSION, **options))
+
+
+def _expected(rows: np.ndarray, words):
+    pooled = rows[[WORDS.index(w) for w in words]].mean(axis=0)
+    return pooled / np.linalg.norm(pooled)
+
+
+def test_onnx_mean_pools_real_tokens_only(tiny_model):
+    model_dir, rows = tiny_model
+    encoder = _onnx(model_dir)
+
+    # One batch, so "alpha" is padded to the width of the longest text
+    batched = encoder.encode(["alpha beta gamma delta", "alpha", "beta gamma"])
+    assert batched.shape == (3, DIMENSION)
+    assert np.allclose(batched[0], _expected(rows, ["alpha", "beta", "gamma", "delta"]), atol=1e-5)
+    assert np.allclose(batched[1], _expected(rows, ["alpha"]), atol=1e-5)
+    assert np.allclose(batched[2], _expected(rows, ["beta", "gamma"]), atol=1e-5)
+    # Padding never changes a text's vector
+    assert np.allclose(encoder.encode(["alpha"])[0], batched[1], atol=1e-5)
+
+
+def test_onnx_length_buckets_keep_input_order(tiny_model):
+    model_dir, rows = tiny_model
+    texts = ["alpha beta gamma delta", "beta", "gamma delta", "alpha", "delta gamma beta"]
+    vectors = _onnx(model_dir, batch_size=2).encode(texts)
+    for text, vector in zip(texts, vectors):
+        assert np.allclose(vector, _expected(rows, text.split()), atol=1e-5)
+
+
+def test_onnx_int8_stays_close_to_fp32(tiny_model):
+    pytest.importorskip("onnxruntime.quantization")
+    model_dir, _ = tiny_model
+    texts = ["alpha beta", "gamma delta", "alpha gamma delta"]
+    fp32, int8 = _onnx(model_dir).encode(texts), _onnx(model_dir, quantize=True).encode(texts)
+    assert (model_dir / "model.int8.onnx").exists()
+    assert np.all(np.sum(fp32 * int8, axis=1) > 0.98)
+
+
+def test_onnx_version_tracks_model_content(tiny_model):
+    model_dir, _ = tiny_model
+    version = _onnx(model_dir).version
+    assert _onnx(model_dir).version == version
+
+    _write_model(model_dir, seed=1)  # re-exported under the same file name
+    assert _onnx(model_dir).version != version
+
+
+def test_encoder_dimension_mismatch_is_refused(tiny_model):
+    from openmemory.backends.encoders import OnnxEncoder
+
+    model_dir, _ = tiny_model
+    encoder = OnnxEncoder(EncoderSpec(backend="onnx", model=str(model_dir), dimension=DIMENSION * 2))
+    with pytest.raises(ValueError, match="embedding_dimension"):
+        encoder.encode(["alpha"])
+
+
+def test_index_refuses_another_encoder(tmp_path, tiny_model):
+    model_dir, _ = tiny_model
+    path = str(tmp_path / "vectors")
+    hashed = HashEncoder(EncoderSpec(backend="hash", dimension=DIMENSION))
+    store = VectorBackend(path, dimension=DIMENSION, encoder=hashed)
+    store.add(Memory(id="m1", content="alpha beta", user_id="u"))
+
+    with pytest.raises(IndexMismatchError, match="reindex"):
+        VectorBackend(path, dimension=DIMENSION, encoder=_onnx(model_dir))
+
+    # Same encoder name, new version (a re-exported model) is refused too
+    onnx_path = str(tmp_path / "onnx-vectors")
+    VectorBackend(onnx_path, dimension=DIMENSION, encoder=_onnx(model_dir)).add(
+        Memory(id="m1", content="alpha beta", user_id="u")
+    )
+    _write_model(model_dir, seed=1)
+    with pytest.raises(IndexMismatchError):
+        VectorBackend(onnx_path, dimension=DIMENSION, encoder=_onnx(model_dir))
@@ -0,0 +1,91 @@
+"""Metrics: counters and span trees recorded around real operations, and nothing while disabled"""
+
+import pytest
+
+from openmemory.core.memory import OpenClawMemory
+from openmemory.core.metrics import NULL_SPAN, InMemorySpanExporter, metrics
+
+
+@pytest.fixture
+def exporter():
+    """The process-wide registry, enabled and empty for one test"""
+    metrics.reset()
+    metrics.configure(enabled=True, slow_threshold_ms=None)
+    exporter = metrics.add_exporter(InMemorySpanExporter())
+    yield exporter
+    metrics.remove_exporter(exporter)
+    metrics.configure(enabled=False, slow_threshold_ms=None)
+    metrics.reset()
+
+
+@pytest.fixture
+def mem(config, exporter):
+    config.search_cache_size = 100
+    mem = OpenClawMemory(user_id="alice", config=config)
+    yield mem
+    mem.close()
+
+
+def test_counters(mem):
+    mem.add("Prefers aisle seats on long flights", category="preference")
+    mem.add("Prefers aisle seats on long flights", category="preference")  # merged into the first
+    for _ in range(2):
+        mem.search("Prefers aisle seats on long flights")
+
+    counters = metrics.snapshot()["counters"]
+    assert counters["merges"] == 1
+    assert (counters["search_cache.misses"], counters["search_cache.hits"]) == (1, 1)
+    assert counters["vectors.scanned"] >= 1
+    assert counters["rows.returned"] >= 1
+
+    prometheus = metrics.to_prometheus()
+    assert "ocmem_search_cache_hits_total 1" in prometheus
+    assert 'ocmem_span_duration_seconds_count{span="search"} 2' in prometheus
+
+
+def test_spans_form_one_trace_per_operation(mem, exporter):
+    mem.add("Booked the 9:40 train to Leeds", merge_similar=False)
+    exporter.clear()
+    mem.search("train to Leeds")
+
+    spans = exporter.spans
+    root, = [s for s in spans if s["parent_span_id"] is None]
+    assert root["name"] == "search" and root["status"] == "OK"
+    assert {s["trace_id"] for s in spans} == {root["trace_id"]}
+    names = {s["name"] for s in spans}
+    assert {"embed", "vector.search"} <= names
+    # Children start and end inside their parent
+    by_id = {s["span_id"]: s for s in spans}
+    for span in spans:
+        parent = by_id.get(span["parent_span_id"])
+        if parent:
+            assert parent["start_time_unix_nano"] <= span["start_time_unix_nano"]
+            assert span["end_time_unix_nano"] <= parent["end_time_unix_nano"]
+
+    timers = metrics.snapshot()["timers"]
+    assert timers["search"]["count"] == 1
+    assert timers["search"]["max_ms"] >= timers["vector.search"]["max_ms"]
+
+
+def test_errors_and_slow_operations(exporter):
+    metrics.configure(slow_threshold_ms=0)
+    with pytest.raises(ValueError):
+        with metrics.span("op", user_id="alice"):
+            with metrics.span("stage"):
+                raise ValueError("boom")
+
+    op = next(s for s in exporter.spans if s["name"] == "op")
+    assert op["status"] == "ERROR" and op["attributes"] == {"user_id": "alice", "error": "ValueError"}
+    slow, = metrics.snapshot()["slow_ops"]
+    assert slow["name"] == "op" and set(slow["stages_ms"]) == {"stage"}
+
+
+def test_disabled_registry_records_nothing(exporter):
+    metrics.configure(enabled=False)
+    assert metrics.span("op") is NULL_SPAN
+    metrics.incr("merges")
+    with metrics.span("op"):
+        pass
+
+    assert metrics.snapshot() == {"timers": {}, "counters": {}, "slow_ops": []}
+    assert exporter.spans == []
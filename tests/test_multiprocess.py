@@ -0,0 +1,44 @@
+"""Several processes sharing one store (the check benchmarks/stress_multiprocess.py runs at scale)"""
+
+import multiprocessing
+
+from openmemory.core.config import MemoryConfig
+from openmemory.core.memory import OpenClawMemory
+
+PROCESSES = 4
+WRITES = 20
+
+
+def _worker(base_path: str, worker_id: int, results):
+    mem = OpenClawMemory(user_id=f"user-{worker_id}", config=MemoryConfig(base_path=base_path, encoder_backend="hash"))
+    foreign = 0
+    for i in range(WRITES):
+        mem.add(f"worker {worker_id} note {i} topic{i % 5}", merge_similar=False)
+        hits = mem.vector_store.search(f"note topic{i % 5}", limit=20, threshold=0.0)
+        foreign += sum(1 for m in mem.long_term.get_many([h["id"] for h in hits]) if m and m.user_id != mem.user_id)
+    mem.close()
+    results.put(foreign)
+
+
+def test_processes_share_one_store(config):
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=_worker, args=(config.base_path, i, results))
+        for i in range(PROCESSES)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(120)
+    assert [p.exitcode for p in procs] == [0] * PROCESSES
+    foreign = [results.get(timeout=5) for _ in procs]
+
+    mem = OpenClawMemory(config=config)
+    rows = {m.id for i in range(PROCESSES) for m in mem.long_term.get_recent(user_id=f"user-{i}", limit=WRITES * 2)}
+    vectors = {meta["id"] for meta in mem.vector_store.metadata.values()}
+    assert len(rows) == PROCESSES * WRITES
+    assert vectors == rows
+    assert mem.vector_store.index.ntotal == PROCESSES * WRITES
+    # Searches pick up other processes' segments without a reopen
+    assert any(foreign)
+    mem.close()
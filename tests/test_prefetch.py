@@ -0,0 +1,29 @@
+"""Session prefetch: loads exactly what get_context() reads, and serves its first call"""
+
+import pytest
+
+from openmemory.core.memory import OpenClawMemory
+
+
+@pytest.fixture
+def mem(config):
+    mem = OpenClawMemory(user_id="alice", config=config)
+    yield mem
+    mem.close()
+
+
+def test_prefetch_serves_first_context(mem):
+    mem.add("Prefers aisle seats", category="preference", importance=0.9, session_id="trip", merge_similar=False)
+    mem.add("Booked the 9:40 train", category="fact", importance=0.9, session_id="trip", merge_similar=False)
+    expected = mem.get_context(session_id="trip")
+
+    rows = mem.prefetch_session(session_id="trip").result()
+    assert set(rows) == {"recent", "preferences"}
+    assert mem.get_context(session_id="trip") == expected
+    assert mem.prefetcher.stats()["hits"] == 1
+
+    # A write discards the prefetched rows
+    mem.prefetch_session(session_id="trip").result()
+    mem.add("Prefers tea", category="preference", importance=0.9, session_id="trip", merge_similar=False)
+    assert "Prefers tea" in mem.get_context(session_id="trip")
+    assert mem.prefetcher.stats()["misses"] == 1
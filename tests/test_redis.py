@@ -0,0 +1,101 @@
+"""Redis backends against fakeredis: conformance, expiry of index members under a TTL, and cache invalidation"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from openmemory.backends.conformance import check_long_term_backend
+from openmemory.core.memory import Memory
+
+fakeredis = pytest.importorskip("fakeredis")
+redis_backend = pytest.importorskip("openmemory.backends.redis_backend")
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis()
+
+
+@pytest.mark.parametrize("ttl", [None, 3600], ids=["durable", "ttl"])
+def test_redis_backend_conformance(client, ttl):
+    check_long_term_backend(redis_backend.RedisBackend(ttl=ttl, client=client))
+
+
+def test_cached_backend_conformance(client, config):
+    from openmemory.backends.sqlite_backend import SQLiteBackend
+    check_long_term_backend(redis_backend.CachedBackend(SQLiteBackend(config.long_term_path), client))
+
+
+def test_expired_members_leave_the_indexes(client):
+    # Same keys, two TTLs: the short-lived memories are newer, so unpruned they would fill every limit
+    live = redis_backend.RedisBackend(ttl=3600, client=client)
+    short = redis_backend.RedisBackend(ttl=1, client=client)
+    later = (datetime.now() + timedelta(hours=1)).isoformat()
+    short.add_many([
+        Memory(id=f"gone-{i}", content=f"gone {i}", user_id="u", session_id="s", category="fact",
+               importance=0.9, updated_at=later)
+        for i in range(5)
+    ])
+    live.add_many([
+        Memory(id=f"kept-{i}", content=f"kept {i}", user_id="u", session_id="s", category="fact", importance=0.5)
+        for i in range(3)
+    ])
+    time.sleep(1.2)
+
+    kept = {f"kept-{i}" for i in range(3)}
+    assert {m.id for m in live.get_recent("u", limit=3)} == kept
+    assert {m.id for m in live.get_recent("u", session_id="s", limit=3)} == kept
+    assert {m.id for m in live.get_by_category("u", "fact", limit=3)} == kept
+    assert {m.id for m in live.get_recent(None, limit=3)} == kept
+
+    # Pruned from the sorted sets and their expiry sets alike
+    for key in live._index_keys(live.get("kept-0")):
+        assert {m.decode() for m in client.zrange(key, 0, -1)} == kept
+        assert client.zcard(live._expiry_key(key)) == 3
+
+
+class _ReadDuringWrite:
+    """A long-term backend whose bulk writes let a cached read in just before they land"""
+
+    def __init__(self, backend, read):
+        self.backend = backend
+        self.read = read
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def delete_many(self, memory_ids):
+        self.read()
+        return self.backend.delete_many(memory_ids)
+
+    def archive(self, memory_ids):
+        self.read()
+        return self.backend.archive(memory_ids)
+
+
+@pytest.mark.parametrize("write", ["delete_many", "archive"])
+def test_cache_drops_reads_that_raced_a_bulk_write(client, config, write):
+    from openmemory.backends.sqlite_backend import SQLiteBackend
+    inner = _ReadDuringWrite(SQLiteBackend(config.long_term_path), read=lambda: cached.get_recent("u", limit=5))
+    cached = redis_backend.CachedBackend(inner, client)
+    cached.add_many([Memory(id=f"m{i}", content=f"note {i}", user_id="u") for i in range(3)])
+
+    getattr(cached, write)(["m0"])
+    assert cached.get("m0") is None
+    assert {m.id for m in cached.get_recent("u", limit=5)} == {"m1", "m2"}
+
+
+def test_importance_change_of_uncached_memory_refreshes_rankings(client, config):
+    from openmemory.backends.sqlite_backend import SQLiteBackend
+    cached = redis_backend.CachedBackend(SQLiteBackend(config.long_term_path), client)
+    cached.add_many([
+        Memory(id=f"m{i}", content=f"note {i}", user_id="u", category="fact", importance=0.1 * (i + 1))
+        for i in range(4)
+    ])
+    assert [m.id for m in cached.get_by_category("u", "fact", limit=2)] == ["m3", "m2"]
+
+    # m0 is in no cached result and not cached itself, yet now ranks first
+    assert client.get(cached._mem_key("m0")) is None
+    cached.set_importance([("m0", 0.9, datetime.now().isoformat())])
+    assert [m.id for m in cached.get_by_category("u", "fact", limit=2)] == ["m0", "m3"]
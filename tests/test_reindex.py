@@ -0,0 +1,55 @@
+"""Reindex: writes that land during the build, back-dated imports included, reach the swapped-in index"""
+
+import json
+import sqlite3
+
+import numpy as np
+
+from openmemory import cli
+from openmemory.backends.registry import create_long_term_backend, create_vector_store
+from openmemory.core.memory import OpenClawMemory
+
+
+def _run(config, *argv):
+    return cli.main(["--base-path", config.base_path, "--encoder", "hash", "-q", *argv])
+
+
+def test_reindex_catches_up_with_back_dated_writes(config, tmp_path, monkeypatch):
+    mem = OpenClawMemory(user_id="alice", config=config)
+    try:
+        memories = [mem.add(f"note number {i}", merge_similar=False) for i in range(30)]
+    finally:
+        mem.close()
+
+    # An import keeps its records' 2025 timestamps: it rewrites one memory, adds
+    # three and is followed by a delete, all after the build's scan has finished
+    records = tmp_path / "late.jsonl"
+    records.write_text("".join(json.dumps(record) + "\n" for record in [
+        {"id": memories[0].id, "content": "note zero, rewritten", "user_id": "alice",
+         "created_at": "2025-01-01T09:00:00", "updated_at": "2025-01-01T09:00:00"},
+        *({"id": f"late-{i}", "content": f"late note {i}", "user_id": "alice",
+           "created_at": "2025-01-02T09:00:00", "updated_at": "2025-01-02T09:00:00"} for i in range(3)),
+    ]))
+    load_batches = cli.load_batches
+
+    def build_then_write(*args, **kwargs):
+        total = load_batches(*args, **kwargs)
+        monkeypatch.setattr(cli, "load_batches", load_batches)  # the import loads through it too
+        assert _run(config, "import", str(records)) == 0
+        create_long_term_backend(config).delete(memories[1].id)
+        create_vector_store(config).delete_many([memories[1].id])
+        return total
+
+    monkeypatch.setattr(cli, "load_batches", build_then_write)
+    assert _run(config, "reindex", "--batch-size", "8") == 0
+
+    ids = {m.id for m in create_long_term_backend(config).iter_memories()}
+    assert len(ids) == 32 and {"late-0", "late-1", "late-2"} <= ids
+    vectors = create_vector_store(config)
+    assert set(vectors._positions) == ids
+    stored, _ = vectors.get_vectors([memories[0].id])
+    assert np.allclose(stored[0], vectors._get_embedding("note zero, rewritten"))
+    # The change log and its triggers are dropped with the build
+    conn = sqlite3.connect(config.long_term_path)
+    assert not conn.execute("SELECT name FROM sqlite_master WHERE name LIKE '%write_log%'").fetchall()
+    conn.close()
@@ -0,0 +1,86 @@
+"""Keyset scans: a cursor resumes in a fresh store handle, and concurrent writes never repeat or skip rows"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from openmemory.backends.registry import create_long_term_backend
+from openmemory.core.config import MemoryConfig
+from openmemory.core.memory import Memory
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture(params=[1, 3], ids=["single", "sharded"])
+def config(request, tmp_path):
+    return MemoryConfig(base_path=str(tmp_path), encoder_backend="hash", num_shards=request.param)
+
+
+def _seed(long_term, count):
+    stamp = lambda i: (START + timedelta(minutes=i)).isoformat()  # noqa: E731
+    memories = [
+        Memory(id=f"m{i:03d}", content=f"note {i}", user_id=f"user-{i % 5}", created_at=stamp(i), updated_at=stamp(i))
+        for i in range(count)
+    ]
+    long_term.add_many(memories)
+    return [m.id for m in memories]
+
+
+def test_cursor_resumes_under_concurrent_writes(config):
+    long_term = create_long_term_backend(config)
+    seeded = _seed(long_term, 300)
+
+    scan = long_term.iter_memories(batch_size=40)
+    pages = scan.batches()
+    read = [m.id for _ in range(2) for m in next(pages)]
+    cursor = scan.cursor
+    assert read == seeded[:80]
+
+    # Rows ahead of the cursor are deleted, then another handle keeps adding
+    # and updating while the walk resumes
+    deleted = set(seeded[200:220])
+    long_term.delete_many(sorted(deleted))
+    stop = threading.Event()
+
+    def write():
+        writer = create_long_term_backend(config)
+        for i in range(300, 2000):
+            if stop.is_set():
+                return
+            writer.add(Memory(id=f"new{i}", content=f"late note {i}", user_id=f"user-{i % 5}"))
+            row = writer.get(seeded[i % 300])
+            if row is not None:
+                row.importance = 0.9
+                writer.update(row)
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    try:
+        resumed = create_long_term_backend(config).iter_memories(cursor=cursor, batch_size=10)
+        rest = [m for batch in resumed.batches() for m in batch]
+    finally:
+        stop.set()
+        thread.join()
+
+    ids = read + [m.id for m in rest]
+    assert len(ids) == len(set(ids))
+    # Every surviving seeded row is read exactly once, in order
+    survivors = [memory_id for memory_id in seeded if memory_id not in deleted]
+    assert ids[:len(survivors)] == survivors
+    keys = [m.created_at for m in rest]
+    assert keys == sorted(keys)
+    # Rows written during the walk sort after the seeded ones
+    assert all(memory_id.startswith("new") for memory_id in ids[len(survivors):])
+
+
+def test_user_cursor_stays_in_scope(config):
+    long_term = create_long_term_backend(config)
+    seeded = _seed(long_term, 100)
+
+    scan = long_term.iter_memories(user_id="user-2", batch_size=7)
+    first = next(scan.batches())
+    long_term.add(Memory(id="other", content="someone else's note", user_id="user-3"))
+
+    rest = [m for m in create_long_term_backend(config).iter_memories(cursor=scan.cursor)]
+    assert [m.id for m in first + rest] == [memory_id for memory_id in seeded if int(memory_id[1:]) % 5 == 2]
@@ -0,0 +1,47 @@
+"""Search result cache: keys, and invalidation by writes"""
+
+import pytest
+
+from openmemory.core.config import MemoryConfig
+from openmemory.core.memory import OpenClawMemory
+
+
+@pytest.fixture
+def mem(tmp_path):
+    mem = OpenClawMemory(
+        user_id="alice",
+        config=MemoryConfig(base_path=str(tmp_path), encoder_backend="hash", search_cache_size=64)
+    )
+    yield mem
+    mem.close()
+
+
+def _ids(rows):
+    return sorted(r["id"] for r in rows)
+
+
+def test_writes_invalidate_all_users_searches(mem):
+    everyone = mem.for_user(None)
+    first = mem.add("drinks green tea daily", merge_similar=False)
+    assert _ids(everyone.search("green tea", threshold=0.0)) == [first.id]
+
+    second = mem.for_user("bob").add("drinks black tea daily", merge_similar=False)
+    assert _ids(everyone.search("green tea", threshold=0.0)) == sorted([first.id, second.id])
+
+
+def test_keyword_searches_match_the_query_as_typed(mem):
+    memory = mem.add("tea daily", merge_similar=False)
+    assert _ids(mem.search("tea daily", semantic=False)) == [memory.id]
+    assert mem.search("tea  daily", semantic=False) == []
+    # A semantic search that finds nothing falls back to the same LIKE match
+    assert _ids(mem.search("tea daily", threshold=1.01)) == [memory.id]
+    assert mem.search("tea  daily", threshold=1.01) == []
+    assert _ids(mem.search_many(["tea daily", "tea  daily"], threshold=1.01)[1]) == []
+
+
+def test_semantic_searches_share_normalized_keys(mem):
+    mem.add("drinks green tea daily", merge_similar=False)
+    first = mem.search("Green tea", threshold=0.0)
+    hits = mem.search_cache.hits
+    assert mem.search("green   TEA", threshold=0.0) == first
+    assert mem.search_cache.hits == hits + 1
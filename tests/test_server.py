@@ -0,0 +1,98 @@
+"""MemoryServer dispatch, batching and slow-call offloading, and the MemoryClient round trip"""
+
+import inspect
+import threading
+import time
+
+import pytest
+
+from openmemory.core.memory import OpenClawMemory
+from openmemory.server import METHODS, SLOW_METHODS, MemoryClient, MemoryServer, _Call
+
+
+@pytest.fixture
+def server(config, tmp_path):
+    server = MemoryServer(str(tmp_path / "ocmem.sock"), config=config)
+    yield server
+    server.stop()
+
+
+def _search(query: str, **kwargs) -> _Call:
+    return _Call({"method": "search", "user_id": "alice", "agent_id": "agent-a", "args": [query], "kwargs": kwargs})
+
+
+def _contents(call: _Call):
+    assert call.error is None
+    return sorted(row["content"] for row in call.result)
+
+
+def test_batched_search_keeps_scopes(server):
+    agent = server.memory.for_user("alice", "agent-a")
+    agent.add("alpha private note", visibility="private", merge_similar=False)
+    agent.add("alpha shared note", visibility="shared", merge_similar=False)
+
+    options = dict(limit=10, threshold=0.0, scopes=["private"])
+    alone = _search("alpha note", **options)
+    server._execute([alone])
+    assert _contents(alone) == ["alpha private note"]
+
+    # Concurrent searches with the same arguments are answered by one search_many()
+    batch = [_search("alpha note", **options), _search("private alpha", **options)]
+    server._execute(batch)
+    assert server.batched_searches == 2
+    assert [_contents(call) for call in batch] == [["alpha private note"]] * 2
+
+    # A different scope is a different group, never merged into this one
+    shared = _search("alpha note", limit=10, threshold=0.0, scopes=["shared"])
+    private = _search("alpha note", **options)
+    server._execute([shared, private])
+    assert _contents(shared) == ["alpha shared note"]
+    assert _contents(private) == ["alpha private note"]
+
+
+def test_client_round_trip(server):
+    server.start()
+    with MemoryClient(server.address, user_id="bob") as client:
+        memory = client.add("Prefers window seats", category="preference", merge_similar=False)
+        assert memory.content == "Prefers window seats"
+        assert [r["id"] for r in client.search("window seats", threshold=0.0)] == [memory.id]
+        with pytest.raises(ValueError):
+            client.add("a private note without an agent", visibility="private")
+        assert client.server_stats()["requests"] >= 3
+
+
+def test_methods_cover_the_public_api():
+    public = {name for name, _ in inspect.getmembers(OpenClawMemory, inspect.isfunction) if not name.startswith("_")}
+    # for_user and close act on the client's own connection
+    assert METHODS == public - {"for_user", "close"}
+    assert SLOW_METHODS <= METHODS
+    assert [name for name in sorted(public) if not callable(getattr(MemoryClient, name, None))] == []
+
+
+def test_client_iter_memories(server):
+    server.start()
+    with MemoryClient(server.address, user_id="carol") as client:
+        added = [client.add(f"note {i}", merge_similar=False).id for i in range(7)]
+        scan = client.iter_memories(batch_size=3)
+        assert [len(batch) for batch in scan.batches()] == [3, 3, 1]
+        assert [m.id for m in client.iter_memories(batch_size=3)] == added
+
+        first = client.iter_memories(batch_size=3)
+        next(first.batches())
+        assert [m.id for m in client.iter_memories(batch_size=3, cursor=first.cursor)] == added[3:]
+
+
+def test_slow_methods_leave_searches_running(server, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(OpenClawMemory, "snapshot", lambda self, dest, incremental=True: release.wait(10))
+    server.start()
+    try:
+        snapshot = server.submit({"method": "snapshot", "user_id": "alice", "args": ["/unused"]})
+        time.sleep(0.05)  # the snapshot is now occupying a worker
+        search = server.submit({"method": "search", "user_id": "alice", "args": ["anything"]})
+        assert search.done.wait(5) and search.error is None
+        assert not snapshot.done.is_set()
+    finally:
+        release.set()
+    assert snapshot.done.wait(5) and snapshot.result is True
+    assert server.stats()["offloaded"] == 1
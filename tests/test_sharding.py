@@ -0,0 +1,73 @@
+"""Online shard split: moved users keep their rows and vectors, and deletes during the move stick"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from openmemory.backends import sharded_backend
+from openmemory.backends.encoders import EncoderSpec, HashEncoder
+from openmemory.backends.registry import create_long_term_backend, create_vector_store
+from openmemory.backends.sharded_backend import split_shard
+from openmemory.backends.vector_backend import VectorBackend
+from openmemory.core.config import MemoryConfig
+from openmemory.core.memory import Memory
+
+
+@pytest.fixture
+def stores(tmp_path):
+    config = MemoryConfig(base_path=str(tmp_path), encoder_backend="hash", num_shards=2)
+    long_term, vectors = create_long_term_backend(config), create_vector_store(config)
+    memories = [Memory(id=f"m{i}", content=f"note {i} for user {i % 12}", user_id=f"user-{i % 12}") for i in range(120)]
+    long_term.add_many(memories)
+    vectors.add_many(memories)
+    return long_term, vectors
+
+
+@pytest.mark.parametrize("index_type", ["flat", "binary"])
+def test_get_vectors_reads_requested_rows(tmp_path, index_type):
+    encoder = HashEncoder(EncoderSpec(backend="hash", dimension=32))
+    store = VectorBackend(str(tmp_path / "vectors"), dimension=32, index_type=index_type, encoder=encoder)
+    for batch in range(3):
+        store.add_many([Memory(id=f"{batch}-{i}", content=f"note {batch} {i}") for i in range(10)])
+
+    vectors, metas = store.get_vectors(["2-3", "0-1", "missing", "1-9"])
+    assert [m["id"] for m in metas] == ["0-1", "1-9", "2-3"]
+    expected = store._all_vectors()[[store._positions[m["id"]] for m in metas]]
+    assert np.allclose(vectors, expected)
+
+
+def test_split_moves_users_and_keeps_mid_copy_deletes(stores, monkeypatch):
+    long_term, vectors = stores
+    # Per-batch reads must not rebuild the whole index (that made a split quadratic)
+    monkeypatch.setattr(VectorBackend, "_all_vectors", lambda self: pytest.fail("full index read"))
+
+    move = sharded_backend._move_user
+    deleter = []
+
+    def move_then_delete(long_term, vector_store, user_id, source, target, since=None):
+        move(long_term, vector_store, user_id, source, target, since)
+        if since is None and not deleter:
+            # Another writer deletes a row the copy has already taken
+            victim = long_term.shards[source].get_by_user(user_id)[0].id
+            thread = threading.Thread(target=lambda: (long_term.delete_many([victim]), vectors.delete_many([victim])))
+            deleter.append((victim, thread))
+            thread.start()
+            time.sleep(0.2)
+
+    monkeypatch.setattr(sharded_backend, "_move_user", move_then_delete)
+    new_shard = split_shard(long_term, vectors)
+    victim, thread = deleter[0]
+    thread.join()
+
+    assert long_term.get(victim) is None
+    assert all(victim not in shard._positions for shard in vectors.shards.values())
+
+    moved = [u for u in long_term.list_users() if long_term.router.route(u) == new_shard]
+    assert moved
+    for user_id in moved:
+        ids = {f"m{i}" for i in range(120) if f"user-{i % 12}" == user_id} - {victim}
+        assert {m.id for m in long_term.shards[new_shard].get_by_user(user_id)} == ids
+        assert {meta["id"] for meta in vectors.shards[new_shard].get_vectors(list(ids))[1]} == ids
+        assert not any(long_term.shards[name].get_by_user(user_id) for name in long_term.shards if name != new_shard)
@@ -0,0 +1,73 @@
+"""Snapshots: a full + incremental chain restores every write, including back-dated imports"""
+
+import json
+import sqlite3
+
+from openmemory.backends.vector_backend import VectorBackend
+from openmemory.cli import main
+from openmemory.core.config import MemoryConfig
+from openmemory.core.memory import OpenClawMemory
+from openmemory.core.snapshot import Snapshotter
+
+
+def _contents(long_term):
+    return {m.id: m.content for m in long_term.iter_memories()}
+
+
+def _archived(db_path: str):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0] for row in conn.execute("SELECT id FROM memories_archive")}
+    finally:
+        conn.close()
+
+
+def test_full_then_incremental_restores_every_change(tmp_path):
+    config = MemoryConfig(base_path=str(tmp_path / "store"), encoder_backend="hash")
+    dest = str(tmp_path / "backups")
+    mem = OpenClawMemory(user_id="alice", config=config)
+    try:
+        edited = mem.add("first note", merge_similar=False)
+        deleted = mem.add("note to delete", merge_similar=False)
+        archived = mem.add("note to archive", merge_similar=False)
+        assert mem.snapshot(dest, incremental=False)["parts"]["store"]["full"]
+
+        mem.add("written after the full snapshot", merge_similar=False)
+        mem.update(edited.id, content="first note, edited")
+        mem.delete(deleted.id)
+        mem.long_term.archive([archived.id])
+        mem.vector_store.delete_many([archived.id])  # as compaction does
+        # An import keeps the records' own (older) timestamps
+        records = tmp_path / "import.jsonl"
+        records.write_text("".join(
+            json.dumps({"id": f"imported-{i}", "content": f"imported note {i}", "user_id": "alice",
+                        "created_at": f"2025-01-0{i + 1}T09:00:00", "updated_at": f"2025-01-0{i + 1}T09:00:00"}) + "\n"
+            for i in range(3)
+        ))
+        assert main(["--base-path", config.base_path, "--encoder", "hash", "-q", "import", str(records)]) == 0
+
+        info = mem.snapshot(dest)["parts"]["store"]
+        assert not info["full"]
+        assert (info["changed"], info["archived"], info["deleted"]) == (5, 1, 2)
+
+        expected = _contents(mem.long_term)
+        assert len(expected) == 5 and expected[edited.id] == "first note, edited"
+        # The finished snapshot pruned the log entries it shipped
+        conn = sqlite3.connect(config.long_term_path)
+        assert conn.execute("SELECT COUNT(*) FROM memory_changes").fetchone()[0] == 0
+        conn.close()
+    finally:
+        mem.close()
+
+    restored = MemoryConfig(base_path=str(tmp_path / "restored"), encoder_backend="hash")
+    Snapshotter(restored).restore(dest)
+    mem = OpenClawMemory(user_id="alice", config=restored)
+    try:
+        assert _contents(mem.long_term) == expected
+        assert _archived(restored.long_term_path) == {archived.id}
+        vectors = VectorBackend(restored.vector_path, restored.embedding_dimension, encoder=mem.vector_store.encoder)
+        assert set(vectors._positions) == set(expected)
+        # A restored store starts a new chain
+        assert mem.snapshot(dest)["parts"]["store"]["full"]
+    finally:
+        mem.close()
@@ -0,0 +1,78 @@
+"""Write-behind ingestion: adds commit in order, reads (global ones too) see them at once, close() loses none"""
+
+import time
+
+import pytest
+
+from openmemory.core.memory import OpenClawMemory
+
+SLOW = 30.0  # a flush interval no test waits out
+
+
+@pytest.fixture
+def mem(config):
+    config.write_behind = True
+    config.write_flush_interval = SLOW
+    mem = OpenClawMemory(user_id="alice", config=config)
+    yield mem
+    mem.close()
+
+
+def test_group_commits_keep_submission_order(mem):
+    mem.writer.batch_size = 4
+    committed = []
+    commit = mem.writer.commit
+
+    def record(batch):
+        committed.append([memory.id for memory, _ in batch])
+        commit(batch)
+
+    mem.writer.commit = record
+    ids = [mem.add(f"queued note {i}", merge_similar=False).id for i in range(10)]
+    assert mem.flush()
+
+    assert [len(batch) for batch in committed] == [4, 4, 2]
+    assert [memory_id for batch in committed for memory_id in batch] == ids
+    stats = mem.writer.stats()
+    assert (stats["committed"], stats["pending"], stats["largest_batch"]) == (10, 0, 4)
+
+
+def test_reads_see_queued_writes(mem):
+    start = time.monotonic()
+    memory = mem.add("Prefers window seats", category="preference", merge_similar=False)
+    assert mem.writer.pending() == 1
+
+    assert [r["id"] for r in mem.search("window seats", limit=1)] == [memory.id]
+    assert "Prefers window seats" in mem.get_context()
+    # The read flushed the queue instead of waiting out the interval
+    assert time.monotonic() - start < SLOW / 2
+
+    # Another user's reads do not wait on alice's queue
+    mem.add("Drinks green tea", merge_similar=False)
+    assert mem.for_user("bob").search("green tea") == []
+    assert mem.writer.pending() == 1
+
+
+def test_close_commits_everything_queued(config, mem):
+    ids = {mem.add(f"note before close {i}", merge_similar=False).id for i in range(20)}
+    assert mem.writer.pending() == 20
+    mem.close()
+
+    config.write_behind = False
+    reopened = OpenClawMemory(user_id="alice", config=config)
+    try:
+        assert {m.id for m in reopened.long_term.iter_memories()} == ids
+        assert set(reopened.vector_store._positions) == ids
+    finally:
+        reopened.close()
+
+
+def test_reads_see_other_users_queued_global_writes(mem):
+    bob = mem.for_user("bob", agent_id="planner")
+    memory = bob.add("The office is closed on Friday", visibility="global", merge_similar=False)
+    assert mem.writer.pending() == 1
+
+    alice = mem.for_user("alice", agent_id="assistant")
+    hits = alice.search("The office is closed on Friday", scopes=["global"], limit=1)
+    assert [r["id"] for r in hits] == [memory.id]
+    assert mem.writer.pending() == 0